@@ -1,3 +1,61 @@
 from django.contrib import admin
+from .models import SmeltingRun, CalibrationPoint, SmeltingMeasurement, CoefficientSet
 
-# Register your models here.
+
+class SmeltingMeasurementInline(admin.TabularInline):
+    model = SmeltingMeasurement
+    extra = 0
+    fields = ['measured_at', 'crude_mass', 'sb_in_crude', 'na_in_crude', 'as_in_crude', 'slag_mass', 'sb_in_slag', 'note']
+
+
+@admin.register(SmeltingRun)
+class SmeltingRunAdmin(admin.ModelAdmin):
+    list_display = ['id', '__str__', 'sb_extraction', 'crude_mass', 'created_at']
+    list_filter = ['created_at']
+    search_fields = ['input_hash']
+    readonly_fields = ['input_hash', 'inputs', 'result', 'created_at']
+    inlines = [SmeltingMeasurementInline]
+
+
+@admin.register(SmeltingMeasurement)
+class SmeltingMeasurementAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'crude_mass', 'sb_in_crude', 'sb_extraction', 'sb_in_slag', 'measured_at']
+    list_filter = ['measured_at']
+    list_select_related = ['run']
+    raw_id_fields = ['run']
+
+
+@admin.register(CoefficientSet)
+class CoefficientSetAdmin(admin.ModelAdmin):
+    list_display = ['version', 'measurements_count', 'created_at']
+    readonly_fields = ['version', 'coefficients', 'errors', 'measurements_count', 'created_at']
+
+
+@admin.register(CalibrationPoint)
+class CalibrationPointAdmin(admin.ModelAdmin):
+    list_display = [
+        '__str__',
+        'sb_extraction',
+        'sb_in_crude',
+        'sb_in_slag',
+        'na_to_crude',
+        'note'
+    ]
+    list_editable = ['sb_extraction', 'sb_in_crude', 'sb_in_slag', 'na_to_crude']
+    list_filter = ['reducer_type', 'temperature']
+
+    fieldsets = (
+        ('Условия плавки', {
+            'fields': (
+                ('temperature', 'reducer_type'),
+                ('reducer_amount', 'pb_ratio')
+            )
+        }),
+        ('Показатели', {
+            'fields': (
+                ('sb_extraction', 'sb_in_crude'),
+                ('sb_in_slag', 'na_to_crude'),
+                'note'
+            )
+        })
+    )
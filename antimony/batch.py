@@ -0,0 +1,297 @@
+"""
+Пакетный (векторизованный) расчет плавки антимоната натрия
+
+Все входные параметры — массивы NumPy: одна операция считает сразу всю
+сетку сценариев. Баланс считают те же узлы SMELTING_GRAPH, что и
+calculate_smelting (они принимают массивы), поэтому оптимизатор и отчеты
+работают с одной моделью.
+"""
+
+import numpy as np
+
+from core.instrumentation import timed
+from core.metrics import track_calculation
+
+from . import calculations
+from .calculations import (
+    MODES,
+    EXTRACTION_EXCELLENT,
+    EXTRACTION_GOOD,
+    REDUCER_MIN,
+    REDUCER_MAX,
+    NA_CRUDE_HIGH,
+    NA_CRUDE_WARNING,
+    TEMPERATURE_MIN,
+)
+from .equilibrium import equilibrium_outcomes
+from .interpolation import REDUCER_TYPES
+
+
+# Значения по умолчанию совпадают с calculate_smelting (кроме массы антимоната:
+# в пакетном расчете удобнее считать на 100 г исходного материала)
+INPUT_DEFAULTS = {
+    'antimonite_mass': 100.0,
+    'sb_content': 60.39,
+    'na_content': 7.66,
+    'as_content': 0.60,
+    'moisture': 2.0,
+    'temperature': 900,
+    'reducer_type': 'coke',
+    'reducer_amount': 10.0,
+    'coke_ash': 15.0,
+    'lead_addition': 0.0,
+}
+
+# Ограничение размера сетки для одного запроса
+MAX_SWEEP_POINTS = 250000
+# В равновесном режиме каждая точка — отдельная минимизация энергии Гиббса
+MAX_EQUILIBRIUM_POINTS = 5000
+
+# Категории рекомендаций (код в массиве → тип/описание)
+RECOMMENDATION_CATEGORIES = {
+    'extraction': ['warning', 'info', 'success'],            # низкое / хорошее / отличное
+    'reducer': ['warning', 'success', 'warning'],            # недостаток / оптимум / избыток
+    'sodium': ['success', 'warning', 'error'],               # норма / повышенное / высокое
+    'temperature': ['error', 'success'],                     # низкая / норма
+}
+
+# Столбцы результата и их отображаемые названия
+RESULT_COLUMNS = {
+    'dry_antimonite': 'Сухая масса антимоната (г)',
+    'reducer_mass': 'Масса восстановителя (г)',
+    'total_charge': 'Масса шихты (г)',
+    'sb_loaded': 'Загружено Sb (г)',
+    'sb_extraction': 'Извлечение Sb (%)',
+    'sb_in_crude': 'Sb в черновой сурьме (%)',
+    'crude_sb_mass': 'Масса черновой сурьмы (г)',
+    'crude_yield': 'Выход черновой сурьмы (%)',
+    'na_content_crude': 'Na в черновой сурьме (%)',
+    'as_content_crude': 'As в черновой сурьме (%)',
+    'slag_mass': 'Масса шлака (г)',
+    'sb_in_slag': 'Sb в шлаке (%)',
+    'sb_to_slag': 'Потери Sb в шлаке (г)',
+    'sb_losses': 'Sb в газы (г)',
+    'as_to_gas': 'As в газы (г)',
+    'total_losses_percent': 'Общие потери (%)',
+    'total_heat': 'Потребность в тепле (кДж)',
+    'specific_energy': 'Удельный расход энергии (кВт·ч/т черновой)',
+}
+
+
+# === ОСНОВНОЙ ПАКЕТНЫЙ РАСЧЕТ ===
+
+def evaluate_batch(inputs, mode='empirical'):
+    """
+    Материальный баланс плавки для массива сценариев
+
+    Args:
+        inputs (dict): входные параметры calculate_smelting; каждое значение —
+            число или массив (все массивы транслируются друг с другом).
+            reducer_type — строка или массив строк 'coke'/'charcoal'.
+        mode (str): 'empirical' — интерполяция по опытным данным,
+            'equilibrium' — равновесный состав (см. equilibrium.py)
+
+    Returns:
+        dict: массивы показателей (имена — как у переменных calculate_smelting),
+            тепловой баланс (см. heat_balance) и коды категорий рекомендаций ('category_*')
+    """
+    if mode not in MODES:
+        raise ValueError(f'Неизвестный режим расчета: {mode}')
+    values = {key: inputs.get(key, default) for key, default in INPUT_DEFAULTS.items()}
+
+    arrays = np.broadcast_arrays(
+        *(np.asarray(values[key], dtype=float) for key in INPUT_DEFAULTS if key != 'reducer_type'),
+        np.asarray(values['reducer_type']),
+    )
+    (antimonite_mass, sb_content, na_content, as_content, moisture, temperature,
+     reducer_amount, coke_ash, lead_addition, reducer_type) = arrays
+    is_charcoal = reducer_type == 'charcoal'
+
+    valid = antimonite_mass > 0
+    mass = np.where(valid, antimonite_mass, np.nan)
+
+    # 1-4. Сухая масса, загрузка элементов, восстановитель, шихта
+    dry_antimonite = calculations.dry_antimonite(mass, moisture)
+    loaded = calculations.elements(dry_antimonite, sb_content, na_content, as_content)
+    reducer_mass = calculations.reducer_mass(dry_antimonite, reducer_amount)
+    total_charge = calculations.total_charge(dry_antimonite, reducer_mass, lead_addition)
+
+    # 5-6. Показатели: равновесный состав или таблица калибровки с поправками
+    if mode == 'equilibrium':
+        state = equilibrium_outcomes({
+            'antimonite_mass': mass, 'moisture': moisture, 'sb_content': sb_content,
+            'na_content': na_content, 'as_content': as_content, 'temperature': temperature,
+            'is_charcoal': is_charcoal, 'reducer_amount': reducer_amount,
+            'coke_ash': coke_ash, 'lead_addition': lead_addition,
+        })
+        outcomes = state
+    else:
+        state = None
+        outcomes = calculations.empirical_outcomes(
+            temperature, reducer_type, reducer_amount, lead_addition / dry_antimonite
+        )
+
+    # 7-14. Черновая сурьма, шлак, потери, тепловой баланс
+    crude = calculations.crude(loaded, outcomes)
+    slag = calculations.slag_composition(state, outcomes, dry_antimonite, reducer_mass, crude,
+                                         reducer_type, coke_ash)
+    losses = calculations.loss_terms(loaded, crude, slag, total_charge)
+    heat = calculations.heat(dry_antimonite, loaded, reducer_mass, crude, losses, temperature, mass,
+                             lead_addition)
+
+    sb_extraction = crude['sb_extraction']
+    na_content_crude = crude['na_content']
+    return {
+        **heat,
+        'valid': valid,
+        'dry_antimonite': dry_antimonite,
+        'sb_loaded': loaded['sb'],
+        'na_loaded': loaded['na'],
+        'as_loaded': loaded['as'],
+        'reducer_mass': reducer_mass,
+        'total_charge': total_charge,
+        'sb_extraction': sb_extraction,
+        'sb_in_crude': crude['sb_in_crude'],
+        'crude_sb_mass': crude['mass'],
+        'sb_to_crude': crude['sb'],
+        'na_to_crude': crude['na_to_crude'],
+        'na_to_slag': crude['na_to_slag'],
+        'as_to_crude': crude['as_to_crude'],
+        'as_to_slag': crude['as_to_slag'],
+        'as_to_gas': crude['as_to_gas'],
+        'na_content_crude': na_content_crude,
+        'as_content_crude': crude['as_content'],
+        'slag_mass': slag['mass'],
+        'sb_in_slag': slag['sb_content'],
+        'sb_to_slag': losses['sb_to_slag'],
+        'sb_losses': losses['sb_losses'],
+        'total_losses': losses['total_losses'],
+        'total_losses_percent': losses['total_losses'] / total_charge * 100,
+        'crude_yield': losses['crude_yield'],
+        'slag_yield': losses['slag_yield'],
+
+        # Категории рекомендаций (см. generate_recommendations)
+        'category_extraction': (
+            (sb_extraction >= EXTRACTION_GOOD).astype(int) + (sb_extraction >= EXTRACTION_EXCELLENT)
+        ),
+        'category_reducer': (
+            (reducer_amount >= REDUCER_MIN).astype(int) + (reducer_amount > REDUCER_MAX)
+        ),
+        'category_sodium': (
+            (na_content_crude > NA_CRUDE_WARNING).astype(int) + (na_content_crude > NA_CRUDE_HIGH)
+        ),
+        'category_temperature': (temperature >= TEMPERATURE_MIN).astype(int),
+    }
+
+
+# === СЕТКА ПАРАМЕТРОВ ===
+
+def parse_axis(name, spec):
+    """
+    Значения одного входного параметра для сетки
+
+    spec: число/строка, список значений или диапазон
+    {'min': ..., 'max': ..., 'steps': ...}
+    """
+    if isinstance(spec, dict):
+        steps = int(spec.get('steps', 10))
+        if steps < 1:
+            raise ValueError(f'{name}: число шагов должно быть больше 0')
+        values = np.linspace(float(spec['min']), float(spec['max']), steps)
+        return values.tolist()
+    if isinstance(spec, (list, tuple)):
+        if not spec:
+            raise ValueError(f'{name}: пустой список значений')
+        values = list(spec)
+    else:
+        values = [spec]
+
+    if name == 'reducer_type':
+        unknown = set(values) - set(REDUCER_TYPES)
+        if unknown:
+            raise ValueError(f'Неизвестный тип восстановителя: {", ".join(map(str, unknown))}')
+        return values
+    return [float(v) for v in values]
+
+
+def build_grid(spec):
+    """
+    Построение полной сетки сценариев
+
+    Args:
+        spec (dict): {параметр: значение | список | диапазон}
+
+    Returns:
+        tuple: (axes, inputs) — axes: {параметр: значения} только для
+            изменяемых параметров (в порядке INPUT_DEFAULTS), inputs —
+            плоские массивы для evaluate_batch
+    """
+    unknown = set(spec) - set(INPUT_DEFAULTS)
+    if unknown:
+        raise ValueError(f'Неизвестные параметры: {", ".join(sorted(unknown))}')
+
+    values = {key: parse_axis(key, spec.get(key, default)) for key, default in INPUT_DEFAULTS.items()}
+    axes = {key: vals for key, vals in values.items() if len(vals) > 1}
+
+    size = int(np.prod([len(vals) for vals in axes.values()], dtype=np.int64))
+    if size > MAX_SWEEP_POINTS:
+        raise ValueError(f'Слишком большая сетка: {size} точек (максимум {MAX_SWEEP_POINTS})')
+
+    inputs = {key: vals[0] for key, vals in values.items() if key not in axes}
+    if axes:
+        mesh = np.meshgrid(*(np.asarray(vals) for vals in axes.values()), indexing='ij')
+        for key, grid in zip(axes, mesh):
+            inputs[key] = grid.ravel()
+
+    return axes, inputs
+
+
+@timed('calc')
+@track_calculation
+def run_sweep(spec, columns=None, mode='empirical'):
+    """
+    Расчет сетки сценариев в столбцовом виде
+
+    Args:
+        spec (dict): описание сетки (см. build_grid)
+        columns (list): нужные столбцы (по умолчанию все из RESULT_COLUMNS)
+        mode (str): режим расчета (см. evaluate_batch)
+
+    Returns:
+        dict: {'axes', 'shape', 'size', 'columns', 'categories', 'labels'}
+    """
+    axes, inputs = build_grid(spec)
+    if float(np.min(inputs['antimonite_mass'])) <= 0:
+        raise ValueError('Масса антимоната должна быть больше 0')
+
+    columns = columns or list(RESULT_COLUMNS)
+    unknown = set(columns) - set(RESULT_COLUMNS)
+    if unknown:
+        raise ValueError(f'Неизвестные столбцы: {", ".join(sorted(unknown))}')
+
+    shape = [len(vals) for vals in axes.values()]
+    size = int(np.prod(shape, dtype=np.int64))
+    if mode == 'equilibrium' and size > MAX_EQUILIBRIUM_POINTS:
+        raise ValueError(
+            f'Слишком большая сетка для равновесного режима: {size} точек (максимум {MAX_EQUILIBRIUM_POINTS})'
+        )
+    results = evaluate_batch(inputs, mode)
+
+    def column(values, decimals=None):
+        flat = np.broadcast_to(values, (size,))
+        if decimals is not None:
+            flat = np.round(flat, decimals)
+        return flat.tolist()
+
+    return {
+        'mode': mode,
+        'axes': axes,
+        'shape': shape,
+        'size': size,
+        'columns': {name: column(results[name], 2) for name in columns},
+        'categories': {
+            name: column(results[f'category_{name}']) for name in RECOMMENDATION_CATEGORIES
+        },
+        'category_types': RECOMMENDATION_CATEGORIES,
+        'labels': {name: RESULT_COLUMNS[name] for name in columns},
+    }
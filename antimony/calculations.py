@@ -1,8 +1,89 @@
 """
 Расчетные функции для восстановительной плавки антимоната натрия
+
+Узлы SMELTING_GRAPH принимают как числа, так и массивы NumPy: те же
+функции считают и одну плавку (calculate_smelting), и сетку сценариев
+(batch.evaluate_batch), так что модель существует в одном экземпляре.
 """
 
+import numpy as np
+
+from core.graph import Graph
+from core.instrumentation import timed
+from core.metrics import track_calculation
+
+from .interpolation import get_table, lookup
+from .coefficients import apply_coefficients, get_coefficients
+from .equilibrium import equilibrium_outcomes
+from .heat_balance import heat_balance
+from .thermodata import ELEMENTS
+
+# Пороги оценки результатов (используются и в пакетных расчетах)
+EXTRACTION_EXCELLENT = 85      # Извлечение выше промышленного уровня (%)
+EXTRACTION_GOOD = 70           # Промышленный уровень извлечения (%)
+REDUCER_MIN = 10               # Минимальный рекомендуемый расход восстановителя (%)
+REDUCER_MAX = 15               # Максимальный рекомендуемый расход восстановителя (%)
+NA_CRUDE_HIGH = 5              # Высокое содержание Na в черновой сурьме (%)
+NA_CRUDE_WARNING = 3           # Повышенное содержание Na в черновой сурьме (%)
+TEMPERATURE_MIN = 900          # Минимальная температура плавки (°C)
+
+# Режимы расчета распределения: по опытным данным или по термодинамическому равновесию
+MODES = ('empirical', 'equilibrium')
+NA_IN_SLAG = 30.0              # Содержание Na в шлаке (%), эмпирическая оценка
+
+
+# Входные параметры и значения по умолчанию (масса по умолчанию не задается)
+INPUT_DEFAULTS = {
+    'antimonite_mass': 0,
+    'sb_content': 60.39,
+    'na_content': 7.66,
+    'as_content': 0.60,
+    'moisture': 2.0,
+    'temperature': 900,
+    'reducer_type': 'coke',
+    'reducer_amount': 10.0,
+    'coke_ash': 15.0,
+    'lead_addition': 0,
+    'mode': 'empirical',
+}
+
+# calibration — версия таблицы калибровки и коэффициентов: при ее смене
+# сессии живого калькулятора пересчитывают показатели
+SMELTING_GRAPH = Graph((*INPUT_DEFAULTS, 'calibration'))
+
+
+def model_version():
+    """Отпечаток таблицы калибровки и версия поправочных коэффициентов"""
+    return get_table().fingerprint, get_coefficients().version
+
+
+def parse_inputs(data):
+    """
+    Входные данные плавки в рабочих типах
+
+    Returns:
+        tuple: (inputs, error) — error — текст ошибки или None
+    """
+    inputs = {}
+    for key, default in INPUT_DEFAULTS.items():
+        value = data.get(key, default)
+        if key == 'temperature':
+            inputs[key] = int(value)
+        elif key in ('reducer_type', 'mode'):
+            inputs[key] = value
+        else:
+            inputs[key] = float(value)
+
+    # Проверка на нулевые значения
+    if inputs['antimonite_mass'] <= 0:
+        return inputs, 'Масса антимоната должна быть больше 0'
+    if inputs['mode'] not in MODES:
+        return inputs, f'Неизвестный режим расчета: {inputs["mode"]}'
+    return inputs, None
 
+
+@timed('calc')
+@track_calculation
 def calculate_smelting(data):
     """
     Основная функция расчета плавки антимоната натрия
@@ -19,233 +100,326 @@ def calculate_smelting(data):
             'reducer_amount': float,             # Расход восстановителя (%)
             'coke_ash': float,                   # Зольность коксика (%)
             'lead_addition': float,              # Добавка свинца (г), 0 если нет
+            'mode': str,                         # 'empirical' (по умолчанию) или 'equilibrium'
         }
     
     Возвращает:
-        dict: Полный материальный баланс и показатели
-    """
-    
-    # Извлекаем данные
-    antimonite_mass = float(data.get('antimonite_mass', 0))
-    sb_content = float(data.get('sb_content', 60.39))
-    na_content = float(data.get('na_content', 7.66))
-    as_content = float(data.get('as_content', 0.60))
-    moisture = float(data.get('moisture', 2.0))
-    
-    temperature = int(data.get('temperature', 900))
-    reducer_type = data.get('reducer_type', 'coke')
-    reducer_amount = float(data.get('reducer_amount', 10.0))
-    coke_ash = float(data.get('coke_ash', 15.0))
-    lead_addition = float(data.get('lead_addition', 0))
-    
-    # Проверка на нулевые значения
-    if antimonite_mass <= 0:
-        return {'error': 'Масса антимоната должна быть больше 0'}
-    
-    # 1. РАСЧЕТ СУХОЙ МАССЫ
-    dry_antimonite = antimonite_mass * (1 - moisture / 100)
-    
-    # 2. КОЛИЧЕСТВО ЗАГРУЖЕННЫХ ЭЛЕМЕНТОВ
-    sb_loaded = dry_antimonite * sb_content / 100
-    na_loaded = dry_antimonite * na_content / 100
-    as_loaded = dry_antimonite * as_content / 100
-    
-    # 3. МАССА ВОССТАНОВИТЕЛЯ
-    reducer_mass = dry_antimonite * reducer_amount / 100
-    
-    # 4. ОБЩАЯ МАССА ШИХТЫ
-    total_charge = dry_antimonite + reducer_mass + lead_addition
+        dict: Полный материальный и тепловой баланс и показатели
     
-    # 5. ИЗВЛЕЧЕНИЕ СУРЬМЫ (по экспериментальным данным)
-    if lead_addition > 0:
-        # С добавкой свинца
-        sb_extraction = get_extraction_with_lead(lead_addition, dry_antimonite)
-    else:
-        # Без свинца
-        sb_extraction = get_extraction_no_lead(temperature, reducer_type)
-    
-    # 6. СОДЕРЖАНИЕ Sb В ЧЕРНОВОЙ СУРЬМЕ
-    sb_in_crude = get_sb_content_in_crude(temperature, reducer_type, reducer_amount)
-    
-    # 7. МАССА ЧЕРНОВОЙ СУРЬМЫ
-    crude_sb_mass = (sb_loaded * sb_extraction / 100) / (sb_in_crude / 100)
-    
-    # 8. РАСПРЕДЕЛЕНИЕ НАТРИЯ
-    na_distribution = get_na_distribution(reducer_type)
-    na_to_crude = na_loaded * na_distribution['to_crude'] / 100
-    na_to_slag = na_loaded * na_distribution['to_slag'] / 100
-    
-    # 9. РАСПРЕДЕЛЕНИЕ МЫШЬЯКА
-    as_to_crude = as_loaded * 0.50  # ~50% в черновую
-    as_to_slag = as_loaded * 0.15   # ~15% в шлак
-    as_to_gas = as_loaded * 0.35    # ~35% в газы
-    
-    # 10. ПРИМЕСИ В ЧЕРНОВОЙ СУРЬМЕ
-    na_content_crude = (na_to_crude / crude_sb_mass) * 100
-    as_content_crude = (as_to_crude / crude_sb_mass) * 100
-    pb_content_crude = 0.70  # Средняя примесь свинца
-    fe_content_crude = 0.55  # Средняя примесь железа
-    
-    # 11. МАССА И СОСТАВ ШЛАКА
-    slag_mass = calculate_slag_mass(
-        dry_antimonite, reducer_mass, crude_sb_mass, reducer_type, coke_ash
+    Расчет выполняется по графу SMELTING_GRAPH (шаги 1-14 ниже); тот же
+    граф используется для инкрементального пересчета в живом калькуляторе.
+    """
+    inputs, error = parse_inputs(data)
+    if error:
+        return {'error': error}
+    return {'success': True, **SMELTING_GRAPH.evaluate({**inputs, 'calibration': model_version()})}
+
+
+# === ГРАФ РАСЧЕТА ПЛАВКИ ===
+
+@SMELTING_GRAPH.node
+def dry_antimonite(antimonite_mass, moisture):
+    """1. Сухая масса антимоната"""
+    return antimonite_mass * (1 - moisture / 100)
+
+
+@SMELTING_GRAPH.node
+def elements(dry_antimonite, sb_content, na_content, as_content):
+    """2. Количество загруженных элементов (г)"""
+    return {
+        'sb': dry_antimonite * sb_content / 100,
+        'na': dry_antimonite * na_content / 100,
+        'as': dry_antimonite * as_content / 100,
+    }
+
+
+@SMELTING_GRAPH.node
+def reducer_mass(dry_antimonite, reducer_amount):
+    """3. Масса восстановителя"""
+    return dry_antimonite * reducer_amount / 100
+
+
+@SMELTING_GRAPH.node
+def total_charge(dry_antimonite, reducer_mass, lead_addition):
+    """4. Общая масса шихты"""
+    return dry_antimonite + reducer_mass + lead_addition
+
+
+@SMELTING_GRAPH.node
+def equilibrium_state(mode, antimonite_mass, moisture, sb_content, na_content, as_content,
+                      temperature, reducer_type, reducer_amount, coke_ash, lead_addition):
+    """Равновесный состав (только в режиме 'equilibrium', см. equilibrium.py)"""
+    if mode != 'equilibrium':
+        return None
+    return get_equilibrium(
+        antimonite_mass, moisture, sb_content, na_content, as_content,
+        temperature, reducer_type, reducer_amount, coke_ash, lead_addition
     )
-    
-    sb_in_slag = get_sb_in_slag(reducer_amount)  # Содержание Sb в шлаке (%)
-    na_in_slag = 30.0  # Содержание Na в шлаке (~30%)
-    
-    # 12. ПОТЕРИ
-    sb_to_slag = slag_mass * sb_in_slag / 100
-    sb_losses = sb_loaded - (crude_sb_mass * sb_in_crude / 100) - sb_to_slag
-    total_losses = total_charge - crude_sb_mass - slag_mass
-    
-    # 13. ТЕХНИКО-ЭКОНОМИЧЕСКИЕ ПОКАЗАТЕЛИ
-    crude_yield = (crude_sb_mass / total_charge) * 100
-    slag_yield = (slag_mass / total_charge) * 100
-    
-    # ФОРМИРУЕМ РЕЗУЛЬТАТ
-    results = {
-        'success': True,
-        
-        # Входные данные (для отображения)
-        'input': {
-            'antimonite_mass': antimonite_mass,
-            'dry_antimonite': round(dry_antimonite, 2),
-            'sb_content': sb_content,
-            'na_content': na_content,
-            'as_content': as_content,
-            'temperature': temperature,
-            'reducer_type_display': 'Коксик' if reducer_type == 'coke' else 'Древесный уголь',
-            'reducer_amount': reducer_amount,
-            'reducer_mass': round(reducer_mass, 2),
-            'lead_addition': lead_addition,
-            'total_charge': round(total_charge, 2),
-        },
-        
-        # Загружено элементов
-        'loaded': {
-            'sb': round(sb_loaded, 2),
-            'na': round(na_loaded, 2),
-            'as': round(as_loaded, 2),
-        },
-        
-        # ЧЕРНОВАЯ СУРЬМА
-        'crude_antimony': {
-            'mass': round(crude_sb_mass, 2),
-            'yield_percent': round(crude_yield, 2),
-            'sb_content': round(sb_in_crude, 2),
-            'sb_extraction': round(sb_extraction, 2),
-            'impurities': {
-                'na': round(na_content_crude, 2),
-                'as': round(as_content_crude, 2),
-                'pb': pb_content_crude,
-                'fe': fe_content_crude,
-            }
-        },
-        
-        # ШЛАК
-        'slag': {
-            'mass': round(slag_mass, 2),
-            'yield_percent': round(slag_yield, 2),
-            'sb_content': round(sb_in_slag, 2),
-            'na_content': na_in_slag,
-            'sb_losses': round(sb_to_slag, 2),
-        },
-        
-        # ПОТЕРИ
-        'losses': {
-            'sb_to_gas': round(sb_losses, 2),
-            'as_to_gas': round(as_to_gas, 2),
-            'total_balance_diff': round(total_losses, 2),
-            'total_losses_percent': round((total_losses / total_charge) * 100, 2),
+
+
+@SMELTING_GRAPH.node
+def outcomes(equilibrium_state, temperature, reducer_type, reducer_amount, lead_addition, dry_antimonite,
+             calibration):
+    """
+    5-6. Извлечение сурьмы, содержание Sb в черновой, распределение Na и As
+
+    Интерполяция по экспериментальным данным с поправками по фактическим
+    плавкам (interpolation.py, coefficients.py) или равновесный состав.
+    """
+    if equilibrium_state:
+        return equilibrium_state
+    return get_outcomes(temperature, reducer_type, reducer_amount, lead_addition / dry_antimonite)
+
+
+@SMELTING_GRAPH.node
+def crude(elements, outcomes):
+    """7-10. Масса черновой сурьмы, распределение Na и As, примеси"""
+    sb_extraction = outcomes['sb_extraction']
+    sb_in_crude = outcomes['sb_in_crude']
+    crude_sb_mass = (elements['sb'] * sb_extraction / 100) / (sb_in_crude / 100)
+
+    na_to_crude = elements['na'] * outcomes['na_to_crude'] / 100
+    na_to_slag = elements['na'] * (100 - outcomes['na_to_crude']) / 100
+
+    as_to_crude = elements['as'] * outcomes['as_to_crude'] / 100   # ~50% в черновую
+    as_to_slag = elements['as'] * outcomes['as_to_slag'] / 100     # ~15% в шлак
+    as_to_gas = elements['as'] * outcomes['as_to_gas'] / 100       # ~35% в газы
+
+    return {
+        'sb_extraction': sb_extraction,
+        'sb_in_crude': sb_in_crude,
+        'mass': crude_sb_mass,
+        'sb': crude_sb_mass * sb_in_crude / 100,
+        'na_to_crude': na_to_crude,
+        'na_to_slag': na_to_slag,
+        'as_to_crude': as_to_crude,
+        'as_to_slag': as_to_slag,
+        'as_to_gas': as_to_gas,
+        'na_content': (na_to_crude / crude_sb_mass) * 100,
+        'as_content': (as_to_crude / crude_sb_mass) * 100,
+        'pb_content': 0.70,  # Средняя примесь свинца
+        'fe_content': 0.55,  # Средняя примесь железа
+    }
+
+
+@SMELTING_GRAPH.node
+def slag_composition(equilibrium_state, outcomes, dry_antimonite, reducer_mass, crude, reducer_type, coke_ash):
+    """11. Масса и состав шлака"""
+    if equilibrium_state:
+        # Оксидный расплав + пустая порода + зола
+        slag_mass = equilibrium_state['slag_mass']
+        return {
+            'mass': slag_mass,
+            'sb_content': equilibrium_state['sb_slag_mass'] / slag_mass * 100,
+            'na_content': np.round(equilibrium_state['na_slag_mass'] / slag_mass * 100, 2),
+        }
+    return {
+        'mass': calculate_slag_mass(dry_antimonite, reducer_mass, crude['mass'], reducer_type, coke_ash),
+        'sb_content': outcomes['sb_in_slag'],  # Содержание Sb в шлаке (%)
+        'na_content': NA_IN_SLAG,              # Содержание Na в шлаке (~30%)
+    }
+
+
+@SMELTING_GRAPH.node
+def loss_terms(elements, crude, slag_composition, total_charge):
+    """12-13. Потери и технико-экономические показатели"""
+    sb_to_slag = slag_composition['mass'] * slag_composition['sb_content'] / 100
+    total_losses = total_charge - crude['mass'] - slag_composition['mass']
+    return {
+        'sb_to_slag': sb_to_slag,
+        'sb_losses': elements['sb'] - crude['sb'] - sb_to_slag,
+        'total_losses': total_losses,
+        'crude_yield': (crude['mass'] / total_charge) * 100,
+        'slag_yield': (slag_composition['mass'] / total_charge) * 100,
+    }
+
+
+@SMELTING_GRAPH.node
+def heat(dry_antimonite, elements, reducer_mass, crude, loss_terms, temperature, antimonite_mass, lead_addition):
+    """14. Тепловой баланс (см. heat_balance.py)"""
+    return heat_balance({
+        'dry_antimonite': dry_antimonite, 'sb_loaded': elements['sb'], 'na_loaded': elements['na'],
+        'as_loaded': elements['as'], 'reducer_mass': reducer_mass,
+        'sb_to_crude': crude['sb'], 'na_to_crude': crude['na_to_crude'],
+        'as_to_crude': crude['as_to_crude'], 'sb_to_slag': loss_terms['sb_to_slag'],
+        'na_to_slag': crude['na_to_slag'], 'as_to_slag': crude['as_to_slag'],
+        'as_to_gas': crude['as_to_gas'], 'sb_losses': loss_terms['sb_losses'],
+        'crude_sb_mass': crude['mass'],
+    }, temperature, antimonite_mass - dry_antimonite, lead_addition)
+
+
+# === РАЗДЕЛЫ РЕЗУЛЬТАТА ===
+
+@SMELTING_GRAPH.output('input')
+def input_section(antimonite_mass, dry_antimonite, sb_content, na_content, as_content, temperature,
+          reducer_type, reducer_amount, reducer_mass, lead_addition, total_charge):
+    """Входные данные (для отображения)"""
+    return {
+        'antimonite_mass': antimonite_mass,
+        'dry_antimonite': round(dry_antimonite, 2),
+        'sb_content': sb_content,
+        'na_content': na_content,
+        'as_content': as_content,
+        'temperature': temperature,
+        'reducer_type_display': 'Коксик' if reducer_type == 'coke' else 'Древесный уголь',
+        'reducer_amount': reducer_amount,
+        'reducer_mass': round(reducer_mass, 2),
+        'lead_addition': lead_addition,
+        'total_charge': round(total_charge, 2),
+    }
+
+
+@SMELTING_GRAPH.output('loaded')
+def loaded_section(elements):
+    """Загружено элементов"""
+    return {key: round(value, 2) for key, value in elements.items()}
+
+
+@SMELTING_GRAPH.output('crude_antimony')
+def crude_antimony_section(crude, loss_terms):
+    """Черновая сурьма"""
+    return {
+        'mass': round(crude['mass'], 2),
+        'yield_percent': round(loss_terms['crude_yield'], 2),
+        'sb_content': round(crude['sb_in_crude'], 2),
+        'sb_extraction': round(crude['sb_extraction'], 2),
+        'impurities': {
+            'na': round(crude['na_content'], 2),
+            'as': round(crude['as_content'], 2),
+            'pb': crude['pb_content'],
+            'fe': crude['fe_content'],
+        }
+    }
+
+
+@SMELTING_GRAPH.output('slag')
+def slag_section(slag_composition, loss_terms):
+    """Шлак"""
+    return {
+        'mass': round(slag_composition['mass'], 2),
+        'yield_percent': round(loss_terms['slag_yield'], 2),
+        'sb_content': round(slag_composition['sb_content'], 2),
+        'na_content': slag_composition['na_content'],
+        'sb_losses': round(loss_terms['sb_to_slag'], 2),
+    }
+
+
+@SMELTING_GRAPH.output('losses')
+def losses_section(crude, loss_terms, total_charge):
+    """Потери"""
+    return {
+        'sb_to_gas': round(loss_terms['sb_losses'], 2),
+        'as_to_gas': round(crude['as_to_gas'], 2),
+        'total_balance_diff': round(loss_terms['total_losses'], 2),
+        'total_losses_percent': round((loss_terms['total_losses'] / total_charge) * 100, 2),
+    }
+
+
+@SMELTING_GRAPH.output('balance')
+def balance_section(elements, crude, loss_terms):
+    """Материальный баланс"""
+    return {
+        'sb': {
+            'loaded': round(elements['sb'], 2),
+            'to_crude': round(crude['sb'], 2),
+            'to_slag': round(loss_terms['sb_to_slag'], 2),
+            'to_gas': round(loss_terms['sb_losses'], 2),
+            'extraction_percent': round(crude['sb_extraction'], 2),
         },
-        
-        # МАТЕРИАЛЬНЫЙ БАЛАНС
-        'balance': {
-            'sb': {
-                'loaded': round(sb_loaded, 2),
-                'to_crude': round(crude_sb_mass * sb_in_crude / 100, 2),
-                'to_slag': round(sb_to_slag, 2),
-                'to_gas': round(sb_losses, 2),
-                'extraction_percent': round(sb_extraction, 2),
-            },
-            'na': {
-                'loaded': round(na_loaded, 2),
-                'to_crude': round(na_to_crude, 2),
-                'to_slag': round(na_to_slag, 2),
-            },
-            'as': {
-                'loaded': round(as_loaded, 2),
-                'to_crude': round(as_to_crude, 2),
-                'to_slag': round(as_to_slag, 2),
-                'to_gas': round(as_to_gas, 2),
-            }
+        'na': {
+            'loaded': round(elements['na'], 2),
+            'to_crude': round(crude['na_to_crude'], 2),
+            'to_slag': round(crude['na_to_slag'], 2),
         },
-        
-        # ОЦЕНКА И РЕКОМЕНДАЦИИ
-        'recommendations': generate_recommendations(
-            sb_extraction, reducer_amount, temperature, reducer_type, na_content_crude
-        )
+        'as': {
+            'loaded': round(elements['as'], 2),
+            'to_crude': round(crude['as_to_crude'], 2),
+            'to_slag': round(crude['as_to_slag'], 2),
+            'to_gas': round(crude['as_to_gas'], 2),
+        }
     }
-    
-    return results
 
 
-# === ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ===
+@SMELTING_GRAPH.output('heat_balance')
+def heat_balance_section(heat):
+    """Тепловой баланс (кДж)"""
+    return {
+        'reaction_heat': round(float(heat['reaction_heat']), 1),
+        'metal_heat': round(float(heat['metal_heat']), 1),
+        'slag_heat': round(float(heat['slag_heat']), 1),
+        'gas_heat': round(float(heat['gas_heat']), 1),
+        'useful_heat': round(float(heat['useful_heat']), 1),
+        'heat_losses': round(float(heat['heat_losses']), 1),
+        'total_heat': round(float(heat['total_heat']), 1),
+        'specific_energy': round(float(heat['specific_energy']), 0),
+    }
 
-def get_extraction_no_lead(temperature, reducer_type):
-    """Извлечение Sb без добавки свинца"""
-    if temperature == 900:
-        return 71.0 if reducer_type == 'charcoal' else 72.35
-    else:  # 1000°C
-        return 75.85 if reducer_type == 'charcoal' else 71.49
 
+# Режим расчета и равновесное распределение элементов
+SMELTING_GRAPH.expose('mode')
 
-def get_extraction_with_lead(lead_mass, antimonite_mass):
-    """Извлечение Sb с добавкой свинца"""
-    pb_ratio = lead_mass / antimonite_mass
-    if pb_ratio > 1.0:  # Много свинца
-        return 80.09
-    else:
-        return 84.83
 
+@SMELTING_GRAPH.output('equilibrium')
+def equilibrium_section(equilibrium_state):
+    """Равновесное распределение элементов (None в эмпирическом режиме)"""
+    return equilibrium_state and {
+        'distribution': equilibrium_state['distribution'],
+        'co_fraction': round(equilibrium_state['co_fraction'] * 100, 2),
+        'metal_mass': round(equilibrium_state['metal_mass'], 2),
+        'oxide_slag_mass': round(equilibrium_state['oxide_slag_mass'], 2),
+    }
 
-def get_sb_content_in_crude(temperature, reducer_type, reducer_amount):
-    """Содержание Sb в черновой сурьме"""
-    if reducer_amount < 10:
-        return 97.90
-    elif reducer_amount > 10:
-        return 92.42
-    else:
-        if temperature == 900:
-            return 88.73 if reducer_type == 'charcoal' else 94.05
-        else:
-            return 90.52 if reducer_type == 'charcoal' else 87.32
 
+@SMELTING_GRAPH.output('recommendations')
+def recommendations_section(crude, reducer_amount, temperature, reducer_type):
+    """Оценка и рекомендации"""
+    return generate_recommendations(
+        crude['sb_extraction'], reducer_amount, temperature, reducer_type, crude['na_content']
+    )
 
-def get_na_distribution(reducer_type):
-    """Распределение натрия"""
-    if reducer_type == 'coke':
-        return {'to_crude': 4.5, 'to_slag': 95.5}  # Коксик
-    else:
-        return {'to_crude': 35.0, 'to_slag': 65.0}  # Древесный уголь
 
+# === ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ===
 
-def get_sb_in_slag(reducer_amount):
-    """Содержание Sb в шлаке в зависимости от расхода восстановителя"""
-    if reducer_amount < 10:
-        return 55.83
-    elif reducer_amount > 10:
-        return 0.56
-    else:
-        return 1.0
+def empirical_outcomes(temperature, reducer_type, reducer_amount, pb_ratio):
+    """Показатели плавки по таблице калибровки с поправочными коэффициентами (числа или массивы)"""
+    return apply_coefficients(lookup(temperature, reducer_type, reducer_amount, pb_ratio), get_coefficients().values)
+
+
+def get_outcomes(temperature, reducer_type, reducer_amount, pb_ratio):
+    """Показатели одной плавки (извлечение, Sb, Na, As) в виде чисел"""
+    outcomes = empirical_outcomes(temperature, reducer_type, reducer_amount, pb_ratio)
+    return {key: float(value) for key, value in outcomes.items()}
+
+
+def get_equilibrium(antimonite_mass, moisture, sb_content, na_content, as_content,
+                    temperature, reducer_type, reducer_amount, coke_ash, lead_addition):
+    """Равновесное распределение элементов для одной плавки (см. equilibrium.py)"""
+    result = equilibrium_outcomes({
+        'antimonite_mass': antimonite_mass,
+        'moisture': moisture,
+        'sb_content': sb_content,
+        'na_content': na_content,
+        'as_content': as_content,
+        'temperature': temperature,
+        'is_charcoal': reducer_type == 'charcoal',
+        'reducer_amount': reducer_amount,
+        'coke_ash': coke_ash,
+        'lead_addition': lead_addition,
+    })
+    distribution = result.pop('distribution')
+    values = {key: float(value) for key, value in result.items()}
+    values['distribution'] = {
+        element: {phase: round(float(share[i]), 2) for phase, share in distribution.items() if phase != 'condensed'}
+        for i, element in enumerate(ELEMENTS) if element not in ('O', 'C')
+    }
+    return values
 
 
 def calculate_slag_mass(antimonite, reducer, crude, reducer_type, ash):
     """Расчет массы шлака"""
     # Упрощенная формула на основе экспериментальных данных
     base_slag = antimonite * 0.20  # Базовая масса ~20% от антимоната
-    ash_contribution = reducer * (ash / 100) if reducer_type == 'coke' else 0
+    ash_contribution = np.where(np.asarray(reducer_type) == 'coke', reducer * (ash / 100), 0.0)
     return base_slag + ash_contribution
 
 
@@ -254,13 +428,13 @@ def generate_recommendations(extraction, reducer_amount, temp, reducer_type, na_
     recommendations = []
     
     # Оценка извлечения
-    if extraction >= 85:
+    if extraction >= EXTRACTION_EXCELLENT:
         recommendations.append({
             'type': 'success',
             'title': 'Отличное извлечение!',
             'text': f'Извлечение {extraction:.1f}% превышает промышленный уровень (70-76%).'
         })
-    elif extraction >= 70:
+    elif extraction >= EXTRACTION_GOOD:
         recommendations.append({
             'type': 'info',
             'title': 'Хорошее извлечение',
@@ -274,13 +448,13 @@ def generate_recommendations(extraction, reducer_amount, temp, reducer_type, na_
         })
     
     # Расход восстановителя
-    if reducer_amount < 10:
+    if reducer_amount < REDUCER_MIN:
         recommendations.append({
             'type': 'warning',
             'title': 'Недостаточно восстановителя',
             'text': 'При расходе <10% возможны большие потери Sb в шлаке. Рекомендуется 10%.'
         })
-    elif reducer_amount > 15:
+    elif reducer_amount > REDUCER_MAX:
         recommendations.append({
             'type': 'warning',
             'title': 'Избыток восстановителя',
@@ -294,13 +468,13 @@ def generate_recommendations(extraction, reducer_amount, temp, reducer_type, na_
         })
     
     # Натрий в черновой сурьме
-    if na_crude > 5:
+    if na_crude > NA_CRUDE_HIGH:
         recommendations.append({
             'type': 'error',
             'title': 'Высокое содержание натрия!',
             'text': f'Na в черновой сурьме: {na_crude:.2f}%. Рекомендуется использовать коксик вместо угля.'
         })
-    elif na_crude > 3:
+    elif na_crude > NA_CRUDE_WARNING:
         recommendations.append({
             'type': 'warning',
             'title': 'Повышенное содержание натрия',
@@ -308,7 +482,7 @@ def generate_recommendations(extraction, reducer_amount, temp, reducer_type, na_
         })
     
     # Температура
-    if temp < 900:
+    if temp < TEMPERATURE_MIN:
         recommendations.append({
             'type': 'error',
             'title': 'Слишком низкая температура',
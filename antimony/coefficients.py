@@ -0,0 +1,247 @@
+"""
+Поправочные коэффициенты модели плавки по фактическим результатам
+
+Эмпирическая модель (таблица калибровки и распределение As) умножается
+на коэффициенты последнего набора CoefficientSet. Набор загружается один
+раз на процесс; номер последней версии перепроверяется не чаще раза в
+REFRESH_INTERVAL секунд, а при сохранении набора в этом процессе кэш
+сбрасывается сразу (см. signals.py).
+
+Калибровка: по всем плавкам с замерами одним пакетным расчетом строятся
+базовые прогнозы модели (без поправок), и для каждого показателя
+коэффициент подбирается методом наименьших квадратов.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .interpolation import get_table
+
+
+# Показатели с поправочным коэффициентом (все — в %)
+COEFFICIENTS = ('sb_extraction', 'sb_in_slag', 'na_to_crude', 'as_to_crude')
+DEFAULT_COEFFICIENTS = dict.fromkeys(COEFFICIENTS, 1.0)
+
+# Базовое распределение мышьяка (доли: черновая, шлак, газы)
+AS_SPLIT = (0.50, 0.15, 0.35)
+
+REFRESH_INTERVAL = 60          # Период проверки новой версии (с)
+MIN_MEASUREMENTS = 3           # Минимум плавок для калибровки
+
+Coefficients = namedtuple('Coefficients', ['version', 'values'])
+BASELINE = Coefficients(0, DEFAULT_COEFFICIENTS)
+
+
+# === ПРИМЕНЕНИЕ КОЭФФИЦИЕНТОВ ===
+
+def apply_coefficients(outcomes, values):
+    """
+    Показатели модели с поправками
+
+    Args:
+        outcomes (dict): числа или массивы таблицы калибровки
+            (sb_extraction, sb_in_crude, sb_in_slag, na_to_crude)
+        values (dict): коэффициенты {показатель: множитель}
+
+    Returns:
+        dict: исправленные показатели и распределение As
+            (as_to_crude, as_to_slag, as_to_gas, %)
+    """
+    as_share = np.clip(AS_SPLIT[0] * values['as_to_crude'], 0.0, 1.0)
+    rest = (1 - as_share) / (AS_SPLIT[1] + AS_SPLIT[2])
+    return {
+        **outcomes,
+        'sb_extraction': np.minimum(outcomes['sb_extraction'] * values['sb_extraction'], 100.0),
+        'sb_in_slag': np.minimum(outcomes['sb_in_slag'] * values['sb_in_slag'], 100.0),
+        'na_to_crude': np.minimum(outcomes['na_to_crude'] * values['na_to_crude'], 100.0),
+        'as_to_crude': as_share * 100,
+        'as_to_slag': rest * AS_SPLIT[1] * 100,
+        'as_to_gas': rest * AS_SPLIT[2] * 100,
+    }
+
+
+# === ЗАГРУЗКА ПОСЛЕДНЕЙ ВЕРСИИ ===
+
+_current = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def load_coefficients():
+    """Последний набор коэффициентов из БД (или базовый, если калибровки не было)"""
+    from .models import CoefficientSet
+
+    latest = CoefficientSet.objects.only('version', 'coefficients').first()
+    if latest is None:
+        return BASELINE
+    return Coefficients(latest.version, {**DEFAULT_COEFFICIENTS, **latest.coefficients})
+
+
+def get_coefficients():
+    """Коэффициенты текущего процесса; перезагружаются при смене версии"""
+    global _current, _checked_at
+    now = time.monotonic()
+    current = _current
+    if current is None or now - _checked_at > REFRESH_INTERVAL:
+        from .models import CoefficientSet
+
+        with _lock:
+            version = CoefficientSet.objects.values_list('version', flat=True).first() or 0
+            if _current is None or _current.version != version:
+                _current = load_coefficients()
+            _checked_at = now
+            current = _current
+    return current
+
+
+def invalidate_coefficients(**kwargs):
+    """Сброс коэффициентов; следующий расчет перечитает последнюю версию"""
+    global _current
+    with _lock:
+        _current = None
+
+
+# === КАЛИБРОВКА ===
+
+def measurement_dataset():
+    """
+    Входные данные и фактические показатели всех плавок с замерами
+
+    Плавки по равновесному режиму не учитываются: коэффициенты относятся
+    к эмпирической модели.
+
+    Returns:
+        tuple: (inputs — массивы входных параметров, measured — массивы
+            фактических показателей в % с NaN для отсутствующих замеров)
+    """
+    from .models import SmeltingMeasurement
+
+    rows = [
+        (m.run.inputs, m) for m in SmeltingMeasurement.objects.select_related('run')
+        if m.run.inputs.get('mode', 'empirical') == 'empirical'
+    ]
+    keys = ('antimonite_mass', 'moisture', 'sb_content', 'na_content', 'as_content',
+            'temperature', 'reducer_amount', 'lead_addition')
+    inputs = {key: np.array([float(run[key]) for run, _ in rows]) for key in keys}
+    inputs['is_charcoal'] = np.array([run['reducer_type'] == 'charcoal' for run, _ in rows], dtype=bool)
+
+    def column(field):
+        return np.array([np.nan if getattr(m, field) is None else getattr(m, field) for _, m in rows], dtype=float)
+
+    dry = inputs['antimonite_mass'] * (1 - inputs['moisture'] / 100)
+    crude_mass = column('crude_mass')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        measured = {
+            'sb_extraction': crude_mass * column('sb_in_crude') / (dry * inputs['sb_content'] / 100),
+            'sb_in_slag': column('sb_in_slag'),
+            'na_to_crude': crude_mass * column('na_in_crude') / (dry * inputs['na_content'] / 100),
+            'as_to_crude': crude_mass * column('as_in_crude') / (dry * inputs['as_content'] / 100),
+        }
+    measured = {key: np.where(np.isfinite(values), values, np.nan) for key, values in measured.items()}
+    return inputs, measured
+
+
+def base_predictions(inputs):
+    """Прогноз модели без поправок для массивов входных данных (%)"""
+    dry = inputs['antimonite_mass'] * (1 - inputs['moisture'] / 100)
+    outcomes = get_table().lookup(
+        inputs['temperature'], inputs['is_charcoal'], inputs['reducer_amount'], inputs['lead_addition'] / dry
+    )
+    return {
+        'sb_extraction': outcomes['sb_extraction'],
+        'sb_in_slag': outcomes['sb_in_slag'],
+        'na_to_crude': outcomes['na_to_crude'],
+        'as_to_crude': np.full(dry.shape, AS_SPLIT[0] * 100),
+    }
+
+
+def predict(base, values):
+    """Прогноз с коэффициентами values по базовым прогнозам"""
+    outcomes = apply_coefficients({**base, 'sb_in_crude': 0.0}, values)
+    return {key: outcomes[key] for key in COEFFICIENTS}
+
+
+def fit_coefficients(base, measured):
+    """
+    Коэффициенты МНК: measured ≈ k · base для каждого показателя
+
+    Показатели без замеров сохраняют коэффициент 1.
+    """
+    values = dict(DEFAULT_COEFFICIENTS)
+    for key in COEFFICIENTS:
+        mask = np.isfinite(measured[key]) & (base[key] > 0)
+        if mask.any():
+            solution, *_ = np.linalg.lstsq(base[key][mask, None], measured[key][mask], rcond=None)
+            values[key] = round(float(solution[0]), 6)
+    return values
+
+
+def prediction_errors(base, measured, values):
+    """Ошибки прогноза по показателям: {показатель: {'count', 'bias', 'rmse'}}"""
+    predicted = predict(base, values)
+    errors = {}
+    for key in COEFFICIENTS:
+        residual = predicted[key] - measured[key]
+        residual = residual[np.isfinite(residual)]
+        errors[key] = {
+            'count': int(residual.size),
+            'bias': round(float(residual.mean()), 3) if residual.size else None,
+            'rmse': round(float(np.sqrt((residual ** 2).mean())), 3) if residual.size else None,
+        }
+    return errors
+
+
+def calibrate(min_measurements=MIN_MEASUREMENTS, save=True):
+    """
+    Подбор нового набора коэффициентов по всей истории замеров
+
+    Returns:
+        dict: {'version', 'coefficients', 'errors', 'baseline_errors', 'count'};
+            version — номер сохраненного набора (None при save=False)
+    """
+    from .models import CoefficientSet
+
+    inputs, measured = measurement_dataset()
+    count = len(inputs['temperature'])
+    if count < min_measurements:
+        raise ValueError(f'Недостаточно плавок с замерами: {count} (нужно не менее {min_measurements})')
+
+    base = base_predictions(inputs)
+    values = fit_coefficients(base, measured)
+    result = {
+        'version': None,
+        'coefficients': values,
+        'errors': prediction_errors(base, measured, values),
+        'baseline_errors': prediction_errors(base, measured, DEFAULT_COEFFICIENTS),
+        'count': count,
+    }
+
+    if save:
+        last = CoefficientSet.objects.values_list('version', flat=True).first() or 0
+        coefficient_set = CoefficientSet.objects.create(
+            version=last + 1,
+            coefficients=values,
+            errors=result['errors'],
+            measurements_count=count,
+        )
+        result['version'] = coefficient_set.version
+    return result
+
+
+def version_errors():
+    """Ошибки прогноза всех сохраненных версий на текущей истории замеров"""
+    from .models import CoefficientSet
+
+    inputs, measured = measurement_dataset()
+    if not len(inputs['temperature']):
+        return []
+    base = base_predictions(inputs)
+
+    report = [{'version': 0, 'errors': prediction_errors(base, measured, DEFAULT_COEFFICIENTS)}]
+    for coefficient_set in CoefficientSet.objects.order_by('version'):
+        values = {**DEFAULT_COEFFICIENTS, **coefficient_set.coefficients}
+        report.append({'version': coefficient_set.version, 'errors': prediction_errors(base, measured, values)})
+    return report
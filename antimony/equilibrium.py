@@ -0,0 +1,290 @@
+"""
+Равновесный состав продуктов плавки (минимизация энергии Гиббса)
+
+Метод RAND (White–Johnson–Dantzig, в форме Гордона–Мак-Брайда) для
+нескольких идеальных растворов — газа, металла (черновая сурьма) и шлака —
+и чистых конденсированных веществ (углерод). На каждой итерации для всех
+задач пакета решается симметричная линейная система относительно
+множителей Лагранжа элементов π, относительных изменений количества
+фаз u и количеств чистых веществ; количества веществ в растворах
+обновляются в логарифмах с ограничением шага.
+
+Равновесие не зависит от масштаба загрузки, поэтому задачи приводятся к
+долям элементов, округляются, и одинаковые составы решаются один раз
+(плюс LRU-кэш для одиночных расчетов).
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from .thermodata import (
+    ELEMENTS, ATOMIC_MASS, PHASES, SPECIES_NAMES, FORMULA, PHASE_OF, LN_GAMMA, gibbs_rt,
+)
+
+
+# Состав загрузки: Sb(V) в антимонате, Na₂O, As(V); углерод восстановителя
+OXYGEN_PER_ATOM = {'Sb': 2.5, 'Na': 0.5, 'As': 2.5}
+# Доля нелетучего углерода в восстановителе (для коксика — 1 − зольность)
+CHARCOAL_CARBON = 0.80
+
+MAX_ITERATIONS = 200
+TOLERANCE = 1e-10
+TRACE = 1e-30                  # нижняя граница доли вещества
+ELEMENT_FLOOR = 1e-12          # следовые количества отсутствующих элементов
+VANISH = 1e-15                 # доля, ниже которой фаза считается исчезнувшей
+ROUND_DIGITS = 5               # округление долей элементов для кэша
+CACHE_SIZE = 4096
+
+SOLUTION = np.flatnonzero(PHASE_OF != 'condensed')
+CONDENSED = np.flatnonzero(PHASE_OF == 'condensed')
+PHASE_INDEX = np.array([PHASES.index(PHASE_OF[j]) for j in SOLUTION])
+PHASE_ONEHOT = np.eye(len(PHASES))[PHASE_INDEX]                          # (раствор, фаза)
+A_SOLUTION = FORMULA[:, SOLUTION]                                       # (элемент, раствор)
+A_CONDENSED = FORMULA[:, CONDENSED]                                     # (элемент, чистое)
+
+
+def solve_equilibrium(temperature, elements):
+    """
+    Равновесный состав для пакета задач
+
+    Args:
+        temperature: температура (К), форма (M,)
+        elements: количества элементов (моль) в порядке ELEMENTS, форма (M, E)
+
+    Returns:
+        ndarray: количества веществ (моль) в порядке SPECIES_NAMES, форма (M, S)
+    """
+    temperature = np.atleast_1d(np.asarray(temperature, dtype=float))
+    b = np.atleast_2d(np.asarray(elements, dtype=float))
+    m = b.shape[0]
+    e_count, p_count, c_count = len(ELEMENTS), len(PHASES), len(CONDENSED)
+
+    total = b.sum(axis=1, keepdims=True)
+    # Отсутствующие элементы — следовые количества, чтобы система не вырождалась
+    b = np.maximum(b, ELEMENT_FLOOR * total)
+
+    mu0 = gibbs_rt(temperature) + LN_GAMMA
+    mu0_solution = mu0[:, SOLUTION]
+    mu0_condensed = mu0[:, CONDENSED]
+
+    # Начальное приближение, согласованное с количествами элементов:
+    # каждый элемент поровну делится между содержащими его веществами
+    carriers = (A_SOLUTION > 0).sum(axis=1)
+    per_species = b[:, :, None] / (carriers[None, :, None] * np.where(A_SOLUTION > 0, A_SOLUTION, np.inf)[None])
+    log_n = np.log(np.min(np.where(A_SOLUTION[None] > 0, per_species, np.inf), axis=1))
+    # Чистые вещества активны с начала: половина количества лимитирующего элемента
+    n_condensed = 0.5 * np.min(np.where(A_CONDENSED[None] > 0, b[:, :, None] / np.where(
+        A_CONDENSED > 0, A_CONDENSED, 1.0)[None], np.inf), axis=1)
+    active = n_condensed > 0
+    present = np.ones((m, p_count), dtype=bool)
+    floor = np.log(TRACE * total)
+
+    size = e_count + p_count + c_count
+    phase_rows = np.arange(e_count, e_count + p_count)
+    condensed_rows = np.arange(e_count + p_count, size)
+    for _ in range(MAX_ITERATIONS):
+        in_phase = present[:, PHASE_INDEX]
+        n = np.where(in_phase, np.exp(log_n), 0.0)
+        phase_total = n @ PHASE_ONEHOT                                   # (M, P)
+        mu = mu0_solution + log_n - np.log(np.maximum(phase_total, 1e-300)[:, PHASE_INDEX])
+
+        # === ЛИНЕЙНАЯ СИСТЕМА ===
+        matrix = np.zeros((m, size, size))
+        weighted = A_SOLUTION[None] * n[:, None, :]                       # (M, E, раствор)
+        matrix[:, :e_count, :e_count] = weighted @ A_SOLUTION.T
+        coupling = weighted @ PHASE_ONEHOT                               # (M, E, P)
+        matrix[:, :e_count, e_count:e_count + p_count] = coupling
+        matrix[:, e_count:e_count + p_count, :e_count] = coupling.transpose(0, 2, 1)
+        condensed_columns = A_CONDENSED[None] * active[:, None, :]
+        matrix[:, :e_count, e_count + p_count:] = condensed_columns
+        matrix[:, e_count + p_count:, :e_count] = condensed_columns.transpose(0, 2, 1)
+        # Отсутствующие фазы и неактивные чистые вещества: тривиальные уравнения;
+        # элемент, все вещества которого в отсутствующих фазах, — π = 0 до их появления
+        element_rows = np.arange(e_count)
+        matrix[:, element_rows, element_rows] += matrix[:, element_rows, element_rows] < 1e-20 * total
+        matrix[:, phase_rows, phase_rows] = ~present
+        matrix[:, condensed_rows, condensed_rows] = ~active
+
+        rhs = np.concatenate((
+            b - np.einsum('ej,mj->me', A_SOLUTION, n) + np.einsum('ej,mj->me', A_SOLUTION, n * mu),
+            (n * mu) @ PHASE_ONEHOT,
+            np.where(active, mu0_condensed, 0.0),
+        ), axis=1)
+
+        # Масштабирование строк и столбцов для обусловленности
+        scale = 1 / np.sqrt(np.maximum(np.abs(np.diagonal(matrix, axis1=1, axis2=2)), 1e-300))
+        scale[:, e_count:e_count + p_count] = np.where(present, 1 / np.sqrt(np.maximum(phase_total, 1e-300)), 1.0)
+        scale[:, e_count + p_count:] = 1.0
+        scaled = matrix * scale[:, :, None] * scale[:, None, :]
+        try:
+            solution = np.linalg.solve(scaled, (rhs * scale)[..., None])[..., 0] * scale
+        except np.linalg.LinAlgError:
+            # Вырожденные задачи (почти все элементы следовые) — псевдообратная матрица
+            solution = (np.linalg.pinv(scaled) @ (rhs * scale)[..., None])[..., 0] * scale
+
+        pi = solution[:, :e_count]
+        u = solution[:, e_count:e_count + p_count]
+        target_condensed = solution[:, e_count + p_count:]
+
+        # === ШАГ ===
+        delta = np.where(in_phase, pi @ A_SOLUTION + u[:, PHASE_INDEX] - mu, 0.0)
+        significant = in_phase & ((n / np.maximum(phase_total, 1e-300)[:, PHASE_INDEX] > 1e-8) | (delta > 0))
+        largest = np.max(np.where(significant, np.abs(delta), 0.0), axis=1, keepdims=True)
+        step = np.minimum(1.0, 2.0 / np.maximum(largest, 1e-300))
+
+        log_n = np.maximum(log_n + step * delta, floor)
+        n_condensed = np.where(active, n_condensed + step * (target_condensed - n_condensed), 0.0)
+
+        # Исчезновение фаз и чистых веществ
+        vanished = active & (n_condensed <= 0)
+        active &= ~vanished
+        n_condensed[vanished] = 0.0
+        emptied = present & (np.exp(log_n) @ PHASE_ONEHOT < VANISH * total)
+        present &= ~emptied
+        log_n = np.where(emptied[:, PHASE_INDEX], floor, log_n)
+
+        converged = np.all(step * largest < TOLERANCE, axis=1)
+        if converged.all():
+            # Появление: чистое вещество — при отрицательном сродстве,
+            # фаза — если сумма «идеальных» мольных долей ее веществ больше 1
+            affinity = mu0_condensed - pi @ A_CONDENSED
+            appearing = ~active & (affinity < -1e-8) & (b @ A_CONDENSED > 0)
+            potential = np.exp(np.minimum(pi @ A_SOLUTION - mu0_solution, 50.0))
+            returning = ~present & (potential @ PHASE_ONEHOT > 1 + 1e-8)
+            if not appearing.any() and not returning.any():
+                break
+            active |= appearing
+            n_condensed[appearing] = 1e-6 * np.broadcast_to(total, appearing.shape)[appearing]
+            present |= returning
+            seed = np.log(1e-6 * total * potential / np.maximum(potential @ PHASE_ONEHOT, 1e-300)[:, PHASE_INDEX])
+            log_n = np.where(returning[:, PHASE_INDEX], np.maximum(seed, floor), log_n)
+
+    amounts = np.zeros((m, len(SPECIES_NAMES)))
+    amounts[:, SOLUTION] = np.where(present[:, PHASE_INDEX], np.exp(log_n), 0.0)
+    amounts[:, CONDENSED] = n_condensed
+    return amounts
+
+
+def charge_elements(inputs):
+    """
+    Количества элементов (моль) в шихте для массивов входных параметров
+
+    Returns:
+        ndarray: форма (..., E) в порядке ELEMENTS
+    """
+    dry = inputs['antimonite_mass'] * (1 - inputs['moisture'] / 100)
+    sb = dry * inputs['sb_content'] / 100 / ATOMIC_MASS['Sb']
+    na = dry * inputs['na_content'] / 100 / ATOMIC_MASS['Na']
+    arsenic = dry * inputs['as_content'] / 100 / ATOMIC_MASS['As']
+    pb = inputs['lead_addition'] / ATOMIC_MASS['Pb']
+    oxygen = OXYGEN_PER_ATOM['Sb'] * sb + OXYGEN_PER_ATOM['Na'] * na + OXYGEN_PER_ATOM['As'] * arsenic
+
+    carbon_share = np.where(inputs['is_charcoal'], CHARCOAL_CARBON, 1 - inputs['coke_ash'] / 100)
+    carbon = dry * inputs['reducer_amount'] / 100 * carbon_share / ATOMIC_MASS['C']
+
+    amounts = {'Sb': sb, 'Na': na, 'As': arsenic, 'Pb': pb, 'O': oxygen, 'C': carbon}
+    return np.stack(np.broadcast_arrays(*(amounts[element] for element in ELEMENTS)), axis=-1)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _solve_cached(temperature, fractions):
+    return solve_equilibrium([temperature], [fractions])[0]
+
+
+def solve_normalized(temperature_k, elements):
+    """
+    Равновесие для долей элементов с повторным использованием решений
+
+    Одинаковые (после округления) задачи пакета решаются один раз; одиночная
+    задача берется из LRU-кэша.
+
+    Returns:
+        ndarray: количества веществ (моль) на 1 моль атомов загрузки, (M, S)
+    """
+    temperature_k = np.atleast_1d(np.asarray(temperature_k, dtype=float))
+    elements = np.atleast_2d(np.asarray(elements, dtype=float))
+    fractions = elements / elements.sum(axis=1, keepdims=True)
+    keys = np.column_stack((np.round(temperature_k), np.round(fractions, ROUND_DIGITS)))
+
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    if len(unique) == 1:
+        solved = _solve_cached(float(unique[0, 0]), tuple(unique[0, 1:]))[None]
+    else:
+        solved = solve_equilibrium(unique[:, 0], unique[:, 1:])
+    return solved[inverse.ravel()]
+
+
+def element_shares(amounts):
+    """
+    Доли элементов по фазам
+
+    Returns:
+        dict: {фаза: массив (..., E)} для газа, металла, шлака и чистых веществ;
+            сумма по фазам для каждого элемента равна 1
+    """
+    by_phase = {phase: amounts[..., PHASE_OF == phase] @ FORMULA[:, PHASE_OF == phase].T
+                for phase in (*PHASES, 'condensed')}
+    total = sum(by_phase.values())
+    total = np.where(total > 0, total, np.nan)
+    return {phase: np.nan_to_num(value / total) for phase, value in by_phase.items()}
+
+
+def equilibrium_outcomes(inputs):
+    """
+    Показатели плавки по равновесному составу
+
+    Доли элементов по фазам берутся из решения для долей загрузки и
+    применяются к фактическим количествам, поэтому баланс элементов
+    сходится точно и после округления ключа кэша.
+
+    Args:
+        inputs (dict): массивы входных параметров evaluate_batch и is_charcoal
+
+    Returns:
+        dict: массивы распределения по фазам (%, 'distribution': {фаза: (..., E)}),
+            показатели sb_extraction, sb_in_crude, na_to_crude, as_to_crude,
+            as_to_slag, as_to_gas (%), sb_slag_mass, na_slag_mass, metal_mass,
+            oxide_slag_mass, slag_mass — оксидный расплав, пустая порода и зола (г)
+            и co_fraction — доля CO в CO + CO₂
+    """
+    elements = charge_elements(inputs)
+    shape = elements.shape[:-1]
+    temperature = np.broadcast_to(np.asarray(inputs['temperature'], dtype=float), shape) + 273.15
+
+    amounts = solve_normalized(temperature.ravel(), elements.reshape(-1, len(ELEMENTS)))
+    amounts = amounts.reshape(*shape, len(SPECIES_NAMES))
+    shares = element_shares(amounts)
+
+    atomic_mass = np.array([ATOMIC_MASS[element] for element in ELEMENTS])
+    masses = {phase: (share * elements) @ atomic_mass for phase, share in shares.items()}
+    sb, na, arsenic = (ELEMENTS.index(element) for element in ('Sb', 'Na', 'As'))
+    metal, slag, gas = shares['metal'], shares['slag'], shares['gas']
+
+    # Пустая порода: сухой антимонат за вычетом Sb, Na, As и связанного кислорода
+    oxygen = ELEMENTS.index('O')
+    feed_mass = elements[..., [sb, na, arsenic, oxygen]] @ atomic_mass[[sb, na, arsenic, oxygen]]
+    dry = inputs['antimonite_mass'] * (1 - inputs['moisture'] / 100)
+    gangue = np.maximum(dry - feed_mass, 0.0)
+    ash = np.where(inputs['is_charcoal'], 0.0, dry * inputs['reducer_amount'] / 100 * inputs['coke_ash'] / 100)
+    slag_mass = masses['slag'] + gangue + ash
+
+    co = amounts[..., SPECIES_NAMES.index('CO')]
+    co2 = amounts[..., SPECIES_NAMES.index('CO2')]
+
+    return {
+        'distribution': {phase: share * 100 for phase, share in shares.items()},
+        'sb_extraction': metal[..., sb] * 100,
+        'sb_in_crude': metal[..., sb] * elements[..., sb] * ATOMIC_MASS['Sb']
+                       / np.where(masses['metal'] > 0, masses['metal'], np.nan) * 100,
+        'na_to_crude': metal[..., na] * 100,
+        'as_to_crude': metal[..., arsenic] * 100,
+        'as_to_slag': slag[..., arsenic] * 100,
+        'as_to_gas': gas[..., arsenic] * 100,
+        'sb_slag_mass': slag[..., sb] * elements[..., sb] * ATOMIC_MASS['Sb'],
+        'metal_mass': masses['metal'],
+        'oxide_slag_mass': masses['slag'],
+        'slag_mass': slag_mass,
+        'na_slag_mass': slag[..., na] * elements[..., na] * ATOMIC_MASS['Na'],
+        'co_fraction': co / np.where(co + co2 > 0, co + co2, np.nan),
+    }
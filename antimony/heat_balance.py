@@ -0,0 +1,137 @@
+"""
+Тепловой баланс восстановительной плавки
+
+Потребность в тепле считается по закону Гесса: шихта поступает при 298 К,
+продукты (металл, шлак, газы) выходят при температуре плавки. Теплота
+реакций восстановления — разность энтальпий образования продуктов и шихты
+при 298 К, физическое тепло продуктов — ∫Cp dT по данным thermodata.py.
+
+Все величины — массивы NumPy: баланс считается для той же сетки
+сценариев, что и материальный баланс (evaluate_batch), без цикла по строкам.
+"""
+
+import numpy as np
+
+from .thermodata import ATOMIC_MASS, T_REF, enthalpy
+
+
+CO_FRACTION = 0.8              # Доля CO в отходящих газах (CO / (CO + CO₂))
+FURNACE_EFFICIENCY = 0.5       # Тепловой КПД печи (доля полезного тепла)
+CP_INERT = 1.0                 # Теплоемкость пустой породы (Дж/(г·К))
+WATER_MASS = 18.015            # Молярная масса воды (г/моль)
+KJ_PER_KWH = 3600
+
+# Вещества шихты (при 298 К) и продуктов (при температуре плавки)
+FEED_SPECIES = ('Sb2O5(s)', 'Na2O(s)', 'As2O5(s)', 'Pb(s)', 'H2O(l)', 'C')
+METAL_SPECIES = ('Sb', 'Na', 'As', 'Pb')
+SLAG_SPECIES = ('Sb2O3', 'Na2O', 'As2O3')
+GAS_SPECIES = ('Sb4O6(g)', 'As4O6(g)', 'H2O(g)', 'CO', 'CO2', 'C')
+
+# Энтальпии образования при 298 К (Дж/моль)
+FEED_H298 = enthalpy(T_REF, FEED_SPECIES)
+PRODUCT_H298 = enthalpy(T_REF, METAL_SPECIES + SLAG_SPECIES + GAS_SPECIES)
+
+# Молярные массы оксидов шихты (г/моль)
+SB2O5_MASS = 2 * ATOMIC_MASS['Sb'] + 5 * ATOMIC_MASS['O']
+NA2O_MASS = 2 * ATOMIC_MASS['Na'] + ATOMIC_MASS['O']
+AS2O5_MASS = 2 * ATOMIC_MASS['As'] + 5 * ATOMIC_MASS['O']
+
+
+def heat_balance(balance, temperature, moisture_mass, lead_addition,
+                 efficiency=FURNACE_EFFICIENCY, co_fraction=CO_FRACTION):
+    """
+    Тепловой баланс плавки для массива сценариев
+
+    Args:
+        balance (dict): массивы материального баланса (имена как в
+            evaluate_batch): dry_antimonite, sb_loaded, na_loaded, as_loaded,
+            reducer_mass, sb_to_crude, na_to_crude, as_to_crude, sb_to_slag,
+            na_to_slag, as_to_slag, as_to_gas, sb_losses, crude_sb_mass (г)
+        temperature: температура плавки (°C)
+        moisture_mass: масса влаги шихты (г)
+        lead_addition: добавка свинца (г)
+        efficiency: тепловой КПД печи
+        co_fraction: доля CO в газах восстановления
+
+    Returns:
+        dict: массивы (кДж) reaction_heat — теплота реакций и испарения влаги,
+            metal_heat, slag_heat, gas_heat — физическое тепло продуктов
+            (в gas_heat входит и нагрев остатка восстановителя),
+            useful_heat, heat_losses, total_heat; specific_energy —
+            кВт·ч на тонну черновой сурьмы; carbon_used — расход углерода (г)
+    """
+    temperature_k = np.asarray(temperature, dtype=float) + 273.15
+    b = {key: np.asarray(value, dtype=float) for key, value in balance.items()}
+    moisture_mass = np.asarray(moisture_mass, dtype=float)
+    lead_addition = np.asarray(lead_addition, dtype=float)
+
+    # Шихта: сурьма, натрий и мышьяк — в высшей степени окисления
+    sb2o5 = b['sb_loaded'] / ATOMIC_MASS['Sb'] / 2
+    na2o = b['na_loaded'] / ATOMIC_MASS['Na'] / 2
+    as2o5 = b['as_loaded'] / ATOMIC_MASS['As'] / 2
+    lead = lead_addition / ATOMIC_MASS['Pb']
+    water = moisture_mass / WATER_MASS
+    carbon = b['reducer_mass'] / ATOMIC_MASS['C']
+    gangue = np.maximum(
+        b['dry_antimonite'] - sb2o5 * SB2O5_MASS - na2o * NA2O_MASS - as2o5 * AS2O5_MASS, 0.0
+    )
+
+    # Продукты: металл, оксидный шлак, возгоны
+    metal = [
+        b['sb_to_crude'] / ATOMIC_MASS['Sb'],
+        b['na_to_crude'] / ATOMIC_MASS['Na'],
+        b['as_to_crude'] / ATOMIC_MASS['As'],
+        lead,
+    ]
+    slag = [
+        b['sb_to_slag'] / ATOMIC_MASS['Sb'] / 2,
+        b['na_to_slag'] / ATOMIC_MASS['Na'] / 2,
+        b['as_to_slag'] / ATOMIC_MASS['As'] / 2,
+    ]
+    sb4o6 = np.maximum(b['sb_losses'], 0.0) / ATOMIC_MASS['Sb'] / 4
+    as4o6 = b['as_to_gas'] / ATOMIC_MASS['As'] / 4
+
+    # Кислород, отнятый углеродом, → CO и CO₂; избыток углерода нагревается
+    oxygen = np.maximum(
+        5 * sb2o5 + na2o + 5 * as2o5
+        - 3 * slag[0] - slag[1] - 3 * slag[2] - 6 * sb4o6 - 6 * as4o6,
+        0.0,
+    )
+    carbon_used = oxygen / (2 - co_fraction)
+    gas = [
+        sb4o6, as4o6, water,
+        carbon_used * co_fraction,
+        carbon_used * (1 - co_fraction),
+        np.maximum(carbon - carbon_used, 0.0),
+    ]
+
+    feed = np.stack(np.broadcast_arrays(sb2o5, na2o, as2o5, lead, water, carbon), axis=-1)
+    products = np.stack(np.broadcast_arrays(*metal, *slag, *gas), axis=-1)
+    h_products = enthalpy(temperature_k, METAL_SPECIES + SLAG_SPECIES + GAS_SPECIES)
+
+    # Теплота реакций при 298 К и физическое тепло по фазам (кДж)
+    reaction_heat = ((products * PRODUCT_H298).sum(axis=-1) - (feed * FEED_H298).sum(axis=-1)) / 1000
+    sensible = products * (h_products - PRODUCT_H298) / 1000
+    n_metal, n_slag = len(METAL_SPECIES), len(SLAG_SPECIES)
+    metal_heat = sensible[..., :n_metal].sum(axis=-1)
+    slag_heat = (
+        sensible[..., n_metal:n_metal + n_slag].sum(axis=-1)
+        + gangue * CP_INERT * (temperature_k - T_REF) / 1000
+    )
+    gas_heat = sensible[..., n_metal + n_slag:].sum(axis=-1)
+
+    useful_heat = reaction_heat + metal_heat + slag_heat + gas_heat
+    heat_losses = np.maximum(useful_heat, 0.0) * (1 / efficiency - 1)
+    total_heat = useful_heat + heat_losses
+
+    return {
+        'reaction_heat': reaction_heat,
+        'metal_heat': metal_heat,
+        'slag_heat': slag_heat,
+        'gas_heat': gas_heat,
+        'useful_heat': useful_heat,
+        'heat_losses': heat_losses,
+        'total_heat': total_heat,
+        'specific_energy': total_heat / KJ_PER_KWH / (b['crude_sb_mass'] / 1e6),
+        'carbon_used': carbon_used * ATOMIC_MASS['C'],
+    }
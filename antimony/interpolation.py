@@ -0,0 +1,202 @@
+"""
+Интерполяция экспериментальных показателей плавки
+
+Таблица калибровочных точек (температура, тип восстановителя, расход
+восстановителя, отношение Pb : антимонат) → показатели загружается один
+раз на процесс в массивы NumPy. Версия точек в БД (число, последний id
+и суммы значений) проверяется не чаще раза в REFRESH_INTERVAL секунд,
+так что изменения из других процессов подхватываются; при изменении
+точек в этом процессе таблица сбрасывается сразу (см. signals.py). Между узлами — полилинейная интерполяция,
+за пределами таблицы — значения на границе (без экстраполяции).
+
+Если в БД нет точек для какого-либо типа восстановителя, используются
+встроенные данные опытов (DEFAULT_CALIBRATION).
+"""
+
+import hashlib
+import threading
+import time
+from itertools import product
+
+import numpy as np
+
+
+REDUCER_TYPES = ('coke', 'charcoal')
+KEY_FIELDS = ('temperature', 'reducer_amount', 'pb_ratio')
+OUTCOMES = ('sb_extraction', 'sb_in_crude', 'sb_in_slag', 'na_to_crude')
+REFRESH_INTERVAL = 60          # Период проверки версии точек в БД (с)
+
+
+# === ДАННЫЕ ОПЫТОВ ===
+# Извлечение Sb без свинца: (температура, восстановитель) → %
+EXTRACTION_NO_LEAD = {
+    (900, 'coke'): 72.35, (900, 'charcoal'): 71.0,
+    (1000, 'coke'): 71.49, (1000, 'charcoal'): 75.85,
+}
+# Извлечение Sb с добавкой свинца: отношение Pb : антимонат → %
+EXTRACTION_WITH_LEAD = {0.5: 84.83, 1.0: 84.83, 1.5: 80.09}
+# Sb в черновой сурьме: недостаток/избыток восстановителя и расход 10%
+SB_IN_CRUDE = {5: 97.90, 15: 92.42}
+SB_IN_CRUDE_AT_10 = {
+    (900, 'coke'): 94.05, (900, 'charcoal'): 88.73,
+    (1000, 'coke'): 87.32, (1000, 'charcoal'): 90.52,
+}
+# Sb в шлаке: расход восстановителя → %
+SB_IN_SLAG = {5: 55.83, 10: 1.0, 15: 0.56}
+# Переход Na в черновую сурьму (%)
+NA_TO_CRUDE = {'coke': 4.5, 'charcoal': 35.0}
+
+
+def default_points():
+    """Встроенная таблица калибровочных точек"""
+    points = []
+    for (temperature, reducer_type), extraction in EXTRACTION_NO_LEAD.items():
+        for reducer_amount, slag in SB_IN_SLAG.items():
+            crude = SB_IN_CRUDE.get(reducer_amount, SB_IN_CRUDE_AT_10[(temperature, reducer_type)])
+            for pb_ratio in (0.0, *EXTRACTION_WITH_LEAD):
+                points.append({
+                    'temperature': temperature,
+                    'reducer_type': reducer_type,
+                    'reducer_amount': reducer_amount,
+                    'pb_ratio': pb_ratio,
+                    'sb_extraction': EXTRACTION_WITH_LEAD.get(pb_ratio, extraction),
+                    'sb_in_crude': crude,
+                    'sb_in_slag': slag,
+                    'na_to_crude': NA_TO_CRUDE[reducer_type],
+                })
+    return points
+
+
+DEFAULT_CALIBRATION = default_points()
+
+
+class CalibrationTable:
+    """
+    Регулярная сетка показателей для полилинейной интерполяции
+
+    values имеет форму (тип восстановителя, T, расход, Pb, показатель).
+    Узлы сетки — объединение координат всех точек; пропущенные ячейки
+    заполняются ближайшей точкой того же типа восстановителя.
+    """
+
+    def __init__(self, points):
+        self.axes = [np.unique([float(p[key]) for p in points]) for key in KEY_FIELDS]
+        shape = tuple(len(axis) for axis in self.axes)
+        self.values = np.empty((len(REDUCER_TYPES), *shape, len(OUTCOMES)))
+
+        for type_index, reducer_type in enumerate(REDUCER_TYPES):
+            subset = [p for p in points if p['reducer_type'] == reducer_type]
+            if not subset:
+                raise ValueError(f'Нет калибровочных точек для восстановителя {reducer_type}')
+
+            # Координаты в долях диапазона каждой оси, чтобы оси были соизмеримы
+            coords = np.array([[float(p[key]) for key in KEY_FIELDS] for p in subset])
+            outcomes = np.array([[float(p[key]) for key in OUTCOMES] for p in subset])
+            grid = np.stack(np.meshgrid(*self.axes, indexing='ij'), axis=-1).reshape(-1, len(KEY_FIELDS))
+            scale = np.array([max(np.ptp(axis), 1e-9) for axis in self.axes])
+
+            distance = (((grid[:, None, :] - coords[None, :, :]) / scale) ** 2).sum(axis=-1)
+            nearest = distance.argmin(axis=1)
+            self.values[type_index] = outcomes[nearest].reshape(*shape, len(OUTCOMES))
+
+        digest = hashlib.sha256()
+        for axis in self.axes:
+            digest.update(axis.tobytes())
+        digest.update(self.values.tobytes())
+        self.fingerprint = digest.hexdigest()[:16]
+
+    @staticmethod
+    def _locate(axis, x):
+        """Индексы соседних узлов и вес правого узла (с ограничением по краям)"""
+        if len(axis) == 1:
+            index = np.zeros(np.shape(x), dtype=int)
+            return index, index, np.zeros(np.shape(x))
+        x = np.clip(x, axis[0], axis[-1])
+        low = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+        weight = (x - axis[low]) / (axis[low + 1] - axis[low])
+        return low, low + 1, weight
+
+    def lookup(self, temperature, is_charcoal, reducer_amount, pb_ratio):
+        """
+        Показатели плавки для массивов условий
+
+        Returns:
+            dict: массивы sb_extraction, sb_in_crude, sb_in_slag, na_to_crude
+        """
+        temperature, is_charcoal, reducer_amount, pb_ratio = np.broadcast_arrays(
+            np.asarray(temperature, dtype=float), np.asarray(is_charcoal, dtype=bool),
+            np.asarray(reducer_amount, dtype=float), np.asarray(pb_ratio, dtype=float),
+        )
+        type_index = is_charcoal.astype(int)
+        located = [self._locate(axis, x) for axis, x in zip(self.axes, (temperature, reducer_amount, pb_ratio))]
+
+        # Плоский индекс ячейки: одна выборка из двумерного массива на угол
+        flat_values = self.values.reshape(-1, len(OUTCOMES))
+        strides = np.cumprod((1, *(len(axis) for axis in self.axes[::-1])))[::-1]
+        base = type_index * strides[0]
+
+        result = np.zeros((*type_index.shape, len(OUTCOMES)))
+        for corner in product((0, 1), repeat=len(KEY_FIELDS)):
+            weight = np.ones(type_index.shape)
+            index = base
+            for side, stride, (low, high, w) in zip(corner, strides[1:], located):
+                index = index + (high if side else low) * stride
+                weight = weight * (w if side else 1 - w)
+            result += weight[..., None] * flat_values.take(index, axis=0)
+
+        return {key: result[..., i] for i, key in enumerate(OUTCOMES)}
+
+
+_table = None
+_version = None
+_checked_at = 0.0
+_table_lock = threading.Lock()
+
+
+def load_points():
+    """Точки из БД; для типов восстановителя без точек — встроенные данные"""
+    from .models import CalibrationPoint
+
+    points = list(CalibrationPoint.objects.values('reducer_type', *KEY_FIELDS, *OUTCOMES))
+    present = {p['reducer_type'] for p in points}
+    points += [p for p in DEFAULT_CALIBRATION if p['reducer_type'] not in present]
+    return points
+
+
+def points_version():
+    """Версия точек в БД: число, последний id и суммы значений (суммы ловят правку на месте)"""
+    from django.db.models import Count, Max, Sum
+
+    from .models import CalibrationPoint
+
+    sums = {key: Sum(key) for key in (*KEY_FIELDS, *OUTCOMES)}
+    return tuple(CalibrationPoint.objects.aggregate(count=Count('id'), last=Max('id'), **sums).values())
+
+
+def get_table():
+    """Таблица калибровки текущего процесса; перезагружается при смене версии точек"""
+    global _table, _version, _checked_at
+    now = time.monotonic()
+    table = _table
+    if table is None or now - _checked_at > REFRESH_INTERVAL:
+        with _table_lock:
+            version = points_version()
+            if _table is None or _version != version:
+                _table = CalibrationTable(load_points())
+                _version = version
+            _checked_at = now
+            table = _table
+    return table
+
+
+def invalidate_table(**kwargs):
+    """Сброс таблицы; следующий расчет перечитает точки из БД"""
+    global _table
+    with _table_lock:
+        _table = None
+
+
+def lookup(temperature, reducer_type, reducer_amount, pb_ratio):
+    """Интерполированные показатели; reducer_type — строка или массив строк"""
+    is_charcoal = np.asarray(reducer_type) == 'charcoal'
+    return get_table().lookup(temperature, is_charcoal, reducer_amount, pb_ratio)
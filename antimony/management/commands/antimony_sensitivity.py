@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from antimony.sensitivity import run_sensitivity, DEFAULT_SAMPLES, DEFAULT_BOOTSTRAP, METHODS
+
+
+class Command(BaseCommand):
+    help = 'Анализ чувствительности баланса плавки антимоната (индексы Соболя или эффекты Морриса)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config', help='JSON-файл с описанием анализа (base, distributions, outputs)')
+        parser.add_argument('--method', choices=METHODS, help='Метод анализа')
+        parser.add_argument('--samples', type=int, help=f'Размер выборки (по умолчанию {DEFAULT_SAMPLES})')
+        parser.add_argument('--bootstrap', type=int, help=f'Число бутстреп-выборок (по умолчанию {DEFAULT_BOOTSTRAP})')
+        parser.add_argument('--seed', type=int, help='Зерно генератора')
+        parser.add_argument('--workers', type=int, default=1, help='Число процессов для расчета выборки')
+        parser.add_argument('--output', help='Сохранить полный результат в JSON-файл')
+
+    def handle(self, *args, **options):
+        spec = {}
+        if options['config']:
+            try:
+                with open(options['config'], encoding='utf-8') as f:
+                    spec = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Не удалось прочитать {options["config"]}: {e}')
+
+        for key in ('method', 'samples', 'bootstrap', 'seed'):
+            if options[key] is not None:
+                spec[key] = options[key]
+
+        try:
+            result = run_sensitivity(spec, workers=options['workers'], max_evaluations=None)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f'\n📊 Метод: {result["method"]}, выборка {result["samples"]}, '
+            f'расчетов {result["evaluations"]}, {result["elapsed_ms"]} мс\n'
+        )
+        for name, report in result['outputs'].items():
+            self.stdout.write(self.style.SUCCESS(f'\n{report["label"]} (среднее {report["mean"]:.3f}, σ {report["std"]:.3f})'))
+            if result['method'] == 'sobol':
+                self.stdout.write(f'  {"Параметр":<16}{"S1":>9}{"ST":>9}   95% ДИ S1')
+                for i, parameter in enumerate(result['parameters']):
+                    ci = report.get('S1_ci', [[None, None]] * len(result['parameters']))[i]
+                    ci_text = f'[{ci[0]:.3f}; {ci[1]:.3f}]' if ci[0] is not None else '—'
+                    self.stdout.write(
+                        f'  {parameter:<16}{report["S1"][i]:>9.3f}{report["ST"][i]:>9.3f}   {ci_text}'
+                    )
+            else:
+                self.stdout.write(f'  {"Параметр":<16}{"mu*":>10}{"mu":>10}{"sigma":>10}')
+                for i, parameter in enumerate(result['parameters']):
+                    self.stdout.write(
+                        f'  {parameter:<16}{report["mu_star"][i]:>10.3f}'
+                        f'{report["mu"][i]:>10.3f}{report["sigma"][i]:>10.3f}'
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'\n✅ Результат сохранен в {options["output"]}'))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from antimony.coefficients import calibrate, version_errors, COEFFICIENTS, MIN_MEASUREMENTS
+
+
+class Command(BaseCommand):
+    help = 'Подбор поправочных коэффициентов модели плавки по фактическим результатам (МНК по всей истории)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-measurements', type=int, default=MIN_MEASUREMENTS,
+                            help=f'Минимум плавок с замерами (по умолчанию {MIN_MEASUREMENTS})')
+        parser.add_argument('--dry-run', action='store_true', help='Рассчитать без сохранения новой версии')
+        parser.add_argument('--report', action='store_true',
+                            help='Только вывести ошибки прогноза всех версий на текущей истории')
+
+    def handle(self, *args, **options):
+        if options['report']:
+            report = version_errors()
+            if not report:
+                raise CommandError('Нет плавок с замерами')
+            self.stdout.write(f'\n{"Версия":<8}' + ''.join(f'{key:>16}' for key in COEFFICIENTS) + '   (RMSE, %)')
+            for row in report:
+                self.stdout.write(f'v{row["version"]:<7}' + ''.join(
+                    f'{self._format(row["errors"][key]["rmse"]):>16}' for key in COEFFICIENTS
+                ))
+            return
+
+        try:
+            result = calibrate(options['min_measurements'], save=not options['dry_run'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'\n📐 Плавок с замерами: {result["count"]}')
+        self.stdout.write(f'  {"Показатель":<16}{"Коэф.":>9}{"Замеров":>9}{"RMSE до":>10}{"RMSE после":>12}')
+        for key in COEFFICIENTS:
+            before, after = result['baseline_errors'][key], result['errors'][key]
+            self.stdout.write(
+                f'  {key:<16}{result["coefficients"][key]:>9.4f}{after["count"]:>9}'
+                f'{self._format(before["rmse"]):>10}{self._format(after["rmse"]):>12}'
+            )
+
+        if result['version'] is None:
+            self.stdout.write(self.style.WARNING('\nНовая версия не сохранена (--dry-run)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'\n✅ Сохранен набор коэффициентов v{result["version"]}'))
+
+    @staticmethod
+    def _format(value):
+        return '—' if value is None else f'{value:.3f}'
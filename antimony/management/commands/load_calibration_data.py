@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from antimony.interpolation import DEFAULT_CALIBRATION, KEY_FIELDS, OUTCOMES
+from antimony.models import CalibrationPoint
+
+
+class Command(BaseCommand):
+    help = 'Загружает встроенную таблицу калибровки плавки в БД для редактирования через админку'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--replace', action='store_true', help='Перезаписать показатели существующих точек')
+
+    def handle(self, *args, **options):
+        created_count = updated_count = 0
+
+        for point in DEFAULT_CALIBRATION:
+            key = {field: point[field] for field in ('reducer_type', *KEY_FIELDS)}
+            outcomes = {field: point[field] for field in OUTCOMES}
+
+            obj, created = CalibrationPoint.objects.get_or_create(
+                **key, defaults={**outcomes, 'note': 'Данные опытов'}
+            )
+            if created:
+                created_count += 1
+            elif options['replace']:
+                for field, value in outcomes.items():
+                    setattr(obj, field, value)
+                obj.save()
+                updated_count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Калибровочных точек создано: {created_count}, обновлено: {updated_count}'
+        ))
@@ -1,3 +1,152 @@
 from django.db import models
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 
-# Create your models here.
+
+class SmeltingRun(models.Model):
+    """Сохраненный расчет восстановительной плавки"""
+
+    input_hash = models.CharField('Хеш входных данных', max_length=64, unique=True)
+    inputs = models.JSONField('Входные данные')
+    result = models.JSONField('Результат расчета')
+    created_at = models.DateTimeField('Дата расчета', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Расчет плавки'
+        verbose_name_plural = 'Расчеты плавки'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Расчет №{self.pk} - {self.inputs.get('temperature')}°C, {self.inputs.get('reducer_type')}"
+
+    @property
+    def sb_extraction(self):
+        """Извлечение Sb в черновую сурьму (%)"""
+        return self.result.get('crude_antimony', {}).get('sb_extraction')
+
+    @property
+    def crude_mass(self):
+        """Масса черновой сурьмы (г)"""
+        return self.result.get('crude_antimony', {}).get('mass')
+
+
+class CalibrationPoint(models.Model):
+    """Экспериментальная точка для интерполяции показателей плавки"""
+
+    REDUCER_CHOICES = [
+        ('coke', 'Коксик'),
+        ('charcoal', 'Древесный уголь'),
+    ]
+
+    # === УСЛОВИЯ ПЛАВКИ ===
+    temperature = models.FloatField('Температура (°C)', validators=[MinValueValidator(0)])
+    reducer_type = models.CharField('Тип восстановителя', max_length=20, choices=REDUCER_CHOICES)
+    reducer_amount = models.FloatField('Расход восстановителя (%)', validators=[MinValueValidator(0)])
+    pb_ratio = models.FloatField(
+        'Отношение Pb : антимонат',
+        default=0,
+        validators=[MinValueValidator(0)]
+    )
+
+    # === ПОКАЗАТЕЛИ ===
+    sb_extraction = models.FloatField(
+        'Извлечение Sb (%)',
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+    sb_in_crude = models.FloatField(
+        'Sb в черновой сурьме (%)',
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+    sb_in_slag = models.FloatField(
+        'Sb в шлаке (%)',
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+    na_to_crude = models.FloatField(
+        'Переход Na в черновую сурьму (%)',
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+
+    note = models.CharField('Источник', max_length=200, blank=True)
+
+    class Meta:
+        verbose_name = 'Калибровочная точка'
+        verbose_name_plural = 'Калибровочные точки'
+        ordering = ['reducer_type', 'temperature', 'reducer_amount', 'pb_ratio']
+        unique_together = ['temperature', 'reducer_type', 'reducer_amount', 'pb_ratio']
+
+    def __str__(self):
+        return (f"{self.get_reducer_type_display()}, {self.temperature:.0f}°C, "
+                f"{self.reducer_amount:g}%, Pb {self.pb_ratio:g}")
+
+
+class SmeltingMeasurement(models.Model):
+    """Фактические результаты плавки, проведенной по сохраненному расчету"""
+
+    run = models.ForeignKey(
+        SmeltingRun,
+        on_delete=models.CASCADE,
+        related_name='measurements',
+        verbose_name='Расчет'
+    )
+
+    # === ЧЕРНОВАЯ СУРЬМА ===
+    crude_mass = models.FloatField('Масса черновой сурьмы (г)', validators=[MinValueValidator(0)])
+    sb_in_crude = models.FloatField(
+        'Sb в черновой сурьме (%)',
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+    na_in_crude = models.FloatField(
+        'Na в черновой сурьме (%)',
+        null=True, blank=True,
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+    as_in_crude = models.FloatField(
+        'As в черновой сурьме (%)',
+        null=True, blank=True,
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+
+    # === ШЛАК ===
+    slag_mass = models.FloatField('Масса шлака (г)', null=True, blank=True, validators=[MinValueValidator(0)])
+    sb_in_slag = models.FloatField(
+        'Sb в шлаке (%)',
+        null=True, blank=True,
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+
+    measured_at = models.DateTimeField('Дата плавки', default=timezone.now)
+    note = models.CharField('Примечание', max_length=200, blank=True)
+
+    class Meta:
+        verbose_name = 'Результат плавки'
+        verbose_name_plural = 'Результаты плавок'
+        ordering = ['-measured_at']
+
+    def __str__(self):
+        return f"Плавка по расчету №{self.run_id} от {self.measured_at:%d.%m.%Y}"
+
+    @property
+    def sb_extraction(self):
+        """Фактическое извлечение Sb в черновую сурьму (%)"""
+        loaded = self.run.result.get('loaded', {}).get('sb')
+        if not loaded:
+            return None
+        return round(self.crude_mass * self.sb_in_crude / loaded, 2)
+
+
+class CoefficientSet(models.Model):
+    """Версия поправочных коэффициентов модели, подобранных по фактическим плавкам"""
+
+    version = models.PositiveIntegerField('Версия', unique=True)
+    coefficients = models.JSONField('Коэффициенты')
+    errors = models.JSONField('Ошибки прогноза', default=dict)
+    measurements_count = models.PositiveIntegerField('Число плавок', default=0)
+    created_at = models.DateTimeField('Дата калибровки', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Набор коэффициентов'
+        verbose_name_plural = 'Наборы коэффициентов'
+        ordering = ['-version']
+
+    def __str__(self):
+        return f"Коэффициенты v{self.version} ({self.measurements_count} плавок)"
@@ -0,0 +1,237 @@
+"""
+Оптимизация состава шихты для восстановительной плавки
+
+Поиск параметров плавки (температура, тип и расход восстановителя,
+добавка свинца), максимизирующих извлечение Sb и массу черновой сурьмы
+при ограничениях на содержание Na в черновой сурьме и Sb в шлаке.
+
+Все кандидаты считаются пакетно через evaluate_batch: сначала полная
+сетка по дискретным параметрам и грубая сетка по непрерывным, затем
+несколько раундов случайного поиска вокруг лучших точек с сужением области.
+"""
+
+import time
+
+import numpy as np
+
+from core.instrumentation import timed
+from core.metrics import track_calculation
+
+from .batch import evaluate_batch, REDUCER_TYPES
+from .calculations import calculate_smelting, NA_CRUDE_WARNING, REDUCER_MIN, REDUCER_MAX
+from .interpolation import get_table
+
+
+OBJECTIVES = ('sb_extraction', 'crude_sb_mass')
+
+DEFAULT_BOUNDS = {
+    'temperature': [900, 1000],
+    'reducer_type': list(REDUCER_TYPES),
+    'reducer_amount': [5.0, 20.0],
+    'lead_addition': [0.0, 0.0],
+}
+
+# Параметры сырья: прочие ключи (в том числе mode) в поиск и итоговый расчет не попадают,
+# чтобы лучший режим пересчитывался той же моделью, что его выбрала
+FEED_KEYS = ('antimonite_mass', 'sb_content', 'na_content', 'as_content', 'moisture', 'coke_ash')
+
+DEFAULT_CONSTRAINTS = {
+    'max_na_in_crude': NA_CRUDE_WARNING,   # %
+    'max_sb_in_slag': 2.0,                 # %
+}
+
+# Параметры поиска
+GRID_POINTS = 48            # точек грубой сетки по каждой непрерывной переменной
+REFINE_ROUNDS = 6
+REFINE_SAMPLES = 4096
+REFINE_ELITE = 32
+MAX_FRONT_POINTS = 50
+
+
+def pareto_front(first, second):
+    """
+    Индексы недоминируемых точек при максимизации двух критериев
+
+    Returns:
+        ndarray: индексы точек фронта по убыванию первого критерия
+    """
+    order = np.lexsort((-second, -first))
+    sorted_second = second[order]
+    best_before = np.concatenate(([-np.inf], np.maximum.accumulate(sorted_second)[:-1]))
+    return order[sorted_second > best_before]
+
+
+def _continuous_axis(low, high, breakpoints):
+    """Равномерная сетка по отрезку плюс точки разрыва эмпирических зависимостей"""
+    if high <= low:
+        return np.array([low])
+    axis = np.linspace(low, high, GRID_POINTS)
+    inner = [b for b in breakpoints if low <= b <= high]
+    return np.unique(np.concatenate((axis, inner)))
+
+
+def _parse_bounds(bounds):
+    """Проверка и нормализация границ переменных"""
+    merged = {**DEFAULT_BOUNDS, **(bounds or {})}
+
+    temperatures = [float(t) for t in merged['temperature']]
+    reducer_types = list(merged['reducer_type'])
+    unknown = set(reducer_types) - set(REDUCER_TYPES)
+    if not temperatures or not reducer_types or unknown:
+        raise ValueError('Некорректные значения температуры или типа восстановителя')
+
+    continuous = {}
+    for key in ('reducer_amount', 'lead_addition'):
+        low, high = (float(v) for v in merged[key])
+        if low < 0 or high < low:
+            raise ValueError(f'Некорректные границы {key}: [{low}, {high}]')
+        continuous[key] = (low, high)
+
+    return temperatures, reducer_types, continuous
+
+
+@timed('calc')
+@track_calculation
+def optimize_smelting(feed, bounds=None, constraints=None, objective='sb_extraction', seed=0):
+    """
+    Поиск оптимального режима плавки
+
+    Args:
+        feed (dict): параметры сырья (antimonite_mass, sb_content, na_content,
+            as_content, moisture, coke_ash)
+        bounds (dict): границы переменных — списки допустимых значений
+            temperature и reducer_type, отрезки [min, max] для
+            reducer_amount и lead_addition
+        constraints (dict): max_na_in_crude (%), max_sb_in_slag (%)
+        objective (str): главный критерий — 'sb_extraction' или 'crude_sb_mass'
+        seed (int): зерно генератора для воспроизводимости
+
+    Returns:
+        dict: лучший режим, фронт Парето и статистика поиска
+    """
+    started = time.perf_counter()
+
+    if objective not in OBJECTIVES:
+        raise ValueError(f'Неизвестный критерий: {objective}')
+    temperatures, reducer_types, continuous = _parse_bounds(bounds)
+    limits = {**DEFAULT_CONSTRAINTS, **(constraints or {})}
+
+    feed = {key: value for key, value in (feed or {}).items() if key in FEED_KEYS}
+    mass = float(feed.get('antimonite_mass', 0))
+    if mass <= 0:
+        raise ValueError('Масса антимоната должна быть больше 0')
+    dry_mass = mass * (1 - float(feed.get('moisture', 2.0)) / 100)
+
+    # === 1. ГРУБАЯ СЕТКА ===
+    # Узлы таблицы калибровки: между ними показатели линейны, экстремумы — в узлах
+    _, reducer_nodes, pb_nodes = get_table().axes
+    reducer_axis = _continuous_axis(*continuous['reducer_amount'], (REDUCER_MIN, REDUCER_MAX, *reducer_nodes))
+    lead_axis = _continuous_axis(*continuous['lead_addition'], tuple(pb_nodes * dry_mass))
+    mesh = np.meshgrid(
+        np.arange(len(temperatures)), np.arange(len(reducer_types)), reducer_axis, lead_axis,
+        indexing='ij'
+    )
+    candidates = {
+        'temperature_index': mesh[0].ravel(),
+        'reducer_type_index': mesh[1].ravel(),
+        'reducer_amount': mesh[2].ravel(),
+        'lead_addition': mesh[3].ravel(),
+    }
+
+    temperature_values = np.asarray(temperatures)
+    reducer_type_values = np.asarray(reducer_types)
+
+    def evaluate(batch):
+        results = evaluate_batch({
+            **feed,
+            'temperature': temperature_values[batch['temperature_index']],
+            'reducer_type': reducer_type_values[batch['reducer_type_index']],
+            'reducer_amount': batch['reducer_amount'],
+            'lead_addition': batch['lead_addition'],
+        })
+        feasible = (
+            (results['na_content_crude'] <= float(limits['max_na_in_crude']))
+            & (results['sb_in_slag'] <= float(limits['max_sb_in_slag']))
+        )
+        return results, feasible
+
+    results, feasible = evaluate(candidates)
+    pool = {**candidates, 'feasible': feasible,
+            'sb_extraction': results['sb_extraction'], 'crude_sb_mass': results['crude_sb_mass']}
+
+    # === 2. УТОЧНЕНИЕ ВОКРУГ ЛУЧШИХ ТОЧЕК ===
+    rng = np.random.default_rng(seed)
+    spans = {key: high - low for key, (low, high) in continuous.items()}
+    secondary = OBJECTIVES[1] if objective == OBJECTIVES[0] else OBJECTIVES[0]
+
+    for round_number in range(REFINE_ROUNDS):
+        score = np.where(pool['feasible'], pool[objective], -np.inf)
+        elite = np.lexsort((-pool[secondary], -score))[:REFINE_ELITE]
+        elite = elite[np.isfinite(score[elite])]
+        if elite.size == 0:
+            break
+
+        parents = rng.choice(elite, REFINE_SAMPLES)
+        radius = 0.25 * 0.5 ** round_number
+        sample = {
+            'temperature_index': pool['temperature_index'][parents],
+            'reducer_type_index': pool['reducer_type_index'][parents],
+        }
+        for key, (low, high) in continuous.items():
+            step = rng.uniform(-radius, radius, REFINE_SAMPLES) * spans[key]
+            sample[key] = np.clip(pool[key][parents] + step, low, high)
+
+        results, feasible = evaluate(sample)
+        sample.update(feasible=feasible, sb_extraction=results['sb_extraction'],
+                      crude_sb_mass=results['crude_sb_mass'])
+        pool = {key: np.concatenate((pool[key], sample[key])) for key in pool}
+
+    evaluations = int(pool['feasible'].size)
+    feasible_idx = np.flatnonzero(pool['feasible'])
+
+    def recipe(i):
+        # Без округления: иначе точка у границы ступени может стать недопустимой
+        return {
+            'temperature': int(temperature_values[pool['temperature_index'][i]]),
+            'reducer_type': str(reducer_type_values[pool['reducer_type_index'][i]]),
+            'reducer_amount': float(pool['reducer_amount'][i]),
+            'lead_addition': float(pool['lead_addition'][i]),
+        }
+
+    response = {
+        'objective': objective,
+        'constraints': limits,
+        'evaluations': evaluations,
+        'feasible_count': int(feasible_idx.size),
+        'best': None,
+        'pareto_front': [],
+    }
+
+    if feasible_idx.size:
+        # === 3. ФРОНТ ПАРЕТО И ЛУЧШИЙ РЕЖИМ ===
+        front = feasible_idx[pareto_front(
+            pool['sb_extraction'][feasible_idx], pool['crude_sb_mass'][feasible_idx]
+        )]
+        if front.size > MAX_FRONT_POINTS:
+            front = front[np.linspace(0, front.size - 1, MAX_FRONT_POINTS).astype(int)]
+
+        response['pareto_front'] = [
+            {
+                **recipe(i),
+                'sb_extraction': round(float(pool['sb_extraction'][i]), 2),
+                'crude_sb_mass': round(float(pool['crude_sb_mass'][i]), 2),
+            }
+            for i in front
+        ]
+
+        best = feasible_idx[np.lexsort((
+            -pool[secondary][feasible_idx], -pool[objective][feasible_idx]
+        ))[0]]
+        best_recipe = recipe(best)
+        response['best'] = {
+            'recipe': best_recipe,
+            'result': calculate_smelting({**feed, **best_recipe}),
+        }
+
+    response['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return response
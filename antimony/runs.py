@@ -0,0 +1,148 @@
+"""
+Мемоизация расчетов плавки
+
+Входные данные приводятся к каноническому виду (значения по умолчанию,
+типы как в calculate_smelting), по ним считается SHA-256. Результат ищется
+сначала в ограниченном LRU-кэше процесса, затем в таблице SmeltingRun,
+и только при промахе пересчитывается и сохраняется.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.db import IntegrityError
+
+from core.db import retry_on_lock
+from core.metrics import record_cache
+
+from .batch import INPUT_DEFAULTS
+from .calculations import calculate_smelting
+from .coefficients import get_coefficients
+from .interpolation import get_table
+from .models import SmeltingRun
+
+
+# Версия расчетной модели: входит в хеш вместе с отпечатком таблицы
+# калибровки и версией поправочных коэффициентов, чтобы после изменения
+# зависимостей, калибровочных точек или коэффициентов старые сохраненные
+# результаты не выдавались за новые
+CALCULATION_VERSION = 4
+
+RUN_CACHE_SIZE = 256
+
+
+def normalize_inputs(data):
+    """
+    Канонический вид входных данных
+
+    Неизвестные ключи отбрасываются, пропущенные заполняются значениями
+    по умолчанию, числа приводятся к тем же типам, что в calculate_smelting.
+    """
+    # Массу, как и calculate_smelting, по умолчанию не подставляем
+    defaults = {**INPUT_DEFAULTS, 'antimonite_mass': 0}
+    normalized = {}
+    for key, default in defaults.items():
+        value = data.get(key, default)
+        if key == 'temperature':
+            normalized[key] = int(value)
+        elif key == 'reducer_type':
+            normalized[key] = str(value)
+        else:
+            normalized[key] = float(value)
+    normalized['mode'] = str(data.get('mode', 'empirical'))
+    return normalized
+
+
+def input_hash(inputs):
+    """SHA-256 канонического JSON нормализованных входных данных"""
+    payload = json.dumps(
+        {
+            'version': CALCULATION_VERSION,
+            'calibration': get_table().fingerprint,
+            'coefficients': get_coefficients().version,
+            'inputs': inputs,
+        },
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RunCache:
+    """Потокобезопасный LRU-кэш результатов: хеш -> (id расчета, результат)"""
+
+    def __init__(self, maxsize=RUN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+run_cache = RunCache()
+
+
+def get_or_calculate(data):
+    """
+    Расчет плавки с мемоизацией
+
+    Returns:
+        tuple: (результат, id SmeltingRun или None, источник:
+            'memory', 'database' или 'calculated')
+    """
+    inputs = normalize_inputs(data)
+    key = input_hash(inputs)
+
+    cached = run_cache.get(key)
+    record_cache('smelting_memory', cached is not None)
+    if cached is not None:
+        run_id, result = cached
+        return result, run_id, 'memory'
+
+    run = SmeltingRun.objects.filter(input_hash=key).only('id', 'result').first()
+    record_cache('smelting_database', run is not None)
+    if run is not None:
+        run_cache.put(key, (run.id, run.result))
+        return run.result, run.id, 'database'
+
+    result = calculate_smelting(inputs)
+    if not result.get('success'):
+        # Ошибки входных данных не сохраняем
+        return result, None, 'calculated'
+
+    run = save_run(key, inputs, result)
+    run_cache.put(key, (run.id, run.result))
+    return run.result, run.id, 'calculated'
+
+
+@retry_on_lock
+def save_run(key, inputs, result):
+    """Сохранение рассчитанного сценария (повтор при блокировке БД)"""
+    try:
+        run, _ = SmeltingRun.objects.get_or_create(
+            input_hash=key, defaults={'inputs': inputs, 'result': result}
+        )
+    except IntegrityError:
+        # Параллельный запрос успел сохранить тот же сценарий
+        run = SmeltingRun.objects.get(input_hash=key)
+    return run
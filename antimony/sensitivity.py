@@ -0,0 +1,371 @@
+"""
+Глобальный анализ чувствительности материального баланса плавки
+
+Входные параметры задаются распределениями (равномерное, нормальное,
+треугольное), остальные фиксируются. Выборки строятся в единичном
+гиперкубе и переводятся в значения параметров через квантильные функции,
+баланс считается пакетно через evaluate_batch.
+
+Методы:
+    sobol — схема Салтелли (матрицы A, B и AB_i), индексы первого порядка
+        (оценка Салтелли 2010) и полные индексы (оценка Янсена),
+        доверительные интервалы — бутстрепом;
+    morris — элементарные эффекты по траекториям (mu, mu*, sigma).
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from core.instrumentation import timed
+from core.metrics import track_calculation
+
+from .batch import evaluate_batch, INPUT_DEFAULTS, RESULT_COLUMNS
+from . import coefficients, interpolation
+
+
+METHODS = ('sobol', 'morris')
+DISTRIBUTIONS = ('uniform', 'normal', 'triangular')
+
+# Диапазоны по умолчанию (на 100 г антимоната)
+DEFAULT_DISTRIBUTIONS = {
+    'sb_content': {'dist': 'uniform', 'min': 55.0, 'max': 65.0},
+    'na_content': {'dist': 'uniform', 'min': 6.0, 'max': 9.0},
+    'as_content': {'dist': 'uniform', 'min': 0.3, 'max': 0.9},
+    'moisture': {'dist': 'uniform', 'min': 0.0, 'max': 5.0},
+    'reducer_amount': {'dist': 'triangular', 'min': 5.0, 'mode': 10.0, 'max': 15.0},
+    'coke_ash': {'dist': 'uniform', 'min': 10.0, 'max': 20.0},
+    'lead_addition': {'dist': 'uniform', 'min': 0.0, 'max': 100.0},
+}
+DEFAULT_OUTPUTS = ['crude_sb_mass', 'na_content_crude']
+
+DEFAULT_SAMPLES = 4096         # базовый размер выборки N (Соболь) / траекторий (Моррис)
+DEFAULT_BOOTSTRAP = 100
+MORRIS_LEVELS = 4
+MAX_EVALUATIONS = 500000       # ограничение для API; команда может считать больше
+MAX_BOOTSTRAP_SAMPLES = 10000000   # N × число бутстреп-выборок для API
+BOOTSTRAP_CHUNK_CELLS = 1000000    # значений в одном массиве пачки бутстрепа (~8 МБ)
+
+
+# === РАСПРЕДЕЛЕНИЯ ===
+
+def _normal_ppf(u):
+    """Квантиль стандартного нормального распределения (аппроксимация Акклама)"""
+    a = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+         1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+    b = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+         6.680131188771972e+01, -1.328068155288572e+01)
+    c = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+         -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+    d = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+         3.754408661907416e+00)
+
+    u = np.clip(u, 1e-12, 1 - 1e-12)
+    tail = np.minimum(u, 1 - u)
+    q = np.sqrt(-2 * np.log(tail))
+    x_tail = (((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q + c[5]) / \
+             ((((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q + 1)
+    x_tail = np.where(u < 0.5, x_tail, -x_tail)
+
+    r = (u - 0.5) ** 2
+    x_central = (((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * (u - 0.5) / \
+                (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1)
+
+    return np.where(tail < 0.02425, x_tail, x_central)
+
+
+def parse_distribution(name, spec):
+    """Проверка описания распределения параметра"""
+    if name not in INPUT_DEFAULTS or name == 'reducer_type':
+        raise ValueError(f'Параметр {name} нельзя варьировать')
+    kind = spec.get('dist', 'uniform')
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f'{name}: неизвестное распределение {kind}')
+
+    if kind == 'normal':
+        params = {'mean': float(spec['mean']), 'std': float(spec['std'])}
+        if params['std'] <= 0:
+            raise ValueError(f'{name}: std должно быть больше 0')
+    else:
+        params = {'min': float(spec['min']), 'max': float(spec['max'])}
+        if params['max'] <= params['min']:
+            raise ValueError(f'{name}: max должно быть больше min')
+        if kind == 'triangular':
+            params['mode'] = float(spec.get('mode', (params['min'] + params['max']) / 2))
+            if not params['min'] <= params['mode'] <= params['max']:
+                raise ValueError(f'{name}: mode должно лежать между min и max')
+    return {'dist': kind, **params}
+
+
+def ppf(distribution, u):
+    """Перевод точек единичного отрезка в значения параметра"""
+    kind = distribution['dist']
+    if kind == 'uniform':
+        values = distribution['min'] + u * (distribution['max'] - distribution['min'])
+    elif kind == 'triangular':
+        low, mode, high = distribution['min'], distribution['mode'], distribution['max']
+        split = (mode - low) / (high - low)
+        values = np.where(
+            u < split,
+            low + np.sqrt(u * (high - low) * (mode - low)),
+            high - np.sqrt((1 - u) * (high - low) * (high - mode)),
+        )
+    else:
+        # Узлы 0 и 1 (план Морриса) сдвигаются внутрь, чтобы квантиль был конечным
+        values = distribution['mean'] + distribution['std'] * _normal_ppf(np.clip(u, 0.005, 0.995))
+    # Массы и содержания не бывают отрицательными
+    return np.maximum(values, 0.0)
+
+
+# === ПАКЕТНЫЙ РАСЧЕТ ВЫБОРКИ ===
+
+def _init_worker(table, values):
+    """Передача таблицы калибровки и коэффициентов в процесс пула (без обращения к БД)"""
+    interpolation._table = table
+    coefficients._current = values
+    coefficients._checked_at = float('inf')
+
+
+def _evaluate_chunk(base, names, matrix, outputs):
+    inputs = {**base, **{name: matrix[:, i] for i, name in enumerate(names)}}
+    results = evaluate_batch(inputs)
+    return {name: np.broadcast_to(results[name], (matrix.shape[0],)).copy() for name in outputs}
+
+
+def evaluate_samples(base, names, matrix, outputs, workers=None):
+    """
+    Показатели для матрицы значений параметров (строка — сценарий)
+
+    При workers > 1 выборка делится на части и считается в пуле процессов.
+    """
+    if not workers or workers <= 1:
+        return _evaluate_chunk(base, names, matrix, outputs)
+
+    chunks = np.array_split(matrix, workers * 4)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(interpolation.get_table(), coefficients.get_coefficients())) as pool:
+        parts = list(pool.map(_evaluate_chunk, [base] * len(chunks), [names] * len(chunks),
+                              chunks, [outputs] * len(chunks)))
+    return {name: np.concatenate([part[name] for part in parts]) for name in outputs}
+
+
+# === МЕТОДЫ ===
+
+def saltelli_matrix(unit_a, unit_b):
+    """Блоки A, B, AB_1..AB_k схемы Салтелли одной матрицей ((k + 2) * N строк)"""
+    n, k = unit_a.shape
+    blocks = [unit_a, unit_b]
+    for i in range(k):
+        ab = unit_a.copy()
+        ab[:, i] = unit_b[:, i]
+        blocks.append(ab)
+    return np.vstack(blocks)
+
+
+def sobol_indices(f_a, f_b, f_ab):
+    """
+    Индексы Соболя первого порядка и полные
+
+    Args:
+        f_a, f_b: (..., N) — значения на A и B
+        f_ab: (k, ..., N) — значения на AB_i
+
+    Returns:
+        tuple: (S1, ST) формы (k, ...)
+    """
+    # Центрирование не меняет индексы, но сильно снижает разброс оценки S1
+    # при среднем, большом по сравнению с разбросом (масса черновой сурьмы)
+    combined = np.concatenate((f_a, f_b), axis=-1)
+    mean = combined.mean(axis=-1, keepdims=True)
+    f_a, f_b, f_ab = f_a - mean, f_b - mean, f_ab - mean
+    variance = np.var(combined, axis=-1)
+    variance = np.where(variance > 0, variance, np.nan)
+    first = np.mean(f_b * (f_ab - f_a), axis=-1) / variance
+    total = 0.5 * np.mean((f_a - f_ab) ** 2, axis=-1) / variance
+    return np.nan_to_num(first), np.nan_to_num(total)
+
+
+def _sobol(distributions, base, outputs, samples, bootstrap, rng, workers):
+    names = list(distributions)
+    k = len(names)
+    unit = saltelli_matrix(rng.random((samples, k)), rng.random((samples, k)))
+    matrix = np.column_stack([ppf(distributions[name], unit[:, i]) for i, name in enumerate(names)])
+
+    values = evaluate_samples(base, names, matrix, outputs, workers)
+    blocks = {name: values[name].reshape(k + 2, samples) for name in outputs}
+
+    report = {}
+    for name in outputs:
+        f_a, f_b, f_ab = blocks[name][0], blocks[name][1], blocks[name][2:]
+        first, total = sobol_indices(f_a, f_b, f_ab)
+        report[name] = {
+            'label': RESULT_COLUMNS[name],
+            'mean': float(np.nanmean(f_a)),
+            'std': float(np.nanstd(f_a)),
+            'S1': np.round(first, 4).tolist(),
+            'ST': np.round(total, 4).tolist(),
+        }
+
+    if bootstrap:
+        boot = bootstrap_indices(blocks, samples, bootstrap, rng)
+        for name, (boot_first, boot_total) in boot.items():
+            report[name]['S1_ci'] = np.round(np.percentile(boot_first, [2.5, 97.5], axis=1).T, 4).tolist()
+            report[name]['ST_ci'] = np.round(np.percentile(boot_total, [2.5, 97.5], axis=1).T, 4).tolist()
+
+    return names, int(matrix.shape[0]), report
+
+
+def bootstrap_indices(blocks, samples, bootstrap, rng):
+    """
+    Бутстреп-оценки индексов Соболя пачками выборок
+
+    Выборки с возвращением одни для всех показателей. Пачка ограничена
+    BOOTSTRAP_CHUNK_CELLS значениями на массив: выборка всех повторов
+    сразу заняла бы (k + 2) × bootstrap × N чисел.
+
+    Args:
+        blocks (dict): {показатель: (k + 2, N) — строки A, B и AB_i}
+
+    Returns:
+        dict: {показатель: (S1, ST) формы (k, bootstrap)}
+    """
+    k = next(iter(blocks.values())).shape[0] - 2
+    chunk = max(1, BOOTSTRAP_CHUNK_CELLS // (k * samples))
+    result = {name: (np.empty((k, bootstrap)), np.empty((k, bootstrap))) for name in blocks}
+    for start in range(0, bootstrap, chunk):
+        stop = min(start + chunk, bootstrap)
+        resample = rng.integers(0, samples, (stop - start, samples))
+        for name, block in blocks.items():
+            first, total = sobol_indices(block[0][resample], block[1][resample], block[2:][:, resample])
+            result[name][0][:, start:stop] = first
+            result[name][1][:, start:stop] = total
+    return result
+
+
+def morris_trajectories(trajectories, k, levels, rng):
+    """
+    Траектории Морриса в единичном гиперкубе
+
+    Returns:
+        tuple: (точки (r, k + 1, k), порядок факторов (r, k), шаг delta)
+    """
+    delta = levels / (2 * (levels - 1))
+    # Стартовые узлы, из которых шаг +delta не выходит за [0, 1]
+    start_levels = np.arange(levels // 2) / (levels - 1)
+    start = rng.choice(start_levels, (trajectories, k))
+    order = np.argsort(rng.random((trajectories, k)), axis=1)
+
+    steps = np.zeros((trajectories, k + 1, k))
+    rows = np.arange(trajectories)[:, None]
+    moved = np.zeros((trajectories, k))
+    for j in range(k):
+        moved[rows[:, 0], order[:, j]] = delta
+        steps[:, j + 1] = moved
+    return start[:, None, :] + steps, order, delta
+
+
+def _morris(distributions, base, outputs, samples, rng, workers):
+    names = list(distributions)
+    k = len(names)
+    points, order, delta = morris_trajectories(samples, k, MORRIS_LEVELS, rng)
+    unit = points.reshape(-1, k)
+    matrix = np.column_stack([ppf(distributions[name], unit[:, i]) for i, name in enumerate(names)])
+
+    values = evaluate_samples(base, names, matrix, outputs, workers)
+
+    report = {}
+    for name in outputs:
+        f = values[name].reshape(samples, k + 1)
+        effects = np.empty((samples, k))
+        # j-й шаг траектории меняет фактор order[:, j]
+        effects[np.arange(samples)[:, None], order] = np.diff(f, axis=1) / delta
+        report[name] = {
+            'label': RESULT_COLUMNS[name],
+            'mean': float(np.nanmean(f)),
+            'std': float(np.nanstd(f)),
+            'mu': np.round(effects.mean(axis=0), 4).tolist(),
+            'mu_star': np.round(np.abs(effects).mean(axis=0), 4).tolist(),
+            'sigma': np.round(effects.std(axis=0), 4).tolist(),
+        }
+
+    return names, int(matrix.shape[0]), report
+
+
+@timed('calc')
+@track_calculation
+def run_sensitivity(spec, workers=None, max_evaluations=MAX_EVALUATIONS):
+    """
+    Анализ чувствительности баланса плавки
+
+    Args:
+        spec (dict): {
+            'method': 'sobol' | 'morris',
+            'base': фиксированные параметры calculate_smelting,
+            'distributions': {параметр: {'dist': 'uniform', 'min', 'max'} |
+                {'dist': 'normal', 'mean', 'std'} |
+                {'dist': 'triangular', 'min', 'mode', 'max'}},
+            'outputs': показатели из RESULT_COLUMNS,
+            'samples': N (Соболь) или число траекторий (Моррис),
+            'bootstrap': число бутстреп-выборок (только Соболь),
+            'seed': зерно генератора,
+        }
+        workers (int): число процессов для расчета выборки
+        max_evaluations (int): ограничение числа расчетов и размера бутстрепа
+            (None — без ограничений)
+
+    Returns:
+        dict: параметры, индексы по каждому показателю и статистика расчета
+    """
+    started = time.perf_counter()
+
+    method = spec.get('method', 'sobol')
+    if method not in METHODS:
+        raise ValueError(f'Неизвестный метод: {method}')
+
+    distributions = {
+        name: parse_distribution(name, dist)
+        for name, dist in (spec.get('distributions') or DEFAULT_DISTRIBUTIONS).items()
+    }
+    if not distributions:
+        raise ValueError('Не заданы варьируемые параметры')
+
+    outputs = list(spec.get('outputs') or DEFAULT_OUTPUTS)
+    unknown = set(outputs) - set(RESULT_COLUMNS)
+    if unknown:
+        raise ValueError(f'Неизвестные показатели: {", ".join(sorted(unknown))}')
+
+    base = {key: value for key, value in (spec.get('base') or {}).items() if key in INPUT_DEFAULTS}
+    base.setdefault('antimonite_mass', INPUT_DEFAULTS['antimonite_mass'])
+    if float(base['antimonite_mass']) <= 0:
+        raise ValueError('Масса антимоната должна быть больше 0')
+
+    samples = int(spec.get('samples', DEFAULT_SAMPLES))
+    if samples < 2:
+        raise ValueError('Размер выборки должен быть не меньше 2')
+    evaluations = samples * (len(distributions) + (2 if method == 'sobol' else 1))
+    if max_evaluations and evaluations > max_evaluations:
+        raise ValueError(f'Слишком много расчетов: {evaluations} (максимум {max_evaluations})')
+
+    rng = np.random.default_rng(spec.get('seed', 0))
+    if method == 'sobol':
+        bootstrap = int(spec.get('bootstrap', DEFAULT_BOOTSTRAP))
+        if bootstrap < 0:
+            raise ValueError('Число бутстреп-выборок не может быть отрицательным')
+        # Бутстреп пересчитывает индексы по N точкам bootstrap раз
+        if max_evaluations and samples * bootstrap > MAX_BOOTSTRAP_SAMPLES:
+            raise ValueError(f'Слишком большой бутстреп: {samples} × {bootstrap} выборок '
+                             f'(максимум {MAX_BOOTSTRAP_SAMPLES})')
+        names, evaluations, report = _sobol(distributions, base, outputs, samples, bootstrap, rng, workers)
+    else:
+        names, evaluations, report = _morris(distributions, base, outputs, samples, rng, workers)
+
+    return {
+        'method': method,
+        'parameters': names,
+        'distributions': distributions,
+        'samples': samples,
+        'evaluations': evaluations,
+        'outputs': report,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
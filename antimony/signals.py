@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+
+from .coefficients import invalidate_coefficients
+from .interpolation import invalidate_table
+from .models import CalibrationPoint, CoefficientSet
+
+
+def connect_signals():
+    """Сброс таблицы интерполяции и коэффициентов при их изменении"""
+    post_save.connect(invalidate_table, sender=CalibrationPoint, dispatch_uid='antimony_calibration_save')
+    post_delete.connect(invalidate_table, sender=CalibrationPoint, dispatch_uid='antimony_calibration_delete')
+    post_save.connect(invalidate_coefficients, sender=CoefficientSet, dispatch_uid='antimony_coefficients_save')
+    post_delete.connect(invalidate_coefficients, sender=CoefficientSet, dispatch_uid='antimony_coefficients_delete')
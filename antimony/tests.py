@@ -0,0 +1,698 @@
+import json
+import os
+import tempfile
+import tracemalloc
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .calculations import calculate_smelting, parse_inputs, model_version, SMELTING_GRAPH
+from .batch import build_grid, evaluate_batch, run_sweep, MAX_SWEEP_POINTS
+from .optimizer import optimize_smelting, pareto_front
+from .models import SmeltingRun, CalibrationPoint, SmeltingMeasurement, CoefficientSet
+from . import coefficients, interpolation
+from .coefficients import calibrate, get_coefficients, invalidate_coefficients, version_errors
+from .interpolation import CalibrationTable, DEFAULT_CALIBRATION, get_table, invalidate_table, lookup
+from . import sensitivity
+from .sensitivity import (
+    bootstrap_indices, run_sensitivity, sobol_indices, saltelli_matrix, ppf, parse_distribution,
+)
+from .equilibrium import _solve_cached, solve_equilibrium, solve_normalized
+from .thermodata import ELEMENTS, FORMULA, SPECIES_NAMES, enthalpy, heat_capacity
+from .heat_balance import heat_balance
+from .runs import get_or_calculate, input_hash, normalize_inputs, run_cache, RunCache
+
+
+class SmeltingSweepTest(TestCase):
+    """Тесты пакетного расчета плавки"""
+
+    GRID = {
+        'antimonite_mass': 73.4,
+        'temperature': [900, 1000],
+        'reducer_type': ['coke', 'charcoal'],
+        'reducer_amount': [5, 10, 15],
+        'lead_addition': [0, 30, 100],
+        'moisture': [0, 2],
+    }
+
+    def test_grid_matches_single_calculation(self):
+        """Каждая точка сетки совпадает с calculate_smelting"""
+        axes, inputs = build_grid(self.GRID)
+        batch = evaluate_batch(inputs)
+
+        self.assertEqual(list(axes), ['moisture', 'temperature', 'reducer_type', 'reducer_amount', 'lead_addition'])
+
+        for i in range(inputs['temperature'].size):
+            scenario = {key: (value[i] if isinstance(value, np.ndarray) else value) for key, value in inputs.items()}
+            single = calculate_smelting(scenario)
+
+            self.assertAlmostEqual(batch['sb_extraction'][i], single['crude_antimony']['sb_extraction'], places=2)
+            self.assertAlmostEqual(batch['crude_sb_mass'][i], single['crude_antimony']['mass'], places=2)
+            self.assertAlmostEqual(batch['na_content_crude'][i], single['crude_antimony']['impurities']['na'], places=2)
+            self.assertAlmostEqual(batch['sb_to_slag'][i], single['slag']['sb_losses'], places=2)
+            self.assertAlmostEqual(batch['sb_losses'][i], single['losses']['sb_to_gas'], places=2)
+
+            # Категории рекомендаций соответствуют generate_recommendations
+            types = [r['type'] for r in single['recommendations']]
+            extraction_type = ['warning', 'info', 'success'][batch['category_extraction'][i]]
+            self.assertEqual(types[0], extraction_type)
+
+    # Показатели calculate_smelting и столбцы evaluate_batch: (раздел, поле, столбец, знаков округления)
+    PARITY_FIELDS = [
+        ('input', 'dry_antimonite', 'dry_antimonite', 2),
+        ('input', 'reducer_mass', 'reducer_mass', 2),
+        ('input', 'total_charge', 'total_charge', 2),
+        ('loaded', 'sb', 'sb_loaded', 2),
+        ('loaded', 'na', 'na_loaded', 2),
+        ('loaded', 'as', 'as_loaded', 2),
+        ('crude_antimony', 'mass', 'crude_sb_mass', 2),
+        ('crude_antimony', 'yield_percent', 'crude_yield', 2),
+        ('crude_antimony', 'sb_content', 'sb_in_crude', 2),
+        ('crude_antimony', 'sb_extraction', 'sb_extraction', 2),
+        ('slag', 'mass', 'slag_mass', 2),
+        ('slag', 'yield_percent', 'slag_yield', 2),
+        ('slag', 'sb_content', 'sb_in_slag', 2),
+        ('slag', 'sb_losses', 'sb_to_slag', 2),
+        ('losses', 'sb_to_gas', 'sb_losses', 2),
+        ('losses', 'as_to_gas', 'as_to_gas', 2),
+        ('losses', 'total_balance_diff', 'total_losses', 2),
+        ('losses', 'total_losses_percent', 'total_losses_percent', 2),
+        ('heat_balance', 'total_heat', 'total_heat', 1),
+        ('heat_balance', 'reaction_heat', 'reaction_heat', 1),
+        ('heat_balance', 'specific_energy', 'specific_energy', 0),
+    ]
+
+    def assert_parity(self, grid, mode):
+        """Все показатели и рекомендации calculate_smelting совпадают с evaluate_batch в каждой точке сетки"""
+        _, inputs = build_grid(grid)
+        batch = evaluate_batch(inputs, mode)
+        categories = {name: batch[f'category_{name}'] for name in ('extraction', 'reducer', 'sodium')}
+
+        for i in range(inputs['temperature'].size):
+            scenario = {key: (value[i] if isinstance(value, np.ndarray) else value) for key, value in inputs.items()}
+            single = calculate_smelting({**scenario, 'mode': mode})
+            for section, field, column, decimals in self.PARITY_FIELDS:
+                with self.subTest(point=scenario, field=f'{section}.{field}'):
+                    self.assertAlmostEqual(round(float(batch[column][i]), decimals), single[section][field],
+                                           delta=10 ** -decimals)
+            self.assertAlmostEqual(batch['na_content_crude'][i], single['crude_antimony']['impurities']['na'],
+                                   delta=0.01)
+
+            types = [r['type'] for r in single['recommendations']]
+            expected = [
+                ['warning', 'info', 'success'][categories['extraction'][i]],
+                ['warning', 'success', 'warning'][categories['reducer'][i]],
+            ]
+            if categories['sodium'][i]:
+                expected.append(['success', 'warning', 'error'][categories['sodium'][i]])
+            self.assertEqual(types[:len(expected)], expected)
+
+    def test_parity_across_grid(self):
+        """Одна модель: пакетный расчет совпадает с calculate_smelting по всей сетке, включая точки между узлами"""
+        self.assert_parity({
+            'antimonite_mass': [50, 120],
+            'sb_content': [55, 60.39],
+            'coke_ash': [10, 20],
+            'moisture': [0, 3.5],
+            'temperature': [850, 900, 950, 1000, 1050],
+            'reducer_type': ['coke', 'charcoal'],
+            'reducer_amount': [4, 7.5, 10, 12.5, 18],
+            'lead_addition': [0, 8, 40, 150],
+        }, 'empirical')
+        self.assert_parity({
+            'antimonite_mass': 100,
+            'temperature': [900, 1000],
+            'reducer_type': ['coke', 'charcoal'],
+            'reducer_amount': [6, 10, 14],
+        }, 'equilibrium')
+
+    def test_sweep_api(self):
+        """API возвращает столбцы для всей сетки одним запросом"""
+        response = self.client.post(
+            '/antimony/sweep/',
+            json.dumps({'grid': {
+                'antimonite_mass': 100,
+                'reducer_amount': {'min': 5, 'max': 20, 'steps': 16},
+                'temperature': [900, 1000],
+            }, 'columns': ['sb_extraction']}),
+            content_type='application/json'
+        )
+        data = response.json()
+
+        self.assertTrue(data['success'])
+        self.assertEqual(data['shape'], [2, 16])
+        self.assertEqual(len(data['columns']['sb_extraction']), 32)
+        self.assertEqual(len(data['categories']['reducer']), 32)
+
+    def test_sweep_size_limit(self):
+        """Слишком большая сетка отклоняется"""
+        steps = int(MAX_SWEEP_POINTS ** 0.5) + 1
+        with self.assertRaises(ValueError):
+            run_sweep({
+                'reducer_amount': {'min': 5, 'max': 20, 'steps': steps},
+                'moisture': {'min': 0, 'max': 10, 'steps': steps},
+            })
+
+
+class SmeltingOptimizerTest(TestCase):
+    """Тесты подбора режима плавки"""
+
+    def test_best_recipe_satisfies_constraints(self):
+        """Лучший режим допустим и не хуже всех точек фронта"""
+        result = optimize_smelting(
+            {'antimonite_mass': 73.4},
+            bounds={'lead_addition': [0, 100]},
+            constraints={'max_na_in_crude': 3, 'max_sb_in_slag': 2},
+        )
+        best = result['best']['result']
+
+        self.assertLessEqual(best['crude_antimony']['impurities']['na'], 3)
+        self.assertLessEqual(best['slag']['sb_content'], 2)
+        # Древесный уголь дает >3% Na и отсекается ограничением
+        self.assertEqual(result['best']['recipe']['reducer_type'], 'coke')
+        for point in result['pareto_front']:
+            self.assertLessEqual(point['sb_extraction'], best['crude_antimony']['sb_extraction'])
+        self.assertLess(result['elapsed_ms'], 1000)
+
+    def test_best_result_uses_search_model(self):
+        """Посторонние ключи сырья (mode) не меняют модель итогового расчета"""
+        result = optimize_smelting({'antimonite_mass': 73.4, 'mode': 'equilibrium'})
+        recipe = result['best']['recipe']
+        self.assertEqual(result['best']['result'], calculate_smelting({'antimonite_mass': 73.4, **recipe}))
+        # Лучший режим — вершина фронта по извлечению, посчитанная той же моделью
+        self.assertAlmostEqual(result['best']['result']['crude_antimony']['sb_extraction'],
+                               result['pareto_front'][0]['sb_extraction'], places=1)
+
+    def test_pareto_front(self):
+        """Фронт Парето содержит только недоминируемые точки"""
+        first = np.array([1, 2, 3, 2, 1])
+        second = np.array([5, 4, 1, 2, 6])
+        self.assertEqual(sorted(pareto_front(first, second).tolist()), [1, 2, 4])
+
+
+class SmeltingRunTest(TestCase):
+    """Тесты сохранения и мемоизации расчетов"""
+
+    DATA = {'antimonite_mass': 73.4, 'temperature': 1000, 'reducer_type': 'coke', 'reducer_amount': 10}
+
+    def setUp(self):
+        run_cache.clear()
+
+    def test_canonical_hash(self):
+        """Эквивалентные входные данные дают один хеш"""
+        same = {'antimonite_mass': '73.4', 'temperature': '1000', 'reducer_amount': 10.0,
+                'sb_content': 60.39, 'unknown': 1}
+        self.assertEqual(input_hash(normalize_inputs(self.DATA)), input_hash(normalize_inputs(same)))
+        self.assertNotEqual(
+            input_hash(normalize_inputs(self.DATA)),
+            input_hash(normalize_inputs({**self.DATA, 'reducer_amount': 11}))
+        )
+
+    def test_memoization_order(self):
+        """Повторный расчет берется из памяти, после сброса кэша — из БД"""
+        result, run_id, source = get_or_calculate(self.DATA)
+        self.assertEqual(source, 'calculated')
+        self.assertEqual(SmeltingRun.objects.count(), 1)
+
+        with self.assertNumQueries(0):
+            cached, cached_id, source = get_or_calculate(self.DATA)
+        self.assertEqual((cached_id, source), (run_id, 'memory'))
+
+        run_cache.clear()
+        stored, stored_id, source = get_or_calculate(self.DATA)
+        self.assertEqual((stored_id, source), (run_id, 'database'))
+        self.assertEqual(stored['crude_antimony'], result['crude_antimony'])
+        self.assertEqual(SmeltingRun.objects.count(), 1)
+
+    def test_errors_not_saved(self):
+        """Расчет с ошибкой не сохраняется"""
+        result, run_id, _ = get_or_calculate({'antimonite_mass': 0})
+        self.assertIn('error', result)
+        self.assertIsNone(run_id)
+        self.assertFalse(SmeltingRun.objects.exists())
+
+    def test_lru_eviction(self):
+        """Кэш вытесняет давно не использованные записи"""
+        cache = RunCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), len(cache)), (1, 2))
+
+    def test_calculate_and_compare_views(self):
+        """API возвращает id расчета, страница истории сравнивает расчеты"""
+        first = self.client.post('/antimony/calculate/', json.dumps(self.DATA),
+                                 content_type='application/json').json()
+        second = self.client.post('/antimony/calculate/', json.dumps({**self.DATA, 'temperature': 900}),
+                                  content_type='application/json').json()
+        self.assertTrue(first['success'])
+        self.assertEqual(first['source'], 'calculated')
+
+        response = self.client.get(f"/antimony/runs/?compare={second['run_id']},{first['run_id']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([run.id for run in response.context['compared']], [second['run_id'], first['run_id']])
+
+
+class CalibrationInterpolationTest(TestCase):
+    """Тесты интерполяции по таблице калибровки"""
+
+    def setUp(self):
+        invalidate_table()
+        self.addCleanup(invalidate_table)
+
+    def test_nodes_reproduce_experiments(self):
+        """В узлах таблицы значения совпадают с данными опытов"""
+        self.assertAlmostEqual(float(lookup(900, 'coke', 10, 0)['sb_in_crude']), 94.05)
+        self.assertAlmostEqual(float(lookup(1000, 'charcoal', 10, 0)['sb_extraction']), 75.85)
+        self.assertAlmostEqual(float(lookup(900, 'coke', 15, 1.5)['sb_extraction']), 80.09)
+        self.assertAlmostEqual(float(lookup(1000, 'charcoal', 5, 0)['na_to_crude']), 35.0)
+
+    def test_continuity_and_clamping(self):
+        """Между узлами — линейно, за пределами таблицы — граничное значение"""
+        middle = lookup(950, 'coke', 10, 0)['sb_in_crude']
+        self.assertAlmostEqual(float(middle), (94.05 + 87.32) / 2)
+        self.assertAlmostEqual(float(lookup(900, 'coke', 12.5, 0)['sb_in_slag']), (1.0 + 0.56) / 2)
+        self.assertAlmostEqual(float(lookup(900, 'coke', 25, 0)['sb_in_slag']), 0.56)
+
+        amounts = np.linspace(9.9, 10.1, 5)
+        values = lookup(900, 'coke', amounts, 0)['sb_in_crude']
+        self.assertEqual(values.shape, (5,))
+        self.assertLess(np.abs(np.diff(values)).max(), 0.2)
+
+    def test_missing_cells_filled(self):
+        """Разреженная таблица дополняется ближайшими точками"""
+        points = [p for p in DEFAULT_CALIBRATION if not (p['reducer_type'] == 'charcoal' and p['pb_ratio'] == 1.5)]
+        table = CalibrationTable(points)
+        self.assertTrue(np.isfinite(table.values).all())
+        self.assertAlmostEqual(float(table.lookup(900, True, 10, 1.5)['sb_extraction']), 84.83)
+
+    def test_admin_changes_reload_table(self):
+        """Изменение точек в БД сбрасывает таблицу и меняет расчет"""
+        before = get_table()
+        result = calculate_smelting({'antimonite_mass': 100, 'reducer_type': 'coke'})
+        self.assertAlmostEqual(result['crude_antimony']['sb_extraction'], 72.35)
+
+        CalibrationPoint.objects.create(
+            temperature=900, reducer_type='coke', reducer_amount=10, pb_ratio=0,
+            sb_extraction=80.0, sb_in_crude=94.05, sb_in_slag=1.0, na_to_crude=4.5,
+        )
+        self.assertIsNot(get_table(), before)
+        self.assertNotEqual(get_table().fingerprint, before.fingerprint)
+        result = calculate_smelting({'antimonite_mass': 100, 'reducer_type': 'coke'})
+        self.assertAlmostEqual(result['crude_antimony']['sb_extraction'], 80.0)
+        # Уголь по-прежнему считается по встроенным данным
+        result = calculate_smelting({'antimonite_mass': 100, 'reducer_type': 'charcoal'})
+        self.assertAlmostEqual(result['crude_antimony']['sb_extraction'], 71.0)
+
+    def test_refresh_on_changes_elsewhere(self):
+        """Точки, измененные другим процессом (без сигналов), подхватываются после интервала проверки"""
+        before = get_table()
+        CalibrationPoint.objects.bulk_create([CalibrationPoint(
+            temperature=900, reducer_type='coke', reducer_amount=10, pb_ratio=0,
+            sb_extraction=80.0, sb_in_crude=94.05, sb_in_slag=1.0, na_to_crude=4.5,
+        )])
+        self.assertIs(get_table(), before)
+
+        interpolation._checked_at -= interpolation.REFRESH_INTERVAL + 1
+        table = get_table()
+        self.assertNotEqual(table.fingerprint, before.fingerprint)
+        self.assertAlmostEqual(float(lookup(900, 'coke', 10, 0)['sb_extraction']), 80.0)
+
+        # Правка на месте не меняет число точек и id, но меняет версию
+        CalibrationPoint.objects.update(sb_extraction=82.0)
+        interpolation._checked_at -= interpolation.REFRESH_INTERVAL + 1
+        self.assertNotEqual(get_table().fingerprint, table.fingerprint)
+        self.assertAlmostEqual(float(lookup(900, 'coke', 10, 0)['sb_extraction']), 82.0)
+
+        # Без изменений таблица остается прежней
+        unchanged = get_table()
+        interpolation._checked_at -= interpolation.REFRESH_INTERVAL + 1
+        self.assertIs(get_table(), unchanged)
+
+
+class SensitivityAnalysisTest(TestCase):
+    """Тесты анализа чувствительности"""
+
+    def test_sobol_indices_of_linear_model(self):
+        """Для f = x1 + 2·x2 индексы равны 0.2 и 0.8, x3 не влияет"""
+        rng = np.random.default_rng(1)
+        samples = 20000
+        unit = saltelli_matrix(rng.random((samples, 3)), rng.random((samples, 3)))
+        f = (unit[:, 0] + 2 * unit[:, 1]).reshape(5, samples)
+        first, total = sobol_indices(f[0], f[1], f[2:])
+        np.testing.assert_allclose(first, [0.2, 0.8, 0.0], atol=0.02)
+        np.testing.assert_allclose(total, [0.2, 0.8, 0.0], atol=0.02)
+
+    def test_bootstrap_in_chunks(self):
+        """Бутстреп пачками совпадает с выборкой всех повторов сразу и не держит их в памяти"""
+        samples, bootstrap = 2000, 30
+        blocks = {'x': np.random.default_rng(2).random((5, samples))}
+        resample = np.random.default_rng(7).integers(0, samples, (bootstrap, samples))
+        block = blocks['x']
+        expected = sobol_indices(block[0][resample], block[1][resample], block[2:][:, resample])
+
+        with mock.patch.object(sensitivity, 'BOOTSTRAP_CHUNK_CELLS', 3 * samples * 4):
+            tracemalloc.start()
+            try:
+                first, total = bootstrap_indices(blocks, samples, bootstrap, np.random.default_rng(7))['x']
+                _current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        np.testing.assert_allclose(first, expected[0])
+        np.testing.assert_allclose(total, expected[1])
+        self.assertLess(peak, 3 * samples * bootstrap * 8)
+
+    def test_bootstrap_limit(self):
+        with self.assertRaises(ValueError):
+            run_sensitivity({'samples': 55000, 'bootstrap': 1000, 'distributions': {
+                'moisture': {'dist': 'uniform', 'min': 0, 'max': 5},
+            }})
+
+    def test_distributions(self):
+        """Квантильные функции дают заданные моменты"""
+        u = (np.arange(100000) + 0.5) / 100000
+        normal = ppf(parse_distribution('moisture', {'dist': 'normal', 'mean': 5, 'std': 1}), u)
+        triangular = ppf(parse_distribution('reducer_amount', {'dist': 'triangular', 'min': 5, 'mode': 8, 'max': 14}), u)
+        self.assertAlmostEqual(normal.mean(), 5, places=2)
+        self.assertAlmostEqual(normal.std(), 1, places=1)
+        self.assertAlmostEqual(triangular.mean(), 9, places=2)
+        with self.assertRaises(ValueError):
+            parse_distribution('reducer_type', {'dist': 'uniform', 'min': 0, 'max': 1})
+
+    def test_balance_drivers(self):
+        """Na в черновой сурьме определяется содержанием Na, а не мышьяком"""
+        result = run_sensitivity({'samples': 2048, 'bootstrap': 50})
+        parameters = result['parameters']
+        na = result['outputs']['na_content_crude']
+
+        self.assertEqual(result['evaluations'], 2048 * (len(parameters) + 2))
+        self.assertEqual(max(range(len(parameters)), key=lambda i: na['ST'][i]), parameters.index('na_content'))
+        self.assertAlmostEqual(na['ST'][parameters.index('as_content')], 0, places=3)
+        low, high = na['S1_ci'][parameters.index('na_content')]
+        self.assertLessEqual(low, na['S1'][parameters.index('na_content')])
+        self.assertGreaterEqual(high, na['S1'][parameters.index('na_content')])
+
+    def test_morris_api(self):
+        """API метода Морриса и ограничение числа расчетов"""
+        response = self.client.post('/antimony/sensitivity/', json.dumps({
+            'method': 'morris', 'samples': 20,
+            'distributions': {'sb_content': {'min': 55, 'max': 65}, 'coke_ash': {'min': 10, 'max': 20}},
+            'outputs': ['crude_sb_mass'],
+        }), content_type='application/json')
+        data = response.json()
+        self.assertTrue(data['success'])
+        mu_star = data['outputs']['crude_sb_mass']['mu_star']
+        self.assertGreater(mu_star[0], 0)
+        self.assertEqual(mu_star[1], 0)
+
+        with self.assertRaises(ValueError):
+            run_sensitivity({'samples': 10 ** 6})
+
+    def test_command_with_workers(self):
+        """Команда считает выборку в пуле процессов и сохраняет JSON"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'result.json')
+            call_command('antimony_sensitivity', samples=256, bootstrap=20, workers=2,
+                         output=path, stdout=StringIO())
+            with open(path, encoding='utf-8') as f:
+                result = json.load(f)
+        serial = run_sensitivity({'samples': 256, 'bootstrap': 20})
+        self.assertEqual(result['outputs']['crude_sb_mass']['S1'], serial['outputs']['crude_sb_mass']['S1'])
+
+
+class EquilibriumModeTest(TestCase):
+    """Тесты равновесного режима (минимизация энергии Гиббса)"""
+
+    CHARGE = {'antimonite_mass': 100, 'mode': 'equilibrium'}
+
+    def test_boudouard_equilibrium(self):
+        """C + CO₂ = 2CO: доля CO растет с температурой, при 1073 К около 90%"""
+        elements = np.zeros((3, len(ELEMENTS)))
+        elements[:, ELEMENTS.index('C')] = 2.0
+        elements[:, ELEMENTS.index('O')] = 2.0
+        amounts = solve_equilibrium(np.array([973.0, 1073.0, 1173.0]), elements)
+
+        co = amounts[:, SPECIES_NAMES.index('CO')]
+        co2 = amounts[:, SPECIES_NAMES.index('CO2')]
+        fraction = co / (co + co2)
+        self.assertTrue(np.all(np.diff(fraction) > 0))
+        self.assertAlmostEqual(fraction[1], 0.90, delta=0.03)
+
+    def test_element_balance(self):
+        """Равновесный состав сохраняет количества всех элементов (с точностью округления ключа кэша)"""
+        elements = np.array([[0.5, 0.3, 0.01, 0.2, 1.4, 0.8]])
+        normalized = elements / elements.sum()
+        amounts = solve_normalized(np.array([1173.15]), elements)
+        np.testing.assert_allclose(amounts @ FORMULA.T, normalized, atol=1e-5)
+
+    def test_reducer_trends(self):
+        """С ростом расхода восстановителя извлечение Sb и переход Na в металл растут"""
+        results = [
+            calculate_smelting({**self.CHARGE, 'reducer_amount': amount})
+            for amount in (5, 10, 15)
+        ]
+        extraction = [r['crude_antimony']['sb_extraction'] for r in results]
+        na_share = [r['equilibrium']['distribution']['Na']['metal'] for r in results]
+
+        self.assertEqual(results[1]['mode'], 'equilibrium')
+        self.assertLess(extraction[0], extraction[1])
+        self.assertLess(na_share[1], na_share[2])
+        self.assertGreater(extraction[1], 95)
+        for r in results:
+            shares = r['equilibrium']['distribution']['Sb']
+            self.assertAlmostEqual(sum(shares.values()), 100, delta=0.05)
+
+    def test_batch_matches_single_calculation(self):
+        """Пакетный равновесный расчет совпадает с calculate_smelting"""
+        _, inputs = build_grid({
+            'antimonite_mass': 100,
+            'temperature': [900, 1000],
+            'reducer_type': ['coke', 'charcoal'],
+            'reducer_amount': [8, 12],
+        })
+        batch = evaluate_batch(inputs, mode='equilibrium')
+
+        for i in range(inputs['temperature'].size):
+            scenario = {key: (value[i] if isinstance(value, np.ndarray) else value) for key, value in inputs.items()}
+            single = calculate_smelting({**scenario, 'mode': 'equilibrium'})
+            self.assertAlmostEqual(batch['sb_extraction'][i], single['crude_antimony']['sb_extraction'], places=1)
+            self.assertAlmostEqual(batch['crude_sb_mass'][i], single['crude_antimony']['mass'], places=1)
+            self.assertAlmostEqual(batch['slag_mass'][i], single['slag']['mass'], places=1)
+
+    def test_cache_and_mode_validation(self):
+        """Повторный расчет берется из кэша; режим входит в хеш и проверяется"""
+        calculate_smelting({**self.CHARGE, 'reducer_amount': 11.3})
+        hits = _solve_cached.cache_info().hits
+        calculate_smelting({**self.CHARGE, 'reducer_amount': 11.3})
+        self.assertGreater(_solve_cached.cache_info().hits, hits)
+
+        empirical = normalize_inputs({'antimonite_mass': 100})
+        self.assertEqual(empirical['mode'], 'empirical')
+        self.assertNotEqual(input_hash(empirical), input_hash(normalize_inputs(self.CHARGE)))
+
+        self.assertIn('error', calculate_smelting({'antimonite_mass': 100, 'mode': 'unknown'}))
+        with self.assertRaises(ValueError):
+            run_sweep({'reducer_amount': {'min': 5, 'max': 15, 'steps': 6000}}, mode='equilibrium')
+
+
+class HeatBalanceTest(TestCase):
+    """Тесты теплового баланса плавки"""
+
+    def test_reduction_enthalpy(self):
+        """Sb₂O₅ + 5C → 2Sb + 5CO: теплота реакции по закону Гесса"""
+        sb = 2 * 121.760
+        balance = {
+            'dry_antimonite': sb / 2 * (2 * 121.760 + 5 * 15.999) / 121.760,
+            'sb_loaded': sb, 'na_loaded': 0.0, 'as_loaded': 0.0,
+            'reducer_mass': 5 * 12.011, 'sb_to_crude': sb, 'na_to_crude': 0.0,
+            'as_to_crude': 0.0, 'sb_to_slag': 0.0, 'na_to_slag': 0.0, 'as_to_slag': 0.0,
+            'as_to_gas': 0.0, 'sb_losses': 0.0, 'crude_sb_mass': sb,
+        }
+        heat = heat_balance(balance, 25.0, 0.0, 0.0, co_fraction=1.0)
+        h298 = enthalpy(298.15, ('Sb', 'CO', 'Sb2O5(s)')) / 1000
+        expected = 2 * h298[0] + 5 * h298[1] - h298[2]
+
+        self.assertAlmostEqual(float(heat['reaction_heat']), expected, places=3)
+        self.assertAlmostEqual(float(heat['metal_heat'] + heat['slag_heat'] + heat['gas_heat']), 0.0, places=3)
+        self.assertAlmostEqual(float(heat['carbon_used']), 5 * 12.011, places=6)
+
+    def test_shomate_consistency(self):
+        """dH/dT совпадает с Cp"""
+        species = ('CO', 'H2O(g)', 'Sb2O5(s)')
+        dh = (enthalpy(1200.5, species) - enthalpy(1199.5, species))
+        np.testing.assert_allclose(dh, heat_capacity(1200.0, species), rtol=1e-5)
+
+    def test_batch_matches_single_calculation(self):
+        """Тепловой баланс сетки совпадает с calculate_smelting; нагрев до 1000 °C дороже"""
+        _, inputs = build_grid({
+            'antimonite_mass': 1000,
+            'temperature': [900, 1000],
+            'reducer_amount': [5, 10, 15],
+        })
+        batch = evaluate_batch(inputs)
+
+        for i in range(inputs['temperature'].size):
+            scenario = {key: (value[i] if isinstance(value, np.ndarray) else value) for key, value in inputs.items()}
+            single = calculate_smelting(scenario)['heat_balance']
+            self.assertAlmostEqual(batch['total_heat'][i], single['total_heat'], delta=0.1)
+            self.assertGreater(single['reaction_heat'], 0)
+            self.assertAlmostEqual(single['heat_losses'], single['useful_heat'], delta=0.1)
+
+        useful = batch['useful_heat'].reshape(2, 3)
+        self.assertTrue(np.all(useful[1] > useful[0]))
+
+        sweep = run_sweep({'temperature': [900, 1000]}, columns=['specific_energy'])
+        self.assertEqual(len(sweep['columns']['specific_energy']), 2)
+
+
+class CoefficientCalibrationTest(TestCase):
+    """Тесты калибровки коэффициентов по фактическим плавкам"""
+
+    SCENARIOS = [
+        {'temperature': 900, 'reducer_type': 'coke', 'reducer_amount': 10},
+        {'temperature': 1000, 'reducer_type': 'coke', 'reducer_amount': 12},
+        {'temperature': 900, 'reducer_type': 'charcoal', 'reducer_amount': 8},
+        {'temperature': 1000, 'reducer_type': 'charcoal', 'reducer_amount': 15},
+    ]
+
+    def setUp(self):
+        run_cache.clear()
+        invalidate_coefficients()
+        self.addCleanup(invalidate_coefficients)
+        self.addCleanup(run_cache.clear)
+
+    def record_melts(self, extraction_factor, slag_factor):
+        """Плавки, в которых факт отличается от прогноза в заданное число раз"""
+        for scenario in self.SCENARIOS:
+            result, run_id, _ = get_or_calculate({'antimonite_mass': 100, **scenario})
+            crude = result['crude_antimony']
+            SmeltingMeasurement.objects.create(
+                run_id=run_id,
+                crude_mass=crude['mass'] * extraction_factor,
+                sb_in_crude=crude['sb_content'],
+                sb_in_slag=result['slag']['sb_content'] * slag_factor,
+            )
+
+    def test_calibration_recovers_factors(self):
+        """МНК находит поправки, ошибка падает, расчет использует новую версию"""
+        before = calculate_smelting({'antimonite_mass': 100})
+        hash_before = input_hash(normalize_inputs({'antimonite_mass': 100}))
+        self.record_melts(0.9, 2.0)
+
+        result = calibrate()
+        self.assertEqual(result['version'], 1)
+        self.assertAlmostEqual(result['coefficients']['sb_extraction'], 0.9, places=2)
+        self.assertAlmostEqual(result['coefficients']['sb_in_slag'], 2.0, places=2)
+        self.assertEqual(result['coefficients']['na_to_crude'], 1.0)
+        self.assertLess(result['errors']['sb_extraction']['rmse'], result['baseline_errors']['sb_extraction']['rmse'])
+        self.assertEqual(result['errors']['na_to_crude']['count'], 0)
+
+        after = calculate_smelting({'antimonite_mass': 100})
+        self.assertEqual(get_coefficients().version, 1)
+        self.assertAlmostEqual(
+            after['crude_antimony']['sb_extraction'], before['crude_antimony']['sb_extraction'] * 0.9, places=1
+        )
+        self.assertNotEqual(input_hash(normalize_inputs({'antimonite_mass': 100})), hash_before)
+
+        report = version_errors()
+        self.assertEqual([row['version'] for row in report], [0, 1])
+
+    def test_refresh_on_new_version(self):
+        """Версия, сохраненная другим процессом, подхватывается после интервала проверки"""
+        self.assertEqual(get_coefficients().version, 0)
+        CoefficientSet.objects.bulk_create([
+            CoefficientSet(version=5, coefficients={'sb_extraction': 1.1}, measurements_count=3)
+        ])
+        self.assertEqual(get_coefficients().version, 0)
+
+        coefficients._checked_at -= coefficients.REFRESH_INTERVAL + 1
+        current = get_coefficients()
+        self.assertEqual(current.version, 5)
+        self.assertEqual(current.values['sb_extraction'], 1.1)
+        self.assertEqual(current.values['sb_in_slag'], 1.0)
+
+    def test_measurement_api_and_command(self):
+        """Запись замера через API и калибровка командой"""
+        _, run_id, _ = get_or_calculate({'antimonite_mass': 100})
+        response = self.client.post(
+            f'/antimony/runs/{run_id}/measurement/',
+            data=json.dumps({'crude_mass': 40, 'sb_in_crude': 95, 'sb_in_slag': ''}),
+            content_type='application/json',
+        )
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertAlmostEqual(data['sb_extraction']['measured'], 40 * 95 / 59.18, places=1)
+
+        invalid = self.client.post(
+            f'/antimony/runs/{run_id}/measurement/',
+            data=json.dumps({'crude_mass': 40, 'sb_in_crude': 150}),
+            content_type='application/json',
+        ).json()
+        self.assertFalse(invalid['success'])
+
+        with self.assertRaises(CommandError):
+            call_command('calibrate_smelting', stdout=StringIO())
+
+        out = StringIO()
+        call_command('calibrate_smelting', '--min-measurements', '1', stdout=out)
+        self.assertIn('v1', out.getvalue())
+        self.assertEqual(CoefficientSet.objects.count(), 1)
+
+
+class LiveRecalculationTest(TestCase):
+    """Тесты инкрементального пересчета по графу зависимостей"""
+
+    def setUp(self):
+        SMELTING_GRAPH.sessions.clear()
+
+    def graph_inputs(self, **changes):
+        inputs, error = parse_inputs({'antimonite_mass': 100, **changes})
+        self.assertIsNone(error)
+        return {**inputs, 'calibration': model_version()}
+
+    def test_only_downstream_nodes_recomputed(self):
+        """Изменение зольности не пересчитывает извлечение и черновую сурьму"""
+        session = SMELTING_GRAPH.session()
+        changed, recomputed, full = session.update(self.graph_inputs())
+        self.assertTrue(full)
+        self.assertEqual(list(changed), SMELTING_GRAPH.outputs)
+
+        changed, recomputed, full = session.update(self.graph_inputs(coke_ash=25))
+        self.assertFalse(full)
+        self.assertIn('slag', changed)
+        self.assertIn('heat', recomputed)
+        for name in ('crude_antimony', 'recommendations', 'loaded', 'input'):
+            self.assertNotIn(name, changed)
+        for name in ('dry_antimonite', 'elements', 'outcomes', 'crude'):
+            self.assertNotIn(name, recomputed)
+
+        changed, recomputed, _ = session.update(self.graph_inputs(coke_ash=25))
+        self.assertEqual(changed, {})
+        self.assertEqual(recomputed, [])
+
+    def test_live_endpoint_diff_matches_full_calculation(self):
+        """Результат, собранный из ответов API, совпадает с calculate_smelting"""
+        def post(**data):
+            return self.client.post('/antimony/live/', data=json.dumps(data), content_type='application/json').json()
+
+        first = post(antimonite_mass='100', reducer_amount='10', reset=True)
+        self.assertTrue(first['full'])
+        result = {'success': True, **first['changed']}
+
+        second = post(antimonite_mass='100', reducer_amount='12.5')
+        self.assertFalse(second['full'])
+        self.assertIn('crude_antimony', second['changed'])
+        self.assertNotIn('loaded', second['changed'])
+        result.update(second['changed'])
+
+        expected = json.loads(json.dumps(calculate_smelting({'antimonite_mass': 100, 'reducer_amount': 12.5})))
+        self.assertEqual(result, expected)
+
+        self.assertTrue(post(antimonite_mass='100', reducer_amount='12.5', reset=True)['full'])
+        self.assertFalse(post(antimonite_mass='0')['success'])
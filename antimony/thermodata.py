@@ -0,0 +1,145 @@
+"""
+Термодинамические данные системы Sb–Na–As–Pb–O–C
+
+Для каждого вещества: фаза, состав, энтальпия образования H°298 (кДж/моль),
+абсолютная энтропия S°298 (Дж/(моль·К)) и коэффициенты теплоемкости в
+форме Шомейта Cp = A + B·t + C·t² + D·t³ + E/t², t = T/1000 (Дж/(моль·К)).
+
+Вещества металлической и шлаковой фаз заданы в жидком состоянии:
+теплота плавления отнесена к 298 К (H°298 и S°298 жидкости получены
+прибавлением ΔH_пл и ΔH_пл/T_пл к данным для твердого вещества).
+ln_gamma — постоянные коэффициенты активности в растворе (оценка по
+литературным данным о сильном связывании Na₂O в шлаке и Na в сурьме).
+
+Данные приближенные (округленные справочные значения JANAF/NIST
+и сводок по системе Sb–O) и предназначены для оценки распределения
+элементов между фазами, а не для прецизионных расчетов.
+"""
+
+import numpy as np
+
+
+ELEMENTS = ('Sb', 'Na', 'As', 'Pb', 'O', 'C')
+
+ATOMIC_MASS = {
+    'Sb': 121.760,
+    'Na': 22.990,
+    'As': 74.922,
+    'Pb': 207.2,
+    'O': 15.999,
+    'C': 12.011,
+}
+
+PHASES = ('gas', 'metal', 'slag')
+
+# Вещество: (фаза, состав, H°298, S°298, (A, B, C, D, E), ln_gamma)
+SPECIES = {
+    # === ГАЗ ===
+    'CO': ('gas', {'C': 1, 'O': 1}, -110.53, 197.66, (25.57, 6.10, 4.05, -2.67, 0.13), 0.0),
+    'CO2': ('gas', {'C': 1, 'O': 2}, -393.52, 213.79, (24.99, 55.19, -33.69, 7.95, -0.14), 0.0),
+    'O2': ('gas', {'O': 2}, 0.0, 205.15, (30.03, 8.77, -3.99, 0.79, -0.74), 0.0),
+    'Na(g)': ('gas', {'Na': 1}, 107.50, 153.72, (20.80, 0.0, 0.0, 0.0, 0.0), 0.0),
+    'As4(g)': ('gas', {'As': 4}, 143.93, 314.00, (83.00, 0.0, 0.0, 0.0, 0.0), 0.0),
+    'As4O6(g)': ('gas', {'As': 4, 'O': 6}, -1196.0, 409.0, (160.0, 20.0, 0.0, 0.0, -3.0), 0.0),
+    'Sb4O6(g)': ('gas', {'Sb': 4, 'O': 6}, -1250.0, 410.0, (160.0, 20.0, 0.0, 0.0, -3.0), 0.0),
+
+    # === МЕТАЛЛ (черновая сурьма) ===
+    'Sb': ('metal', {'Sb': 1}, 19.79, 67.58, (31.4, 0.0, 0.0, 0.0, 0.0), 0.0),
+    'As': ('metal', {'As': 1}, 24.44, 57.52, (25.0, 0.0, 0.0, 0.0, 0.0), -1.0),
+    'Na': ('metal', {'Na': 1}, 2.60, 58.31, (31.0, 0.0, 0.0, 0.0, 0.0), -6.0),
+    'Pb': ('metal', {'Pb': 1}, 4.77, 72.74, (29.0, 0.0, 0.0, 0.0, 0.0), 0.0),
+
+    # === ШЛАК ===
+    'Na2O': ('slag', {'Na': 2, 'O': 1}, -370.3, 109.0, (70.0, 10.0, 0.0, 0.0, 0.0), -9.0),
+    'Sb2O3': ('slag', {'Sb': 2, 'O': 3}, -659.6, 176.2, (115.0, 10.0, 0.0, 0.0, 0.0), -2.0),
+    'As2O3': ('slag', {'As': 2, 'O': 3}, -638.6, 138.8, (110.0, 10.0, 0.0, 0.0, 0.0), -2.0),
+    'PbO': ('slag', {'Pb': 1, 'O': 1}, -193.8, 88.6, (50.0, 5.0, 0.0, 0.0, 0.0), -1.0),
+
+    # === ЧИСТЫЕ КОНДЕНСИРОВАННЫЕ ВЕЩЕСТВА ===
+    'C': ('condensed', {'C': 1}, 0.0, 5.74, (6.0, 13.0, 0.0, 0.0, -0.25), 0.0),
+}
+
+# Вещества, участвующие только в тепловом балансе (исходная шихта и пары
+# воды): в равновесный расчет не входят. Кислородные соединения сурьмы,
+# натрия и мышьяка в антимонате представлены простыми оксидами (теплота
+# образования NaSbO₃ из оксидов не учитывается). Водород в ELEMENTS не
+# входит, поэтому в составе воды указан только кислород.
+HEAT_SPECIES = {
+    'Sb2O5(s)': ('feed', {'Sb': 2, 'O': 5}, -971.9, 125.1, (110.0, 30.0, 0.0, 0.0, -1.0), 0.0),
+    'Na2O(s)': ('feed', {'Na': 2, 'O': 1}, -418.0, 75.1, (66.2, 16.8, 0.0, 0.0, -0.5), 0.0),
+    'As2O5(s)': ('feed', {'As': 2, 'O': 5}, -924.9, 105.4, (100.0, 40.0, 0.0, 0.0, -0.5), 0.0),
+    'Pb(s)': ('feed', {'Pb': 1}, 0.0, 64.8, (26.4, 0.0, 0.0, 0.0, 0.0), 0.0),
+    'H2O(l)': ('feed', {'O': 1}, -285.83, 69.95, (75.3, 0.0, 0.0, 0.0, 0.0), 0.0),
+    'H2O(g)': ('gas', {'O': 1}, -241.83, 188.84, (30.09, 6.83, 6.79, -2.53, 0.082), 0.0),
+}
+
+SPECIES_NAMES = tuple(SPECIES)
+ALL_SPECIES = {**SPECIES, **HEAT_SPECIES}
+
+# Матрица состава (элемент × вещество) и молярные массы веществ
+FORMULA = np.array([[SPECIES[name][1].get(element, 0) for name in SPECIES_NAMES] for element in ELEMENTS],
+                   dtype=float)
+MOLAR_MASS = np.array([ATOMIC_MASS[element] for element in ELEMENTS]) @ FORMULA
+
+PHASE_OF = np.array([SPECIES[name][0] for name in SPECIES_NAMES])
+H298 = np.array([SPECIES[name][2] for name in SPECIES_NAMES]) * 1000      # Дж/моль
+S298 = np.array([SPECIES[name][3] for name in SPECIES_NAMES])             # Дж/(моль·К)
+SHOMATE = np.array([SPECIES[name][4] for name in SPECIES_NAMES])          # (вещество, 5)
+LN_GAMMA = np.array([SPECIES[name][5] for name in SPECIES_NAMES])
+
+T_REF = 298.15
+R_GAS = 8.314462618                     # Дж/(моль·К)
+
+
+def _coefficients(species):
+    """H°298 (Дж/моль), S°298 и коэффициенты Шомейта выбранных веществ"""
+    if species is None:
+        return H298, S298, SHOMATE
+    data = [ALL_SPECIES[name] for name in species]
+    return (
+        np.array([item[2] for item in data]) * 1000,
+        np.array([item[3] for item in data]),
+        np.array([item[4] for item in data]),
+    )
+
+
+def _shomate_integrals(t, shomate):
+    """∫Cp dt и ∫Cp/t dt в форме Шомейта; t — массив (..., 1), результат (..., вещество)"""
+    a, b, c, d, e = shomate.T
+    enthalpy = a * t + b * t ** 2 / 2 + c * t ** 3 / 3 + d * t ** 4 / 4 - e / t
+    entropy = a * np.log(t) + b * t + c * t ** 2 / 2 + d * t ** 3 / 3 - e / (2 * t ** 2)
+    return enthalpy, entropy
+
+
+def heat_capacity(temperature, species=None):
+    """Cp (Дж/(моль·К)); форма (..., вещество). species — имена из ALL_SPECIES (по умолчанию SPECIES)"""
+    _, _, shomate = _coefficients(species)
+    t = np.asarray(temperature, dtype=float)[..., None] / 1000
+    a, b, c, d, e = shomate.T
+    return a + b * t + c * t ** 2 + d * t ** 3 + e / t ** 2
+
+
+def enthalpy(temperature, species=None):
+    """H(T) = H°298 + ∫Cp dT (Дж/моль); форма (..., вещество)"""
+    h298, _, shomate = _coefficients(species)
+    t = np.asarray(temperature, dtype=float)[..., None] / 1000
+    h, _ = _shomate_integrals(t, shomate)
+    h_ref, _ = _shomate_integrals(np.array([T_REF / 1000]), shomate)
+    return h298 + 1000 * (h - h_ref)
+
+
+def entropy(temperature, species=None):
+    """S(T) = S°298 + ∫Cp/T dT (Дж/(моль·К)); форма (..., вещество)"""
+    _, s298, shomate = _coefficients(species)
+    t = np.asarray(temperature, dtype=float)[..., None] / 1000
+    _, s = _shomate_integrals(t, shomate)
+    _, s_ref = _shomate_integrals(np.array([T_REF / 1000]), shomate)
+    return s298 + (s - s_ref)
+
+
+def gibbs_rt(temperature):
+    """Безразмерная стандартная энергия Гиббса G°/RT; форма (..., вещество)"""
+    temperature = np.asarray(temperature, dtype=float)
+    return (enthalpy(temperature) - temperature[..., None] * entropy(temperature)) / (
+        R_GAS * temperature[..., None]
+    )
@@ -6,4 +6,10 @@ app_name = 'antimony'
 urlpatterns = [
     path('', views.calculator, name='calculator'),
     path('calculate/', views.calculate, name='calculate'),
+    path('live/', views.live, name='live'),
+    path('sweep/', views.sweep, name='sweep'),
+    path('optimize/', views.optimize, name='optimize'),
+    path('sensitivity/', views.sensitivity, name='sensitivity'),
+    path('runs/', views.runs, name='runs'),
+    path('runs/<int:run_id>/measurement/', views.add_measurement, name='add_measurement'),
 ]
\ No newline at end of file
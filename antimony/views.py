@@ -1,6 +1,13 @@
 from django.shortcuts import render
 from django.http import JsonResponse
-from .calculations import calculate_smelting
+from .batch import run_sweep
+from .optimizer import optimize_smelting
+from .sensitivity import run_sensitivity
+from .models import SmeltingRun, SmeltingMeasurement
+from .runs import get_or_calculate
+from .calculations import SMELTING_GRAPH, model_version, parse_inputs
+from core.concurrency import run_calculation
+from core.graph import live_update
 import json
 
 
@@ -16,12 +23,74 @@ def calculator(request):
     return render(request, 'antimony/calculator.html', context)
 
 
-def calculate(request):
+async def calculate(request):
     """API для расчета (AJAX)"""
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            results = calculate_smelting(data)
+            results, run_id, source = await run_calculation(get_or_calculate, data)
+            return JsonResponse({**results, 'run_id': run_id, 'source': source})
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+    
+    return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
+
+
+def live(request):
+    """API живого пересчета: только изменившиеся разделы результата"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            inputs, error = parse_inputs(data)
+            if error:
+                return JsonResponse({'success': False, 'error': error})
+            return JsonResponse(live_update(
+                request, SMELTING_GRAPH, {**inputs, 'calibration': model_version()}, reset=data.get('reset', False)
+            ))
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+    
+    return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
+
+
+async def sweep(request):
+    """API для расчета сетки сценариев (карта параметров)"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            results = await run_calculation(
+                run_sweep, data.get('grid', {}), data.get('columns'), data.get('mode', 'empirical')
+            )
+            results['success'] = True
+            return JsonResponse(results)
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+    
+    return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
+
+
+async def optimize(request):
+    """API для подбора оптимального режима плавки"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            results = await run_calculation(
+                optimize_smelting,
+                data.get('feed', {}),
+                bounds=data.get('bounds'),
+                constraints=data.get('constraints'),
+                objective=data.get('objective', 'sb_extraction'),
+            )
+            results['success'] = True
             return JsonResponse(results)
         except Exception as e:
             return JsonResponse({
@@ -29,4 +98,78 @@ def calculate(request):
                 'error': str(e)
             })
     
-    return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
\ No newline at end of file
+    return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
+
+
+async def sensitivity(request):
+    """API для анализа чувствительности баланса (Соболь/Моррис)"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            results = await run_calculation(run_sensitivity, data)
+            results['success'] = True
+            return JsonResponse(results)
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+    
+    return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
+
+
+def runs(request):
+    """История расчетов плавки и сравнение выбранных расчетов"""
+    compare_ids = [int(i) for i in request.GET.get('compare', '').split(',') if i.strip().isdigit()]
+    compared = list(SmeltingRun.objects.filter(id__in=compare_ids)) if compare_ids else []
+    compared.sort(key=lambda run: compare_ids.index(run.id))
+
+    context = {
+        'page_title': 'История расчетов плавки',
+        'breadcrumbs': [
+            {'title': 'Главная', 'url': 'core:home'},
+            {'title': 'Калькулятор антимоната', 'url': 'antimony:calculator'},
+            {'title': 'История расчетов', 'url': None}
+        ],
+        'runs': SmeltingRun.objects.all()[:100],
+        'compared': compared,
+    }
+    return render(request, 'antimony/runs.html', context)
+
+
+MEASUREMENT_FIELDS = ['crude_mass', 'sb_in_crude', 'na_in_crude', 'as_in_crude', 'slag_mass', 'sb_in_slag', 'note']
+
+
+def add_measurement(request, run_id):
+    """API для записи фактических результатов плавки по сохраненному расчету"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            run = SmeltingRun.objects.filter(pk=run_id).first()
+            if run is None:
+                return JsonResponse({'success': False, 'error': f'Расчет №{run_id} не найден'})
+
+            measurement = SmeltingMeasurement(run=run, **{
+                field: data[field] for field in MEASUREMENT_FIELDS if data.get(field) not in (None, '')
+            })
+            measurement.full_clean()
+            measurement.save()
+            return JsonResponse({
+                'success': True,
+                'measurement_id': measurement.id,
+                'sb_extraction': {
+                    'predicted': run.sb_extraction,
+                    'measured': measurement.sb_extraction,
+                },
+                'crude_mass': {
+                    'predicted': run.crude_mass,
+                    'measured': measurement.crude_mass,
+                },
+            })
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+    
+    return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
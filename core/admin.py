@@ -1 +1,52 @@
-from django.contrib import admin
\ No newline at end of file
+from django.contrib import admin
+from .models import Article, Sensor, SensorBatch, SensorChunk, ProcessStats, ReportJob
+
+
+@admin.register(Sensor)
+class SensorAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name', 'quantity', 'location', 'last_reading_at']
+    list_filter = ['quantity']
+    search_fields = ['code', 'name', 'location']
+    readonly_fields = ['last_reading_at', 'created_at']
+
+
+@admin.register(SensorChunk)
+class SensorChunkAdmin(admin.ModelAdmin):
+    list_display = ['sensor', 'day', 'count', 'min_value', 'max_value', 'updated_at']
+    list_filter = ['sensor', 'day']
+    list_select_related = ['sensor']
+    exclude = ['times', 'values', 'overview_times', 'overview_values']
+    readonly_fields = ['sensor', 'day', 'count', 'min_value', 'max_value', 'updated_at']
+
+
+@admin.register(SensorBatch)
+class SensorBatchAdmin(admin.ModelAdmin):
+    list_display = ['sensor', 'day', 'count', 'created_at']
+    list_filter = ['sensor', 'day']
+    list_select_related = ['sensor']
+    exclude = ['times', 'values']
+    readonly_fields = ['sensor', 'day', 'count', 'created_at']
+
+
+@admin.register(ProcessStats)
+class ProcessStatsAdmin(admin.ModelAdmin):
+    list_display = ['process', 'count', 'average', 'best_value', 'best_id', 'updated_at']
+    readonly_fields = ['process', 'count', 'total', 'valued_count', 'best_value', 'best_id', 'version', 'updated_at']
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    exclude = ['html']
+    readonly_fields = ['kind', 'params', 'cache_key', 'status', 'progress', 'stage', 'error',
+                       'created_at', 'started_at', 'finished_at']
+
+
+@admin.register(Article)
+class ArticleAdmin(admin.ModelAdmin):
+    list_display = ['title', 'slug', 'process', 'order', 'is_published', 'updated_at']
+    list_filter = ['process', 'is_published']
+    list_editable = ['order', 'is_published']
+    search_fields = ['title', 'slug']
+    prepopulated_fields = {'slug': ['title']}
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .signals import connect_db_signals, connect_signals, connect_knowledge_signals
+        connect_db_signals()
+        connect_signals()
+        connect_knowledge_signals()
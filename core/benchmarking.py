@@ -0,0 +1,597 @@
+"""
+Нагрузочные замеры представлений без внешнего сервера
+
+Запросы передаются прямо в обработчики Django: WSGIHandler вызывается из
+пула потоков (как у многопоточного WSGI-сервера), ASGIHandler — из цикла
+событий с ограничением числа одновременных запросов. Так оба варианта
+сравниваются на одном коде и одной БД, без сетевых накладных расходов.
+
+run_mixed_load нагружает саму БД: параллельные сохранения расчетов и
+чтения дашбордов, с подсчетом ошибок блокировки.
+
+run_wsgi_journeys / run_asgi_journeys — нагрузка сценариями: каждый
+виртуальный пользователь по кругу проходит свой сценарий (открыть
+дашборд, отфильтровать опыты, открыть опыт, рассчитать и сохранить)
+до истечения времени; сводка — по всем запросам и по шагам, с долей
+ошибок и ошибок блокировки SQLite (команда loadtest).
+
+bench_kernel замеряет отдельную функцию расчета: задержку одного вызова,
+пропускную способность серии и выделения памяти (tracemalloc);
+compare_to_baseline сравнивает замер с сохраненным базовым.
+
+measure_view замеряет страницу через тестовый клиент Django (задержка,
+число SQL-запросов, пик памяти) — для таблицы масштабирования по
+объему данных (команда bench_views).
+"""
+
+import asyncio
+import contextvars
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.signals import got_request_exception
+from django.db import close_old_connections, connection
+
+from .db import is_lock_error
+from .metrics import DB_QUERIES
+
+
+BENCH_HOST = 'localhost'
+# Фиксированный секрет CSRF: передается и в cookie, и в заголовке
+CSRF_SECRET = 'metallurgylabbenchmarkcsrfsecret'
+
+
+def percentile(sorted_values, q):
+    """Перцентиль q (0–100) по отсортированному списку, линейная интерполяция"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies, elapsed, errors=0):
+    """
+    Сводка замера
+
+    Args:
+        latencies (list): длительности запросов (с)
+        elapsed (float): общее время серии (с)
+        errors (int): число ответов с кодом >= 400 или исключением
+
+    Returns:
+        dict: {'requests', 'errors', 'throughput' (запр/с), 'p50', 'p90', 'p99', 'max' (мс)}
+    """
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'throughput': round(len(values) / elapsed, 1) if elapsed > 0 else 0.0,
+        'p50': round(percentile(values, 50) * 1000, 2),
+        'p90': round(percentile(values, 90) * 1000, 2),
+        'p99': round(percentile(values, 99) * 1000, 2),
+        'max': round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+def _split_path(path):
+    path, _, query = path.partition('?')
+    return path, query
+
+
+def wsgi_call(handler, method, path, body=b''):
+    """Один запрос к WSGI-приложению; возвращает код ответа"""
+    return wsgi_request(handler, method, path, body)[0]
+
+
+def wsgi_request(handler, method, path, body=b''):
+    """Один запрос к WSGI-приложению; возвращает (код ответа, тело)"""
+    path, query = _split_path(path)
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': BENCH_HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': BENCH_HOST,
+        'HTTP_COOKIE': f'csrftoken={CSRF_SECRET}',
+        'HTTP_X_CSRFTOKEN': CSRF_SECRET,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+
+    response = handler(environ, start_response)
+    try:
+        content = b''.join(response)
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return status[0], content
+
+
+async def asgi_call(app, method, path, body=b''):
+    """Один запрос к ASGI-приложению; возвращает код ответа"""
+    return (await asgi_request(app, method, path, body))[0]
+
+
+async def asgi_request(app, method, path, body=b''):
+    """Один запрос к ASGI-приложению; возвращает (код ответа, тело)"""
+    path, query = _split_path(path)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [
+            (b'host', BENCH_HOST.encode()),
+            (b'cookie', f'csrftoken={CSRF_SECRET}'.encode()),
+            (b'x-csrftoken', CSRF_SECRET.encode()),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': (BENCH_HOST, 80),
+    }
+    received = False
+    status = []
+    chunks = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # Клиент не отключается: обработчик ждет здесь до конца ответа
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return status[0], b''.join(chunks)
+
+
+def _schedule(requests, total):
+    """Циклический список из total запросов (method, path, body)"""
+    return [requests[i % len(requests)] for i in range(total)]
+
+
+def run_wsgi_load(handler, requests, total, concurrency):
+    """Серия из total запросов в concurrency потоках; сводка summarize"""
+    latencies = []
+    errors = 0
+
+    def one(request):
+        started = time.perf_counter()
+        try:
+            ok = wsgi_call(handler, *request) < 400
+        except Exception:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, ok in pool.map(one, _schedule(requests, total)):
+            latencies.append(latency)
+            errors += not ok
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def run_asgi_load(app, requests, total, concurrency):
+    """Серия из total запросов, не более concurrency одновременно; сводка summarize"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(request):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok = await asgi_call(app, *request) < 400
+            except Exception:
+                ok = False
+            return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(request) for request in _schedule(requests, total)))
+    elapsed = time.perf_counter() - started
+    return summarize([latency for latency, _ok in results], elapsed, sum(not ok for _latency, ok in results))
+
+
+def run_mixed_load(write, read, writers, readers, duration):
+    """
+    Смешанная нагрузка на БД: writers потоков вызывают write, readers — read
+
+    Каждый вызов — как отдельный запрос: после него соединение закрывается
+    или сохраняется по CONN_MAX_AGE (close_old_connections).
+
+    Returns:
+        dict: {'writes', 'reads'} — сводки summarize с полями 'lock_errors'
+            и 'lock_rate' (% попыток, завершившихся "database is locked")
+    """
+    deadline = time.perf_counter() + duration
+
+    def worker(func):
+        latencies, errors, lock_errors = [], 0, 0
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    func()
+                except Exception as e:
+                    errors += 1
+                    lock_errors += is_lock_error(e)
+                else:
+                    latencies.append(time.perf_counter() - started)
+                finally:
+                    close_old_connections()
+        finally:
+            connection.close()
+        return latencies, errors, lock_errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers + readers) as pool:
+        futures = {
+            'writes': [pool.submit(worker, write) for _ in range(writers)],
+            'reads': [pool.submit(worker, read) for _ in range(readers)],
+        }
+        outcomes = {kind: [future.result() for future in items] for kind, items in futures.items()}
+    elapsed = time.perf_counter() - started
+
+    result = {}
+    for kind, items in outcomes.items():
+        latencies = [latency for item in items for latency in item[0]]
+        errors = sum(item[1] for item in items)
+        lock_errors = sum(item[2] for item in items)
+        attempts = len(latencies) + errors
+        result[kind] = {
+            **summarize(latencies, elapsed, errors),
+            'lock_errors': lock_errors,
+            'lock_rate': round(lock_errors / attempts * 100, 2) if attempts else 0.0,
+        }
+    return result
+
+
+# === СЦЕНАРИИ ПОЛЬЗОВАТЕЛЕЙ ===
+
+# Необработанные исключения запроса (got_request_exception): список общий
+# с потоками sync_to_async, которым копируется контекст
+_request_exceptions = contextvars.ContextVar('load_request_exceptions', default=None)
+
+
+def _collect_exception(sender, request=None, **kwargs):
+    found = _request_exceptions.get()
+    if found is not None:
+        found.append(sys.exc_info()[1])
+
+
+def step_outcome(status, content, exceptions=()):
+    """
+    Итог шага сценария: (успех, ошибка блокировки SQLite)
+
+    Ошибка — код >= 400 или JSON {'success': False}: API расчетов
+    перехватывают исключения (и "database is locked") и отвечают их
+    текстом с кодом 200.
+    """
+    if any(is_lock_error(exc) for exc in exceptions):
+        return False, True
+    ok, error = status < 400, ''
+    if content[:1] == b'{':
+        try:
+            data = json.loads(content)
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and data.get('success') is False:
+            ok, error = False, str(data.get('error', '')).lower()
+    return ok, 'locked' in error or 'busy' in error
+
+
+def _request_args(make, rng):
+    method, path, data = make(rng)
+    return method, path, b'' if data is None else json.dumps(data).encode()
+
+
+def _journey_summary(results, elapsed):
+    """Сводка по всем шагам и по каждому: summarize + доля ошибок и блокировки"""
+    records = [record for items, _completed in results for record in items]
+
+    def block(items):
+        errors = sum(not ok for _name, _latency, ok, _lock in items)
+        return {
+            **summarize([latency for _name, latency, _ok, _lock in items], elapsed, errors),
+            'error_rate': round(errors / len(items) * 100, 2) if items else 0.0,
+            'lock_errors': sum(lock for _name, _latency, _ok, lock in items),
+        }
+
+    steps = {}
+    for record in records:
+        steps.setdefault(record[0], []).append(record)
+    return {
+        'journeys': sum(completed for _items, completed in results),
+        **block(records),
+        'steps': {name: block(items) for name, items in steps.items()},
+    }
+
+
+def run_wsgi_journeys(handler, journeys, duration, think=0, seed=0):
+    """
+    Нагрузка сценариями на WSGI-приложение: поток на пользователя
+
+    Args:
+        handler: WSGIHandler
+        journeys (list): сценарий каждого пользователя — список шагов
+            (имя, make), make(rng) → (метод, путь, данные JSON или None)
+        duration (float): длительность (с); начатый сценарий прерывается
+        think (float): средняя пауза пользователя между шагами (с)
+        seed (int): зерно генераторов пользователей
+
+    Returns:
+        dict: {'journeys' — пройдено сценариев, поля summarize, 'error_rate'
+            (%), 'lock_errors', 'steps': {шаг: то же без 'journeys'}}
+    """
+    deadline = time.perf_counter() + duration
+
+    def user(index, steps):
+        rng = random.Random(seed * 1000 + index)
+        records, completed = [], 0
+        try:
+            while time.perf_counter() < deadline:
+                for name, make in steps:
+                    if time.perf_counter() >= deadline:
+                        break
+                    request = _request_args(make, rng)
+                    exceptions = []
+                    _request_exceptions.set(exceptions)
+                    started = time.perf_counter()
+                    try:
+                        status, content = wsgi_request(handler, *request)
+                    except Exception as e:
+                        status, content = 500, b''
+                        exceptions.append(e)
+                    records.append((name, time.perf_counter() - started, *step_outcome(status, content, exceptions)))
+                    if think:
+                        time.sleep(rng.uniform(0, 2 * think))
+                else:
+                    completed += 1
+        finally:
+            connection.close()
+        return records, completed
+
+    got_request_exception.connect(_collect_exception)
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(journeys)) as pool:
+            results = list(pool.map(user, range(len(journeys)), journeys))
+        elapsed = time.perf_counter() - started
+    finally:
+        got_request_exception.disconnect(_collect_exception)
+    return _journey_summary(results, elapsed)
+
+
+async def run_asgi_journeys(app, journeys, duration, think=0, seed=0):
+    """Нагрузка сценариями на ASGI-приложение: задача на пользователя; аргументы как у run_wsgi_journeys"""
+    deadline = time.perf_counter() + duration
+
+    async def user(index, steps):
+        rng = random.Random(seed * 1000 + index)
+        records, completed = [], 0
+        while time.perf_counter() < deadline:
+            for name, make in steps:
+                if time.perf_counter() >= deadline:
+                    break
+                request = _request_args(make, rng)
+                exceptions = []
+                _request_exceptions.set(exceptions)
+                started = time.perf_counter()
+                try:
+                    status, content = await asgi_request(app, *request)
+                except Exception as e:
+                    status, content = 500, b''
+                    exceptions.append(e)
+                records.append((name, time.perf_counter() - started, *step_outcome(status, content, exceptions)))
+                if think:
+                    await asyncio.sleep(rng.uniform(0, 2 * think))
+            else:
+                completed += 1
+        return records, completed
+
+    got_request_exception.connect(_collect_exception)
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(user(index, steps) for index, steps in enumerate(journeys)))
+        elapsed = time.perf_counter() - started
+    finally:
+        got_request_exception.disconnect(_collect_exception)
+    return _journey_summary(results, elapsed)
+
+
+# === МИКРОБЕНЧМАРКИ РАСЧЕТОВ ===
+
+# Показатели, по которым ищется регрессия: имя → True, если больше — хуже
+KERNEL_METRICS = {
+    'p50_us': True,
+    'throughput': False,
+    'allocations': True,
+    'peak_kb': True,
+}
+
+
+def bench_kernel(func, args=(), kwargs=None, repeat=200, batch=1000, warmup=5):
+    """
+    Замер функции расчета
+
+    Args:
+        func (callable): функция расчета
+        args, kwargs: аргументы одного вызова
+        repeat (int): число отдельно замеряемых вызовов (задержка)
+        batch (int): число вызовов в серии (пропускная способность)
+        warmup (int): вызовов до замера (кэши, ленивые импорты)
+
+    Returns:
+        dict: {'p50_us', 'p90_us', 'p99_us', 'min_us' — задержка вызова (мкс),
+            'throughput' — вызовов/с в серии, 'allocations' — блоков памяти,
+            выделенных за вызов и не освобожденных до его конца, 'peak_kb' —
+            пик памяти во время вызова}
+    """
+    kwargs = kwargs or {}
+    for _ in range(warmup):
+        func(*args, **kwargs)
+
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args, **kwargs)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    started = time.perf_counter()
+    for _ in range(batch):
+        func(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+
+    # Выделения — отдельным вызовом: tracemalloc замедляет код в разы
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _peak = tracemalloc.get_traced_memory()
+        result = func(*args, **kwargs)
+        _current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    own = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(own).compare_to(before.filter_traces(own), 'lineno')
+    allocations = sum(max(stat.count_diff, 0) for stat in diff)
+
+    def us(value):
+        return round(value * 1e6, 2)
+
+    return {
+        'p50_us': us(percentile(latencies, 50)),
+        'p90_us': us(percentile(latencies, 90)),
+        'p99_us': us(percentile(latencies, 99)),
+        'min_us': us(latencies[0]) if latencies else 0.0,
+        'throughput': round(batch / elapsed, 1) if elapsed > 0 else 0.0,
+        'allocations': allocations,
+        'peak_kb': round((peak - base) / 1024, 2),
+    }
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Сравнение замеров с базовыми
+
+    Args:
+        results (dict): {функция: bench_kernel(...)}
+        baseline (dict): то же из сохраненного файла
+        threshold (float): допустимое ухудшение (0.2 — на 20 %)
+
+    Returns:
+        list: регрессии [{'kernel', 'metric', 'baseline', 'current', 'change' (%)}]
+    """
+    regressions = []
+    for kernel, current in results.items():
+        previous = baseline.get(kernel)
+        if previous is None:
+            continue
+        for metric, higher_is_worse in KERNEL_METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change if higher_is_worse else -change) > threshold:
+                regressions.append({
+                    'kernel': kernel, 'metric': metric, 'baseline': old, 'current': new,
+                    'change': round(change * 100, 1),
+                })
+    return regressions
+
+
+# === МАСШТАБИРОВАНИЕ ПРЕДСТАВЛЕНИЙ ===
+
+def measure_view(client, path, repeat=1, memory=True):
+    """
+    Замер страницы через тестовый клиент
+
+    Args:
+        client (django.test.Client): клиент с raise_request_exception=False
+        path (str): адрес страницы
+        repeat (int): число запросов; задержка — минимальная из них
+        memory (bool): дополнительный запрос под tracemalloc для пика памяти
+
+    Returns:
+        dict: {'status', 'latency_ms', 'queries', 'peak_kb' (None без memory)}
+    """
+    # Счетчик метрик учитывает и запросы асинхронных представлений в пулах потоков
+    def total_queries():
+        return sum(DB_QUERIES.collect().values())
+
+    latencies = []
+    for _ in range(repeat):
+        before = total_queries()
+        started = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - started)
+        queries = total_queries() - before
+
+    peak_kb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            client.get(path)
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_kb = round(peak / 1024, 1)
+
+    return {
+        'status': response.status_code,
+        'latency_ms': round(min(latencies) * 1000, 2),
+        'queries': queries,
+        'peak_kb': peak_kb,
+    }
+
+
+def query_growth(counts):
+    """
+    Рост числа запросов с объемом данных
+
+    Args:
+        counts (list): [(размер, число запросов)] по возрастанию размера
+
+    Returns:
+        float: прирост запросов на один опыт между крайними размерами;
+            заметно больше 0 — число запросов O(N)
+    """
+    counts = [(size, queries) for size, queries in counts if queries is not None]
+    if len(counts) < 2 or counts[-1][0] == counts[0][0]:
+        return 0.0
+    (first_size, first), (last_size, last) = counts[0], counts[-1]
+    return round((last - first) / (last_size - first_size), 3)
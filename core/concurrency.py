@@ -0,0 +1,83 @@
+"""
+Асинхронные представления: параллельные запросы к БД и расчеты вне цикла событий
+
+ORM синхронный, поэтому независимые запросы дашбордов выполняются в
+ограниченном пуле потоков ASYNC_DB_WORKERS (у каждого потока свое
+соединение с БД), а тяжелые расчеты — в отдельном пуле ASYNC_CPU_WORKERS,
+чтобы длинная серия расчетов не занимала цикл событий и потоки запросов.
+
+Если вызывающий код находится внутри транзакции (тесты, ATOMIC_REQUESTS),
+другие соединения не видят ее незафиксированных данных; тогда функции
+выполняются последовательно в потоке исходного соединения.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+
+DB_WORKERS = getattr(settings, 'ASYNC_DB_WORKERS', 4)
+CPU_WORKERS = getattr(settings, 'ASYNC_CPU_WORKERS', 2)
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _executor(name, workers):
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'async-{name}')
+        return _executors[name]
+
+
+def _with_connection(func, *args, **kwargs):
+    """Вызов в потоке пула с тем же жизненным циклом соединения, что у запроса"""
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+@sync_to_async
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+async def _run(name, workers, func, args, kwargs, sequential):
+    if sequential:
+        return await sync_to_async(func)(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    # Контекст запроса (например, учет времени core.instrumentation) — и в потоке пула
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _executor(name, workers), functools.partial(context.run, _with_connection, func, *args, **kwargs)
+    )
+
+
+async def gather_queries(**queries):
+    """
+    Параллельное выполнение независимых синхронных функций с запросами к БД
+
+    Функции должны возвращать готовые данные (списки, словари, числа), а не
+    ленивые QuerySet: вычисление QuerySet в цикле событий запрещено.
+
+    Returns:
+        dict: {имя: результат} в порядке аргументов
+    """
+    sequential = await _in_transaction()
+    results = await asyncio.gather(*(
+        _run('db', DB_WORKERS, func, (), {}, sequential) for func in queries.values()
+    ))
+    return dict(zip(queries, results))
+
+
+async def run_calculation(func, *args, **kwargs):
+    """Расчет в пуле ASYNC_CPU_WORKERS (функция может читать и писать БД)"""
+    return await _run('cpu', CPU_WORKERS, func, args, kwargs, await _in_transaction())
@@ -0,0 +1,519 @@
+"""
+Ремедиация медных отвалов: нейтрализация и кучное биовыщелачивание
+
+=== НЕЙТРАЛИЗАЦИЯ ===
+Кислотность промывной/поровой воды складывается из свободной кислоты
+(разность [H⁺] при исходном и целевом pH), гидролиза металлов, выпадающих
+в осадок при целевом pH (Fe(OH)₃ — 3 H⁺ на Fe, Cu(OH)₂ — 2 H⁺ на Cu;
+растворимость по константам гидролиза), и кислотности, удерживаемой рудой.
+Расход реагента — по стехиометрии (2 H⁺ на Ca) с учетом чистоты и
+эффективности использования (для известняка — пассивация гипсом).
+
+=== КУЧНОЕ БИОВЫЩЕЛАЧИВАНИЕ ===
+Штабель — двумерная сетка (глубина × ширина; ширина 1 ячейка — одномерная
+колонна). Раствор орошения движется сверху вниз с постоянной скоростью
+фильтрации и дисперсией; в каждой ячейке протекают реакции:
+
+    CuFeS₂ + 4Fe³⁺ → Cu²⁺ + 5Fe²⁺ + 2S⁰           (окисление минерала)
+    4Fe²⁺ + O₂ + 4H⁺ → 4Fe³⁺ + 2H₂O               (бактерии, Моно)
+    S⁰ + 1.5O₂ + H₂O → 2H⁺ + SO₄²⁻                (бактерии, доля f_S)
+    3Fe³⁺ + … → ярозит + 6H⁺                        (при pH > pH_jar)
+    пустая порода + H⁺ → …                          (кислотопоглощение)
+
+Перенос считается сразу для всех растворенных компонентов (массив
+(компонент, глубина, ширина)) неявными схемами: по глубине — против
+потока с дисперсией, по ширине — дисперсия. Матрицы трехдиагональные и
+постоянные: прогонка факторизуется один раз, а ее прямой и обратный
+ходы — рекуррентности с положительными коэффициентами — считаются
+блоками через накопленные суммы сразу для всех компонентов и столбцов,
+O(nz·nx) на шаг без цикла по ячейкам и без ограничения шага. Реакции —
+расщеплением по физическим процессам с неявным (линеаризованным) шагом
+для каждой реакции, что сохраняет положительность концентраций при любом
+шаге. Цикл — только по шагам времени.
+
+Концентрации в растворе — моль/м³ (ммоль/л), твердая медь — моль/м³ штабеля.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from .instrumentation import timed
+from .metrics import track_calculation
+
+
+# === НЕЙТРАЛИЗАЦИЯ ===
+
+ATOMIC_MASS_CU = 63.546
+ATOMIC_MASS_FE = 55.845
+MOLAR_MASS_H2SO4 = 98.079
+MOLAR_MASS_GYPSUM = 172.17      # CaSO₄·2H₂O
+MOLAR_MASS_FE_OH3 = 106.87
+MOLAR_MASS_CU_OH2 = 97.56
+
+# Реагент: (формула, молярная масса г/моль, эффективность использования)
+REAGENTS = {
+    'lime': ('CaO', 56.08, 0.90),
+    'hydrated_lime': ('Ca(OH)₂', 74.09, 0.95),
+    'limestone': ('CaCO₃', 100.09, 0.60),
+}
+
+# Растворимость гидроксидов: lg[M] (моль/л) = lg_k - n·pH
+FE_HYDROLYSIS = (3.0, 3)        # Fe(OH)₃ (аморфный)
+CU_HYDROLYSIS = (8.7, 2)        # Cu(OH)₂
+
+# Параметры по умолчанию — по опытам промывки отвала (pH 1.8, Fe 3.27 г/л, Cu 0.125 г/л)
+DEFAULT_NEUTRALIZATION = {
+    'ore_mass': 100.0,           # кг
+    'initial_ph': 1.8,
+    'target_ph': 4.0,
+    'solution_ratio': 0.3,       # л раствора на кг руды
+    'fe': 3.27,                  # г/л
+    'cu': 0.125,                 # г/л
+    'retained_acidity': 0.5,     # кг H₂SO₄ на т руды
+    'reagent': 'lime',
+    'purity': 90.0,              # %
+}
+
+
+def dissolved_metal(initial, ph, hydrolysis):
+    """Остаток металла в растворе (моль/л) при данном pH; initial — моль/л"""
+    lg_k, n = hydrolysis
+    return np.minimum(initial, 10.0 ** (lg_k - n * np.asarray(ph, dtype=float)))
+
+
+def acidity(ph, initial_ph, fe, cu):
+    """
+    Кислотность раствора при нейтрализации до pH (моль H⁺ на литр)
+
+    Все аргументы транслируются; fe и cu — исходные концентрации (г/л).
+    """
+    ph = np.asarray(ph, dtype=float)
+    fe0 = dissolved_metal(np.asarray(fe, dtype=float) / ATOMIC_MASS_FE, initial_ph, FE_HYDROLYSIS)
+    cu0 = dissolved_metal(np.asarray(cu, dtype=float) / ATOMIC_MASS_CU, initial_ph, CU_HYDROLYSIS)
+    free_acid = np.maximum(10.0 ** -np.asarray(initial_ph, dtype=float) - 10.0 ** -ph, 0.0)
+    fe_precipitated = fe0 - dissolved_metal(fe0, ph, FE_HYDROLYSIS)
+    cu_precipitated = cu0 - dissolved_metal(cu0, ph, CU_HYDROLYSIS)
+    return free_acid + FE_HYDROLYSIS[1] * fe_precipitated + CU_HYDROLYSIS[1] * cu_precipitated
+
+
+@timed('calc')
+@track_calculation
+def calculate_neutralization(data):
+    """
+    Расход реагента на нейтрализацию отвала до целевого pH
+
+    Args:
+        data (dict): параметры DEFAULT_NEUTRALIZATION (пропущенные — по умолчанию)
+
+    Returns:
+        dict: кислотность, расход реагента, осадки, остаточные концентрации
+            и кривая титрования (pH → расход реагента, кг/т)
+    """
+    params = {**DEFAULT_NEUTRALIZATION, **{k: v for k, v in data.items() if v not in (None, '')}}
+    reagent = params['reagent']
+    if reagent not in REAGENTS:
+        raise ValueError(f'Неизвестный реагент: {reagent}')
+    ore_mass = float(params['ore_mass'])
+    initial_ph = float(params['initial_ph'])
+    target_ph = float(params['target_ph'])
+    ratio = float(params['solution_ratio'])
+    fe, cu = float(params['fe']), float(params['cu'])
+    purity = float(params['purity']) / 100
+    if ore_mass <= 0 or ratio <= 0:
+        raise ValueError('Масса руды и отношение раствор/руда должны быть больше 0')
+    if not 0 < purity <= 1:
+        raise ValueError('Чистота реагента должна быть от 0 до 100%')
+    if target_ph <= initial_ph:
+        raise ValueError('Целевой pH должен быть выше исходного')
+
+    formula, molar_mass, efficiency = REAGENTS[reagent]
+    volume = ore_mass * ratio                                         # л
+    retained = float(params['retained_acidity']) * ore_mass / 1000 / MOLAR_MASS_H2SO4 * 2 * 1000  # моль H⁺
+
+    # Кривая титрования: расход реагента (кг/т) для сетки pH
+    ph_grid = np.linspace(initial_ph, target_ph, 41)
+    h_plus = acidity(ph_grid, initial_ph, fe, cu) * volume + retained * (ph_grid > initial_ph)
+    dose = h_plus / 2 * molar_mass / (purity * efficiency) / 1000    # кг реагента
+    h_total = float(h_plus[-1])
+
+    fe_initial = float(dissolved_metal(fe / ATOMIC_MASS_FE, initial_ph, FE_HYDROLYSIS))
+    cu_initial = float(dissolved_metal(cu / ATOMIC_MASS_CU, initial_ph, CU_HYDROLYSIS))
+    fe_final = float(dissolved_metal(fe_initial, target_ph, FE_HYDROLYSIS))
+    cu_final = float(dissolved_metal(cu_initial, target_ph, CU_HYDROLYSIS))
+
+    return {
+        'reagent': reagent,
+        'formula': formula,
+        'solution_volume': round(volume, 1),
+        'acidity': {
+            'h_plus_mol': round(h_total, 2),
+            'h2so4_kg': round(h_total / 2 * MOLAR_MASS_H2SO4 / 1000, 3),
+            'h2so4_kg_per_t': round(h_total / 2 * MOLAR_MASS_H2SO4 / ore_mass, 2),
+        },
+        'reagent_mass': round(float(dose[-1]), 3),
+        'reagent_per_t': round(float(dose[-1]) / ore_mass * 1000, 2),
+        'gypsum_mass': round(h_total / 2 * MOLAR_MASS_GYPSUM / 1000, 3),
+        'precipitate': {
+            'fe_oh3_kg': round((fe_initial - fe_final) * volume * MOLAR_MASS_FE_OH3 / 1000, 4),
+            'cu_oh2_kg': round((cu_initial - cu_final) * volume * MOLAR_MASS_CU_OH2 / 1000, 4),
+        },
+        'final_solution': {
+            'fe': round(fe_final * ATOMIC_MASS_FE, 4),
+            'cu': round(cu_final * ATOMIC_MASS_CU, 4),
+        },
+        'titration': {
+            'ph': np.round(ph_grid, 2).tolist(),
+            'dose_per_t': np.round(dose / ore_mass * 1000, 3).tolist(),
+        },
+    }
+
+
+# === КУЧНОЕ БИОВЫЩЕЛАЧИВАНИЕ ===
+
+SPECIES = ('h', 'cu', 'fe2', 'fe3')    # растворенные компоненты (моль/м³)
+R_GAS = 8.314
+
+MAX_CELLS = 100000
+MAX_STEPS = 200000
+MAX_FIELD_POINTS = 60           # прореживание полей для ответа API (по каждой оси)
+RECURRENCE_RANGE = 250          # Предел log10 масштаба внутри блока рекуррентности
+ROW_LOOP_MIN_WIDTH = 2000       # С какой ширины строки рекуррентность считается циклом по строкам
+
+DEFAULT_HEAP_PARAMS = {
+    # Геометрия и сетка
+    'height': 6.0,               # м
+    'width': 20.0,               # м
+    'nz': 60,
+    'nx': 100,
+    'days': 90.0,
+    'time_step': 1.0,            # ч
+
+    # Руда
+    'bulk_density': 1.7,         # т/м³
+    'grade': 1.027,              # Cu, %
+    'leachable': 0.9,            # доля сульфидной (выщелачиваемой) меди
+    'grade_cv': 0.3,             # коэффициент вариации содержания по штабелю
+    'seed': 0,
+
+    # Гидравлика
+    'irrigation': 10.0,          # л/(м²·ч)
+    'water_content': 0.08,       # объемная влажность
+    'dispersivity': 0.05,        # м, продольная
+    'lateral_dispersivity': 0.01,
+
+    # Раствор орошения
+    'inlet_ph': 1.8,
+    'inlet_cu': 0.1,             # г/л
+    'inlet_fe2': 0.5,            # г/л
+    'inlet_fe3': 1.0,            # г/л
+
+    # Кинетика
+    'temperature': 25.0,         # °C
+    'k_leach': 5e-6,             # м³/(моль·ч) при 25 °C
+    'ea_leach': 60000.0,         # Дж/моль
+    'q_max': 2.0,                # моль Fe²⁺/(г биомассы·ч)
+    'k_s': 5.0,                  # моль/м³, константа Моно по Fe²⁺
+    'yield': 0.05,               # г биомассы на моль Fe²⁺
+    'decay': 0.002,              # 1/ч
+    'x0': 1.0,                   # г/м³, начальная биомасса
+    'x_max': 50.0,               # г/м³, емкость поверхности
+    'ph_opt': 2.0,
+    'ph_width': 0.7,
+    't_opt': 35.0,
+    't_width': 12.0,
+    'sulfur_oxidation': 0.5,     # доля S⁰, окисляемая до H₂SO₄
+    'k_jarosite': 0.01,          # 1/(ч·ед. pH) выше ph_jarosite
+    'ph_jarosite': 2.5,
+    'k_gangue': 0.002,           # 1/ч, кислотопоглощение породы
+}
+
+
+def heap_parameters(data):
+    """Параметры модели с проверкой ограничений размера задачи"""
+    params = {**DEFAULT_HEAP_PARAMS}
+    for key, value in data.items():
+        if key not in DEFAULT_HEAP_PARAMS:
+            raise ValueError(f'Неизвестный параметр: {key}')
+        if value not in (None, ''):
+            params[key] = int(value) if key in ('nz', 'nx', 'seed') else float(value)
+    if params['nz'] < 2 or params['nx'] < 1:
+        raise ValueError('Сетка должна содержать не менее 2 ячеек по глубине')
+    if params['nz'] * params['nx'] > MAX_CELLS:
+        raise ValueError(f'Слишком большая сетка: {params["nz"] * params["nx"]} ячеек (максимум {MAX_CELLS})')
+    for key in ('height', 'width', 'days', 'irrigation', 'water_content'):
+        if params[key] <= 0:
+            raise ValueError(f'{key}: значение должно быть больше 0')
+    return params
+
+
+def _ph(h):
+    """pH по [H⁺] в моль/м³"""
+    return 3.0 - np.log10(np.maximum(h, 1e-12))
+
+
+def _concentrations(ph, cu, fe2, fe3):
+    """Концентрации раствора орошения (моль/м³) по pH и г/л"""
+    return np.array([
+        10.0 ** (3.0 - ph),
+        cu / ATOMIC_MASS_CU * 1000,
+        fe2 / ATOMIC_MASS_FE * 1000,
+        fe3 / ATOMIC_MASS_FE * 1000,
+    ])
+
+
+# Блоки рекуррентности y[i] = b[i] + gain[i]·y[i-1]: (начало, конец, P) —
+# внутри блока y = P·cumsum(b/P), перенос y[начало-1] добавляется к b[начало]
+Recurrence = namedtuple('Recurrence', ['gain', 'blocks'])
+# Факторизованная трехдиагональная матрица: прямой ход, 1/ведущие элементы, обратный ход
+Tridiagonal = namedtuple('Tridiagonal', ['forward', 'scale', 'backward'])
+
+
+def recurrence(gain):
+    """
+    Разбиение рекуррентности первого порядка на блоки
+
+    gain[i] ≥ 0 — вес предыдущего значения (gain[0] не используется).
+    Блок заканчивается, когда произведение весов внутри него выходит за
+    10^-RECURRENCE_RANGE, поэтому деление на P не переполняется, а сумма
+    положительных слагаемых не теряет точность.
+    """
+    gain = np.asarray(gain, dtype=float)
+    if not gain[1:].any():
+        return Recurrence(gain, [])    # Связи нет: y = b
+    with np.errstate(divide='ignore'):
+        log_gain = np.log10(gain)
+    blocks = []
+    start = 0
+    while start < len(gain):
+        # Первый вес блока относится к переносу из предыдущего блока
+        cumulative = np.cumsum(log_gain[start + 1:])
+        length = 1 + int(np.searchsorted(-cumulative, RECURRENCE_RANGE, side='right'))
+        stop = start + length
+        scale = np.concatenate([[1.0], np.cumprod(gain[start + 1:stop])])
+        blocks.append((start, stop, scale[:, None]))
+        start = stop
+    return Recurrence(gain, blocks)
+
+
+def solve_recurrence(rec, b):
+    """
+    y[i] = b[i] + gain[i]·y[i-1] по оси 1 массива b (компонент, i, остальное), на месте
+
+    Короткая ось при широких строках — цикл по строкам (каждая строка —
+    одна векторная операция), иначе — блоки накопленных сумм (цикл только
+    по блокам).
+    """
+    if not rec.blocks:
+        return b
+    width = b.size // b.shape[1]
+    if width >= ROW_LOOP_MIN_WIDTH:
+        term = np.empty_like(b[:, 0])
+        for i in range(1, b.shape[1]):
+            np.multiply(b[:, i - 1], rec.gain[i], out=term)
+            b[:, i] += term
+        return b
+
+    for start, stop, scale in rec.blocks:
+        block = b[:, start:stop]
+        if start:
+            # Перенос из предыдущего блока входит в первую строку
+            block[:, 0] += rec.gain[start] * b[:, start - 1]
+        block /= scale
+        np.cumsum(block, axis=1, out=block)
+        block *= scale
+    return b
+
+
+def tridiagonal(main, lower, upper):
+    """
+    Факторизация (прогонка) трехдиагональной матрицы с постоянными внедиагональными элементами
+
+    main — диагональ, -lower и -upper — элементы под и над диагональю
+    (lower, upper ≥ 0). Прямой ход: y[i] = r[i] + a[i]·y[i-1], обратный:
+    x[i] = y[i]/den[i] + e[i]·x[i+1], где a, e ≥ 0.
+    """
+    n = len(main)
+    den = np.empty(n)
+    den[0] = main[0]
+    for i in range(1, n):
+        den[i] = main[i] - lower * upper / den[i - 1]
+    forward = np.concatenate([[0.0], lower / den[:-1]])
+    backward = np.concatenate([[0.0], (upper / den[:-1])[::-1]])
+    return Tridiagonal(recurrence(forward), 1 / den, recurrence(backward))
+
+
+def solve_tridiagonal(operator, rhs, axis):
+    """Решение по оси axis массива rhs (компонент, глубина, ширина) сразу для всех остальных осей, на месте"""
+    view = np.moveaxis(rhs, axis, 1)
+    solve_recurrence(operator.forward, view)
+    view *= operator.scale.reshape((-1,) + (1,) * (view.ndim - 2))
+    solve_recurrence(operator.backward, view[:, ::-1])
+    return rhs
+
+
+def column_operator(nz, courant, diffusion):
+    """
+    Неявный шаг переноса по глубине колонны
+
+    Схема против потока с дисперсией: на верхней границе — концентрация
+    раствора орошения (ее вклад в первую ячейку — (courant + diffusion)·C_вх),
+    на нижней — свободный вынос (нулевой градиент).
+    """
+    main = np.full(nz, 1 + courant + 2 * diffusion)
+    main[-1] -= diffusion
+    return tridiagonal(main, courant + diffusion, diffusion)
+
+
+def lateral_operator(nx, lateral):
+    """Неявный шаг дисперсии по ширине; на боковых границах потока нет"""
+    main = np.full(nx, 1 + 2 * lateral)
+    main[[0, -1]] -= lateral
+    return tridiagonal(main, lateral, lateral)
+
+
+@timed('calc')
+@track_calculation
+def simulate_heap(data=None):
+    """
+    Моделирование кучного биовыщелачивания
+
+    Args:
+        data (dict): параметры DEFAULT_HEAP_PARAMS (пропущенные — по умолчанию)
+
+    Returns:
+        dict: временные ряды на выходе штабеля (по суткам), профили по
+            глубине и прореженные конечные поля pH и извлечения Cu
+    """
+    p = heap_parameters(data or {})
+    nz, nx = p['nz'], p['nx']
+    dz, dx = p['height'] / nz, p['width'] / nx
+    theta = p['water_content']
+
+    # Скорость фильтрации и дисперсия (м/ч, м²/ч)
+    flux = p['irrigation'] / 1000
+    velocity = flux / theta
+    d_z = p['dispersivity'] * velocity
+    d_x = p['lateral_dispersivity'] * velocity
+
+    # Шаг по времени: перенос по глубине неявный, по ширине — дробление шага
+    hours = p['days'] * 24
+    steps = int(math.ceil(hours / p['time_step']))
+    if steps > MAX_STEPS:
+        raise ValueError(f'Слишком много шагов по времени: {steps} (максимум {MAX_STEPS})')
+    dt = hours / steps
+    courant = velocity * dt / dz
+    diffusion = d_z * dt / dz ** 2
+    column = column_operator(nz, courant, diffusion)
+    lateral = d_x * dt / dx ** 2 if nx > 1 else 0.0
+    across = lateral_operator(nx, lateral) if lateral > 0 else None
+
+    # Начальное состояние: минерал с неоднородным содержанием, раствор орошения в порах
+    rng = np.random.default_rng(p['seed'])
+    sigma = math.sqrt(math.log(1 + p['grade_cv'] ** 2))
+    heterogeneity = rng.lognormal(-sigma ** 2 / 2, sigma, (nz, nx)) if p['grade_cv'] > 0 else np.ones((nz, nx))
+    cu_total = p['grade'] / 100 * p['bulk_density'] * 1e6 / ATOMIC_MASS_CU * heterogeneity  # моль/м³ штабеля
+    solid0 = cu_total * p['leachable']
+    solid = solid0.copy()
+    inv_solid0 = 1 / np.maximum(solid0, 1e-12)
+    biomass = np.full((nz, nx), p['x0'])
+
+    inlet = _concentrations(p['inlet_ph'], p['inlet_cu'], p['inlet_fe2'], p['inlet_fe3'])
+    c = np.broadcast_to(inlet[:, None, None], (len(SPECIES), nz, nx)).copy()
+    h, cu, fe2, fe3 = range(len(SPECIES))
+
+    # Температурные множители
+    temperature_k = p['temperature'] + 273.15
+    k_leach = p['k_leach'] * math.exp(-p['ea_leach'] / R_GAS * (1 / temperature_k - 1 / 298.15))
+    f_temperature = math.exp(-((p['temperature'] - p['t_opt']) / p['t_width']) ** 2)
+
+    # Выходы по суткам
+    steps_per_day = max(1, int(round(steps / p['days'])))
+    series = {'day': [], 'ph': [], 'cu': [], 'fe2': [], 'fe3': [], 'extraction': [], 'recovery': []}
+    recovered = 0.0                                             # моль Cu на 1 м длины штабеля
+    inlet_cu_load = 0.0
+    cell_volume = dz * dx                                       # м³ на 1 м длины
+    total_solid0 = solid0.sum() * cell_volume
+
+    leach_coef = 4 * k_leach * dt / theta                       # Fe³⁺: доля за шаг на моль/м³ минерала
+    bio_coef = p['q_max'] * f_temperature * dt
+    acid_per_cu = 4 * p['sulfur_oxidation']
+    gangue = 1 / (1 + p['k_gangue'] * dt)
+    inlet_row = (courant + diffusion) * inlet[:, None]
+
+    for step in range(1, steps + 1):
+        # --- Перенос (все компоненты сразу) ---
+        c[:, 0] += inlet_row
+        solve_tridiagonal(column, c, axis=1)
+        if across is not None:
+            solve_tridiagonal(across, c, axis=2)
+        outflow = c[cu, -1].mean()
+        recovered += flux * p['width'] * outflow * dt
+        inlet_cu_load += flux * p['width'] * inlet[cu] * dt
+
+        # --- Окисление минерала Fe³⁺ (неявно по Fe³⁺, ограничено запасом минерала) ---
+        remaining = solid * inv_solid0
+        rate = leach_coef * solid * np.cbrt(remaining * remaining)       # сжимающееся ядро
+        dissolved = np.minimum(c[fe3] * rate / (1 + rate) * (theta / 4), solid)  # моль/м³ штабеля
+        solid -= dissolved
+        dissolved /= theta
+        c[fe3] -= 4 * dissolved
+        c[fe2] += 5 * dissolved
+        c[cu] += dissolved
+        c[h] += acid_per_cu * dissolved
+
+        # --- Бактериальное окисление Fe²⁺ (Моно, неявно по Fe²⁺; расходует H⁺) ---
+        ph = _ph(c[h])
+        k_bio = bio_coef * biomass * np.exp(-((ph - p['ph_opt']) / p['ph_width']) ** 2) / (p['k_s'] + c[fe2])
+        oxidized = np.minimum(c[fe2] * k_bio / (1 + k_bio), c[h])
+        c[fe2] -= oxidized
+        c[fe3] += oxidized
+        c[h] -= oxidized
+        biomass += p['yield'] * oxidized * (1 - biomass / p['x_max']) - p['decay'] * dt * biomass
+        np.maximum(biomass, 1e-6, out=biomass)
+
+        # --- Ярозит (выше pH_jar) и кислотопоглощение породы ---
+        k_jar = np.maximum(ph - p['ph_jarosite'], 0.0) * (p['k_jarosite'] * dt)
+        precipitated = c[fe3] * k_jar / (1 + k_jar)
+        c[fe3] -= precipitated
+        c[h] += 2 * precipitated
+        c[h] *= gangue
+
+        if step % steps_per_day == 0 or step == steps:
+            dissolved_total = total_solid0 - solid.sum() * cell_volume
+            series['day'].append(round(step * dt / 24, 2))
+            series['ph'].append(round(float(_ph(c[h, -1]).mean()), 3))
+            series['cu'].append(round(float(outflow * ATOMIC_MASS_CU / 1000), 4))
+            series['fe2'].append(round(float(c[fe2, -1].mean() * ATOMIC_MASS_FE / 1000), 4))
+            series['fe3'].append(round(float(c[fe3, -1].mean() * ATOMIC_MASS_FE / 1000), 4))
+            series['extraction'].append(round(float(dissolved_total / total_solid0 * 100), 3))
+            series['recovery'].append(round(float((recovered - inlet_cu_load) / total_solid0 * 100), 3))
+
+    extraction = (1 - solid * inv_solid0) * 100
+    stride_z = max(1, nz // MAX_FIELD_POINTS)
+    stride_x = max(1, nx // MAX_FIELD_POINTS)
+    depth = (np.arange(nz) + 0.5) * dz
+
+    return {
+        'grid': {'nz': nz, 'nx': nx, 'dz': dz, 'dx': dx, 'cells': nz * nx},
+        'time': {'steps': steps, 'dt_hours': round(dt, 4), 'courant': round(courant, 3),
+                 'lateral': round(lateral, 3)},
+        'series': series,
+        'profile': {
+            'depth': np.round(depth, 3).tolist(),
+            'extraction': np.round(extraction.mean(axis=1), 2).tolist(),
+            'ph': np.round(_ph(c[h]).mean(axis=1), 3).tolist(),
+            'biomass': np.round(biomass.mean(axis=1), 3).tolist(),
+        },
+        'fields': {
+            'ph': np.round(_ph(c[h])[::stride_z, ::stride_x], 2).tolist(),
+            'extraction': np.round(extraction[::stride_z, ::stride_x], 1).tolist(),
+        },
+        'summary': {
+            'extraction': series['extraction'][-1],
+            'recovery': series['recovery'][-1],
+            'pls_cu': series['cu'][-1],
+            'pls_ph': series['ph'][-1],
+        },
+    }
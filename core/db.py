@@ -0,0 +1,86 @@
+"""
+Профиль SQLite для рабочей нагрузки
+
+При каждом новом соединении (connection_created) применяются PRAGMA
+профиля settings.DB_PROFILE. В профиле production журнал WAL позволяет
+читателям дашбордов не блокировать записи расчетов и наоборот,
+synchronous=NORMAL в режиме WAL не теряет целостность при сбое процесса,
+а busy_timeout заставляет писателя ждать блокировку вместо немедленной
+ошибки "database is locked". Вместе с CONN_MAX_AGE и BEGIN IMMEDIATE
+(OPTIONS.transaction_mode) это настраивается в settings.DATABASES.
+
+Если блокировка не освободилась за busy_timeout, сохранение повторяется
+декоратором retry_on_lock с экспоненциальной задержкой.
+"""
+
+import functools
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+
+PRAGMA_PROFILES = {
+    # Настройки SQLite по умолчанию (для сравнения в bench_db)
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # в КиБ: 64 МиБ на соединение
+        'busy_timeout': 5000,  # мс
+        'temp_store': 'MEMORY',
+    },
+}
+
+# Параметры соединения профиля: то же, что в settings.DATABASES
+CONNECTION_PROFILES = {
+    'default': {'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+    'production': {'CONN_MAX_AGE': 600, 'OPTIONS': {'transaction_mode': 'IMMEDIATE'}},
+}
+
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.05  # с, удваивается с каждой попыткой
+
+
+def profile_pragmas(profile=None):
+    return PRAGMA_PROFILES[profile or getattr(settings, 'DB_PROFILE', 'default')]
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Обработчик connection_created: PRAGMA текущего профиля"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in profile_pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_lock_error(exc):
+    message = str(exc).lower()
+    return isinstance(exc, OperationalError) and ('locked' in message or 'busy' in message)
+
+
+def retry_on_lock(func=None, *, attempts=LOCK_RETRIES, backoff=LOCK_BACKOFF, using=DEFAULT_DB_ALIAS):
+    """
+    Повтор сохранения при "database is locked"
+
+    Задержка backoff·2^n со случайной добавкой до 100%, чтобы писатели не
+    просыпались одновременно. Внутри внешней транзакции повтор бесполезен
+    (блокировки уже удерживаются) — ошибка пробрасывается сразу.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as e:
+                    if (not is_lock_error(e) or attempt == attempts - 1
+                            or connections[using].in_atomic_block):
+                        raise
+                    time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
@@ -0,0 +1,182 @@
+"""
+Граф зависимостей расчета
+
+Расчет описывается набором именованных узлов: каждый узел — функция,
+аргументы которой — имена входных параметров или других узлов. Полный
+расчет вычисляет узлы по порядку регистрации; сессия (GraphSession)
+хранит значения всех узлов и при изменении входных данных пересчитывает
+только узлы ниже по графу, возвращая лишь изменившиеся выходы.
+"""
+
+import inspect
+import threading
+from collections import OrderedDict
+
+
+SESSION_CACHE_SIZE = 512
+
+
+class Graph:
+    """Граф расчета: входные параметры, узлы и выходы (разделы результата)"""
+
+    def __init__(self, inputs):
+        self.inputs = tuple(inputs)
+        self.nodes = {}          # имя -> (функция, зависимости)
+        self.outputs = []
+        self.sessions = SessionCache(self)
+
+    def node(self, func=None, *, output=False, name=None):
+        """
+        Декоратор регистрации узла; зависимости — имена аргументов функции
+
+        Узлы регистрируются после своих зависимостей, поэтому порядок
+        регистрации одновременно является топологическим порядком.
+        name — имя узла, если оно отличается от имени функции.
+        """
+        def register(func):
+            node_name = name or func.__name__
+            deps = tuple(inspect.signature(func).parameters)
+            unknown = [dep for dep in deps if dep not in self.inputs and dep not in self.nodes]
+            if unknown:
+                raise ValueError(f'Узел {node_name}: неизвестные зависимости {", ".join(unknown)}')
+            if node_name in self.nodes or node_name in self.inputs:
+                raise ValueError(f'Узел {node_name} уже определен')
+            self.nodes[node_name] = (func, deps)
+            if output:
+                self.outputs.append(node_name)
+            return func
+
+        return register(func) if func is not None else register
+
+    def output(self, name):
+        """Декоратор узла, значение которого входит в результат под именем name"""
+        return self.node(output=True, name=name)
+
+    def expose(self, *names):
+        """Добавление входных параметров в результат как есть"""
+        for name in names:
+            if name not in self.inputs:
+                raise ValueError(f'Неизвестный входной параметр: {name}')
+            self.outputs.append(name)
+
+    def evaluate(self, inputs):
+        """Полный расчет: {выход: значение} в порядке регистрации выходов"""
+        values = dict(inputs)
+        for name, (func, deps) in self.nodes.items():
+            values[name] = func(*(values[dep] for dep in deps))
+        return {name: values[name] for name in self.outputs}
+
+    def session(self):
+        return GraphSession(self)
+
+
+def _same(old, new):
+    """Сравнение значений узлов (числа, строки, словари и списки из них)"""
+    try:
+        return bool(old == new)
+    except (TypeError, ValueError):
+        return False
+
+
+class GraphSession:
+    """Состояние графа для одного пользователя: значения всех узлов"""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def update(self, inputs):
+        """
+        Пересчет после изменения входных данных
+
+        Returns:
+            tuple: (changed — {выход: новое значение} только для изменившихся
+                выходов, recomputed — список пересчитанных узлов, full —
+                True при первом расчете в сессии)
+        """
+        with self._lock:
+            full = not self.values
+            dirty = {key for key, value in inputs.items() if full or not _same(self.values.get(key), value)}
+            self.values.update(inputs)
+
+            recomputed = []
+            try:
+                for name, (func, deps) in self.graph.nodes.items():
+                    if not full and not dirty.intersection(deps):
+                        continue
+                    value = func(*(self.values[dep] for dep in deps))
+                    recomputed.append(name)
+                    if full or not _same(self.values.get(name), value):
+                        dirty.add(name)
+                        self.values[name] = value
+            except Exception:
+                # Состояние могло остаться несогласованным: следующий расчет — полный
+                self.values = {}
+                raise
+
+            changed = {name: self.values[name] for name in self.graph.outputs if name in dirty}
+            return changed, recomputed, full
+
+    def reset(self):
+        """Сброс состояния: следующий расчет — полный"""
+        with self._lock:
+            self.values = {}
+
+
+class SessionCache:
+    """Сессии графа по ключу пользовательской сессии (LRU, в памяти процесса)"""
+
+    def __init__(self, graph, maxsize=SESSION_CACHE_SIZE):
+        self.graph = graph
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Сессия по ключу; новая (пустая) при первом обращении или после вытеснения"""
+        with self._lock:
+            session = self._data.get(key)
+            if session is None:
+                session = self._data[key] = self.graph.session()
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return session
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def session_key(request):
+    """Ключ сессии Django (сессия создается при первом обращении)"""
+    if request.session.session_key is None:
+        request.session.save()
+    return request.session.session_key
+
+
+def live_update(request, graph, inputs, reset=False):
+    """
+    Инкрементальный пересчет для пользователя запроса
+
+    reset — клиент начинает заново (например, после перезагрузки страницы)
+    и ждет полный результат.
+
+    Returns:
+        dict: {'success', 'full', 'changed', 'recomputed'} для JsonResponse;
+            при full=True changed содержит все выходы графа
+    """
+    session = graph.sessions.get(session_key(request))
+    if reset:
+        session.reset()
+    changed, recomputed, full = session.update(inputs)
+    return {
+        'success': True,
+        'full': full,
+        'changed': changed,
+        'recomputed': recomputed,
+    }
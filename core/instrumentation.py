@@ -0,0 +1,215 @@
+"""
+Инструментирование запросов: Server-Timing, число и время SQL-запросов
+
+ServerTimingMiddleware для выбранного запроса (доля TIMING_SAMPLE_RATE)
+создает RequestTiming и кладет его в contextvar. Все, что выполняется в
+контексте запроса — SQL-запросы (обертка execute_wrapper на каждом
+соединении), функции расчета (@timed) и рендер шаблонов
+(TimedDjangoTemplates), — добавляет в него свою длительность. В том числе
+в потоках sync_to_async и пулах core.concurrency: контекст копируется.
+
+Результат отдается заголовком Server-Timing и строкой JSON в логгер
+core.timing. Одинаковые SQL-запросы (с точностью до параметров),
+выполненные TIMING_DUPLICATE_THRESHOLD раз и больше, — признак N+1:
+они попадают в лог с уровнем WARNING.
+
+При TIMING_ENABLED = False middleware отключается (MiddlewareNotUsed),
+обертка SQL не устанавливается, а @timed и шаблоны проверяют только
+пустой contextvar.
+"""
+
+import functools
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+
+logger = logging.getLogger('core.timing')
+
+# Показатели в заголовке Server-Timing: имя → описание (заголовок — только ASCII)
+METRICS = {
+    'db': 'SQL',
+    'calc': 'calculations',
+    'render': 'templates',
+}
+
+_current = ContextVar('request_timing', default=None)
+_open_spans = ContextVar('request_timing_spans', default=frozenset())
+
+
+class RequestTiming:
+    """Накопитель показателей одного запроса (потокобезопасный)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.statements = Counter()
+        self.spans = defaultdict(float)
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def record_query(self, sql, duration):
+        with self._lock:
+            self.queries += 1
+            self.statements[sql] += 1
+            self.spans['db'] += duration
+
+    def add(self, name, duration):
+        with self._lock:
+            self.spans[name] += duration
+
+    def duplicates(self, threshold):
+        """Повторяющиеся запросы: [(sql, число выполнений)] по убыванию"""
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+    def server_timing(self, total=None):
+        """Значение заголовка Server-Timing (длительности в мс)"""
+        total = self.elapsed if total is None else total
+        parts = [f'total;dur={total * 1000:.1f}']
+        for name, title in METRICS.items():
+            if name in self.spans or name == 'db':
+                desc = f'{title}: {self.queries} queries' if name == 'db' else title
+                parts.append(f'{name};dur={self.spans[name] * 1000:.1f};desc="{desc}"')
+        return ', '.join(parts)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """Обертка connection.execute_wrapper: время и текст каждого запроса"""
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.record_query(sql, time.perf_counter() - started)
+
+
+def install_sql_wrapper(sender=None, connection=connection, **kwargs):
+    """Обработчик connection_created: обертка ставится на соединение один раз"""
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+def timed(name):
+    """
+    Декоратор: время функции добавляется к показателю name запроса
+
+    Вложенные вызовы с тем же именем (расчет внутри расчета) не считаются
+    повторно.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timing = _current.get()
+            spans = _open_spans.get()
+            if timing is None or name in spans:
+                return func(*args, **kwargs)
+            token = _open_spans.set(spans | {name})
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timing.add(name, time.perf_counter() - started)
+                _open_spans.reset(token)
+        return wrapper
+    return decorator
+
+
+class TimedTemplate(Template):
+    @timed('render')
+    def render(self, context=None, request=None):
+        return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Движок шаблонов Django с учетом времени рендера в RequestTiming"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class ServerTimingMiddleware:
+    """Server-Timing и структурированный лог для доли TIMING_SAMPLE_RATE запросов"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'TIMING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'TIMING_SAMPLE_RATE', 1.0)
+        self.threshold = getattr(settings, 'TIMING_DUPLICATE_THRESHOLD', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        timing, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        timing, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def start(self):
+        # Соединение потока запроса могло открыться до включения инструментирования
+        install_sql_wrapper(connection=connection)
+        timing = RequestTiming()
+        return timing, _current.set(timing)
+
+    def finish(self, request, response, timing):
+        total = timing.elapsed
+        response['Server-Timing'] = timing.server_timing(total)
+
+        duplicates = timing.duplicates(self.threshold)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'queries': timing.queries,
+            **{f'{name}_ms': round(timing.spans[name] * 1000, 2) for name in METRICS},
+        }
+        if duplicates:
+            record['duplicates'] = [{'sql': sql, 'count': count} for sql, count in duplicates]
+        logger.log(logging.WARNING if duplicates else logging.INFO,
+                   json.dumps(record, ensure_ascii=False), extra={'timing': record})
+        return response
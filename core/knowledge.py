@@ -0,0 +1,366 @@
+"""
+База знаний: полнотекстовый поиск и кэш страниц статей
+
+Индекс — виртуальная таблица SQLite FTS5 core_article_fts (rowid = id
+статьи) с заголовком и текстом, приведенными к основам слов стеммером
+Портера для русского языка (Snowball), и неиндексируемым текстом без
+разметки для фрагментов. Таблица создается после migrate и
+обновляется сигналами при сохранении и удалении статей; полная
+перестройка — load_knowledge_base --reindex.
+
+Запрос тоже приводится к основам (см. query_terms); все слова
+обязательны, порядок — по BM25 с весом заголовка TITLE_WEIGHT. Основы
+ищутся точно, без префиксов (основа*): в SQLite 3.40 префиксный запрос
+к FTS5 после удаления строк в той же транзакции повреждает индекс
+(«database disk image is malformed»).
+
+Фрагменты с подсветкой строятся по тексту без разметки только для
+выдаваемой страницы результатов; поиск — три коротких запроса (число
+совпадений, ранжирование по rowid, текст страницы результатов) без
+обращения к полному тексту статей.
+
+Отрисованные страницы статей хранятся в кэше Django под ключом с версией
+базы знаний. Версия в БД (число статей и время последнего изменения)
+проверяется не чаще раза в REFRESH_INTERVAL секунд, так что правки из
+других процессов подхватываются и при кэше в памяти процесса; изменение
+статьи в этом процессе меняет версию сразу (см. signals.py).
+"""
+
+import html
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Count, Max
+from django.utils.html import escape, strip_tags
+from django.utils.text import Truncator
+
+from .models import Article
+
+
+FTS_TABLE = 'core_article_fts'
+TITLE_WEIGHT = 10.0
+SEARCH_LIMIT = 20
+MAX_QUERY_WORDS = 10
+SNIPPET_LENGTH = 240           # Символов во фрагменте
+SNIPPET_CONTEXT = 40           # Символов перед первым совпадением
+PAGE_CACHE_TIMEOUT = 24 * 3600
+REFRESH_INTERVAL = 60          # Период проверки версии статей в БД (с)
+SOURCE_DIR = Path(__file__).resolve().parent / 'knowledge_base'
+
+
+# === СТЕММИНГ (Snowball, русский) ===
+
+_VOWELS = 'аеиоуыэюя'
+_RV = re.compile(f'^(.*?[{_VOWELS}])(.*)$')
+_PERFECTIVE_GERUND = re.compile(r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+_REFLEXIVE = re.compile(r'(с[яь])$')
+_ADJECTIVE = re.compile(r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|ую|юю|ая|яя|ою|ею)$')
+_PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+_VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)'
+    r'|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+_NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+_DERIVATIONAL = re.compile(f'.*[^{_VOWELS}]+[{_VOWELS}].*ость?$')
+_WORD = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=50000)
+def stem(word):
+    """
+    Основа слова
+
+    Окончания снимаются только в области RV (после первой гласной), поэтому
+    основа — всегда префикс слова, приведенного к нижнему регистру с заменой
+    ё на е. Слова без кириллицы возвращаются без изменений.
+    """
+    word = word.lower().replace('ё', 'е')
+    match = _RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+
+    stripped = _PERFECTIVE_GERUND.sub('', rv, 1)
+    if stripped == rv:
+        rv = _REFLEXIVE.sub('', rv, 1)
+        stripped = _ADJECTIVE.sub('', rv, 1)
+        if stripped != rv:
+            rv = _PARTICIPLE.sub('', stripped, 1)
+        else:
+            stripped = _VERB.sub('', rv, 1)
+            rv = _NOUN.sub('', rv, 1) if stripped == rv else stripped
+    else:
+        rv = stripped
+
+    rv = re.sub('и$', '', rv)
+    if _DERIVATIONAL.match(rv):
+        rv = re.sub('ость?$', '', rv)
+
+    stripped = re.sub('ь$', '', rv)
+    if stripped == rv:
+        rv = re.sub('ейше?$', '', rv)
+        rv = re.sub('нн$', 'н', rv)
+    else:
+        rv = stripped
+    return start + rv
+
+
+def stems(text):
+    """Основы всех слов текста"""
+    return [stem(word) for word in _WORD.findall(text)]
+
+
+def plain_text(body):
+    """Текст статьи без разметки"""
+    return re.sub(r'\s+', ' ', html.unescape(strip_tags(body))).strip()
+
+
+# === ИНДЕКС ===
+
+def ensure_index(using=DEFAULT_DB_ALIAS):
+    """Создание таблицы FTS5 (после migrate)"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(title, body, text UNINDEXED, tokenize='unicode61 remove_diacritics 0')"
+        )
+
+
+def _index_row(pk, title, body):
+    """Строка индекса: основы заголовка и текста, текст без разметки для фрагментов"""
+    text = plain_text(body)
+    return [pk, ' '.join(stems(title)), ' '.join(stems(text)), text]
+
+
+def index_article(article):
+    """Обновление статьи в индексе (неопубликованные из индекса убираются)"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [article.pk])
+        if article.is_published:
+            cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, title, body, text) VALUES (%s, %s, %s, %s)',
+                           _index_row(article.pk, article.title, article.body))
+
+
+def unindex_article(pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def reindex():
+    """Перестройка индекса по всем статьям"""
+    ensure_index()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, body, text) VALUES (%s, %s, %s, %s)',
+            [
+                _index_row(pk, title, body) for pk, title, body in
+                Article.objects.filter(is_published=True).values_list('pk', 'title', 'body').iterator()
+            ],
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+# === ПОИСК ===
+
+def query_terms(query):
+    """
+    Слова запроса: для каждого — основа и само слово как вариант основы
+
+    Стеммер иногда снимает с начальной формы «окончание», которое в
+    косвенных падежах остается в основе (анионит → анион, но анионитах →
+    анионит); второй вариант находит и такие словоформы.
+
+    Returns:
+        list: кортежи вариантов, не больше MAX_QUERY_WORDS
+    """
+    terms = []
+    for word in _WORD.findall(query):
+        term = tuple(dict.fromkeys((stem(word), word.lower().replace('ё', 'е'))))
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_WORDS]
+
+
+def highlight(text, terms, length=None):
+    """
+    Экранированный фрагмент текста с совпадениями в <mark>
+
+    Слово совпадает, если его основа — один из вариантов слова запроса;
+    так как основа — префикс слова, кандидаты ищутся одним регулярным
+    выражением по префиксам, и только они проверяются стеммером.
+
+    Args:
+        length: длина фрагмента в символах (None — весь текст); фрагмент
+            выбирается с наибольшим числом разных слов запроса
+    """
+    normalized = text.lower().replace('ё', 'е')
+    if len(normalized) != len(text):
+        # Редкие символы меняют длину при lower(); позиции должны совпадать
+        normalized = text
+    variants = sorted({variant for term in terms for variant in term}, key=len, reverse=True)
+    hits = []
+    if variants:
+        candidates = re.compile(r'\b(?:' + '|'.join(map(re.escape, variants)) + r')\w*')
+        for match in candidates.finditer(normalized):
+            word_stem = stem(match.group())
+            for term in terms:
+                if word_stem in term:
+                    hits.append((match.start(), match.end(), term))
+                    break
+
+    begin, end = 0, len(text)
+    if length is not None and len(text) > length:
+        best = (-1, 0)
+        for position, _, _ in hits:
+            start = max(position - SNIPPET_CONTEXT, 0)
+            covered = {term for hit, _, term in hits if start <= hit < start + length}
+            best = max(best, (len(covered), -start))
+        begin = -best[1]
+        end = min(begin + length, len(text))
+        # Границы фрагмента — по пробелам, чтобы не резать слова
+        if begin:
+            space = text.find(' ', begin, begin + SNIPPET_CONTEXT)
+            begin = space + 1 if space != -1 else begin
+        if end < len(text):
+            space = text.rfind(' ', end - SNIPPET_CONTEXT, end)
+            end = space if space > begin else end
+
+    parts, position = [], begin
+    for hit_start, hit_end, _ in hits:
+        if hit_start < begin or hit_end > end:
+            continue
+        parts.append(escape(text[position:hit_start]))
+        parts.append(f'<mark>{escape(text[hit_start:hit_end])}</mark>')
+        position = hit_end
+    parts.append(escape(text[position:end]))
+    return ('…' if begin else '') + ''.join(parts) + ('…' if end < len(text) else '')
+
+
+def search(query, limit=SEARCH_LIMIT, offset=0):
+    """
+    Поиск статей
+
+    Returns:
+        dict: {'query', 'total', 'results': [{'slug', 'title', 'process',
+            'title_html', 'snippet', 'score'}]} — title_html и snippet
+            экранированы, совпадения выделены <mark>
+    """
+    terms = query_terms(query)
+    if not terms:
+        return {'query': query, 'total': 0, 'results': []}
+    match = ' AND '.join('(' + ' OR '.join(f'"{variant}"' for variant in term) + ')' for term in terms)
+
+    processes = dict(Article.PROCESS_CHOICES)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        total = cursor.fetchone()[0]
+        # Ранжирование только по rowid: текст всех совпадений не попадает в сортировку
+        cursor.execute(
+            f'SELECT rowid, bm25({FTS_TABLE}, %s, 1.0) AS score FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s ORDER BY score LIMIT %s OFFSET %s',
+            [TITLE_WEIGHT, match, limit, offset],
+        )
+        ranked = cursor.fetchall()
+        rows = {}
+        if ranked:
+            cursor.execute(
+                f'SELECT fts.rowid, article.slug, article.title, article.process, fts.text '
+                f'FROM {FTS_TABLE} AS fts JOIN {Article._meta.db_table} AS article ON article.id = fts.rowid '
+                f'WHERE fts.rowid IN ({", ".join(["%s"] * len(ranked))})',
+                [pk for pk, _ in ranked],
+            )
+            rows = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    results = []
+    for pk, score in ranked:
+        if pk not in rows:
+            continue
+        slug, title, process, text = rows[pk]
+        results.append({
+            'slug': slug,
+            'title': title,
+            'process': processes.get(process, process),
+            'title_html': highlight(title, terms),
+            'snippet': highlight(text, terms, SNIPPET_LENGTH),
+            'score': round(-score, 4),
+        })
+    return {'query': query, 'total': total, 'results': results}
+
+
+# === КЭШ СТРАНИЦ ===
+
+_VERSION_KEY = 'knowledge_base:version'
+_articles_version = None
+_checked_at = 0.0
+
+
+def articles_version():
+    """Версия статей в БД: число и время последнего изменения"""
+    found = Article.objects.aggregate(count=Count('id'), last=Max('updated_at'))
+    last = int(found['last'].timestamp() * 10 ** 6) if found['last'] else 0
+    return f"{found['count']}.{last}"
+
+
+def page_cache_key(slug):
+    global _articles_version, _checked_at
+    now = time.monotonic()
+    if _articles_version is None or now - _checked_at > REFRESH_INTERVAL:
+        _articles_version = articles_version()
+        _checked_at = now
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(_VERSION_KEY, version, None)
+        version = cache.get(_VERSION_KEY, version)
+    return f'knowledge_base:{_articles_version}:{version}:{slug}'
+
+
+def invalidate_pages():
+    """Сброс кэша всех страниц статей (новая версия базы знаний)"""
+    global _articles_version
+    cache.set(_VERSION_KEY, time.time_ns(), None)
+    _articles_version = None
+
+
+# === ИМПОРТ ===
+
+def load_articles(directory=SOURCE_DIR, replace=False, process='flotation'):
+    """
+    Загрузка статей из файлов NN-slug.html (первая строка — <h1>заголовок</h1>)
+
+    Returns:
+        tuple: (создано, обновлено)
+    """
+    created_count = updated_count = 0
+    for path in sorted(Path(directory).glob('*.html')):
+        order, _, slug = path.stem.partition('-')
+        source = path.read_text(encoding='utf-8')
+        match = re.match(r'\s*<h1>(.*?)</h1>\s*', source, re.S)
+        if match is None:
+            raise ValueError(f'{path.name}: первая строка должна содержать <h1>заголовок</h1>')
+        body = source[match.end():]
+        paragraph = re.search(r'<p>(.*?)</p>', body, re.S)
+        fields = {
+            'title': html.unescape(match.group(1)).strip(),
+            'body': body,
+            'summary': Truncator(plain_text(paragraph.group(1) if paragraph else body)).chars(240),
+            'order': int(order) if order.isdigit() else 0,
+            'process': process,
+        }
+
+        article, created = Article.objects.get_or_create(slug=slug or order, defaults=fields)
+        if created:
+            created_count += 1
+        elif replace:
+            for field, value in fields.items():
+                setattr(article, field, value)
+            article.save()
+            updated_count += 1
+    return created_count, updated_count
@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarking import BENCH_HOST, asgi_call, run_asgi_load, run_wsgi_load, wsgi_call
+
+
+SWEEP_BODY = json.dumps({
+    'grid': {
+        'antimonite_mass': 100,
+        'reducer_amount': {'min': 5, 'max': 20, 'steps': 40},
+        'temperature': {'min': 850, 'max': 1100, 'steps': 25},
+    },
+    'columns': ['sb_extraction', 'specific_energy'],
+})
+
+# Дашборды, аналитика и расчетный эндпоинт
+DEFAULT_REQUESTS = [
+    ('GET', '/flotation/', ''),
+    ('GET', '/flotation/analytics/', ''),
+    ('GET', '/molybdenum/', ''),
+    ('POST', '/antimony/sweep/', SWEEP_BODY),
+]
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает пропускную способность и p99 представлений под WSGI и ASGI при конкурентной нагрузке'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на каждый уровень конкурентности')
+        parser.add_argument('--concurrency', default='1,8,32', help='Уровни конкурентности через запятую')
+        parser.add_argument('--path', action='append', default=[],
+                            help='GET-путь вместо набора по умолчанию (можно указать несколько раз)')
+        parser.add_argument('--json', action='store_true', help='Вывести результаты в JSON')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError('--concurrency: ожидаются целые числа через запятую')
+        if not levels or min(levels) < 1 or options['requests'] < 1:
+            raise CommandError('Число запросов и уровни конкурентности должны быть больше 0')
+
+        requests = [('GET', path, '') for path in options['path']] or DEFAULT_REQUESTS
+        requests = [(method, path, body.encode()) for method, path, body in requests]
+
+        # Как в рабочем окружении: без журнала SQL-запросов отладки
+        settings.DEBUG = False
+        if BENCH_HOST not in settings.ALLOWED_HOSTS:
+            settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, BENCH_HOST]
+
+        wsgi, asgi = WSGIHandler(), ASGIHandler()
+
+        # Прогрев и проверка путей
+        for request in requests:
+            status = wsgi_call(wsgi, *request)
+            if status >= 400:
+                raise CommandError(f'{request[0]} {request[1]}: код ответа {status}')
+            asyncio.run(asgi_call(asgi, *request))
+
+        results = []
+        for level in levels:
+            for server, run in (
+                ('wsgi', lambda: run_wsgi_load(wsgi, requests, options['requests'], level)),
+                ('asgi', lambda: asyncio.run(run_asgi_load(asgi, requests, options['requests'], level))),
+            ):
+                results.append({'server': server, 'concurrency': level, **run()})
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f'{"Сервер":<8}{"Конк.":>6}{"Запр/с":>10}{"p50, мс":>10}{"p99, мс":>10}{"max, мс":>10}{"Ошибки":>8}')
+        for row in results:
+            self.stdout.write(
+                f'{row["server"]:<8}{row["concurrency"]:>6}{row["throughput"]:>10}'
+                f'{row["p50"]:>10}{row["p99"]:>10}{row["max"]:>10}{row["errors"]:>8}'
+            )
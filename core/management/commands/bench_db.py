@@ -0,0 +1,111 @@
+import json
+import random
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from core.benchmarking import run_mixed_load
+from core.db import CONNECTION_PROFILES, PRAGMA_PROFILES
+from flotation import views as flotation_views
+from molybdenum import views as molybdenum_views
+
+
+def flotation_data():
+    """Входные данные калькулятора флотации со случайными массами и содержаниями"""
+    product = lambda mass, grade: {'mass': round(random.uniform(*mass), 2), 'grade': round(random.uniform(*grade), 2)}
+    return {
+        'initial_grade_analysis': 3.0,
+        'reagent_regime': 'РАХ 100 г/т',
+        'is_microflotation': False,
+        'configuration': '',
+        'final_concentrate': product((10, 30), (60, 120)),
+        'tails': product((800, 950), (0.1, 0.5)),
+        'cleaner_tails': product((20, 60), (1, 5)),
+        'control_concentrate': product((10, 40), (5, 15)),
+    }
+
+
+def read_dashboards():
+    """Запросы дашбордов флотации и молибдена"""
+    flotation_views._dashboard_counts()
+    flotation_views._dashboard_trend()
+    molybdenum_views._dashboard_sorption()
+    molybdenum_views._dashboard_recent()
+
+
+class Command(BaseCommand):
+    help = ('Нагружает копию БД параллельными сохранениями расчетов и чтениями дашбордов '
+            'и сравнивает профили SQLite (пропускная способность, доля ошибок блокировки)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Потоков сохранения расчетов')
+        parser.add_argument('--readers', type=int, default=4, help='Потоков чтения дашбордов')
+        parser.add_argument('--duration', type=float, default=5, help='Длительность замера на профиль (с)')
+        parser.add_argument('--profiles', default='default,production', help='Профили через запятую')
+        parser.add_argument('--json', action='store_true', help='Вывести результаты в JSON')
+
+    def handle(self, *args, **options):
+        profiles = [name.strip() for name in options['profiles'].split(',') if name.strip()]
+        unknown = set(profiles) - set(PRAGMA_PROFILES)
+        if unknown:
+            raise CommandError(f'Неизвестные профили: {", ".join(sorted(unknown))}')
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер рассчитан на SQLite')
+        if not Path(connection.settings_dict['NAME']).exists():
+            raise CommandError('Файл БД не найден: выполните migrate')
+
+        db = connections.settings['default']
+        original = {key: db.get(key) for key in ('NAME', 'CONN_MAX_AGE', 'OPTIONS')}
+        original_profile = settings.DB_PROFILE
+        results = []
+        try:
+            for profile in profiles:
+                with tempfile.TemporaryDirectory() as tmp:
+                    results.append({'profile': profile, **self.run_profile(profile, original['NAME'], tmp, options)})
+        finally:
+            connection.close()
+            db.update(original)
+            settings.DB_PROFILE = original_profile
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f'{"Профиль":<12}{"Нагрузка":<10}{"Опер/с":>8}{"p50, мс":>10}{"p99, мс":>10}'
+                          f'{"Ошибки":>8}{"Блокировки":>12}{"Доля, %":>9}')
+        for row in results:
+            for kind, title in (('writes', 'запись'), ('reads', 'чтение')):
+                item = row[kind]
+                self.stdout.write(
+                    f'{row["profile"]:<12}{title:<10}{item["throughput"]:>8}{item["p50"]:>10}{item["p99"]:>10}'
+                    f'{item["errors"]:>8}{item["lock_errors"]:>12}{item["lock_rate"]:>9}'
+                )
+
+    def run_profile(self, profile, source, tmp, options):
+        """Замер на свежей копии БД с PRAGMA и параметрами соединения профиля"""
+        path = Path(tmp) / 'bench.sqlite3'
+        with sqlite3.connect(source) as src, sqlite3.connect(path) as dst:
+            src.backup(dst)
+            # Режим журнала хранится в файле: копия начинает с журнала по умолчанию
+            dst.execute('PRAGMA journal_mode = DELETE')
+        src.close()
+        dst.close()
+
+        connection.close()
+        connections.settings['default'].update(NAME=str(path), **CONNECTION_PROFILES[profile])
+        settings.DB_PROFILE = profile
+
+        # Без профиля — и без повторов при блокировке, как было до него
+        save = flotation_views.save_flotation_test
+        if profile == 'default':
+            save = save.__wrapped__
+
+        def write():
+            data = flotation_data()
+            save(data, flotation_views.calculate_flotation_results(data))
+
+        return run_mixed_load(write, read_dashboards, options['writers'], options['readers'], options['duration'])
@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from antimony.batch import INPUT_DEFAULTS
+from antimony.calculations import calculate_smelting
+from core.benchmarking import bench_kernel, compare_to_baseline
+from flotation.views import calculate_flotation_results
+from molybdenum.utils import calculate_kinetic_series, calculate_leaching_balance, calculate_sorption
+
+
+FLOTATION_DATA = {
+    'final_concentrate': {'mass': 18.4, 'grade': 92.5},
+    'tails': {'mass': 902.0, 'grade': 0.21},
+    'cleaner_tails': {'mass': 41.3, 'grade': 2.8},
+    'control_concentrate': {'mass': 26.7, 'grade': 9.4},
+}
+
+# Опыт №6 (выщелачивание) и таблица 6, 80 °C (сорбция)
+LEACHING_DATA = {
+    'concentrate_mass': 50, 'initial_mo': 25.01, 'initial_cu': 0.91, 'initial_fe': 3.5, 'initial_si': 3.2,
+    'cake_mass': 43.5, 'cake_mo': 7.88, 'cake_cu': 0.37, 'cake_fe': 1.42, 'cake_si': 3.36,
+    'solution_volume': 250, 'solution_mo': 36.3, 'solution_cu': 1.18, 'solution_fe': 4.53, 'solution_si': 0.54,
+}
+
+SORPTION_DATA = {
+    'solution_volume': 200, 'initial_mo_concentration': 2.429, 'final_mo_concentration': 0.131,
+    'anionite_mass': 10, 'temperature': 80, 'duration': 60,
+}
+
+# Функции расчета: имя → (функция, аргументы)
+KERNELS = {
+    'calculate_flotation_results': (calculate_flotation_results, (FLOTATION_DATA,)),
+    'calculate_leaching_balance': (calculate_leaching_balance, (LEACHING_DATA,)),
+    'calculate_sorption': (calculate_sorption, (SORPTION_DATA,)),
+    'calculate_kinetic_series': (calculate_kinetic_series, (SORPTION_DATA, list(range(0, 241, 5)))),
+    'calculate_smelting': (calculate_smelting, (INPUT_DEFAULTS,)),
+}
+
+
+class Command(BaseCommand):
+    help = ('Микробенчмарки функций расчета: задержка вызова, пропускная способность серии и выделения '
+            'памяти; сравнение с сохраненным базовым замером')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kernel', action='append', default=[],
+                            help=f'Функция расчета (можно указать несколько раз; по умолчанию все: {", ".join(KERNELS)})')
+        parser.add_argument('--repeat', type=int, default=200, help='Отдельно замеряемых вызовов')
+        parser.add_argument('--batch', type=int, default=1000, help='Вызовов в серии для пропускной способности')
+        parser.add_argument('--output', help='Записать результаты в JSON-файл')
+        parser.add_argument('--baseline', default=str(Path(settings.BASE_DIR) / 'var' / 'bench_kernels.json'),
+                            help='Файл базового замера')
+        parser.add_argument('--save-baseline', action='store_true', help='Сохранить результаты как базовый замер')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимое ухудшение относительно базового замера (0.2 — 20 %%)')
+        parser.add_argument('--json', action='store_true', help='Вывести результаты в JSON')
+
+    def handle(self, *args, **options):
+        names = options['kernel'] or list(KERNELS)
+        unknown = [name for name in names if name not in KERNELS]
+        if unknown:
+            raise CommandError(f'Неизвестные функции: {", ".join(unknown)}')
+
+        results = {}
+        for name in names:
+            func, arguments = KERNELS[name]
+            results[name] = bench_kernel(func, arguments, repeat=options['repeat'], batch=options['batch'])
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+
+        baseline_path = Path(options['baseline'])
+        regressions = []
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            stored = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else {}
+            baseline_path.write_text(json.dumps({**stored, **results}, ensure_ascii=False, indent=2),
+                                     encoding='utf-8')
+        elif baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+            regressions = compare_to_baseline(results, baseline, options['threshold'])
+
+        if options['json']:
+            self.stdout.write(json.dumps({'results': results, 'regressions': regressions},
+                                         ensure_ascii=False, indent=2))
+        else:
+            self.stdout.write(f'{"Функция":<30}{"p50, мкс":>10}{"p99, мкс":>10}{"Вызовов/с":>12}'
+                              f'{"Блоков":>8}{"Пик, КБ":>9}')
+            for name, item in results.items():
+                self.stdout.write(f'{name:<30}{item["p50_us"]:>10}{item["p99_us"]:>10}{item["throughput"]:>12}'
+                                  f'{item["allocations"]:>8}{item["peak_kb"]:>9}')
+            for item in regressions:
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️ {item["kernel"]}: {item["metric"]} {item["baseline"]} → {item["current"]} '
+                    f'({item["change"]:+} %)'
+                ))
+            if options['save_baseline']:
+                self.stdout.write(self.style.SUCCESS(f'\n✅ Базовый замер сохранен: {baseline_path}'))
+
+        if regressions:
+            raise CommandError(f'Регрессия относительно {baseline_path}: {len(regressions)}')
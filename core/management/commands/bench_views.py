@@ -0,0 +1,151 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from core.benchmarking import measure_view, query_growth
+from core.synthetic import generate
+from flotation.models import FlotationTest
+from molybdenum.models import LeachingTest, SorptionTest
+
+
+# Страницы, зависящие от объема опытов: (имя URL, модель для id детальной страницы)
+VIEWS = [
+    ('core:home', None),
+    ('flotation:dashboard', None),
+    ('flotation:tests', None),
+    ('flotation:analytics', None),
+    ('flotation:reagents', None),
+    ('flotation:test_detail', FlotationTest),
+    ('molybdenum:dashboard', None),
+    ('molybdenum:leaching_tests', None),
+    ('molybdenum:sorption_tests', None),
+    ('molybdenum:analytics', None),
+    ('molybdenum:leaching_kinetics', None),
+    ('molybdenum:leaching_test_detail', LeachingTest),
+    ('molybdenum:sorption_test_detail', SorptionTest),
+]
+
+# Прирост SQL-запросов на опыт, начиная с которого представление считается O(N)
+GROWTH_THRESHOLD = 0.01
+
+
+def view_path(name, model):
+    if model is None:
+        return reverse(name)
+    pk = model.objects.order_by('pk').values_list('pk', flat=True).first()
+    return reverse(name, args=[pk]) if pk is not None else None
+
+
+class Command(BaseCommand):
+    help = ('Таблица масштабирования страниц: на временной БД с 1k/10k/100k синтетических опытов '
+            'замеряет задержку, число SQL-запросов и пик памяти каждой страницы')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000', help='Опытов каждого процесса через запятую')
+        parser.add_argument('--view', action='append', default=[], help='Имя URL (можно указать несколько раз)')
+        parser.add_argument('--repeat', type=int, default=1, help='Запросов на замер (берется минимум)')
+        parser.add_argument('--budget', type=float, default=30,
+                            help='Страница дольше стольких секунд не замеряется на больших объемах')
+        parser.add_argument('--no-memory', action='store_true', help='Без замера пика памяти (tracemalloc)')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно генератора данных')
+        parser.add_argument('--output', help='Дописать прогон строкой JSON в файл (история замеров)')
+        parser.add_argument('--json', action='store_true', help='Вывести результаты в JSON')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options['sizes'].split(',') if size.strip()})
+        except ValueError:
+            raise CommandError('Размеры — целые числа через запятую')
+        views = [(name, model) for name, model in VIEWS if not options['view'] or name in options['view']]
+        unknown = set(options['view']) - {name for name, _model in VIEWS}
+        if unknown:
+            raise CommandError(f'Неизвестные страницы: {", ".join(sorted(unknown))}')
+
+        db = connections.settings['default']
+        original = {key: db.get(key) for key in ('NAME', 'CONN_MAX_AGE', 'OPTIONS')}
+        overrides = {'DEBUG': False, 'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+                     # Журнал медленных запросов и профили не засоряются замером
+                     'SLOW_QUERY_MS': 0, 'PROFILING_SAMPLE_RATE': 0}
+        saved = {key: getattr(settings, key, None) for key in overrides}
+        try:
+            for key, value in overrides.items():
+                setattr(settings, key, value)
+            with tempfile.TemporaryDirectory() as tmp:
+                connection.close()
+                db.update(NAME=str(Path(tmp) / 'scaling.sqlite3'), CONN_MAX_AGE=0)
+                call_command('migrate', run_syncdb=True, verbosity=0)
+                results = self.run(sizes, views, options)
+                connection.close()
+        finally:
+            db.update(original)
+            for key, value in saved.items():
+                setattr(settings, key, value)
+
+        for row in results:
+            row['query_growth'] = query_growth([(size, item['queries']) for size, item in row['sizes'].items()])
+            row['linear_queries'] = row['query_growth'] > GROWTH_THRESHOLD
+
+        if options['output']:
+            with open(options['output'], 'a', encoding='utf-8') as file:
+                file.write(json.dumps({'created': time.time(), 'sizes': sizes, 'views': results},
+                                      ensure_ascii=False) + '\n')
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+            return
+        self.write_table(results, sizes)
+
+    def run(self, sizes, views, options):
+        client = Client(raise_request_exception=False)
+        results = [{'view': name, 'sizes': {}} for name, _model in views]
+        skipped = set()
+        current = 0
+        for size in sizes:
+            started = time.perf_counter()
+            generate(flotation=size - current, leaching=size - current, sorption=size - current,
+                     seed=options['seed'] + size)
+            current = size
+            self.stderr.write(f'{size} опытов: данные за {time.perf_counter() - started:.1f} с')
+
+            for row, (name, model) in zip(results, views):
+                path = view_path(name, model)
+                if name in skipped or path is None:
+                    row['sizes'][size] = {'status': None, 'latency_ms': None, 'queries': None, 'peak_kb': None}
+                    continue
+                item = measure_view(client, path, options['repeat'], memory=not options['no_memory'])
+                row['sizes'][size] = item
+                if item['latency_ms'] > options['budget'] * 1000:
+                    skipped.add(name)
+        return results
+
+    def write_table(self, results, sizes):
+        header = f'{"Страница":<34}' + ''.join(f'{str(size) + " опытов":>30}' for size in sizes)
+        self.stdout.write(header)
+        self.stdout.write(f'{"":<34}' + ''.join(f'{"мс / запросов / КБ":>30}' for _size in sizes))
+        for row in results:
+            cells = []
+            for size in sizes:
+                item = row['sizes'][size]
+                if item['status'] is None:
+                    cells.append(f'{"пропущено":>30}')
+                    continue
+                peak = '—' if item['peak_kb'] is None else f'{item["peak_kb"]:.0f}'
+                error = f' [{item["status"]}]' if item['status'] >= 400 else ''
+                cell = f'{item["latency_ms"]:.1f} / {item["queries"]} / {peak}{error}'
+                cells.append(f'{cell:>30}')
+            line = f'{row["view"]:<34}' + ''.join(cells)
+            self.stdout.write(self.style.WARNING(line) if row['linear_queries'] else line)
+
+        linear = [row for row in results if row['linear_queries']]
+        if linear:
+            self.stdout.write(self.style.WARNING('\n⚠️ Число SQL-запросов растет с числом опытов (O(N)):'))
+            for row in linear:
+                self.stdout.write(self.style.WARNING(f'   {row["view"]}: +{row["query_growth"]} запроса на опыт'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Sensor
+from core.sensors import compact
+
+
+class Command(BaseCommand):
+    help = ('Слияние отложенных пакетов показаний в суточные блоки с пересчетом обзоров '
+            '(запускать по расписанию, например раз в минуту)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('sensors', nargs='*', help='Коды датчиков (по умолчанию все)')
+
+    def handle(self, *args, **options):
+        if not options['sensors']:
+            merged = compact()
+        else:
+            sensors = list(Sensor.objects.filter(code__in=options['sensors']))
+            unknown = set(options['sensors']) - {sensor.code for sensor in sensors}
+            if unknown:
+                raise CommandError(f'Неизвестные датчики: {", ".join(sorted(unknown))}')
+            merged = sum(compact(sensor) for sensor in sensors)
+        self.stdout.write(self.style.SUCCESS(f'✅ Слито пакетов: {merged}'))
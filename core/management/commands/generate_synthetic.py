@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.synthetic import generate
+from core.stats import rebuild
+from flotation.models import FlotationTest
+from molybdenum.models import LeachingTest, SorptionTest
+
+
+class Command(BaseCommand):
+    help = ('Добавляет синтетические опыты флотации, выщелачивания и сорбции (bulk_create) '
+            'для замеров масштабирования')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=0, help='Опытов каждого процесса')
+        parser.add_argument('--flotation', type=int, help='Опытов флотации (вместо --size)')
+        parser.add_argument('--leaching', type=int, help='Опытов выщелачивания (вместо --size)')
+        parser.add_argument('--sorption', type=int, help='Опытов сорбции (вместо --size)')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно генератора случайных чисел')
+        parser.add_argument('--clear', action='store_true', help='Удалить все опыты этих процессов перед генерацией')
+
+    def handle(self, *args, **options):
+        counts = {process: options[process] if options[process] is not None else options['size']
+                  for process in ('flotation', 'leaching', 'sorption')}
+        if any(count < 0 for count in counts.values()):
+            raise CommandError('Число опытов не может быть отрицательным')
+
+        if options['clear']:
+            for model in (SorptionTest, LeachingTest, FlotationTest):
+                model.objects.all().delete()
+            rebuild()
+
+        started = time.perf_counter()
+        created = generate(**counts, seed=options['seed'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Создано опытов: флотация {created["flotation"]}, выщелачивание {created["leaching"]}, '
+            f'сорбция {created["sorption"]} за {elapsed:.1f} с'
+        ))
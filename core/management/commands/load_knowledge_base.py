@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from core.knowledge import SOURCE_DIR, load_articles, reindex
+
+
+class Command(BaseCommand):
+    help = 'Загружает статьи базы знаний из HTML-файлов и перестраивает поисковый индекс'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=str(SOURCE_DIR), help='Каталог со статьями NN-slug.html')
+        parser.add_argument('--process', default='flotation', help='Процесс для новых статей')
+        parser.add_argument('--replace', action='store_true', help='Перезаписать существующие статьи')
+        parser.add_argument('--reindex', action='store_true', help='Только перестроить поисковый индекс')
+
+    def handle(self, *args, **options):
+        if not options['reindex']:
+            created_count, updated_count = load_articles(options['dir'], options['replace'], options['process'])
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Статей создано: {created_count}, обновлено: {updated_count}'
+            ))
+        reindex()
+        self.stdout.write(self.style.SUCCESS('✅ Поисковый индекс перестроен'))
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.urls import reverse
+
+from core.benchmarking import (
+    BENCH_HOST, _request_args, asgi_request, run_asgi_journeys, run_wsgi_journeys, step_outcome, wsgi_request,
+)
+from core.synthetic import ACID_TYPES, CONFIGURATIONS, flotation_inputs, generate, leaching_inputs, sorption_inputs
+from flotation.models import FlotationTest
+from molybdenum.models import LeachingTest, SorptionTest
+
+
+# Шаги сценариев: (имя, make(rng, ids)) → (метод, путь, данные JSON или None);
+# ids — id опытов временной БД по процессам
+def _get(name, query=None):
+    return lambda rng, ids: ('GET', reverse(name) + (f'?{urlencode(query(rng))}' if query else ''), None)
+
+
+def _detail(name, process):
+    return lambda rng, ids: ('GET', reverse(name, args=[rng.choice(ids[process])]), None)
+
+
+def _save(name, inputs):
+    return lambda rng, ids: ('POST', reverse(name), {**inputs(rng), 'save_test': True})
+
+
+JOURNEYS = {
+    # Просмотр результатов: дашборды, фильтры, карточки опытов, аналитика
+    'viewer': [
+        ('flotation:dashboard', _get('flotation:dashboard')),
+        ('flotation:tests', _get('flotation:tests', lambda rng: {
+            'min_extraction': rng.choice([0, 50, 80]),
+            'configuration': rng.choice(CONFIGURATIONS),
+        })),
+        ('flotation:test_detail', _detail('flotation:test_detail', 'flotation')),
+        ('flotation:analytics', _get('flotation:analytics')),
+        ('molybdenum:dashboard', _get('molybdenum:dashboard')),
+        ('molybdenum:leaching_tests', _get('molybdenum:leaching_tests',
+                                           lambda rng: {'acid_type': rng.choice(ACID_TYPES)})),
+        ('molybdenum:leaching_test_detail', _detail('molybdenum:leaching_test_detail', 'leaching')),
+    ],
+    # Лаборант: калькуляторы с сохранением опытов
+    'technician': [
+        ('flotation:calculator', _get('flotation:calculator')),
+        ('flotation:calculator [сохранение]', _save('flotation:calculator', flotation_inputs)),
+        ('molybdenum:leaching_calculator', _get('molybdenum:leaching_calculator')),
+        ('molybdenum:leaching_calculator [сохранение]', _save('molybdenum:leaching_calculator', leaching_inputs)),
+        ('molybdenum:sorption_calculator [сохранение]', _save('molybdenum:sorption_calculator', sorption_inputs)),
+        ('molybdenum:leaching_tests', _get('molybdenum:leaching_tests')),
+    ],
+}
+
+
+def parse_mix(value):
+    """'viewer=3,technician=1' → {'viewer': 3, 'technician': 1}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in JOURNEYS:
+            raise CommandError(f'Неизвестный сценарий: {name} (есть: {", ".join(JOURNEYS)})')
+        try:
+            mix[name] = int(weight or 1)
+        except ValueError:
+            raise CommandError(f'--mix: вес сценария {name} — целое число')
+    if not mix or min(mix.values()) < 0 or not sum(mix.values()):
+        raise CommandError('--mix: нужен хотя бы один сценарий с весом больше 0')
+    return mix
+
+
+def assign_journeys(mix, users):
+    """Сценарии пользователей в пропорции весов (каждый следующий — самый отстающий от своей доли)"""
+    total = sum(mix.values())
+    counts = dict.fromkeys(mix, 0)
+    names = []
+    for index in range(users):
+        name = max(mix, key=lambda item: mix[item] * (index + 1) / total - counts[item])
+        counts[name] += 1
+        names.append(name)
+    return names
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест сценариями пользователей: зрители и лаборанты проходят типовые сценарии '
+            'через WSGI/ASGI-обработчик Django без внешнего сервера, на временной БД с синтетическими '
+            'опытами; число пользователей растет ступенями')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi', help='Обработчик Django')
+        parser.add_argument('--users', default='1,4,16', help='Ступени числа пользователей через запятую')
+        parser.add_argument('--mix', default='viewer=3,technician=1', help='Сценарии и их веса')
+        parser.add_argument('--duration', type=float, default=10, help='Длительность ступени (с)')
+        parser.add_argument('--think', type=float, default=0, help='Средняя пауза пользователя между шагами (с)')
+        parser.add_argument('--size', type=int, default=1000, help='Синтетических опытов каждого процесса в БД')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно генераторов данных и пользователей')
+        parser.add_argument('--output', help='Записать результаты в JSON-файл (для сравнения версий)')
+        parser.add_argument('--json', action='store_true', help='Вывести результаты в JSON')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['users'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError('--users: ожидаются целые числа через запятую')
+        if not levels or min(levels) < 1 or options['duration'] <= 0:
+            raise CommandError('Число пользователей и длительность должны быть больше 0')
+        mix = parse_mix(options['mix'])
+
+        db = connections.settings['default']
+        original_name = db['NAME']
+        overrides = {'DEBUG': False, 'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, BENCH_HOST],
+                     # Журнал медленных запросов и профили не засоряются замером
+                     'SLOW_QUERY_MS': 0, 'PROFILING_SAMPLE_RATE': 0}
+        saved = {key: getattr(settings, key, None) for key in overrides}
+        try:
+            for key, value in overrides.items():
+                setattr(settings, key, value)
+            with tempfile.TemporaryDirectory() as tmp:
+                # Параметры соединения — как в работе (профиль БД), файл — временный
+                connection.close()
+                db['NAME'] = str(Path(tmp) / 'loadtest.sqlite3')
+                call_command('migrate', run_syncdb=True, verbosity=0)
+                generate(flotation=options['size'], leaching=options['size'], sorption=options['size'],
+                         seed=options['seed'])
+                results = self.run(levels, mix, options)
+                connection.close()
+        finally:
+            db['NAME'] = original_name
+            for key, value in saved.items():
+                setattr(settings, key, value)
+
+        report = {
+            'created': time.time(),
+            'server': options['server'],
+            'mix': mix,
+            'size': options['size'],
+            'duration': options['duration'],
+            'think': options['think'],
+            'levels': results,
+        }
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        self.write_table(results)
+
+    def run(self, levels, mix, options):
+        ids = {
+            'flotation': list(FlotationTest.objects.values_list('id', flat=True)),
+            'leaching': list(LeachingTest.objects.values_list('id', flat=True)),
+            'sorption': list(SorptionTest.objects.values_list('id', flat=True)),
+        }
+        journeys = {
+            name: [(step, lambda rng, make=make: make(rng, ids)) for step, make in steps]
+            for name, steps in JOURNEYS.items()
+        }
+        server = options['server']
+        handler = WSGIHandler() if server == 'wsgi' else ASGIHandler()
+
+        # Прогрев и проверка шагов
+        rng = random.Random(options['seed'])
+        for name in mix:
+            for step, make in journeys[name]:
+                request = _request_args(make, rng)
+                if server == 'wsgi':
+                    status, content = wsgi_request(handler, *request)
+                else:
+                    status, content = asyncio.run(asgi_request(handler, *request))
+                if not step_outcome(status, content)[0]:
+                    raise CommandError(f'{step}: {request[0]} {request[1]} — код ответа {status}')
+
+        results = []
+        for users in levels:
+            assigned = assign_journeys(mix, users)
+            user_journeys = [journeys[name] for name in assigned]
+            if server == 'wsgi':
+                result = run_wsgi_journeys(handler, user_journeys, options['duration'], options['think'],
+                                           options['seed'])
+            else:
+                result = asyncio.run(run_asgi_journeys(handler, user_journeys, options['duration'],
+                                                       options['think'], options['seed']))
+            results.append({'users': users, 'journey_users': {name: assigned.count(name) for name in mix},
+                            **result})
+            self.stderr.write(f'{users} польз.: {result["requests"]} запросов, {result["throughput"]} запр/с')
+        return results
+
+    def write_table(self, results):
+        self.stdout.write(f'{"Польз.":>7}{"Сценариев":>11}{"Запр/с":>9}{"p50, мс":>10}{"p90, мс":>10}'
+                          f'{"p99, мс":>10}{"Ошибки, %":>11}{"Блокировки":>12}')
+        for row in results:
+            line = (f'{row["users"]:>7}{row["journeys"]:>11}{row["throughput"]:>9}{row["p50"]:>10}{row["p90"]:>10}'
+                    f'{row["p99"]:>10}{row["error_rate"]:>11}{row["lock_errors"]:>12}')
+            self.stdout.write(self.style.WARNING(line) if row['errors'] else line)
+
+        last = results[-1]
+        self.stdout.write(f'\nШаги при {last["users"]} польз.:')
+        self.stdout.write(f'{"Шаг":<46}{"Запросов":>9}{"p50, мс":>10}{"p99, мс":>10}{"Ошибки, %":>11}{"Блокировки":>12}')
+        for step, item in last['steps'].items():
+            line = (f'{step:<46}{item["requests"]:>9}{item["p50"]:>10}{item["p99"]:>10}'
+                    f'{item["error_rate"]:>11}{item["lock_errors"]:>12}')
+            self.stdout.write(self.style.WARNING(line) if item['errors'] else line)
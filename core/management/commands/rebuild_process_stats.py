@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.stats import rebuild, SOURCES
+
+
+class Command(BaseCommand):
+    help = 'Пересчет сводной статистики процессов с нуля (исправление расхождений)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('processes', nargs='*', help=f'Процессы (по умолчанию все: {", ".join(SOURCES)})')
+
+    def handle(self, *args, **options):
+        unknown = [process for process in options['processes'] if process not in SOURCES]
+        if unknown:
+            raise CommandError(f'Неизвестные процессы: {", ".join(unknown)}')
+
+        report = rebuild(options['processes'] or None)
+
+        self.stdout.write(f'\n{"Процесс":<12}{"Было":>28}{"Стало":>28}')
+        drift = 0
+        for process, row in report.items():
+            changed = row['before'] != row['after']
+            drift += changed
+            line = f'{process:<12}{self._format(row["before"]):>28}{self._format(row["after"]):>28}'
+            self.stdout.write(self.style.WARNING(line) if changed else line)
+
+        if drift:
+            self.stdout.write(self.style.WARNING(f'\n⚠️ Исправлено расхождений: {drift}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\n✅ Расхождений нет'))
+
+    @staticmethod
+    def _format(values):
+        count, total, best = values
+        return f'{count} / {total:.2f} / {"—" if best is None else f"{best:.2f}"}'
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.slowlog import REPORT_LIMIT, clear_log, log_path, slow_query_report
+
+
+class Command(BaseCommand):
+    help = 'Топ медленных SQL-запросов из журнала core.slowlog с планами выполнения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=REPORT_LIMIT, help='Число запросов в отчете')
+        parser.add_argument('--json', action='store_true', help='Вывести отчет в JSON')
+        parser.add_argument('--clear', action='store_true', help='Очистить журнал после вывода отчета')
+
+    def handle(self, *args, **options):
+        report = slow_query_report(options['limit'])
+        if options['json']:
+            for group in report:
+                group.pop('last_seen_at')
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        elif not report:
+            self.stdout.write(f'Журнал медленных запросов пуст ({log_path()})')
+        else:
+            for number, group in enumerate(report, 1):
+                title = (f'{number}. [{group["fingerprint"]}] {group["count"]} раз, всего {group["total_ms"]} мс, '
+                         f'среднее {group["avg_ms"]} мс, максимум {group["max_ms"]} мс')
+                self.stdout.write(self.style.WARNING(title) if group['full_scans'] else title)
+                self.stdout.write(f'   {group["sql"]}')
+                for detail in group['plan'] or ():
+                    self.stdout.write(f'   план: {detail}')
+                if group['full_scans']:
+                    self.stdout.write(self.style.WARNING(f'   ⚠️ полный проход: {", ".join(group["full_scans"])}'))
+                for place, count in group['origins']:
+                    self.stdout.write(f'   откуда: {place or "—"} ({count})')
+                self.stdout.write('')
+
+        if options['clear']:
+            clear_log()
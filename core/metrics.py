@@ -0,0 +1,358 @@
+"""
+Метрики приложения в формате Prometheus без внешних зависимостей
+
+Счетчики и гистограммы пишутся в шард текущего потока (threading.local):
+запись не берет общих блокировок, а при выдаче /metrics шарды
+суммируются. Шарды завершившихся потоков сливаются в общий итог, чтобы
+их число не росло у серверов с потоком на запрос. Датчики (gauge) либо
+устанавливаются под блокировкой, либо вычисляются функцией при выдаче.
+
+Источники:
+    MetricsMiddleware    — число, длительность и SQL-запросы каждого
+                           запроса по имени URL (flotation:dashboard, ...)
+    sql_wrapper          — все SQL-запросы (на каждом соединении)
+    @track_calculation   — длительность и ошибки функций расчета
+    record_cache         — попадания в кэши страниц, расчетов, отчетов
+    датчики при выдаче   — доля попаданий кэшей, размеры таблиц опытов
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SQL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+# === МЕТРИКИ ===
+
+class _ShardedMetric:
+    """Основа счетчика и гистограммы: значения по меткам в шардах потоков"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labels)
+        self._local = threading.local()
+        self._shards = []  # (поток, {метки: значение})
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name}: ожидаются метки {", ".join(self.labelnames) or "—"}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _merge(self, target, key, value):
+        raise NotImplementedError
+
+    def collect(self):
+        """Сумма по всем шардам: {метки: значение}"""
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if not thread.is_alive():
+                    for key, value in dict(shard).items():
+                        self._merge(self._retired, key, value)
+                else:
+                    alive.append((thread, shard))
+            self._shards = alive
+            merged = {}
+            for key, value in self._retired.items():
+                self._merge(merged, key, value)
+            for _thread, shard in alive:
+                for key, value in dict(shard).items():
+                    self._merge(merged, key, value)
+        return merged
+
+    def value(self, **labels):
+        return self.collect().get(self._key(labels))
+
+
+class Counter(_ShardedMetric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _merge(self, target, key, value):
+        target[key] = target.get(key, 0) + value
+
+    def render(self):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in sorted(self.collect().items())]
+
+
+class Histogram(_ShardedMetric):
+    """Гистограмма с фиксированными границами; значение шарда — [по корзинам..., +Inf, сумма, число]"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0] * (len(self.buckets) + 3)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    def _merge(self, target, key, value):
+        current = target.get(key)
+        target[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+
+    def render(self):
+        lines = []
+        for key, values in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", _format_value(bound))])} '
+                             f'{cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(values[-2])}')
+            lines.append(f'{self.name}_count{labels} {values[-1]}')
+        return lines
+
+
+class Gauge:
+    """Датчик: set/inc под блокировкой или callback() -> {метки (tuple): значение} при выдаче"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labels)
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[tuple(str(labels[name]) for name in self.labelnames)] = value
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        if self.callback is not None:
+            return self.callback()
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in sorted(self.collect().items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Метрика {metric.name} уже зарегистрирована')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self, name, documentation, labels=(), callback=None):
+        return self.register(Gauge(name, documentation, labels, callback))
+
+    def render(self):
+        """Текстовый формат Prometheus 0.0.4"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+# === МЕТРИКИ ПРИЛОЖЕНИЯ ===
+
+REQUESTS = REGISTRY.counter('lab_http_requests_total', 'HTTP-запросы', ['view', 'method', 'status'])
+REQUEST_DURATION = REGISTRY.histogram('lab_http_request_duration_seconds', 'Длительность запроса', ['view'])
+REQUEST_QUERIES = REGISTRY.histogram('lab_http_request_queries', 'SQL-запросов на HTTP-запрос', ['view'],
+                                     buckets=QUERY_BUCKETS)
+DB_QUERIES = REGISTRY.counter('lab_db_queries_total', 'SQL-запросы', ['alias'])
+DB_QUERY_DURATION = REGISTRY.histogram('lab_db_query_duration_seconds', 'Длительность SQL-запроса',
+                                       buckets=SQL_BUCKETS)
+CALCULATION_DURATION = REGISTRY.histogram('lab_calculation_duration_seconds', 'Длительность расчета',
+                                          ['function'])
+CALCULATION_ERRORS = REGISTRY.counter('lab_calculation_errors_total', 'Расчеты, завершившиеся ошибкой',
+                                      ['function'])
+CACHE_REQUESTS = REGISTRY.counter('lab_cache_requests_total', 'Обращения к кэшам', ['cache', 'result'])
+
+_request_queries = ContextVar('metrics_request_queries', default=None)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def track_calculation(func):
+    """Декоратор: длительность и ошибки функции расчета по ее имени"""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            CALCULATION_ERRORS.inc(function=name)
+            raise
+        finally:
+            CALCULATION_DURATION.observe(time.perf_counter() - started, function=name)
+    return wrapper
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """Обертка connection.execute_wrapper: счетчик и длительность SQL-запросов"""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        DB_QUERY_DURATION.observe(time.perf_counter() - started)
+        DB_QUERIES.inc(alias=context['connection'].alias)
+        counter = _request_queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+def install_sql_wrapper(sender=None, connection=None, **kwargs):
+    """Обработчик connection_created: обертка ставится на соединение один раз"""
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+def _cache_hit_ratio():
+    """Доля попаданий: кэши с учетом в record_cache и lru_cache расчетов"""
+    from antimony.equilibrium import _solve_cached
+    from core.knowledge import stem
+
+    totals = {}
+    for (cache, result), count in CACHE_REQUESTS.collect().items():
+        hits, total = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (count if result == 'hit' else 0), total + count)
+    for cache, func in (('equilibrium', _solve_cached), ('stems', stem)):
+        info = func.cache_info()
+        totals[cache] = (info.hits, info.hits + info.misses)
+    return {(cache,): hits / total for cache, (hits, total) in totals.items() if total}
+
+
+def _table_rows():
+    """Число строк таблиц опытов и расчетов"""
+    from django.apps import apps
+
+    models = [
+        'flotation.FlotationTest', 'flotation.FlotationProduct', 'flotation.Reagent',
+        'molybdenum.LeachingTest', 'molybdenum.LeachingProduct', 'molybdenum.SorptionTest',
+        'antimony.SmeltingRun', 'antimony.SmeltingMeasurement',
+        'core.ReportJob', 'core.Article', 'core.SensorChunk', 'core.SensorBatch',
+    ]
+    return {(model._meta.db_table,): model.objects.count() for model in map(apps.get_model, models)}
+
+
+REGISTRY.gauge('lab_cache_hit_ratio', 'Доля попаданий в кэш', ['cache'], callback=_cache_hit_ratio)
+REGISTRY.gauge('lab_table_rows', 'Строк в таблице', ['table'], callback=_table_rows)
+
+
+# === MIDDLEWARE ===
+
+class MetricsMiddleware:
+    """Число, длительность и SQL-запросы каждого запроса по имени URL"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started, queries, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.finish(request, response, started, queries)
+        return response
+
+    async def __acall__(self, request):
+        started, queries, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.finish(request, response, started, queries)
+        return response
+
+    def start(self):
+        queries = [0]
+        return time.perf_counter(), queries, _request_queries.set(queries)
+
+    def finish(self, request, response, started, queries):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unmatched'
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        REQUEST_DURATION.observe(time.perf_counter() - started, view=view)
+        REQUEST_QUERIES.observe(queries[0], view=view)
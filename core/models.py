@@ -1 +1,203 @@
-from django.db import models
\ No newline at end of file
+from django.db import models
+
+
+class Sensor(models.Model):
+    """Датчик мониторинга медных отвалов (pH, концентрации, расход)"""
+
+    QUANTITY_CHOICES = [
+        ('ph', 'pH'),
+        ('cu', 'Cu (г/л)'),
+        ('fe', 'Fe (г/л)'),
+        ('h2so4', 'H₂SO₄ (г/л)'),
+        ('eh', 'ОВП (мВ)'),
+        ('temperature', 'Температура (°C)'),
+        ('flow', 'Расход (л/ч)'),
+    ]
+
+    code = models.SlugField('Код датчика', max_length=50, unique=True)
+    name = models.CharField('Название', max_length=200, blank=True)
+    quantity = models.CharField('Измеряемая величина', max_length=20, choices=QUANTITY_CHOICES, default='ph')
+    location = models.CharField('Место установки', max_length=200, blank=True)
+    last_reading_at = models.DateTimeField('Последнее показание', null=True, blank=True)
+    created_at = models.DateTimeField('Дата добавления', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Датчик'
+        verbose_name_plural = 'Датчики'
+        ordering = ['code']
+
+    def __str__(self):
+        return self.name or self.code
+
+
+class SensorChunk(models.Model):
+    """
+    Показания датчика за сутки (UTC) в виде упакованных массивов
+
+    times — миллисекунды от начала суток (int32), values — значения
+    (float32); overview_* — те же сутки, прореженные LTTB до
+    OVERVIEW_POINTS точек для запросов по длинным интервалам.
+    """
+
+    sensor = models.ForeignKey(Sensor, on_delete=models.CASCADE, related_name='chunks', verbose_name='Датчик')
+    day = models.DateField('Сутки')
+    count = models.PositiveIntegerField('Показаний', default=0)
+    min_value = models.FloatField('Минимум', null=True)
+    max_value = models.FloatField('Максимум', null=True)
+    # Обзор — перед сырыми массивами: SQLite читает столбцы строки по порядку,
+    # и чтение обзора не проходит по страницам переполнения сырых данных
+    overview_times = models.BinaryField('Время (обзор)')
+    overview_values = models.BinaryField('Значения (обзор)')
+    times = models.BinaryField('Время (мс от начала суток)')
+    values = models.BinaryField('Значения')
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Показания за сутки'
+        verbose_name_plural = 'Показания за сутки'
+        ordering = ['sensor', 'day']
+        unique_together = [('sensor', 'day')]
+
+    def __str__(self):
+        return f"{self.sensor} — {self.day} ({self.count})"
+
+
+class SensorBatch(models.Model):
+    """
+    Пакет показаний датчика за сутки, еще не слитый в SensorChunk
+
+    Запись только добавляет строку; слияние с суточным блоком и пересчет
+    обзора — при чтении этих суток или командой compact_sensors.
+    """
+
+    sensor = models.ForeignKey(Sensor, on_delete=models.CASCADE, related_name='batches', verbose_name='Датчик')
+    day = models.DateField('Сутки')
+    count = models.PositiveIntegerField('Показаний')
+    times = models.BinaryField('Время (мс от начала суток)')
+    values = models.BinaryField('Значения')
+    created_at = models.DateTimeField('Записан', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Пакет показаний'
+        verbose_name_plural = 'Пакеты показаний'
+        ordering = ['sensor', 'day', 'id']
+        indexes = [models.Index(fields=['sensor', 'day'])]
+
+    def __str__(self):
+        return f"{self.sensor} — {self.day} ({self.count})"
+
+
+class ProcessStats(models.Model):
+    """
+    Сводные показатели процесса для главной страницы
+
+    Поддерживаются сигналами при сохранении и удалении опытов (см.
+    core/stats.py); пересчет с нуля — команда rebuild_process_stats.
+    version растет при любом изменении объектов процесса (ключ кэша отчетов).
+    """
+
+    process = models.CharField('Процесс', max_length=50, unique=True)
+    count = models.PositiveIntegerField('Количество', default=0)
+    total = models.FloatField('Сумма показателя', default=0)
+    valued_count = models.PositiveIntegerField('Количество с показателем', default=0)
+    best_value = models.FloatField('Лучшее значение', null=True, blank=True)
+    best_id = models.BigIntegerField('ID лучшего объекта', null=True, blank=True)
+    version = models.PositiveBigIntegerField('Версия данных', default=0)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Сводка процесса'
+        verbose_name_plural = 'Сводки процессов'
+        ordering = ['process']
+
+    def __str__(self):
+        return f"{self.process}: {self.count}"
+
+    @property
+    def average(self):
+        """Среднее значение показателя"""
+        return self.total / self.valued_count if self.valued_count else None
+
+
+class ProcessStatsEntry(models.Model):
+    """Текущий вклад объекта в сводку процесса (для дельт и лучшего значения)"""
+
+    process = models.CharField('Процесс', max_length=50)
+    object_id = models.BigIntegerField('ID объекта')
+    value = models.FloatField('Значение', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Вклад в сводку'
+        verbose_name_plural = 'Вклады в сводку'
+        unique_together = [('process', 'object_id')]
+        indexes = [models.Index(fields=['process', 'value'])]
+
+    def __str__(self):
+        return f"{self.process} #{self.object_id}: {self.value}"
+
+
+class ReportJob(models.Model):
+    """Задание на построение отчета (выполняется в фоновом пуле, см. core/reports.py)"""
+
+    KIND_CHOICES = [
+        ('summary', 'Сводный отчет лаборатории'),
+        ('flotation', 'Флотация: рейтинг конфигураций'),
+        ('molybdenum', 'Молибден: выщелачивание и сорбция'),
+        ('antimony', 'Сурьма: расчеты плавки'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Готов'),
+        ('failed', 'Ошибка'),
+    ]
+
+    kind = models.CharField('Отчет', max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField('Параметры', default=dict)
+    cache_key = models.CharField('Ключ кэша', max_length=64, db_index=True)
+    status = models.CharField('Статус', max_length=10, choices=STATUS_CHOICES, default='pending')
+    progress = models.PositiveSmallIntegerField('Готовность (%)', default=0)
+    stage = models.CharField('Этап', max_length=200, blank=True)
+    html = models.TextField('HTML отчета', blank=True)
+    error = models.TextField('Ошибка', blank=True)
+    created_at = models.DateTimeField('Создан', auto_now_add=True)
+    started_at = models.DateTimeField('Начат', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершен', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Отчет'
+        verbose_name_plural = 'Отчеты'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} №{self.pk} ({self.get_status_display()})"
+
+
+class Article(models.Model):
+    """Статья базы знаний (полнотекстовый индекс и кэш страниц — core/knowledge.py)"""
+
+    PROCESS_CHOICES = [
+        ('general', 'Общие вопросы'),
+        ('flotation', 'Флотация'),
+        ('copper', 'Медь'),
+        ('molybdenum', 'Молибден'),
+        ('antimony', 'Сурьма'),
+    ]
+
+    slug = models.SlugField('Адрес', max_length=100, unique=True)
+    title = models.CharField('Заголовок', max_length=200)
+    process = models.CharField('Процесс', max_length=20, choices=PROCESS_CHOICES, default='general')
+    summary = models.TextField('Аннотация', blank=True)
+    body = models.TextField('Текст (HTML)')
+    order = models.PositiveIntegerField('Порядок', default=0)
+    is_published = models.BooleanField('Опубликована', default=True)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    updated_at = models.DateTimeField('Обновлена', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Статья базы знаний'
+        verbose_name_plural = 'Статьи базы знаний'
+        ordering = ['order', 'title']
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,316 @@
+"""
+Профилирование запросов по требованию
+
+ProfilingMiddleware профилирует запрос, если сотрудник (is_staff) добавил
+к адресу ?_profile=1, или случайно — с долей PROFILING_SAMPLE_RATE.
+Режимы:
+
+    cprofile  — детерминированный cProfile потока запроса; результат —
+                файл pstats (.prof: snakeviz, python -m pstats)
+    sample    — статистический сэмплер стеков всех потоков процесса
+                (sys._current_frames) с шагом PROFILE_SAMPLE_INTERVAL;
+                результат — свернутые стеки (.folded: flamegraph.pl,
+                speedscope). Подходит для асинхронных представлений,
+                где работа идет в пулах потоков; стеки параллельных
+                запросов тоже попадают в профиль.
+
+?_profile=1 выбирает режим по представлению (async — sample), можно явно
+указать ?_profile=cprofile или ?_profile=sample.
+
+Профили хранятся в PROFILE_DIR кольцевым буфером: не больше PROFILE_KEEP
+последних, рядом — JSON с адресом, длительностью и самыми горячими
+функциями (всеми — по собственному времени, кода проекта — по полному)
+для страницы в админке.
+"""
+
+import cProfile
+import functools
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+
+MODES = {'cprofile': '.prof', 'sample': '.folded'}
+TOP_FUNCTIONS = 15
+PROFILE_ID = re.compile(r'^\d+-\d+$')
+
+_lock = threading.Lock()
+_counter = 0
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILE_DIR', Path(settings.BASE_DIR) / 'var' / 'profiles'))
+
+
+@functools.lru_cache(maxsize=4096)
+def _describe(filename, lineno, function):
+    """
+    Короткое имя функции и признак кода проекта
+
+    Returns:
+        tuple: ('путь:строка(имя)', код проекта) — путь относительно
+            проекта, для библиотек и стандартной библиотеки только имя файла
+    """
+    base = f'{settings.BASE_DIR}{os.sep}'
+    project = filename.startswith(base) and 'site-packages' not in filename
+    filename = filename[len(base):] if project else os.path.basename(filename)
+    return f'{filename}:{lineno}({function})', project
+
+
+# Листовые кадры ожидания: такие стеки сэмплер не учитывает
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+}
+
+
+# === СБОР ПРОФИЛЯ ===
+
+class StackSampler:
+    """Статистический сэмплер: свернутые стеки всех занятых потоков, кроме своего"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.project = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                code = frame.f_code
+                if ident == own or (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label, project = _describe(code.co_filename, code.co_firstlineno, code.co_name)
+                    if project:
+                        self.project.add(label)
+                    stack.append(label)
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        """Формат свернутых стеков: 'корень;...;лист число' построчно"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def summary(self, limit=TOP_FUNCTIONS):
+        """
+        Горячие функции по числу сэмплов
+
+        Returns:
+            tuple: (top — все функции по собственному времени,
+                hot — функции проекта по полному времени)
+        """
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        step = self.interval * 1000
+
+        def row(name):
+            return {'function': name, 'calls': None, 'self_ms': round(own[name] * step, 2),
+                    'total_ms': round(total[name] * step, 2)}
+
+        top = [row(name) for name, _count in own.most_common(limit)]
+        hot = [row(name) for name, _count in total.most_common() if name in self.project][:limit]
+        return top, hot
+
+
+def cprofile_summary(profile, limit=TOP_FUNCTIONS):
+    """Горячие функции cProfile: (все по собственному времени, проекта по полному)"""
+    rows = []
+    for func, (_primitive, calls, tottime, cumtime, _callers) in pstats.Stats(profile).stats.items():
+        label, project = _describe(*func)
+        rows.append(({'function': label, 'calls': calls, 'self_ms': round(tottime * 1000, 2),
+                      'total_ms': round(cumtime * 1000, 2)}, project))
+    top = sorted((row for row, _project in rows), key=lambda row: row['self_ms'], reverse=True)[:limit]
+    hot = sorted((row for row, project in rows if project), key=lambda row: row['total_ms'], reverse=True)[:limit]
+    return top, hot
+
+
+# === КОЛЬЦЕВОЙ БУФЕР ===
+
+def save_profile(meta, write):
+    """
+    Сохранение профиля в кольцевой буфер
+
+    Args:
+        meta (dict): описание (mode, path, duration_ms, top, ...)
+        write (callable): write(path) записывает данные профиля
+
+    Returns:
+        str: идентификатор профиля
+    """
+    global _counter
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        _counter += 1
+        profile_id = f'{time.time_ns()}-{_counter}'
+    data_path = directory / f'{profile_id}{MODES[meta["mode"]]}'
+    write(data_path)
+    meta = {**meta, 'id': profile_id, 'file': data_path.name, 'size': data_path.stat().st_size}
+    (directory / f'{profile_id}.json').write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+    _trim(directory)
+    return profile_id
+
+
+def _trim(directory):
+    keep = getattr(settings, 'PROFILE_KEEP', 50)
+    with _lock:
+        for meta_path in _meta_paths(directory)[keep:]:
+            for path in directory.glob(f'{meta_path.stem}.*'):
+                path.unlink(missing_ok=True)
+
+
+def _meta_paths(directory):
+    """Описания профилей, новые первыми"""
+    paths = [path for path in directory.glob('*.json') if PROFILE_ID.match(path.stem)]
+    return sorted(paths, key=lambda path: tuple(int(part) for part in path.stem.split('-')), reverse=True)
+
+
+def list_profiles():
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    profiles = []
+    for path in _meta_paths(directory):
+        try:
+            profile = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            # Профиль удален параллельной очисткой
+            continue
+        profile['created_at'] = datetime.fromtimestamp(profile['created'], tz=timezone.utc)
+        profiles.append(profile)
+    return profiles
+
+
+def profile_file(profile_id):
+    """Путь к данным профиля или None (в том числе для недопустимого id)"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    for suffix in MODES.values():
+        path = profile_dir() / f'{profile_id}{suffix}'
+        if path.exists():
+            return path
+    return None
+
+
+# === MIDDLEWARE ===
+
+class ProfilingMiddleware:
+    """Профиль запроса по ?_profile=1 (сотрудники) или с долей PROFILING_SAMPLE_RATE"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Пользователь (запрос к сессии) нужен только при ?_profile
+        user = getattr(request, 'user', None) if '_profile' in request.GET else None
+        mode = self.requested_mode(request, user is not None and user.is_staff)
+        if mode is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            collector = cProfile.Profile()
+            response = collector.runcall(self.get_response, request)
+        else:
+            collector = self.start_sampler()
+            try:
+                response = self.get_response(request)
+            finally:
+                collector.stop()
+        return self.finish(request, response, mode, started, collector, user)
+
+    async def __acall__(self, request):
+        user = await request.auser() if '_profile' in request.GET and hasattr(request, 'auser') else None
+        mode = self.requested_mode(request, user is not None and user.is_staff)
+        if mode is None:
+            return await self.get_response(request)
+        # В цикле событий cProfile видит только корутины — профиль всех потоков
+        collector = self.start_sampler()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            collector.stop()
+        return self.finish(request, response, 'sample', started, collector, user)
+
+    def requested_mode(self, request, is_staff):
+        """Режим профилирования запроса или None"""
+        requested = request.GET.get('_profile')
+        if requested and is_staff:
+            return requested if requested in MODES else self.default_mode(request)
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        if rate > 0 and random.random() < rate:
+            return self.default_mode(request)
+        return None
+
+    def default_mode(self, request):
+        try:
+            view = resolve(request.path_info).func
+        except Resolver404:
+            return 'cprofile'
+        return 'sample' if iscoroutinefunction(view) else 'cprofile'
+
+    def start_sampler(self):
+        sampler = StackSampler(getattr(settings, 'PROFILE_SAMPLE_INTERVAL', 0.005))
+        sampler.start()
+        return sampler
+
+    def finish(self, request, response, mode, started, collector, user):
+        meta = {
+            'mode': mode,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user': user.get_username() if user is not None and user.is_authenticated else '',
+            'created': time.time(),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+        if mode == 'cprofile':
+            meta['top'], meta['hot'] = cprofile_summary(collector)
+            profile_id = save_profile(meta, lambda path: collector.dump_stats(str(path)))
+        else:
+            meta['samples'] = collector.samples
+            meta['top'], meta['hot'] = collector.summary()
+            profile_id = save_profile(meta, lambda path: path.write_text(collector.folded(), encoding='utf-8'))
+        response['X-Profile-Id'] = profile_id
+        return response
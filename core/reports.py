@@ -0,0 +1,319 @@
+"""
+Построение отчетов лаборатории в фоновом пуле
+
+Задание (ReportJob) создается запросом и выполняется в пуле потоков
+процесса; страница опрашивает статус и скачивает готовый HTML (или PDF,
+если установлен WeasyPrint). Ключ кэша — хеш вида отчета, параметров,
+REPORT_VERSION и версий данных (ProcessStats.version, последний набор
+коэффициентов и фактические замеры плавок): пока данные не менялись, готовый
+отчет с тем же ключом отдается сразу, без нового задания.
+
+Задание, зависшее дольше STALE_AFTER (процесс перезапущен во время
+построения), считается потерянным и ставится заново.
+"""
+
+import datetime
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Max
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import ReportJob
+from .stats import SOURCES, data_versions
+
+
+REPORT_VERSION = 1             # Меняется при изменении содержания отчетов
+REPORT_WORKERS = 2
+STALE_AFTER = 600              # с
+RETENTION_DAYS = 30
+
+KINDS = dict(ReportJob.KIND_CHOICES)
+KIND_SECTIONS = {
+    'summary': ('flotation', 'leaching', 'sorption', 'smelting'),
+    'flotation': ('flotation',),
+    'molybdenum': ('leaching', 'sorption'),
+    'antimony': ('smelting',),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# === РАЗДЕЛЫ ===
+
+def _date_filter(queryset, field, params):
+    if params.get('date_from'):
+        queryset = queryset.filter(**{f'{field}__gte': params['date_from']})
+    if params.get('date_to'):
+        queryset = queryset.filter(**{f'{field}__lte': params['date_to']})
+    return queryset
+
+
+def _group_rows(items, key, value):
+    """Группировка: [{'group', 'count', 'average', 'best', 'best_item'}] по убыванию среднего"""
+    groups = defaultdict(list)
+    for item in items:
+        groups[key(item)].append(item)
+    rows = []
+    for group, members in groups.items():
+        values = [value(member) for member in members if value(member) is not None]
+        best = max(members, key=lambda member: value(member) if value(member) is not None else float('-inf'))
+        rows.append({
+            'group': group,
+            'count': len(members),
+            'average': sum(values) / len(values) if values else None,
+            'best': value(best),
+            'best_item': best,
+        })
+    return sorted(rows, key=lambda row: row['average'] if row['average'] is not None else float('-inf'), reverse=True)
+
+
+def flotation_section(params):
+    """Рейтинг конфигураций флотации по среднему извлечению"""
+    from flotation.models import FlotationTest
+
+    queryset = _date_filter(FlotationTest.objects.all(), 'date_conducted', params)
+    extraction = SOURCES['flotation'].values(queryset)
+    tests = [
+        {'number': number, 'configuration': configuration or 'Без конфигурации',
+         'microflotation': micro, 'extraction': extraction.get(pk)}
+        for pk, number, configuration, micro in
+        queryset.values_list('pk', 'number', 'configuration', 'is_microflotation')
+    ]
+    return {
+        'title': 'Флотация: рейтинг конфигураций',
+        'count': len(tests),
+        'columns': ('Конфигурация', 'Тестов', 'Среднее извлечение, %', 'Лучшее, %', 'Лучший тест'),
+        'rows': [
+            (row['group'], row['count'], row['average'], row['best'], f"№{row['best_item']['number']}")
+            for row in _group_rows(tests, lambda test: test['configuration'], lambda test: test['extraction'])
+        ],
+    }
+
+
+def leaching_section(params):
+    """Выщелачивание молибденита по типу кислоты и продувке кислородом"""
+    from molybdenum.models import LeachingTest
+
+    queryset = _date_filter(LeachingTest.objects.all(), 'date_conducted', params)
+    extraction = SOURCES['leaching'].values(queryset)
+    acids = dict(LeachingTest.ACID_CHOICES)
+    tests = [
+        {'number': number, 'mode': f"{acids.get(acid, acid)}{' + O₂' if oxygen else ''}",
+         'extraction': extraction.get(pk)}
+        for pk, number, acid, oxygen in queryset.values_list('pk', 'number', 'acid_type', 'has_oxygen')
+    ]
+    return {
+        'title': 'Выщелачивание молибденита',
+        'count': len(tests),
+        'columns': ('Режим', 'Опытов', 'Среднее извлечение Mo в раствор, %', 'Лучшее, %', 'Лучший опыт'),
+        'rows': [
+            (row['group'], row['count'], row['average'], row['best'], f"№{row['best_item']['number']}")
+            for row in _group_rows(tests, lambda test: test['mode'], lambda test: test['extraction'])
+        ],
+    }
+
+
+def sorption_section(params):
+    """Сорбция молибдена по типу анионита"""
+    from molybdenum.models import SorptionTest
+
+    queryset = _date_filter(SorptionTest.objects.all(), 'date_conducted', params)
+    anionites = dict(SorptionTest.ANIONITE_CHOICES)
+    tests = [
+        {'number': number, 'anionite': anionites.get(anionite, anionite),
+         'extraction': extraction, 'capacity': capacity}
+        for number, anionite, extraction, capacity in
+        queryset.values_list('number', 'anionite_type', 'mo_extraction', 'sorption_capacity')
+    ]
+    rows = []
+    for row in _group_rows(tests, lambda test: test['anionite'], lambda test: test['extraction']):
+        members = [test for test in tests if test['anionite'] == row['group']]
+        capacity = sum(test['capacity'] for test in members) / len(members) * 1000
+        rows.append((row['group'], row['count'], row['average'], row['best'], capacity,
+                     f"№{row['best_item']['number']}"))
+    return {
+        'title': 'Сорбция молибдена',
+        'count': len(tests),
+        'columns': ('Анионит', 'Опытов', 'Среднее извлечение Mo, %', 'Лучшее, %',
+                    'Средняя емкость, мг-атом/г', 'Лучший опыт'),
+        'rows': rows,
+    }
+
+
+def smelting_section(params):
+    """Расчеты восстановительной плавки по режиму и восстановителю"""
+    from antimony.models import SmeltingRun, CalibrationPoint, CoefficientSet
+
+    queryset = _date_filter(SmeltingRun.objects.all(), 'created_at__date', params)
+    extraction = SOURCES['smelting'].values(queryset)
+    modes = {'empirical': 'эмпирический', 'equilibrium': 'равновесный'}
+    reducers = dict(CalibrationPoint.REDUCER_CHOICES)
+    runs = [
+        {'pk': pk,
+         'mode': f"{modes.get(inputs.get('mode'), 'эмпирический')}, {reducers.get(inputs.get('reducer_type'), '—')}",
+         'extraction': extraction.get(pk), 'measured': measured}
+        for pk, inputs, measured in queryset.values_list('pk', 'inputs', 'measurements')
+    ]
+    # values_list по обратной связи дает строку на каждый замер — оставляем по одной на расчет
+    unique_runs = list({run['pk']: run for run in runs}.values())
+    measured = len({run['pk'] for run in runs if run['measured'] is not None})
+    latest = CoefficientSet.objects.values_list('version', flat=True).first()
+    return {
+        'title': 'Плавка антимоната натрия',
+        'count': len(unique_runs),
+        'note': f"Расчетов с фактическими замерами: {measured}; коэффициенты модели: v{latest or 0}",
+        'columns': ('Режим, восстановитель', 'Расчетов', 'Среднее извлечение Sb, %', 'Лучшее, %', 'Лучший расчет'),
+        'rows': [
+            (row['group'], row['count'], row['average'], row['best'], f"№{row['best_item']['pk']}")
+            for row in _group_rows(unique_runs, lambda run: run['mode'], lambda run: run['extraction'])
+        ],
+    }
+
+
+SECTIONS = {
+    'flotation': flotation_section,
+    'leaching': leaching_section,
+    'sorption': sorption_section,
+    'smelting': smelting_section,
+}
+
+
+# === ЗАДАНИЯ ===
+
+def normalize_params(kind, params):
+    """Проверка вида отчета и параметров (даты ISO: date_from, date_to)"""
+    if kind not in KINDS:
+        raise ValueError(f'Неизвестный отчет: {kind}')
+    normalized = {}
+    for key in ('date_from', 'date_to'):
+        if params.get(key):
+            normalized[key] = datetime.date.fromisoformat(params[key]).isoformat()
+    if normalized.get('date_from') and normalized.get('date_to') and normalized['date_from'] > normalized['date_to']:
+        raise ValueError('Начало периода позже конца')
+    return normalized
+
+
+def cache_key(kind, params):
+    """Ключ кэша: вид отчета, параметры и версии данных"""
+    from antimony.models import CoefficientSet, SmeltingMeasurement
+
+    payload = {
+        'kind': kind,
+        'params': params,
+        'report_version': REPORT_VERSION,
+        'data': data_versions(),
+        'coefficients': CoefficientSet.objects.values_list('version', flat=True).first(),
+        'measurements': SmeltingMeasurement.objects.aggregate(count=Count('pk'), last=Max('pk')),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def submit_report(kind, params=None):
+    """
+    Постановка отчета в очередь или возврат готового из кэша
+
+    Returns:
+        tuple: (job, cached) — cached=True, если отчет с тем же ключом уже
+            построен или строится
+    """
+    params = normalize_params(kind, params or {})
+    key = cache_key(kind, params)
+    stale = timezone.now() - datetime.timedelta(seconds=STALE_AFTER)
+
+    existing = ReportJob.objects.filter(cache_key=key).exclude(status='failed').first()
+    if existing is not None:
+        if existing.status == 'done' or (existing.started_at or existing.created_at) > stale:
+            return existing, True
+        existing.status = 'failed'
+        existing.error = 'Задание прервано'
+        existing.save(update_fields=['status', 'error'])
+
+    ReportJob.objects.filter(
+        status__in=('done', 'failed'),
+        created_at__lt=timezone.now() - datetime.timedelta(days=RETENTION_DAYS),
+    ).delete()
+    job = ReportJob.objects.create(kind=kind, params=params, cache_key=key)
+    if getattr(settings, 'REPORTS_ASYNC', True):
+        _get_executor().submit(_run_in_worker, job.pk)
+    else:
+        run_job(job.pk)
+        job.refresh_from_db()
+    return job, False
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix='report')
+        return _executor
+
+
+def _run_in_worker(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def _progress(job_id, progress, stage, **fields):
+    ReportJob.objects.filter(pk=job_id).update(progress=progress, stage=stage, **fields)
+
+
+def run_job(job_id):
+    """Построение отчета с обновлением прогресса в БД"""
+    job = ReportJob.objects.get(pk=job_id)
+    _progress(job_id, 0, 'Запуск', status='running', started_at=timezone.now())
+    try:
+        names = KIND_SECTIONS[job.kind]
+        sections = []
+        for index, name in enumerate(names):
+            _progress(job_id, int(index / (len(names) + 1) * 100), SECTIONS[name].__doc__)
+            sections.append(SECTIONS[name](job.params))
+
+        _progress(job_id, int(len(names) / (len(names) + 1) * 100), 'Оформление отчета')
+        html = render_to_string('core/report_document.html', {
+            'title': KINDS[job.kind],
+            'params': job.params,
+            'sections': sections,
+            'generated_at': timezone.now(),
+            'job_id': job.pk,
+        })
+        _progress(job_id, 100, 'Готово', status='done', html=html, finished_at=timezone.now())
+    except Exception as e:
+        _progress(job_id, 100, 'Ошибка', status='failed', error=str(e), finished_at=timezone.now())
+
+
+def job_status(job):
+    """Состояние задания для опроса со страницы"""
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'title': job.get_kind_display(),
+        'params': job.params,
+        'status': job.status,
+        'progress': job.progress,
+        'stage': job.stage,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def render_pdf(html):
+    """PDF из HTML отчета; требует WeasyPrint"""
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        raise ValueError('Для выгрузки в PDF установите WeasyPrint (pip install weasyprint) '
+                         'или сохраните HTML-версию через печать в браузере')
+    return HTML(string=html).write_pdf()
@@ -0,0 +1,328 @@
+"""
+Показания датчиков мониторинга: хранение, прореживание и поток
+
+Показания хранятся не строкой на замер, а суточными блоками SensorChunk
+(упакованные массивы int32 времени и float32 значений). Запись только
+добавляет пакет SensorBatch — без чтения и перезаписи суточного блока.
+Пакеты сливаются в блок (сортировка, замена повторного времени, пересчет
+обзора — сутки, прореженные LTTB до OVERVIEW_POINTS точек) при чтении
+этих суток или по расписанию командой compact_sensors.
+
+Запрос за интервал читает сырые блоки, если в интервале не больше
+MAX_RAW_POINTS показаний, иначе — обзоры (год секундных данных — 365
+обзоров по 1440 точек), и прореживает результат LTTB до ширины графика
+в пикселях.
+
+LTTB (Largest-Triangle-Three-Buckets, Steinarsson, 2013): ряд делится на
+корзины, из каждой выбирается точка, образующая треугольник наибольшей
+площади с выбранной точкой предыдущей корзины и средним следующей.
+"""
+
+import asyncio
+import datetime
+import json
+import time
+from itertools import groupby
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .models import Sensor, SensorBatch, SensorChunk
+
+
+DAY_SECONDS = 86400
+OVERVIEW_POINTS = 1440           # Точек обзора на сутки (1 в минуту)
+MAX_RAW_POINTS = 200000          # Порог перехода с сырых блоков на обзоры
+DEFAULT_WIDTH = 1000
+MAX_WIDTH = 5000
+MAX_BATCH = 500000               # Показаний в одном запросе записи
+
+STREAM_POLL = 1.0                # Период проверки новых показаний (с)
+STREAM_DURATION = 60             # Длительность потока; EventSource переподключится сам
+STREAM_HEARTBEAT = 15
+MAX_STREAM_POINTS = 1000
+
+
+# === LTTB ===
+
+def lttb(x, y, n_out):
+    """
+    Прореживание ряда до n_out точек (x возрастает)
+
+    Средние следующих корзин считаются одним проходом; цикл — по корзинам,
+    внутри корзины — векторные операции.
+
+    Returns:
+        tuple: (x, y) — массивы выбранных точек
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[:-1], edges[:-1])[1:] / counts[1:], x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], edges[:-1])[1:] / counts[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - avg_x[i]) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y[i] - ay))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return x[selected], y[selected]
+
+
+# === УПАКОВКА БЛОКОВ ===
+
+def _pack(times_ms, values):
+    return np.asarray(times_ms, dtype='<i4').tobytes(), np.asarray(values, dtype='<f4').tobytes()
+
+
+def _unpack(times, values):
+    return np.frombuffer(bytes(times), dtype='<i4'), np.frombuffer(bytes(values), dtype='<f4')
+
+
+def _day_start(day):
+    """Начало суток (UTC) в секундах эпохи"""
+    return (day - datetime.date(1970, 1, 1)).days * DAY_SECONDS
+
+
+def parse_times(raw):
+    """Время показаний: секунды эпохи (числа) или строки ISO 8601 (без зоны — UTC)"""
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in raw):
+        return np.asarray(raw, dtype=float)
+    parsed = []
+    for value in raw:
+        if isinstance(value, str):
+            moment = datetime.datetime.fromisoformat(value)
+            if moment.tzinfo is None:
+                moment = moment.replace(tzinfo=datetime.timezone.utc)
+            parsed.append(moment.timestamp())
+        else:
+            parsed.append(float(value))
+    return np.asarray(parsed, dtype=float)
+
+
+# === ЗАПИСЬ ===
+
+def ingest(code, times, values, quantity=None):
+    """
+    Запись пакета показаний датчика
+
+    Датчик создается при первом показании. Показания с совпадающим
+    временем (с точностью до мс) заменяются новыми при слиянии пакетов.
+
+    Returns:
+        int: число записанных показаний
+    """
+    times = parse_times(times)
+    values = np.asarray(values, dtype=float)
+    if times.shape != values.shape or times.ndim != 1:
+        raise ValueError('Массивы времени и значений должны быть одной длины')
+    if len(times) > MAX_BATCH:
+        raise ValueError(f'Слишком большой пакет: {len(times)} показаний (максимум {MAX_BATCH})')
+    valid = np.isfinite(times) & np.isfinite(values)
+    times, values = times[valid], values[valid]
+    if not len(times):
+        return 0
+
+    days = np.floor(times / DAY_SECONDS).astype(np.int64)
+    with transaction.atomic():
+        sensor, _ = Sensor.objects.get_or_create(code=code, defaults={'quantity': quantity or 'ph'})
+        batches = []
+        for day_number in np.unique(days):
+            mask = days == day_number
+            day = datetime.date(1970, 1, 1) + datetime.timedelta(days=int(day_number))
+            day_ms = np.round((times[mask] - day_number * DAY_SECONDS) * 1000).astype(np.int64)
+            packed_times, packed_values = _pack(day_ms, values[mask])
+            batches.append(SensorBatch(sensor=sensor, day=day, count=int(mask.sum()),
+                                       times=packed_times, values=packed_values))
+        SensorBatch.objects.bulk_create(batches)
+
+        last = datetime.datetime.fromtimestamp(times.max(), tz=datetime.timezone.utc)
+        if sensor.last_reading_at is None or last > sensor.last_reading_at:
+            Sensor.objects.filter(pk=sensor.pk).update(last_reading_at=last)
+    return len(times)
+
+
+def compact(sensor=None, first_day=None, last_day=None):
+    """
+    Слияние отложенных пакетов в суточные блоки
+
+    Без аргументов — все пакеты всех датчиков; first_day, last_day
+    ограничивают сутки (включительно).
+
+    Returns:
+        int: число слитых пакетов
+    """
+    batches = SensorBatch.objects.all()
+    if sensor is not None:
+        batches = batches.filter(sensor=sensor)
+    if first_day is not None:
+        batches = batches.filter(day__gte=first_day)
+    if last_day is not None:
+        batches = batches.filter(day__lte=last_day)
+
+    merged = 0
+    with transaction.atomic():
+        pending = list(batches.select_for_update().order_by('sensor_id', 'day', 'id')
+                       .values_list('id', 'sensor_id', 'day', 'times', 'values'))
+        if not pending:
+            return 0
+        ids = [row[0] for row in pending]
+        # Пакеты, уже слитые параллельным чтением, повторно не сливаются
+        if SensorBatch.objects.filter(id__in=ids).delete()[0] != len(ids):
+            transaction.set_rollback(True)
+            return 0
+        for (sensor_id, day), rows in groupby(pending, key=lambda row: (row[1], row[2])):
+            parts = [_unpack(packed_times, packed_values) for _, _, _, packed_times, packed_values in rows]
+            _merge_chunk(sensor_id, day, np.concatenate([times for times, _ in parts]),
+                         np.concatenate([values for _, values in parts]))
+            merged += len(parts)
+    return merged
+
+
+def _merge_chunk(sensor_id, day, times_ms, values):
+    """Дополнение суточного блока пакетами и пересчет обзора"""
+    chunk = SensorChunk.objects.select_for_update().filter(sensor_id=sensor_id, day=day).first()
+    if chunk is not None and chunk.count:
+        old_times, old_values = _unpack(chunk.times, chunk.values)
+        times_ms = np.concatenate([old_times, times_ms])
+        values = np.concatenate([old_values, values])
+    else:
+        chunk = chunk or SensorChunk(sensor_id=sensor_id, day=day)
+
+    # Сортировка с сохранением порядка поступления; при совпадении времени — последнее
+    order = np.argsort(times_ms, kind='stable')
+    times_ms, values = times_ms[order], values[order]
+    keep = np.append(times_ms[1:] != times_ms[:-1], True)
+    times_ms, values = times_ms[keep], values[keep]
+
+    overview_times, overview_values = lttb(times_ms, values, OVERVIEW_POINTS)
+    chunk.times, chunk.values = _pack(times_ms, values)
+    chunk.overview_times, chunk.overview_values = _pack(overview_times, overview_values)
+    chunk.count = len(times_ms)
+    chunk.min_value = float(values.min())
+    chunk.max_value = float(values.max())
+    chunk.save()
+
+
+# === ЧТЕНИЕ ===
+
+def read_series(sensor, start, end, width=DEFAULT_WIDTH):
+    """
+    Показания датчика за интервал, прореженные до width точек
+
+    Args:
+        sensor: Sensor
+        start, end: границы интервала (секунды эпохи)
+        width: ширина графика в пикселях (число точек результата)
+
+    Returns:
+        dict: {'times' — секунды эпохи, 'values', 'level' — 'raw' или
+            'overview', 'points' — показаний в интервале до прореживания
+            (для обзора — во всех затронутых сутках)}
+    """
+    width = int(min(max(width, 3), MAX_WIDTH))
+    if end < start:
+        raise ValueError('Конец интервала раньше начала')
+    first_day = datetime.date(1970, 1, 1) + datetime.timedelta(days=int(start // DAY_SECONDS))
+    last_day = datetime.date(1970, 1, 1) + datetime.timedelta(days=int(end // DAY_SECONDS))
+    if SensorBatch.objects.filter(sensor=sensor, day__gte=first_day, day__lte=last_day).exists():
+        compact(sensor, first_day, last_day)
+    chunks = SensorChunk.objects.filter(sensor=sensor, day__gte=first_day, day__lte=last_day).order_by('day')
+
+    total = sum(chunks.values_list('count', flat=True))
+    level = 'raw' if total <= MAX_RAW_POINTS else 'overview'
+    fields = ('times', 'values') if level == 'raw' else ('overview_times', 'overview_values')
+
+    times, values = [], []
+    for day, packed_times, packed_values in chunks.values_list('day', *fields):
+        day_times, day_values = _unpack(packed_times, packed_values)
+        times.append(day_times / 1000 + _day_start(day))
+        values.append(day_values)
+    if not times:
+        return {'times': [], 'values': [], 'level': level, 'points': 0}
+
+    times = np.concatenate(times)
+    values = np.concatenate(values).astype(float)
+    mask = (times >= start) & (times <= end)
+    times, values = lttb(times[mask], values[mask], width)
+    return {
+        'times': np.round(times, 3).tolist(),
+        'values': np.round(values, 4).tolist(),
+        'level': level,
+        'points': int(mask.sum()) if level == 'raw' else total,
+    }
+
+
+def readings_since(sensor, since, limit=MAX_STREAM_POINTS):
+    """Сырые показания после момента since (секунды эпохи), не более limit точек"""
+    return read_series(sensor, np.nextafter(since, np.inf), time.time() + DAY_SECONDS, limit)
+
+
+# === ПОТОК (Server-Sent Events) ===
+
+def _event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+def _new_events(codes, cursors, cursor):
+    """События readings по датчикам, у которых есть показания новее курсоров"""
+    checked = min(cursors.values()) if cursors else cursor
+    updated = Sensor.objects.filter(
+        code__in=codes,
+        last_reading_at__gt=datetime.datetime.fromtimestamp(checked, tz=datetime.timezone.utc),
+    )
+    events = []
+    for sensor in updated:
+        series = readings_since(sensor, cursors[sensor.code])
+        if series['times']:
+            cursors[sensor.code] = series['times'][-1]
+            events.append(_event('readings', {'sensor': sensor.code, 'times': series['times'],
+                                              'values': series['values']}))
+    return events
+
+
+async def stream_events(codes, since=None, duration=STREAM_DURATION):
+    """
+    Асинхронный генератор событий SSE с новыми показаниями датчиков codes
+
+    Между проверками (раз в STREAM_POLL секунд, по Sensor.last_reading_at)
+    поток ждет в цикле событий и не занимает поток обработчика; сами
+    проверки выполняются в потоке ORM.
+    """
+    cursor = time.time() if since is None else float(since)
+    cursors = dict.fromkeys(codes, cursor)
+    deadline = time.monotonic() + duration
+    heartbeat = time.monotonic()
+    yield 'retry: 2000\n\n'
+
+    while time.monotonic() < deadline:
+        for event in await sync_to_async(_new_events)(codes, cursors, cursor):
+            yield event
+
+        if time.monotonic() - heartbeat > STREAM_HEARTBEAT:
+            heartbeat = time.monotonic()
+            yield ': keepalive\n\n'
+        await asyncio.sleep(min(STREAM_POLL, max(deadline - time.monotonic(), 0)))
+
+
+def sensor_summary(sensor):
+    """Описание датчика для списка на странице"""
+    return {
+        'code': sensor.code,
+        'name': str(sensor),
+        'quantity': sensor.quantity,
+        'quantity_display': sensor.get_quantity_display(),
+        'location': sensor.location,
+        'last_reading_at': sensor.last_reading_at.timestamp() if sensor.last_reading_at else None,
+    }
@@ -0,0 +1,81 @@
+from django.apps import apps
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, post_migrate
+
+from .db import apply_pragmas
+from .instrumentation import install_sql_wrapper
+from .metrics import install_sql_wrapper as install_metrics_wrapper
+from .slowlog import install_slow_query_wrapper
+from .knowledge import ensure_index, index_article, invalidate_pages, unindex_article
+from .models import Article
+from .stats import SOURCES, update_object, remove_object
+
+
+def _object_saved(process):
+    def handler(sender, instance, raw=False, **kwargs):
+        if not raw:
+            update_object(process, instance.pk)
+    return handler
+
+
+def _object_deleted(process):
+    def handler(sender, instance, **kwargs):
+        remove_object(process, instance.pk)
+    return handler
+
+
+def _child_changed(process, field):
+    def handler(sender, instance, raw=False, **kwargs):
+        parent_id = getattr(instance, field)
+        if not raw and parent_id is not None:
+            update_object(process, parent_id)
+    return handler
+
+
+def connect_signals():
+    """Обновление сводок процессов при сохранении и удалении опытов и их продуктов"""
+    for process, source in SOURCES.items():
+        model = apps.get_model(source.model)
+        post_save.connect(_object_saved(process), sender=model, weak=False,
+                          dispatch_uid=f'process_stats_{process}_save')
+        post_delete.connect(_object_deleted(process), sender=model, weak=False,
+                            dispatch_uid=f'process_stats_{process}_delete')
+        for child_label, field in source.children:
+            child = apps.get_model(child_label)
+            post_save.connect(_child_changed(process, field), sender=child, weak=False,
+                              dispatch_uid=f'process_stats_{process}_{child._meta.model_name}_save')
+            post_delete.connect(_child_changed(process, field), sender=child, weak=False,
+                                dispatch_uid=f'process_stats_{process}_{child._meta.model_name}_delete')
+
+
+def _article_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_article(instance)
+    invalidate_pages()
+
+
+def _article_deleted(sender, instance, **kwargs):
+    unindex_article(instance.pk)
+    invalidate_pages()
+
+
+def _create_search_index(sender, using, **kwargs):
+    ensure_index(using)
+
+
+def connect_knowledge_signals():
+    """Поисковый индекс и кэш страниц базы знаний при изменении статей"""
+    post_save.connect(_article_saved, sender=Article, dispatch_uid='knowledge_article_save')
+    post_delete.connect(_article_deleted, sender=Article, dispatch_uid='knowledge_article_delete')
+    post_migrate.connect(_create_search_index, sender=apps.get_app_config('core'),
+                         dispatch_uid='knowledge_search_index')
+
+
+def connect_db_signals():
+    """PRAGMA профиля БД и учет SQL-запросов для каждого нового соединения"""
+    connection_created.connect(apply_pragmas, dispatch_uid='core_sqlite_pragmas')
+    connection_created.connect(install_metrics_wrapper, dispatch_uid='core_metrics_sql')
+    connection_created.connect(install_slow_query_wrapper, dispatch_uid='core_slow_queries')
+    if getattr(settings, 'TIMING_ENABLED', False):
+        connection_created.connect(install_sql_wrapper, dispatch_uid='core_timing_sql')
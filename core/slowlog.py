@@ -0,0 +1,218 @@
+"""
+Журнал медленных SQL-запросов с планом выполнения
+
+Обертка execute_wrapper на каждом соединении замеряет запросы; запрос
+дольше SLOW_QUERY_MS попадает в журнал SLOW_QUERY_LOG (строки JSON) и
+в логгер core.slow_queries. Для каждого медленного запроса записываются:
+
+    fingerprint  — хэш SQL без значений (одинаков для запросов с разными
+                   параметрами и длиной списков IN)
+    plan         — EXPLAIN QUERY PLAN на том же соединении (SQLite)
+    full_scans   — таблицы из SLOW_QUERY_SCAN_TABLES, которые план читает
+                   целиком (SCAN без индекса)
+    origin       — ближайший кадр стека в коде проекта (файл:строка(функция))
+
+slow_query_report() сводит журнал по отпечаткам в топ по суммарному
+времени — его выводят команда slow_queries и страница в админке.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+
+from .profiling import _describe
+
+
+logger = logging.getLogger('core.slow_queries')
+
+REPORT_LIMIT = 20
+LOG_MAX_BYTES = 5 * 1024 * 1024
+# Таблицы продуктов опытов: полный проход по ним — признак отсутствующего индекса
+SCAN_TABLES = ('flotation_flotationproduct', 'molybdenum_leachingproduct')
+
+# Кадры, которые пропускаются при поиске места запроса
+SKIP_FILES = {'core/slowlog.py', 'core/metrics.py', 'core/instrumentation.py'}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE)
+_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(?: AS \w+)?$')
+
+_lock = threading.Lock()
+
+
+def log_path():
+    return Path(getattr(settings, 'SLOW_QUERY_LOG', Path(settings.BASE_DIR) / 'var' / 'slow_queries.jsonl'))
+
+
+def normalize(sql):
+    """SQL без значений: литералы и параметры — ?, списки IN — (...)"""
+    sql = _STRING.sub('?', sql.replace('%s', '?'))
+    sql = _NUMBER.sub('?', sql)
+    sql = ' '.join(sql.split())
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:12]
+
+
+def full_scans(plan, tables=None):
+    """Таблицы из списка, которые план читает полным проходом"""
+    tables = SCAN_TABLES if tables is None else tables
+    found = []
+    for detail in plan or ():
+        match = _FULL_SCAN.match(detail)
+        if match and match.group(1) in tables and match.group(1) not in found:
+            found.append(match.group(1))
+    return found
+
+
+def explain(connection, sql, params):
+    """Строки EXPLAIN QUERY PLAN (только SQLite и SELECT) или None"""
+    if connection.vendor != 'sqlite' or not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    # Курсор без execute_wrappers: EXPLAIN не попадает в учет запросов
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+    except sqlite3.Error:
+        return None
+    finally:
+        cursor.close()
+
+
+def origin():
+    """Ближайший кадр стека в коде проекта"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        label, project = _describe(code.co_filename, frame.f_lineno, code.co_name)
+        if project and label.split(':', 1)[0].replace(os.sep, '/') not in SKIP_FILES:
+            return label
+        frame = frame.f_back
+    return ''
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    """Обертка connection.execute_wrapper: запись запросов дольше SLOW_QUERY_MS"""
+    threshold = getattr(settings, 'SLOW_QUERY_MS', None)
+    if not threshold:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms >= threshold:
+        record_slow_query(context['connection'], sql, None if many else params, duration_ms)
+    return result
+
+
+def install_slow_query_wrapper(sender=None, connection=None, **kwargs):
+    """Обработчик connection_created: обертка ставится на соединение один раз"""
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+def record_slow_query(connection, sql, params, duration_ms):
+    plan = explain(connection, sql, params) if params is not None else None
+    scans = full_scans(plan, getattr(settings, 'SLOW_QUERY_SCAN_TABLES', SCAN_TABLES))
+    record = {
+        'fingerprint': fingerprint(sql),
+        'sql': normalize(sql),
+        'duration_ms': round(duration_ms, 2),
+        'plan': plan,
+        'full_scans': scans,
+        'origin': origin(),
+        'created': time.time(),
+    }
+    logger.log(logging.WARNING if scans else logging.INFO,
+               json.dumps(record, ensure_ascii=False), extra={'slow_query': record})
+    _append(record)
+    return record
+
+
+def _append(record):
+    path = log_path()
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+    max_bytes = getattr(settings, 'SLOW_QUERY_LOG_MAX_BYTES', LOG_MAX_BYTES)
+    with _lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Одна старая копия: журнал не растет бесконечно
+        if path.exists() and path.stat().st_size + len(line) > max_bytes:
+            os.replace(path, path.with_name(path.name + '.1'))
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write(line)
+
+
+def read_log():
+    """Записи журнала, начиная со старой копии"""
+    path = log_path()
+    records = []
+    for part in (path.with_name(path.name + '.1'), path):
+        if not part.exists():
+            continue
+        with open(part, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Строка, недописанная параллельным процессом
+                    continue
+    return records
+
+
+def clear_log():
+    path = log_path()
+    with _lock:
+        for part in (path, path.with_name(path.name + '.1')):
+            part.unlink(missing_ok=True)
+
+
+def slow_query_report(limit=REPORT_LIMIT):
+    """
+    Топ медленных запросов по суммарному времени
+
+    Returns:
+        list: [{'fingerprint', 'sql', 'count', 'total_ms', 'avg_ms', 'max_ms',
+            'plan', 'full_scans', 'origins': [(место, число)], 'last_seen',
+            'last_seen_at'}]
+    """
+    groups = {}
+    for record in read_log():
+        group = groups.get(record['fingerprint'])
+        if group is None:
+            group = groups[record['fingerprint']] = {
+                'fingerprint': record['fingerprint'], 'sql': record['sql'], 'count': 0,
+                'total_ms': 0.0, 'max_ms': 0.0, 'plan': None, 'full_scans': [],
+                'origins': Counter(), 'last_seen': 0,
+            }
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        group['max_ms'] = max(group['max_ms'], record['duration_ms'])
+        group['origins'][record['origin']] += 1
+        for table in record['full_scans']:
+            if table not in group['full_scans']:
+                group['full_scans'].append(table)
+        if record['created'] >= group['last_seen']:
+            group['last_seen'] = record['created']
+            group['plan'] = record['plan'] or group['plan']
+
+    report = sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)[:limit]
+    for group in report:
+        group['total_ms'] = round(group['total_ms'], 2)
+        group['avg_ms'] = round(group['total_ms'] / group['count'], 2)
+        group['origins'] = group['origins'].most_common(3)
+        group['last_seen_at'] = datetime.fromtimestamp(group['last_seen'], tz=timezone.utc)
+    return report
@@ -0,0 +1,201 @@
+"""
+Сводная статистика процессов для главной страницы
+
+Для каждого процесса (SOURCES) в ProcessStats хранятся количество
+объектов, сумма и лучшее значение показателя. Таблица обновляется
+сигналами при сохранении и удалении объектов и их дочерних записей
+(продуктов опыта): показатель объекта пересчитывается одним запросом,
+а сводка меняется на разность со старым вкладом из ProcessStatsEntry.
+Лучшее значение при ухудшении лучшего объекта берется по индексу
+вкладов, без пересчета всех опытов.
+
+Главная страница читает одну маленькую таблицу; массовые операции в
+обход сигналов (bulk_create, QuerySet.update) исправляет команда
+rebuild_process_stats.
+"""
+
+from collections import namedtuple
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F, Max, Q, Sum
+
+from .models import ProcessStats, ProcessStatsEntry
+
+
+# === ИСТОЧНИКИ ===
+
+def _flotation_values(queryset):
+    """Извлечение Au в продукты, кроме отвальных хвостов (как FlotationTest.extraction)"""
+    rows = queryset.annotate(
+        au_total=Sum('products__au_content'),
+        au_useful=Sum('products__au_content', filter=~Q(products__product_type='tails')),
+    ).values_list('pk', 'au_total', 'au_useful')
+    return {pk: (useful or 0) / total * 100 if total else 0.0 for pk, total, useful in rows}
+
+
+def _leaching_values(queryset):
+    """Извлечение Mo в раствор (как LeachingTest.mo_extraction_to_solution)"""
+    rows = queryset.annotate(
+        solution_mo=Max('products__mo_extraction', filter=Q(products__product_type='solution')),
+    ).values_list('pk', 'solution_mo')
+    return {pk: value or 0.0 for pk, value in rows}
+
+
+def _sorption_values(queryset):
+    return dict(queryset.values_list('pk', 'mo_extraction'))
+
+
+def _smelting_values(queryset):
+    return {
+        pk: result.get('crude_antimony', {}).get('sb_extraction')
+        for pk, result in queryset.values_list('pk', 'result')
+    }
+
+
+def _count_only(queryset):
+    return dict.fromkeys(queryset.values_list('pk', flat=True))
+
+
+# label — подпись, model — учитываемая модель, values(queryset) → {pk: показатель},
+# children — дочерние модели (модель, поле внешнего ключа), влияющие на показатель
+Source = namedtuple('Source', ['label', 'model', 'values', 'children'])
+
+SOURCES = {
+    'flotation': Source('Флотационные тесты', 'flotation.FlotationTest', _flotation_values,
+                        (('flotation.FlotationProduct', 'test_id'),)),
+    'leaching': Source('Опыты выщелачивания', 'molybdenum.LeachingTest', _leaching_values,
+                       (('molybdenum.LeachingProduct', 'test_id'),)),
+    'sorption': Source('Опыты сорбции', 'molybdenum.SorptionTest', _sorption_values, ()),
+    'smelting': Source('Расчеты плавки', 'antimony.SmeltingRun', _smelting_values, ()),
+    'reagents': Source('Реагенты флотации', 'flotation.Reagent', _count_only, ()),
+}
+
+# Процессы с лабораторными опытами (для общего числа опытов и лучшего извлечения)
+TEST_PROCESSES = ('flotation', 'leaching', 'sorption')
+
+
+# === ИНКРЕМЕНТАЛЬНОЕ ОБНОВЛЕНИЕ ===
+
+def update_object(process, pk):
+    """Пересчет вклада объекта после его сохранения или изменения дочерних записей"""
+    source = SOURCES[process]
+    values = source.values(apps.get_model(source.model).objects.filter(pk=pk))
+    if pk in values:
+        _apply(process, pk, values[pk], exists=True)
+    else:
+        _apply(process, pk, None, exists=False)
+
+
+def remove_object(process, pk):
+    """Исключение удаленного объекта из сводки"""
+    _apply(process, pk, None, exists=False)
+
+
+def _apply(process, pk, value, exists):
+    with transaction.atomic():
+        stats, _ = ProcessStats.objects.select_for_update().get_or_create(process=process)
+        entry = ProcessStatsEntry.objects.filter(process=process, object_id=pk).first()
+        if entry is None and not exists:
+            return
+        old = entry.value if entry is not None else None
+        if entry is not None and exists and old == value:
+            # Показатель не изменился, но другие поля объекта могли измениться
+            ProcessStats.objects.filter(pk=stats.pk).update(version=F('version') + 1)
+            return
+
+        if not exists:
+            entry.delete()
+            value = None
+        elif entry is None:
+            ProcessStatsEntry.objects.create(process=process, object_id=pk, value=value)
+        else:
+            entry.value = value
+            entry.save(update_fields=['value'])
+
+        stats.count += int(exists) - int(entry is not None)
+        stats.valued_count += int(value is not None) - int(old is not None)
+        stats.total += (value or 0.0) - (old or 0.0)
+
+        if value is not None and (stats.best_value is None or value > stats.best_value):
+            stats.best_value, stats.best_id = value, pk
+        elif stats.best_id == pk and (value is None or value < stats.best_value):
+            best = (
+                ProcessStatsEntry.objects.filter(process=process, value__isnull=False)
+                .order_by('-value', 'object_id').values_list('value', 'object_id').first()
+            )
+            stats.best_value, stats.best_id = best or (None, None)
+        stats.version += 1
+        stats.save()
+
+
+# === ПЕРЕСЧЕТ С НУЛЯ ===
+
+def rebuild(processes=None):
+    """
+    Пересчет сводок по всем объектам
+
+    Returns:
+        dict: {процесс: {'before': (count, total, best_value),
+            'after': (count, total, best_value)}}
+    """
+    report = {}
+    for process in processes or SOURCES:
+        source = SOURCES[process]
+        values = source.values(apps.get_model(source.model).objects.all())
+        valued = {pk: value for pk, value in values.items() if value is not None}
+        best_id = max(valued, key=lambda pk: (valued[pk], -pk)) if valued else None
+
+        with transaction.atomic():
+            stats, _ = ProcessStats.objects.select_for_update().get_or_create(process=process)
+            before = (stats.count, round(stats.total, 6), stats.best_value)
+            ProcessStatsEntry.objects.filter(process=process).delete()
+            ProcessStatsEntry.objects.bulk_create(
+                [ProcessStatsEntry(process=process, object_id=pk, value=value) for pk, value in values.items()],
+                batch_size=1000,
+            )
+            stats.count = len(values)
+            stats.valued_count = len(valued)
+            stats.total = float(sum(valued.values()))
+            stats.best_value = valued[best_id] if best_id is not None else None
+            stats.best_id = best_id
+            stats.version += 1
+            stats.save()
+        report[process] = {'before': before, 'after': (stats.count, round(stats.total, 6), stats.best_value)}
+    return report
+
+
+# === ЧТЕНИЕ ===
+
+def home_stats():
+    """Сводка для главной страницы (один запрос к ProcessStats)"""
+    rows = {row.process: row for row in ProcessStats.objects.all()}
+    processes = {}
+    for process, source in SOURCES.items():
+        row = rows.get(process)
+        processes[process] = {
+            'label': source.label,
+            'count': row.count if row else 0,
+            'average': row.average if row else None,
+            'best_value': row.best_value if row else None,
+            'best_id': row.best_id if row else None,
+        }
+
+    best = max(
+        (processes[process] for process in TEST_PROCESSES if processes[process]['best_value'] is not None),
+        key=lambda item: item['best_value'],
+        default=None,
+    )
+    return {
+        'total_tests': sum(processes[process]['count'] for process in TEST_PROCESSES),
+        'best_extraction': best['best_value'] if best else None,
+        'best_process': best['label'] if best else None,
+        'smelting_runs': processes['smelting']['count'],
+        'reagents_count': processes['reagents']['count'],
+        'processes': processes,
+    }
+
+
+def data_versions():
+    """Версии данных процессов {процесс: version} (один запрос)"""
+    return dict(ProcessStats.objects.values_list('process', 'version'))
@@ -0,0 +1,218 @@
+"""
+Синтетические опыты для замеров масштабирования
+
+Опыты флотации, выщелачивания и сорбции с правдоподобными входными
+данными (диапазоны — по реальным опытам лаборатории) и показателями,
+рассчитанными теми же функциями, что и при сохранении из калькуляторов.
+Записи создаются через bulk_create пачками по BATCH_SIZE; сигналы
+сохранения при этом не срабатывают, поэтому в конце пересчитываются
+сводки процессов (core.stats.rebuild).
+"""
+
+import random
+
+from django.db import transaction
+
+from flotation.models import FlotationProduct, FlotationTest
+from flotation.views import calculate_flotation_results
+from molybdenum.models import LeachingProduct, LeachingTest, SorptionTest
+from molybdenum.utils import calculate_leaching_balance, calculate_sorption
+
+from .stats import rebuild
+
+
+BATCH_SIZE = 1000
+
+FLOTATION_PRODUCTS = {
+    'final_concentrate': 'Финальный концентрат',
+    'tails': 'Отвальные хвосты',
+    'cleaner_tails': 'Хвосты перечистки',
+    'control_concentrate': 'Концентрат контрольной',
+}
+
+REAGENT_REGIMES = [
+    'РАХ 100 г/т',
+    'РАХ 80 г/т + Х-133 20 г/т',
+    'Х-133 60 г/т',
+    'РАХ 60 г/т + CuSO4 50 г/т + Т-92 20 г/т',
+    'MP-1 40 г/т + БТФ 30 г/т',
+    'MP-102 50 г/т',
+]
+
+CONFIGURATIONS = ['', 'открытый цикл', 'замкнутый цикл', 'с доизмельчением']
+ELEMENTS = ('mo', 'cu', 'fe', 'si')
+ACID_TYPES = [choice for choice, _label in LeachingTest.ACID_CHOICES]
+ANIONITES = [choice for choice, _label in SorptionTest.ANIONITE_CHOICES]
+
+
+def _next_number(model):
+    last = model.objects.order_by('-number').values_list('number', flat=True).first()
+    return (last or 0) + 1
+
+
+def _chunks(count):
+    for start in range(0, count, BATCH_SIZE):
+        yield start, min(count - start, BATCH_SIZE)
+
+
+# === ФЛОТАЦИЯ ===
+
+def flotation_inputs(rng):
+    """Входные данные калькулятора флотации"""
+    concentrate = rng.uniform(8, 40)
+    cleaner = rng.uniform(15, 60)
+    control = rng.uniform(10, 40)
+    return {
+        'initial_grade_analysis': round(rng.uniform(1.5, 6), 2),
+        'reagent_regime': rng.choice(REAGENT_REGIMES),
+        'is_microflotation': rng.random() < 0.2,
+        'configuration': rng.choice(CONFIGURATIONS),
+        'final_concentrate': {'mass': round(concentrate, 2), 'grade': round(rng.uniform(40, 150), 2)},
+        'tails': {'mass': round(1000 - concentrate - cleaner - control, 2), 'grade': round(rng.uniform(0.1, 0.6), 3)},
+        'cleaner_tails': {'mass': round(cleaner, 2), 'grade': round(rng.uniform(1, 6), 2)},
+        'control_concentrate': {'mass': round(control, 2), 'grade': round(rng.uniform(4, 15), 2)},
+    }
+
+
+def generate_flotation(count, rng):
+    number = _next_number(FlotationTest)
+    for start, size in _chunks(count):
+        tests, balances = [], []
+        for offset in range(size):
+            data = flotation_inputs(rng)
+            results = calculate_flotation_results(data)
+            tests.append(FlotationTest(
+                number=number + start + offset,
+                initial_grade_analysis=data['initial_grade_analysis'],
+                calculated_initial_grade=results['calculated_initial_grade'],
+                reagent_regime=data['reagent_regime'],
+                is_microflotation=data['is_microflotation'],
+                configuration=data['configuration'],
+            ))
+            balances.append(results['material_balance']['products'])
+        FlotationTest.objects.bulk_create(tests)
+        FlotationProduct.objects.bulk_create([
+            FlotationProduct(test=test, name=name, product_type=key, mass=products[key]['mass'],
+                             grade=products[key]['grade'], au_content=products[key]['au'])
+            for test, products in zip(tests, balances)
+            for key, name in FLOTATION_PRODUCTS.items()
+        ])
+
+
+# === ВЫЩЕЛАЧИВАНИЕ И СОРБЦИЯ ===
+
+def leaching_inputs(rng):
+    """Входные данные баланса выщелачивания: извлечения зависят от условий опыта"""
+    mass = 50.0
+    volume = rng.choice([250.0, 300.0])
+    temperature = rng.choice([80, 85, 90, 95])
+    has_oxygen = rng.random() < 0.4
+    acid_type = rng.choice(ACID_TYPES)
+    initial = {'mo': rng.uniform(18, 26), 'cu': rng.uniform(0.5, 2), 'fe': rng.uniform(2, 4), 'si': rng.uniform(2, 3.5)}
+    base = 0.15 + (temperature - 80) / 100 + (0.3 if has_oxygen else 0) + (0.1 if acid_type != 'h2so4' else 0)
+    extraction = {
+        'mo': min(base + rng.uniform(0, 0.15), 0.95),
+        'cu': min(base + rng.uniform(0.1, 0.3), 0.95),
+        'fe': min(base + rng.uniform(0.1, 0.3), 0.95),
+        'si': rng.uniform(0.02, 0.15),
+    }
+    cake_mass = mass * rng.uniform(0.82, 0.97)
+    data = {
+        'concentrate_mass': mass, 'cake_mass': round(cake_mass, 2), 'solution_volume': volume,
+        'acid_type': acid_type, 'temperature': temperature, 'has_oxygen': has_oxygen,
+        'hno3_concentration': rng.choice([50, 60, 70, 80]) if acid_type != 'h2so4' else None,
+        'h2so4_concentration': rng.choice([100, 150, 200]) if acid_type != 'hno3' else None,
+        'duration': rng.choice([2, 3, 4]), 'stirring_speed': rng.choice([200, 300, 400]),
+        'oxygen_flow': round(rng.uniform(0.5, 2), 2) if has_oxygen else None,
+    }
+    for element in ELEMENTS:
+        grams = initial[element] * mass / 100
+        data[f'initial_{element}'] = round(initial[element], 3)
+        data[f'cake_{element}'] = round(grams * (1 - extraction[element]) / cake_mass * 100, 3)
+        data[f'solution_{element}'] = round(grams * extraction[element] / (volume / 1000), 3)
+    return data
+
+
+def _leaching_product(test, data, results, product_type):
+    prefix = 'cake' if product_type == 'cake' else 'solution'
+    return LeachingProduct(
+        test=test, product_type=product_type,
+        mass_or_volume=data['cake_mass'] if product_type == 'cake' else data['solution_volume'],
+        yield_percentage=results['cake_yield'] if product_type == 'cake' else None,
+        **{f'{element}_content': data[f'{prefix}_{element}'] for element in ELEMENTS},
+        **{f'{element}_grams': results[prefix][element] for element in ELEMENTS},
+        **{f'{element}_extraction': results['extractions'][f'{element}_to_{prefix}'] for element in ELEMENTS},
+    )
+
+
+def generate_leaching(count, rng):
+    number = _next_number(LeachingTest)
+    fields = ['concentrate_mass', 'solution_volume', 'acid_type', 'temperature', 'has_oxygen', 'hno3_concentration',
+              'h2so4_concentration', 'duration', 'stirring_speed', 'oxygen_flow',
+              *(f'initial_{element}' for element in ELEMENTS)]
+    for start, size in _chunks(count):
+        tests, inputs = [], []
+        for offset in range(size):
+            data = leaching_inputs(rng)
+            tests.append(LeachingTest(number=number + start + offset, **{field: data[field] for field in fields}))
+            inputs.append((data, calculate_leaching_balance(data)))
+        LeachingTest.objects.bulk_create(tests)
+        LeachingProduct.objects.bulk_create([
+            _leaching_product(test, data, results, product_type)
+            for test, (data, results) in zip(tests, inputs)
+            for product_type in ('cake', 'solution')
+        ])
+
+
+def sorption_inputs(rng):
+    """Входные данные расчета сорбции: извлечение растет с температурой и временем"""
+    temperature = rng.choice([20, 40, 60, 80])
+    duration = rng.choice([15, 30, 60, 120])
+    initial = rng.uniform(1.5, 3)
+    extraction = min(0.4 + temperature / 200 + duration / 400 + rng.uniform(-0.05, 0.05), 0.99)
+    return {
+        'solution_volume': 200.0,
+        'initial_mo_concentration': round(initial, 3),
+        'final_mo_concentration': round(initial * (1 - extraction), 3),
+        'h2so4_concentration': rng.choice([20, 50, 100]),
+        'anionite_type': rng.choice(ANIONITES),
+        'anionite_mass': round(rng.uniform(5, 20), 1),
+        'temperature': temperature,
+        'duration': duration,
+        'stirring_speed': rng.choice([150, 200, 300]),
+    }
+
+
+def generate_sorption(count, rng):
+    number = _next_number(SorptionTest)
+    leaching_ids = list(LeachingTest.objects.values_list('id', flat=True)[:1000])
+    for start, size in _chunks(count):
+        tests = []
+        for offset in range(size):
+            data = sorption_inputs(rng)
+            results = calculate_sorption(data)
+            tests.append(SorptionTest(
+                number=number + start + offset,
+                leaching_test_id=rng.choice(leaching_ids) if leaching_ids and rng.random() < 0.5 else None,
+                **data,
+                mo_extraction=results['extraction'],
+                sorption_capacity=results['sorption_capacity'],
+                mo_on_anionite=results['mo_on_anionite'],
+            ))
+        SorptionTest.objects.bulk_create(tests)
+
+
+def generate(flotation=0, leaching=0, sorption=0, seed=0):
+    """
+    Добавление синтетических опытов (номера — после существующих)
+
+    Returns:
+        dict: {'flotation', 'leaching', 'sorption'} — созданное число опытов
+    """
+    rng = random.Random(seed)
+    with transaction.atomic():
+        generate_flotation(flotation, rng)
+        generate_leaching(leaching, rng)
+        generate_sorption(sorption, rng)
+    rebuild()
+    return {'flotation': flotation, 'leaching': leaching, 'sorption': sorption}
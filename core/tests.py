@@ -0,0 +1,1067 @@
+import json
+import tempfile
+import time
+from importlib import import_module
+from io import StringIO
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from antimony.models import SmeltingRun
+from flotation.models import FlotationTest, FlotationProduct
+from molybdenum.models import LeachingProduct, LeachingTest, SorptionTest
+from . import knowledge
+from .benchmarking import (
+    asgi_call, bench_kernel, compare_to_baseline, measure_view, percentile, query_growth, run_asgi_journeys,
+    run_wsgi_journeys, step_outcome, summarize,
+)
+from .management.commands.loadtest import assign_journeys, parse_mix
+from .concurrency import gather_queries, run_calculation
+from .copper import (
+    MAX_CELLS, calculate_neutralization, column_operator, lateral_operator, simulate_heap, solve_tridiagonal,
+)
+from .db import retry_on_lock
+from .knowledge import search, stem
+from .metrics import CALCULATION_DURATION, REQUESTS, Registry, record_cache
+from .models import Article, Sensor, SensorBatch, SensorChunk, ProcessStats
+from .profiling import list_profiles
+from .reports import submit_report
+from .slowlog import fingerprint, full_scans, slow_query_report
+from .sensors import compact, ingest, lttb, read_series, stream_events, OVERVIEW_POINTS
+from .stats import home_stats, rebuild
+from .synthetic import generate
+
+
+class NeutralizationTest(TestCase):
+    """Тесты расчета нейтрализации отвала"""
+
+    def test_reagent_demand(self):
+        """Расход растет с целевым pH; известняку нужно больше, чем извести"""
+        lime = calculate_neutralization({'target_ph': 4.0})
+        lime_high = calculate_neutralization({'target_ph': 6.0})
+        limestone = calculate_neutralization({'target_ph': 4.0, 'reagent': 'limestone'})
+
+        self.assertGreater(lime_high['reagent_mass'], lime['reagent_mass'])
+        self.assertGreater(limestone['reagent_mass'], lime['reagent_mass'])
+        self.assertAlmostEqual(lime['acidity']['h_plus_mol'], limestone['acidity']['h_plus_mol'])
+        # При pH 4 железо осаждается практически полностью, медь остается в растворе
+        self.assertLess(lime['final_solution']['fe'], 0.01)
+        self.assertAlmostEqual(lime['final_solution']['cu'], 0.125, places=3)
+        self.assertLess(lime_high['final_solution']['cu'], 0.125)
+        self.assertTrue(np.all(np.diff(lime['titration']['dose_per_t']) >= 0))
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            calculate_neutralization({'target_ph': 1.5})
+        with self.assertRaises(ValueError):
+            calculate_neutralization({'reagent': 'soda'})
+
+
+class HeapBioleachingTest(TestCase):
+    """Тесты модели кучного биовыщелачивания"""
+
+    def test_uniform_heap_matches_column(self):
+        """Однородный штабель в 2-D совпадает с одномерной колонной"""
+        params = {'nz': 20, 'days': 10, 'grade_cv': 0}
+        column = simulate_heap({**params, 'nx': 1})
+        heap = simulate_heap({**params, 'nx': 8})
+
+        np.testing.assert_allclose(heap['series']['cu'], column['series']['cu'], rtol=1e-6)
+        np.testing.assert_allclose(heap['series']['extraction'], column['series']['extraction'], rtol=1e-6)
+
+    def test_leaching_progress(self):
+        """Извлечение растет со временем; в раствор переходит не больше, чем выщелочено"""
+        result = simulate_heap({'nz': 30, 'nx': 10, 'days': 30})
+        extraction = np.array(result['series']['extraction'])
+        recovery = np.array(result['series']['recovery'])
+
+        self.assertEqual(len(extraction), 30)
+        self.assertTrue(np.all(np.diff(extraction) >= 0))
+        self.assertTrue(np.all(recovery <= extraction + 1e-9))
+        self.assertGreater(result['summary']['extraction'], 0)
+        self.assertGreater(result['summary']['pls_cu'], 0.1)     # выше содержания в растворе орошения
+        self.assertEqual(len(result['profile']['depth']), 30)
+
+    def test_tridiagonal_matches_dense_solve(self):
+        """Прогонка по вертикали и по ширине совпадает с решением полной матрицы"""
+        rng = np.random.default_rng(0)
+        for nz, courant, diffusion in [(7, 0.3, 0.2), (600, 20.0, 0.05), (40, 0.0, 0.0)]:
+            matrix = (np.diag(np.full(nz, 1 + courant + 2 * diffusion))
+                      - np.diag(np.full(nz - 1, courant + diffusion), -1)
+                      - np.diag(np.full(nz - 1, diffusion), 1))
+            matrix[-1, -1] -= diffusion
+            rhs = rng.random((4, nz, 3))
+            expected = np.linalg.solve(matrix, rhs.transpose(1, 0, 2).reshape(nz, -1))
+            solved = solve_tridiagonal(column_operator(nz, courant, diffusion), rhs.copy(), axis=1)
+            np.testing.assert_allclose(solved.transpose(1, 0, 2).reshape(nz, -1), expected, rtol=1e-10, atol=1e-12)
+
+        nx, lateral = 300, 3.1
+        matrix = (np.diag(np.full(nx, 1 + 2 * lateral))
+                  - np.diag(np.full(nx - 1, lateral), -1) - np.diag(np.full(nx - 1, lateral), 1))
+        matrix[0, 0] -= lateral
+        matrix[-1, -1] -= lateral
+        rhs = rng.random((4, 5, nx))
+        expected = np.linalg.solve(matrix, rhs.reshape(-1, nx).T).T.reshape(rhs.shape)
+        solved = solve_tridiagonal(lateral_operator(nx, lateral), rhs.copy(), axis=2)
+        np.testing.assert_allclose(solved, expected, rtol=1e-10, atol=1e-12)
+
+    def test_large_grid_step_cost(self):
+        """Штабель 10⁵ ячеек: шаг дороже сетки 10⁴ примерно в 10 раз, а не в 100 (плотная матрица)"""
+        def step_time(nz, nx, days):
+            started = time.perf_counter()
+            result = simulate_heap({'nz': nz, 'nx': nx, 'days': days})
+            self.assertTrue(np.isfinite(result['summary']['extraction']))
+            return (time.perf_counter() - started) / result['time']['steps']
+
+        small = step_time(100, 100, 5)
+        self.assertLess(step_time(1000, 100, 1) / small, 30)
+        self.assertLess(step_time(100, 1000, 1) / small, 30)
+
+    def test_grid_limit(self):
+        with self.assertRaises(ValueError):
+            simulate_heap({'nz': 1000, 'nx': MAX_CELLS // 1000 + 1})
+        with self.assertRaises(ValueError):
+            simulate_heap({'unknown': 1})
+
+
+class CopperApiTest(TestCase):
+    """Тесты API страницы медных отвалов"""
+
+    def test_neutralization_api(self):
+        response = self.client.post(
+            reverse('core:copper_neutralization'),
+            data=json.dumps({'ore_mass': 200, 'target_ph': 5}),
+            content_type='application/json',
+        )
+        result = response.json()
+        self.assertTrue(result['success'])
+        self.assertEqual(len(result['titration']['ph']), len(result['titration']['dose_per_t']))
+
+    def test_heap_leaching_api(self):
+        response = self.client.post(
+            reverse('core:copper_heap_leaching'),
+            data=json.dumps({'nz': 10, 'nx': 5, 'days': 5}),
+            content_type='application/json',
+        )
+        result = response.json()
+        self.assertTrue(result['success'])
+        self.assertEqual(result['grid']['cells'], 50)
+
+        response = self.client.post(
+            reverse('core:copper_heap_leaching'),
+            data=json.dumps({'nz': 1}),
+            content_type='application/json',
+        )
+        self.assertFalse(response.json()['success'])
+
+
+class SensorReadingsTest(TestCase):
+    """Тесты хранения и прореживания показаний датчиков"""
+
+    START = 1700006400.0           # Начало суток (UTC)
+
+    def test_lttb(self):
+        """LTTB сохраняет концы ряда и выбросы"""
+        x = np.arange(10000.0)
+        y = np.sin(x / 500)
+        y[4321] = 10
+        sampled_x, sampled_y = lttb(x, y, 200)
+
+        self.assertEqual(len(sampled_x), 200)
+        self.assertEqual((sampled_x[0], sampled_x[-1]), (0, 9999))
+        self.assertTrue(np.all(np.diff(sampled_x) > 0))
+        self.assertIn(4321, sampled_x)
+        self.assertEqual(len(lttb(x[:50], y[:50], 200)[0]), 50)
+
+    def test_daily_chunks(self):
+        """Показания хранятся суточными блоками; повторное время заменяется"""
+        times = self.START + np.arange(0, 2 * 86400, 10.0)
+        ingest('ph-1', times.tolist(), (3 + np.arange(len(times)) * 0.001).tolist())
+        ingest('ph-1', [self.START + 20, '2023-11-15T00:00:30'], [7.5, 8.0])
+
+        sensor = Sensor.objects.get(code='ph-1')
+        # Запись только добавляет пакеты, блоки не переписываются
+        self.assertFalse(SensorChunk.objects.exists())
+        self.assertEqual(SensorBatch.objects.filter(sensor=sensor).count(), 3)
+        self.assertEqual(compact(), 3)
+        self.assertFalse(SensorBatch.objects.exists())
+        chunks = list(SensorChunk.objects.filter(sensor=sensor))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(sum(chunk.count for chunk in chunks), len(times))
+        self.assertEqual(sensor.last_reading_at.timestamp(), times[-1])
+
+        series = read_series(sensor, self.START, self.START + 40, 100)
+        self.assertEqual(series['level'], 'raw')
+        self.assertEqual(series['values'], [3.0, 3.001, 7.5, 8.0, 3.004])
+
+        series = read_series(sensor, self.START, self.START + 2 * 86400, 500)
+        self.assertEqual(len(series['times']), 500)
+        self.assertEqual(series['points'], len(times))
+
+    def test_compact_on_read(self):
+        """Чтение сливает отложенные пакеты только затронутых суток"""
+        ingest('ph-4', [self.START + 86400 + 5, self.START + 5], [1.0, 2.0])
+        ingest('ph-4', [self.START + 5, self.START + 10], [2.5, 3.0])
+        sensor = Sensor.objects.get(code='ph-4')
+
+        series = read_series(sensor, self.START, self.START + 3600)
+        self.assertEqual(series['values'], [2.5, 3.0])
+        self.assertEqual(SensorChunk.objects.get(sensor=sensor).count, 2)
+        self.assertEqual(list(SensorBatch.objects.values_list('count', flat=True)), [1])
+
+        output = StringIO()
+        call_command('compact_sensors', 'ph-4', stdout=output)
+        self.assertIn('Слито пакетов: 1', output.getvalue())
+        self.assertEqual(SensorChunk.objects.filter(sensor=sensor).count(), 2)
+
+    def test_overview_level(self):
+        """Длинный интервал читается из обзоров"""
+        from . import sensors
+
+        times = self.START + np.arange(0, 3 * 86400, 2.0)
+        ingest('cu-1', times, np.cos(times / 1e5), quantity='cu')
+        sensor = Sensor.objects.get(code='cu-1')
+        self.assertEqual(sensor.quantity, 'cu')
+
+        limit = sensors.MAX_RAW_POINTS
+        sensors.MAX_RAW_POINTS = 1000
+        try:
+            series = read_series(sensor, self.START, self.START + 3 * 86400, 1000)
+        finally:
+            sensors.MAX_RAW_POINTS = limit
+        self.assertEqual(series['level'], 'overview')
+        self.assertEqual(len(series['times']), 1000)
+        self.assertLessEqual(max(series['values']), 1.0001)
+        chunk = SensorChunk.objects.filter(sensor=sensor).first()
+        self.assertEqual(len(chunk.overview_times), OVERVIEW_POINTS * 4)
+
+    def test_stream(self):
+        """Поток отдает показания, появившиеся после курсора"""
+        ingest('ph-2', [self.START, self.START + 1], [2.0, 2.1])
+
+        async def collect():
+            return [event async for event in stream_events(['ph-2'], since=self.START, duration=0.1)]
+
+        events = async_to_sync(collect)()
+
+        readings = [json.loads(event.split('data: ')[1]) for event in events if event.startswith('event: readings')]
+        self.assertEqual(len(readings), 1)
+        self.assertEqual(readings[0]['times'], [self.START + 1])
+
+    def test_stream_invalid_since(self):
+        for since in ('abc', 'nan', 'inf'):
+            response = self.client.get(reverse('core:sensor_stream'), {'sensors': 'ph-2', 'since': since})
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()['success'])
+
+    def test_api_requires_token(self):
+        """Без настроенного токена запись закрыта; неверный токен отклоняется"""
+        body = json.dumps({'sensor': 'ph-5', 'times': [self.START], 'values': [2.5]})
+        with override_settings(SENSOR_INGEST_TOKEN=''):
+            response = self.client.post(reverse('core:sensor_ingest'), data=body, content_type='application/json',
+                                        headers={'X-Sensor-Token': ''})
+        self.assertEqual(response.status_code, 403)
+        with override_settings(SENSOR_INGEST_TOKEN='secret'):
+            response = self.client.post(reverse('core:sensor_ingest'), data=body, content_type='application/json',
+                                        headers={'X-Sensor-Token': 'wrong'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Sensor.objects.exists())
+
+    @override_settings(SENSOR_INGEST_TOKEN='secret')
+    def test_api(self):
+        self.client.defaults['HTTP_X_SENSOR_TOKEN'] = 'secret'
+        response = self.client.post(
+            reverse('core:sensor_ingest'),
+            data=json.dumps({'batches': [
+                {'sensor': 'ph-3', 'times': [self.START, self.START + 60], 'values': [2.5, 2.6]},
+                {'sensor': 'fe-3', 'times': [self.START], 'values': [3.27], 'quantity': 'fe'},
+            ]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), {'success': True, 'stored': {'ph-3': 2, 'fe-3': 1}})
+
+        sensors = self.client.get(reverse('core:sensor_list')).json()['sensors']
+        self.assertEqual([sensor['code'] for sensor in sensors], ['fe-3', 'ph-3'])
+
+        series = self.client.get(
+            reverse('core:sensor_series', args=['ph-3']), {'start': self.START, 'end': self.START + 3600}
+        ).json()
+        self.assertTrue(series['success'])
+        self.assertEqual(series['values'], [2.5, 2.6])
+
+        response = self.client.post(
+            reverse('core:sensor_ingest'),
+            data=json.dumps({'sensor': 'ph-3', 'times': [1, 2], 'values': [1]}),
+            content_type='application/json',
+        )
+        self.assertFalse(response.json()['success'])
+
+
+class ProcessStatsTest(TestCase):
+    """Тесты сводной статистики процессов"""
+
+    def create_flotation_test(self, number, useful_au, tails_au):
+        test = FlotationTest.objects.create(
+            number=number, initial_grade_analysis=2, calculated_initial_grade=2, reagent_regime='—',
+        )
+        FlotationProduct.objects.create(test=test, name='Концентрат', mass=10, grade=100, au_content=useful_au,
+                                        product_type='final_concentrate')
+        FlotationProduct.objects.create(test=test, name='Хвосты', mass=990, grade=0.1, au_content=tails_au,
+                                        product_type='tails')
+        return test
+
+    def create_sorption_test(self, number, mo_extraction):
+        return SorptionTest.objects.create(
+            number=number, solution_volume=1, initial_mo_concentration=10, final_mo_concentration=1,
+            h2so4_concentration=5, anionite_type='ab17', anionite_mass=5, temperature=25, duration=60,
+            mo_extraction=mo_extraction, sorption_capacity=1, mo_on_anionite=1,
+        )
+
+    def stats(self, process):
+        return ProcessStats.objects.get(process=process)
+
+    def test_incremental_updates(self):
+        """Сводка следует за созданием, изменением продуктов и удалением опытов"""
+        first = self.create_flotation_test(1, 90, 10)
+        second = self.create_flotation_test(2, 95, 5)
+        stats = self.stats('flotation')
+        self.assertEqual(stats.count, 2)
+        self.assertAlmostEqual(stats.total, 185)
+        self.assertEqual((stats.best_value, stats.best_id), (95, second.pk))
+        self.assertAlmostEqual(stats.average, 92.5)
+
+        # Ухудшение лучшего опыта: лучший — по вкладам остальных
+        FlotationProduct.objects.filter(test=second, product_type='tails').get().delete()
+        second.products.create(name='Хвосты', mass=990, grade=1, au_content=20, product_type='tails')
+        stats = self.stats('flotation')
+        self.assertEqual((stats.best_value, stats.best_id), (90, first.pk))
+        self.assertAlmostEqual(stats.total, 90 + 100 * 95 / 115)
+
+        # Каскадное удаление опыта с продуктами
+        first.delete()
+        stats = self.stats('flotation')
+        self.assertEqual(stats.count, 1)
+        self.assertAlmostEqual(stats.total, 100 * 95 / 115)
+        self.assertAlmostEqual(stats.best_value, 100 * 95 / 115)
+        self.assertEqual(stats.best_id, second.pk)
+
+        second.delete()
+        stats = self.stats('flotation')
+        self.assertEqual((stats.count, stats.valued_count, stats.best_value), (0, 0, None))
+        self.assertAlmostEqual(stats.total, 0)
+
+    def test_home_stats(self):
+        self.create_flotation_test(1, 80, 20)
+        self.create_sorption_test(1, 97.4)
+
+        with self.assertNumQueries(1):
+            stats = home_stats()
+        self.assertEqual(stats['total_tests'], 2)
+        self.assertEqual(stats['best_extraction'], 97.4)
+        self.assertEqual(stats['best_process'], 'Опыты сорбции')
+
+        response = self.client.get(reverse('core:home'))
+        self.assertContains(response, '97.4%')
+
+    def test_rebuild_repairs_drift(self):
+        """Изменения в обход сигналов исправляются пересчетом"""
+        self.create_sorption_test(1, 50)
+        test = self.create_sorption_test(2, 60)
+        SorptionTest.objects.filter(pk=test.pk).update(mo_extraction=90)
+        self.assertEqual(self.stats('sorption').best_value, 60)
+
+        report = rebuild(['sorption'])
+        self.assertEqual(report['sorption']['before'], (2, 110, 60))
+        self.assertEqual(report['sorption']['after'], (2, 140, 90))
+        self.assertEqual(self.stats('sorption').best_id, test.pk)
+
+        call_command('rebuild_process_stats', stdout=StringIO())
+        self.assertEqual(self.stats('sorption').total, 140)
+
+
+@override_settings(REPORTS_ASYNC=False)
+class ReportEngineTest(TestCase):
+    """Тесты построения отчетов"""
+
+    def setUp(self):
+        for number, (configuration, useful_au) in enumerate([('A', 90), ('A', 70), ('B', 95)], start=1):
+            test = FlotationTest.objects.create(
+                number=number, initial_grade_analysis=2, calculated_initial_grade=2, reagent_regime='—',
+                configuration=configuration,
+            )
+            FlotationProduct.objects.create(test=test, name='Концентрат', mass=10, grade=100, au_content=useful_au,
+                                            product_type='final_concentrate')
+            FlotationProduct.objects.create(test=test, name='Хвосты', mass=990, grade=0.1, au_content=100 - useful_au,
+                                            product_type='tails')
+
+    def test_report_content(self):
+        """Отчет строится по всем разделам; конфигурации упорядочены по среднему извлечению"""
+        job, cached = submit_report('summary')
+
+        self.assertFalse(cached)
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.progress, 100)
+        self.assertIn('Флотация: рейтинг конфигураций', job.html)
+        self.assertIn('Сорбция молибдена', job.html)
+        self.assertLess(job.html.index('>B<'), job.html.index('>A<'))
+        self.assertIn('>80<', job.html)
+
+    def test_cache_follows_data_versions(self):
+        """Повторный запрос берет готовый отчет, изменение данных строит новый"""
+        first, _ = submit_report('flotation')
+        again, cached = submit_report('flotation')
+        self.assertTrue(cached)
+        self.assertEqual(again.pk, first.pk)
+
+        other_period, cached = submit_report('flotation', {'date_to': '2000-01-01'})
+        self.assertFalse(cached)
+        self.assertIn('Нет данных за период', other_period.html)
+
+        test = FlotationTest.objects.get(number=1)
+        test.configuration = 'C'
+        test.save()
+        rebuilt, cached = submit_report('flotation')
+        self.assertFalse(cached)
+        self.assertNotEqual(rebuilt.pk, first.pk)
+        self.assertIn('>C<', rebuilt.html)
+
+    def test_invalid_params(self):
+        with self.assertRaises(ValueError):
+            submit_report('unknown')
+        with self.assertRaises(ValueError):
+            submit_report('summary', {'date_from': '2025-02-01', 'date_to': '2025-01-01'})
+
+    def test_api(self):
+        """Постановка, опрос и выгрузка через API"""
+        response = self.client.post(reverse('core:report_submit'), json.dumps({'kind': 'molybdenum'}),
+                                    content_type='application/json')
+        job = response.json()['job']
+        self.assertTrue(response.json()['success'])
+
+        status = self.client.get(reverse('core:report_status', args=[job['id']])).json()
+        self.assertEqual(status['job']['status'], 'done')
+
+        download = self.client.get(reverse('core:report_download', args=[job['id']]), {'download': 1})
+        self.assertEqual(download.status_code, 200)
+        self.assertIn('attachment', download['Content-Disposition'])
+        self.assertIn('Выщелачивание молибденита', download.content.decode())
+
+        page = self.client.get(reverse('core:reports'))
+        self.assertContains(page, 'Молибден: выщелачивание и сорбция')
+
+        failed = self.client.post(reverse('core:report_submit'), json.dumps({'kind': 'copper'}),
+                                  content_type='application/json')
+        self.assertFalse(failed.json()['success'])
+        self.assertEqual(self.client.get(reverse('core:report_status', args=[9999])).status_code, 404)
+
+
+class KnowledgeBaseTest(TestCase):
+    """Тесты базы знаний и полнотекстового поиска"""
+
+    def test_stemming(self):
+        for word, expected in [('флотации', 'флотац'), ('флотация', 'флотац'), ('важнейшие', 'важн'),
+                               ('микропузырьков', 'микропузырьк'), ('Ёлки', 'елк'), ('PAX', 'pax')]:
+            self.assertEqual(stem(word), expected)
+
+    def test_import_and_search(self):
+        """Импорт статей из файлов; поиск по словоформам с ранжированием и подсветкой"""
+        call_command('load_knowledge_base', stdout=StringIO())
+        self.assertEqual(Article.objects.count(), 7)
+        introduction = Article.objects.get(slug='introduction')
+        self.assertEqual(introduction.order, 1)
+        self.assertIn('микрофлотаци', introduction.title)
+
+        found = search('микрофлотацию')
+        self.assertGreater(found['total'], 1)
+        # Совпадение в заголовке весит больше, чем в тексте
+        self.assertIn('<mark>', found['results'][0]['title_html'])
+        self.assertIn('<mark>', found['results'][0]['snippet'])
+
+        formula = search('формулой Ханкокка')
+        self.assertEqual(formula['results'][0]['slug'], 'calculations')
+        self.assertIn('<mark>Ханкокка</mark>', formula['results'][0]['snippet'])
+        self.assertEqual(search('несуществующееслово')['total'], 0)
+        self.assertEqual(search('  ')['results'], [])
+
+    def test_index_follows_changes(self):
+        article = Article.objects.create(slug='leaching', title='Выщелачивание молибденита',
+                                         body='<p>Азотная кислота окисляет молибденит &amp; <b>сульфиды</b></p>')
+        self.assertEqual(search('окисление молибденита')['total'], 0)
+        self.assertEqual(search('молибденитом')['results'][0]['slug'], 'leaching')
+        self.assertIn('&amp;', search('кислоты')['results'][0]['snippet'])
+
+        article.body = '<p>Сорбция на анионитах</p>'
+        article.save()
+        self.assertEqual(search('кислота')['total'], 0)
+        self.assertEqual(search('анионит')['total'], 1)
+
+        article.is_published = False
+        article.save()
+        self.assertEqual(search('анионит')['total'], 0)
+        article.is_published = True
+        article.save()
+        article.delete()
+        self.assertEqual(search('анионит')['total'], 0)
+
+    def test_pages(self):
+        article = Article.objects.create(slug='sorption', title='Сорбция молибдена', summary='Кратко',
+                                         body='<p>Анионит АМ-п</p>')
+        index = self.client.get(reverse('core:knowledge_base'))
+        self.assertContains(index, 'Сорбция молибдена')
+        self.assertNotContains(index, 'Анионит АМ-п')
+
+        url = reverse('core:knowledge_article', args=['sorption'])
+        self.assertContains(self.client.get(url), 'Анионит АМ-п')
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(url), 'Анионит АМ-п')
+
+        article.body = '<p>Анионит АН-106</p>'
+        article.save()
+        self.assertContains(self.client.get(url), 'АН-106')
+
+        # Правка из другого процесса (без сигналов) видна после проверки версии в БД
+        Article.objects.filter(pk=article.pk).update(body='<p>Анионит ВП-1Ап</p>', updated_at=timezone.now())
+        self.assertContains(self.client.get(url), 'АН-106')
+        knowledge._checked_at -= knowledge.REFRESH_INTERVAL + 1
+        self.assertContains(self.client.get(url), 'ВП-1Ап')
+        self.assertEqual(self.client.get(reverse('core:knowledge_article', args=['missing'])).status_code, 404)
+
+        response = self.client.get(reverse('core:knowledge_search'), {'q': 'анионит'}).json()
+        self.assertTrue(response['success'])
+        self.assertEqual(response['results'][0]['slug'], 'sorption')
+
+
+def create_flotation_test(number, useful_au=90, tails_au=10):
+    test = FlotationTest.objects.create(
+        number=number, initial_grade_analysis=2, calculated_initial_grade=2, reagent_regime='РАХ',
+    )
+    FlotationProduct.objects.create(test=test, name='Концентрат', mass=10, grade=100, au_content=useful_au,
+                                    product_type='final_concentrate')
+    FlotationProduct.objects.create(test=test, name='Хвосты', mass=990, grade=0.1, au_content=tails_au,
+                                    product_type='tails')
+    return test
+
+
+class AsyncViewsTest(TestCase):
+    """Тесты асинхронных дашбордов и расчетных API"""
+
+    def test_dashboards_render(self):
+        create_flotation_test(1)
+        create_flotation_test(2, 95, 5)
+        for url in ('/flotation/', '/flotation/analytics/', '/molybdenum/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+        response = self.client.get('/flotation/')
+        self.assertEqual(response.context['total_tests'], 2)
+        self.assertAlmostEqual(response.context['best_extraction'], 95)
+        self.assertEqual([t.number for t in response.context['recent_tests']], [2, 1])
+
+    def test_gather_inside_transaction(self):
+        """В транзакции теста функции видят ее данные (последовательный режим)"""
+        create_flotation_test(1)
+        results = async_to_sync(gather_queries)(
+            tests=FlotationTest.objects.count,
+            products=FlotationProduct.objects.count,
+        )
+        self.assertEqual(results, {'tests': 1, 'products': 2})
+        self.assertEqual(async_to_sync(run_calculation)(sum, [1, 2], start=3), 6)
+
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_asgi_calculation(self):
+        """Расчетный эндпоинт через ASGI-обработчик"""
+        body = json.dumps({'target_ph': 4.0}).encode()
+        status = async_to_sync(asgi_call)(ASGIHandler(), 'POST', '/copper/neutralization/', body)
+        self.assertEqual(status, 200)
+
+    def test_summary(self):
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2.5)
+        self.assertEqual(percentile([], 99), 0.0)
+        summary = summarize([0.01, 0.02, 0.03, 0.04], elapsed=0.5, errors=1)
+        self.assertEqual(summary['throughput'], 8.0)
+        self.assertEqual(summary['max'], 40.0)
+        self.assertEqual(summary['errors'], 1)
+
+
+class ConcurrentQueriesTest(TransactionTestCase):
+    """Параллельные запросы в пуле потоков видят зафиксированные данные"""
+
+    def test_gather_in_pool(self):
+        create_flotation_test(1)
+        create_flotation_test(2)
+        results = async_to_sync(gather_queries)(
+            numbers=lambda: list(FlotationTest.objects.values_list('number', flat=True)),
+            products=FlotationProduct.objects.count,
+        )
+        self.assertEqual(results, {'numbers': [1, 2], 'products': 4})
+
+
+class DatabaseProfileTest(TransactionTestCase):
+    """PRAGMA профиля production применяются к каждому новому соединению"""
+
+    @override_settings(DB_PROFILE='production')
+    def test_pragmas(self):
+        connection = connections.create_connection('default')
+        self.addCleanup(connection.close)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+
+
+class RetryOnLockTest(SimpleTestCase):
+    """Повтор сохранения при блокировке БД"""
+
+    def flaky(self, failures, message='database is locked'):
+        calls = []
+
+        @retry_on_lock(attempts=3, backoff=0)
+        def save():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return len(calls)
+
+        return save, calls
+
+    def test_retries_until_success(self):
+        save, calls = self.flaky(2)
+        self.assertEqual(save(), 3)
+
+    def test_gives_up(self):
+        save, calls = self.flaky(5)
+        with self.assertRaises(OperationalError):
+            save()
+        self.assertEqual(len(calls), 3)
+
+    def test_other_errors_not_retried(self):
+        save, calls = self.flaky(1, 'no such table: core_article')
+        with self.assertRaises(OperationalError):
+            save()
+        self.assertEqual(len(calls), 1)
+
+
+class ServerTimingTest(TestCase):
+    """Тесты инструментирования запросов"""
+
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', self.client.get('/flotation/').headers)
+
+    @override_settings(TIMING_ENABLED=True, TIMING_DUPLICATE_THRESHOLD=5)
+    def test_header_and_duplicates(self):
+        """Тесты сорбции: одинаковые запросы по каждой группе попадают в лог"""
+        generate(sorption=20, seed=1)
+
+        with self.assertLogs('core.timing', 'WARNING') as logs:
+            response = Client().get('/molybdenum/sorption-tests/')
+
+        header = response.headers['Server-Timing']
+        self.assertTrue(header.startswith('total;dur='))
+        self.assertIn('db;dur=', header)
+        self.assertIn('render;dur=', header)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], '/molybdenum/sorption-tests/')
+        self.assertGreater(record['queries'], 12)
+        self.assertIn('queries', header)
+        self.assertTrue(any('"molybdenum_sorptiontest"' in item['sql'] and item['count'] >= 5
+                            for item in record['duplicates']))
+
+    @override_settings(TIMING_ENABLED=True)
+    def test_calculation_span(self):
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            response = Client().post('/copper/neutralization/', json.dumps({'target_ph': 4.0}),
+                                     content_type='application/json')
+        self.assertIn('calc;dur=', response.headers['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record['calc_ms'], 0)
+        self.assertNotIn('duplicates', record)
+
+    @override_settings(TIMING_ENABLED=True, TIMING_SAMPLE_RATE=0)
+    def test_sampling(self):
+        self.assertNotIn('Server-Timing', Client().get('/flotation/').headers)
+
+
+class ProfilingTest(TestCase):
+    """Тесты профилирования запросов по требованию"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(PROFILE_DIR=directory.name, PROFILE_KEEP=2)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.staff = User.objects.create_user('lab', password='x', is_staff=True)
+
+    def test_staff_capture_and_download(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/copper/?_profile=1')
+        profile_id = response.headers['X-Profile-Id']
+
+        profile, = list_profiles()
+        self.assertEqual(profile['id'], profile_id)
+        self.assertEqual(profile['mode'], 'cprofile')
+        self.assertEqual(profile['path'], '/copper/?_profile=1')
+        self.assertEqual(profile['user'], 'lab')
+        self.assertTrue(profile['top'])
+
+        page = self.client.get(reverse('core:profiles'))
+        self.assertContains(page, profile['file'])
+        download = self.client.get(reverse('core:profile_download', args=[profile_id]))
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b''.join(download.streaming_content))
+        self.assertEqual(self.client.get(reverse('core:profile_download', args=['..'])).status_code, 404)
+
+    def test_async_view_sampled(self):
+        """Асинхронные представления профилируются сэмплером стеков"""
+        self.client.force_login(self.staff)
+        self.client.get('/flotation/?_profile=1')
+        self.assertEqual(list_profiles()[0]['mode'], 'sample')
+
+    def test_anonymous_ignored(self):
+        self.assertNotIn('X-Profile-Id', self.client.get('/copper/?_profile=1').headers)
+        self.assertEqual(self.client.get(reverse('core:profiles')).status_code, 302)
+
+    def test_ring_buffer(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            ids = [self.client.get('/copper/').headers['X-Profile-Id'] for _ in range(3)]
+        self.assertEqual([profile['id'] for profile in list_profiles()], ids[:0:-1])
+
+
+class MetricsTest(TestCase):
+    """Тесты метрик Prometheus"""
+
+    def test_sharded_counter_and_histogram(self):
+        """Значения потоков суммируются, в том числе завершившихся"""
+        import threading
+
+        registry = Registry()
+        counter = registry.counter('test_total', 'Тест', ['kind'])
+        histogram = registry.histogram('test_seconds', 'Тест', buckets=(0.1, 1))
+
+        def work():
+            for _ in range(1000):
+                counter.inc(kind='a')
+            histogram.observe(0.5)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc(2, kind='b')
+
+        self.assertEqual(counter.value(kind='a'), 4000)
+        # Шарды завершившихся потоков слиты в итог один раз
+        self.assertEqual(counter.value(kind='a'), 4000)
+        text = registry.render()
+        self.assertIn('# TYPE test_total counter', text)
+        self.assertIn('test_total{kind="b"} 2', text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('test_seconds_bucket{le="1"} 4', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn('test_seconds_count 4', text)
+        with self.assertRaises(ValueError):
+            counter.inc()
+
+    def test_endpoint(self):
+        before = REQUESTS.value(view='core:copper', method='GET', status=200) or 0
+        self.client.get('/copper/')
+        self.assertEqual(REQUESTS.value(view='core:copper', method='GET', status=200), before + 1)
+
+        self.client.post('/copper/neutralization/', json.dumps({}), content_type='application/json')
+        record_cache('knowledge_pages', True)
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('lab_http_request_duration_seconds_bucket{view="core:copper",le="+Inf"}', text)
+        self.assertIn('lab_http_request_queries_count{view="core:copper"}', text)
+        self.assertIn('lab_db_queries_total{alias="default"}', text)
+        self.assertIn('lab_cache_hit_ratio{cache="knowledge_pages"}', text)
+        self.assertIn('lab_table_rows{table="flotation_flotationtest"} 0', text)
+        self.assertIsNotNone(CALCULATION_DURATION.value(function='calculate_neutralization'))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secre').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer sécret').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+
+class SlowQueryLogTest(TestCase):
+    """Тесты журнала медленных SQL-запросов"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(SLOW_QUERY_MS=1e-6, SLOW_QUERY_LOG=f'{directory.name}/slow.jsonl')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint('SELECT * FROM t WHERE id IN (%s, %s) LIMIT 21'),
+                         fingerprint("SELECT * FROM t WHERE id IN (%s)  LIMIT 5"))
+        self.assertNotEqual(fingerprint('SELECT * FROM t'), fingerprint('SELECT * FROM u'))
+        self.assertEqual(full_scans(['SCAN flotation_flotationproduct', 'SCAN molybdenum_leachingproduct '
+                                     'USING INDEX x']), ['flotation_flotationproduct'])
+
+    def test_full_scan_flagged(self):
+        with self.assertLogs('core.slow_queries', 'WARNING'):
+            list(FlotationProduct.objects.filter(mass__gt=1))
+            list(FlotationProduct.objects.filter(mass__gt=5))
+
+        report = slow_query_report()
+        group = next(group for group in report if 'flotation_flotationproduct' in group['full_scans'])
+        self.assertEqual(group['count'], 2)
+        self.assertIn('SCAN flotation_flotationproduct', group['plan'])
+        self.assertTrue(group['origins'][0][0].startswith('core/tests.py'))
+
+        output = StringIO()
+        call_command('slow_queries', '--limit', '50', stdout=output)
+        self.assertIn('полный проход: flotation_flotationproduct', output.getvalue())
+
+    def test_disabled_without_threshold(self):
+        with override_settings(SLOW_QUERY_MS=None):
+            list(FlotationProduct.objects.filter(mass__gt=1))
+        self.assertEqual(slow_query_report(), [])
+
+    def test_admin_page(self):
+        staff = User.objects.create_user('lab', password='x', is_staff=True)
+        self.client.force_login(staff)
+        with self.assertLogs('core.slow_queries', 'WARNING'):
+            FlotationProduct.objects.filter(mass__gt=1).count()
+        response = self.client.get(reverse('core:slow_queries'))
+        self.assertContains(response, 'Полный проход: flotation_flotationproduct')
+
+
+class KernelBenchmarkTest(TestCase):
+    """Тесты микробенчмарков функций расчета"""
+
+    def test_bench_kernel(self):
+        result = bench_kernel(lambda n: [0] * n, (1000,), repeat=5, batch=5, warmup=0)
+        self.assertLessEqual(result['min_us'], result['p50_us'])
+        self.assertGreater(result['throughput'], 0)
+        # Список из 1000 элементов — не меньше 8 КБ
+        self.assertGreaterEqual(result['peak_kb'], 7.8)
+        self.assertGreaterEqual(result['allocations'], 1)
+
+    def test_compare_to_baseline(self):
+        baseline = {'calc': {'p50_us': 10, 'throughput': 1000, 'allocations': 5, 'peak_kb': 1}}
+        current = {'calc': {'p50_us': 11, 'throughput': 700, 'allocations': 5, 'peak_kb': 2}, 'new': {}}
+        regressions = compare_to_baseline(current, baseline, 0.2)
+        self.assertEqual([(item['metric'], item['change']) for item in regressions],
+                         [('throughput', -30.0), ('peak_kb', 100.0)])
+
+    def test_command_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = f'{directory}/baseline.json'
+            options = ['--kernel', 'calculate_sorption', '--repeat', '3', '--batch', '3', '--baseline', baseline]
+            call_command('bench_kernels', *options, '--save-baseline', stdout=StringIO())
+            with open(baseline, encoding='utf-8') as file:
+                self.assertIn('calculate_sorption', json.load(file))
+
+            output = StringIO()
+            call_command('bench_kernels', *options, '--threshold', '1000', '--json', stdout=output)
+            self.assertEqual(json.loads(output.getvalue())['regressions'], [])
+
+
+class SyntheticDataTest(TestCase):
+    """Тесты генератора синтетических опытов и замера масштабирования"""
+
+    def test_generate(self):
+        create_flotation_test(1)
+        generate(flotation=30, leaching=10, sorption=10, seed=1)
+
+        self.assertEqual(FlotationTest.objects.count(), 31)
+        self.assertEqual(FlotationProduct.objects.count(), 2 + 30 * 4)
+        self.assertEqual(LeachingProduct.objects.count(), 20)
+        self.assertEqual(SorptionTest.objects.count(), 10)
+        self.assertEqual(FlotationTest.objects.order_by('-number').first().number, 31)
+
+        test = FlotationTest.objects.last()
+        self.assertTrue(0 < test.extraction < 100)
+        leaching = LeachingTest.objects.first()
+        self.assertTrue(0 < leaching.mo_extraction_to_solution < 100)
+        # Массовые вставки учтены в сводках главной страницы
+        self.assertEqual(ProcessStats.objects.get(process='flotation').count, 31)
+
+    def test_measure_view(self):
+        generate(flotation=3, seed=1)
+        result = measure_view(Client(), '/flotation/tests/')
+        self.assertEqual(result['status'], 200)
+        self.assertGreater(result['queries'], 0)
+        self.assertGreater(result['peak_kb'], 0)
+
+    def test_query_growth(self):
+        self.assertEqual(query_growth([(10, 5), (110, 5)]), 0.0)
+        self.assertEqual(query_growth([(10, 25), (110, 425)]), 4.0)
+        self.assertEqual(query_growth([(10, 25), (110, None)]), 0.0)
+
+
+@override_settings(REPORTS_ASYNC=False)
+class QueryBudgetTest(TestCase):
+    """
+    Число SQL-запросов каждой страницы ограничено и не растет с числом записей
+
+    Страницы замеряются на 10 и на 100 опытах каждого процесса (и расчетах
+    плавки, датчиках): рост числа запросов — признак N+1 (свойство модели,
+    читающее продукты опыта без prefetch_related, или столбец list_display).
+    """
+
+    URLCONFS = ['core.urls', 'flotation.urls', 'molybdenum.urls', 'antimony.urls']
+
+    # Не замеряются: бесконечный поток событий и файл профиля вне БД
+    SKIPPED = {'core:sensor_stream', 'core:profile_download'}
+
+    # Предел SQL-запросов на GET-запрос (POST-only API отвечают без запросов)
+    BUDGETS = {
+        'metrics': 12,
+        'core:home': 1,
+        'core:knowledge_base': 1,
+        'core:knowledge_article': 3,
+        'core:sensor_list': 1,
+        'core:sensor_series': 4,
+        'core:reports': 1,
+        'core:report_status': 1,
+        'core:report_download': 1,
+        'core:profiles': 2,
+        'core:slow_queries': 2,
+        'flotation:dashboard': 9,
+        'flotation:reagents': 7,
+        'flotation:tests': 4,
+        'flotation:test_detail': 2,
+        'flotation:analytics': 4,
+        'molybdenum:dashboard': 9,
+        'molybdenum:leaching_tests': 2,
+        'molybdenum:sorption_tests': 38,
+        'molybdenum:leaching_test_detail': 4,
+        'molybdenum:sorption_test_detail': 1,
+        'molybdenum:analytics': 22,
+        'antimony:runs': 1,
+    }
+    # Сессия, пользователь, подсчет записей и страница списка
+    ADMIN_BUDGET = 7
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_superuser('lab', password='x')
+        self.client = Client(raise_request_exception=False)
+        self.client.force_login(user)
+        Article.objects.create(slug='flotation', title='Флотация', body='<p>Флотация золота</p>')
+        self.job, _cached = submit_report('summary')
+
+    def seed(self, count):
+        """Догенерация опытов, расчетов плавки и датчиков до count записей каждого вида"""
+        current = FlotationTest.objects.count()
+        generate(flotation=count - current, leaching=count - current, sorption=count - current, seed=count)
+        SmeltingRun.objects.bulk_create([
+            SmeltingRun(input_hash=f'{number:064x}', inputs={'temperature': 1000, 'reducer_type': 'coke'},
+                        result={'crude_antimony': {'sb_extraction': 90, 'mass': 10}})
+            for number in range(current, count)
+        ])
+        for number in range(current, count):
+            ingest(f'ph-{number}', [SensorReadingsTest.START + number], [7.0], quantity='ph')
+        # Замеряется чтение слитых блоков; слияние пакетов — разовая запись
+        compact()
+
+    def urls(self):
+        """Адреса всех страниц приложений и списков админки: {имя: путь}"""
+        args = {
+            'flotation:test_detail': FlotationTest.objects.order_by('pk').first().pk,
+            'molybdenum:leaching_test_detail': LeachingTest.objects.order_by('pk').first().pk,
+            'molybdenum:sorption_test_detail': SorptionTest.objects.order_by('pk').first().pk,
+            'antimony:add_measurement': SmeltingRun.objects.order_by('pk').first().pk,
+            'core:knowledge_article': 'flotation',
+            'core:sensor_series': 'ph-0',
+            'core:report_status': self.job.pk,
+            'core:report_download': self.job.pk,
+        }
+        urls = {'metrics': reverse('metrics')}
+        for urlconf in self.URLCONFS:
+            module = import_module(urlconf)
+            for pattern in module.urlpatterns:
+                name = f'{module.app_name}:{pattern.name}'
+                if name not in self.SKIPPED:
+                    urls[name] = reverse(name, args=[args[name]] if name in args else None)
+        for model in admin.site._registry:
+            name = f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
+            urls[name] = reverse(name)
+        return urls
+
+    def measure(self):
+        counts = {}
+        for name, path in self.urls().items():
+            cache.clear()
+            knowledge.invalidate_pages()
+            result = measure_view(self.client, path, memory=False)
+            self.assertLess(result['status'], 400, f'{name}: {path}')
+            counts[name] = result['queries']
+        return counts
+
+    def test_queries_do_not_grow(self):
+        self.seed(10)
+        small = self.measure()
+        self.seed(100)
+        large = self.measure()
+
+        for name, queries in large.items():
+            with self.subTest(name):
+                self.assertEqual(queries, small[name], 'число запросов растет с числом записей')
+                budget = self.ADMIN_BUDGET if name.startswith('admin:') else self.BUDGETS.get(name, 0)
+                self.assertLessEqual(queries, budget)
+
+
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class LoadTestTest(TransactionTestCase):
+    """Тесты нагрузки сценариями пользователей"""
+
+    JOURNEY = [
+        ('copper', lambda rng: ('GET', '/copper/', None)),
+        ('neutralization', lambda rng: ('POST', '/copper/neutralization/', {'target_ph': rng.choice([3.5, 4.0])})),
+        ('missing', lambda rng: ('GET', '/missing/', None)),
+    ]
+
+    def test_step_outcome(self):
+        self.assertEqual(step_outcome(200, b'<html></html>'), (True, False))
+        self.assertEqual(step_outcome(404, b''), (False, False))
+        self.assertEqual(step_outcome(200, b'{"success": false, "error": "Database is locked"}'), (False, True))
+        self.assertEqual(step_outcome(500, b'', [OperationalError('database is locked')]), (False, True))
+
+    def test_assign_journeys(self):
+        self.assertEqual(assign_journeys({'viewer': 3, 'technician': 1}, 8).count('technician'), 2)
+        self.assertEqual(assign_journeys({'viewer': 1, 'technician': 1}, 2), ['viewer', 'technician'])
+        self.assertEqual(parse_mix('viewer,technician=2'), {'viewer': 1, 'technician': 2})
+        with self.assertRaises(CommandError):
+            parse_mix('admin=1')
+
+    def test_journeys(self):
+        """Сводка по шагам: ошибки считаются отдельно для каждого шага"""
+        for server, run in (
+            ('wsgi', lambda: run_wsgi_journeys(WSGIHandler(), [self.JOURNEY] * 2, duration=0.3)),
+            ('asgi', lambda: async_to_sync(run_asgi_journeys)(ASGIHandler(), [self.JOURNEY] * 2, duration=0.3)),
+        ):
+            with self.subTest(server=server):
+                result = run()
+                self.assertGreater(result['journeys'], 0)
+                self.assertEqual(list(result['steps']), ['copper', 'neutralization', 'missing'])
+                self.assertEqual(result['steps']['copper']['errors'], 0)
+                self.assertEqual(result['steps']['neutralization']['errors'], 0)
+                self.assertEqual(result['steps']['missing']['error_rate'], 100)
+                self.assertEqual(result['lock_errors'], 0)
+                self.assertEqual(result['requests'], sum(item['requests'] for item in result['steps'].values()))
@@ -7,9 +7,24 @@ urlpatterns = [
     path('', views.home, name='home'),
     
     path('knowledge-base/', views.knowledge_base, name='knowledge_base'),
+    path('knowledge-base/search/', views.knowledge_search, name='knowledge_search'),
+    path('knowledge-base/<slug:slug>/', views.knowledge_article, name='knowledge_article'),
     
     path('copper/', views.copper, name='copper'),
+    path('copper/neutralization/', views.copper_neutralization, name='copper_neutralization'),
+    path('copper/heap-leaching/', views.copper_heap_leaching, name='copper_heap_leaching'),
+    path('copper/sensors/', views.sensor_list, name='sensor_list'),
+    path('copper/sensors/ingest/', views.sensor_ingest, name='sensor_ingest'),
+    path('copper/sensors/stream/', views.sensor_stream, name='sensor_stream'),
+    path('copper/sensors/<slug:code>/series/', views.sensor_series, name='sensor_series'),
     
     path('reports/', views.reports, name='reports'),
+    path('reports/submit/', views.report_submit, name='report_submit'),
+    path('reports/<int:job_id>/status/', views.report_status, name='report_status'),
+    path('reports/<int:job_id>/download/', views.report_download, name='report_download'),
+    
+    path('profiles/', views.profiles, name='profiles'),
+    path('profiles/<str:profile_id>/download/', views.profile_download, name='profile_download'),
+    path('slow-queries/', views.slow_queries, name='slow_queries'),
     
 ]
\ No newline at end of file
@@ -1,21 +1,40 @@
-from django.shortcuts import render
+import hmac
+import json
+import math
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.shortcuts import render, get_object_or_404
+from django.template.loader import render_to_string
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from .concurrency import run_calculation
+from .copper import calculate_neutralization, simulate_heap
+from .metrics import REGISTRY, record_cache
+from .knowledge import PAGE_CACHE_TIMEOUT, SEARCH_LIMIT, page_cache_key, search
+from .models import Article, ReportJob, Sensor
+from .profiling import list_profiles, profile_file
+from .slowlog import slow_query_report
+from .reports import KINDS, job_status, render_pdf, submit_report
+from .stats import home_stats
+from .sensors import ingest, read_series, stream_events, sensor_summary, DAY_SECONDS, DEFAULT_WIDTH
 
 def home(request):
     """Главная страница"""
+    stats = home_stats()
     context = {
-        'stats': {
-            'total_tests': 132 + 6,  # флотация + выщелачивание
-            'best_extraction': 97.4,
-            'configurations': 5 + 6,  # флотация + молибден
-            'reagents_count': 15 + 5,  # флотация + анионитов
-        },
+        'stats': stats,
         'processes': [
             {
                 'name': 'Флотация',
                 'icon': '🧪',
                 'description': 'Анализ флотационных тестов, оптимизация реагентных режимов, расчет эффективности извлечения ценных компонентов.',
                 'status': 'active',
-                'url': 'flotation:dashboard'
+                'url': 'flotation:dashboard',
+                'metrics': _process_metrics(stats, 'flotation'),
             },
             {
                 'name': 'Утилизация медных отвалов',
@@ -29,27 +48,272 @@ def home(request):
                 'icon': '⚗️',
                 'description': 'Гидрометаллургическая переработка молибденитовых концентратов: кислотное выщелачивание и сорбционное извлечение.',
                 'status': 'active',
-                'url': 'molybdenum:dashboard'
+                'url': 'molybdenum:dashboard',
+                'metrics': _process_metrics(stats, 'leaching') + _process_metrics(stats, 'sorption'),
             },
             {
                 'name': 'Плавка антимоната',
                 'icon': '🔥',
                 'description': 'Калькулятор восстановительной плавки антимоната натрия для получения металлической сурьмы',
                 'status': 'active',
-                'url': 'antimony:calculator'
+                'url': 'antimony:calculator',
+                'metrics': _process_metrics(stats, 'smelting'),
             },
         ]
     }
     return render(request, 'core/home.html', context)
 
+def _process_metrics(stats, process):
+    """Количество и лучшее извлечение процесса для карточки главной страницы"""
+    row = stats['processes'][process]
+    metrics = [{'label': row['label'], 'value': row['count']}]
+    if row['best_value'] is not None:
+        metrics.append({'label': 'Лучшее извлечение', 'value': f"{row['best_value']:.1f}%"})
+    return metrics
+
 def knowledge_base(request):
-    """База знаний"""
-    return render(request, 'core/knowledge_base.html')
+    """База знаний: оглавление статей и поиск"""
+    articles = Article.objects.filter(is_published=True).only('slug', 'title', 'process', 'summary')
+    return render(request, 'core/knowledge_base.html', {
+        'articles': articles,
+        'query': request.GET.get('q', ''),
+    })
+
+
+def knowledge_search(request):
+    """API поиска по базе знаний (?q, limit, offset)"""
+    try:
+        limit = min(max(int(request.GET.get('limit') or SEARCH_LIMIT), 1), 100)
+        offset = max(int(request.GET.get('offset') or 0), 0)
+        results = search(request.GET.get('q', ''), limit, offset)
+        results['success'] = True
+        return JsonResponse(results)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+
+
+def knowledge_article(request, slug):
+    """Статья базы знаний (отрисованная страница кэшируется до изменения статей)"""
+    key = page_cache_key(slug)
+    page = cache.get(key)
+    record_cache('knowledge_pages', page is not None)
+    if page is None:
+        article = get_object_or_404(Article, slug=slug, is_published=True)
+        siblings = Article.objects.filter(is_published=True).only('slug', 'title')
+        page = render_to_string('core/knowledge_article.html', {
+            'article': article,
+            'articles': siblings,
+        }, request)
+        cache.set(key, page, PAGE_CACHE_TIMEOUT)
+    return HttpResponse(page)
 
 def reports(request):
     """Отчеты"""
-    return render(request, 'core/reports.html')
+    return render(request, 'core/reports.html', {
+        'kinds': KINDS.items(),
+        'jobs': ReportJob.objects.defer('html')[:20],
+    })
+
+
+def report_submit(request):
+    """API постановки отчета в очередь (готовый отчет из кэша возвращается сразу)"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            job, cached = submit_report(data.get('kind', 'summary'), data.get('params', {}))
+            record_cache('reports', cached)
+            return JsonResponse({'success': True, 'cached': cached, 'job': job_status(job)})
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+
+    return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
+
+
+def report_status(request, job_id):
+    """API состояния задания на отчет"""
+    job = get_object_or_404(ReportJob.objects.defer('html'), pk=job_id)
+    return JsonResponse({'success': True, 'job': job_status(job)})
+
+
+def report_download(request, job_id):
+    """Выгрузка готового отчета (?format=html|pdf)"""
+    job = get_object_or_404(ReportJob, pk=job_id, status='done')
+    filename = f'report-{job.kind}-{job.pk}'
+    if request.GET.get('format') == 'pdf':
+        try:
+            response = HttpResponse(render_pdf(job.html), content_type='application/pdf')
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+        response['Content-Disposition'] = f'attachment; filename="{filename}.pdf"'
+        return response
+
+    response = HttpResponse(job.html, content_type='text/html; charset=utf-8')
+    if request.GET.get('download'):
+        response['Content-Disposition'] = f'attachment; filename="{filename}.html"'
+    return response
 
 def copper(request):
     """Медь"""
-    return render(request, 'core/copper.html')
\ No newline at end of file
+    return render(request, 'core/copper.html')
+
+async def copper_neutralization(request):
+    """API расчета нейтрализации отвала"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            results = await run_calculation(calculate_neutralization, data)
+            results['success'] = True
+            return JsonResponse(results)
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+
+    return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
+
+
+async def copper_heap_leaching(request):
+    """API моделирования кучного биовыщелачивания"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            results = await run_calculation(simulate_heap, data)
+            results['success'] = True
+            return JsonResponse(results)
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+
+    return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
+
+
+@csrf_exempt
+def sensor_ingest(request):
+    """
+    API записи показаний датчиков
+
+    Тело: {'sensor', 'times', 'values', 'quantity'} или {'batches': [...]}
+    таких пакетов; times — секунды эпохи или строки ISO 8601. Токен
+    settings.SENSOR_INGEST_TOKEN передается в заголовке X-Sensor-Token;
+    пока токен не задан, запись закрыта.
+    """
+    if request.method == 'POST':
+        token = getattr(settings, 'SENSOR_INGEST_TOKEN', None)
+        if not token:
+            return JsonResponse({'success': False, 'error': 'Запись показаний не настроена'}, status=403)
+        if not hmac.compare_digest(request.headers.get('X-Sensor-Token', '').encode(), token.encode()):
+            return JsonResponse({'success': False, 'error': 'Неверный токен датчика'}, status=403)
+        try:
+            data = json.loads(request.body)
+            batches = data.get('batches', [data])
+            stored = {}
+            for batch in batches:
+                code = batch['sensor']
+                stored[code] = stored.get(code, 0) + ingest(code, batch['times'], batch['values'], batch.get('quantity'))
+            return JsonResponse({'success': True, 'stored': stored})
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+
+    return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
+
+
+def metrics(request):
+    """
+    Метрики в текстовом формате Prometheus
+
+    Если задан settings.METRICS_TOKEN, он передается в заголовке
+    Authorization: Bearer <токен>.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and not hmac.compare_digest(request.headers.get('Authorization', '').encode(),
+                                         f'Bearer {token}'.encode()):
+        return HttpResponse('Неверный токен метрик', status=403, content_type='text/plain; charset=utf-8')
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def sensor_list(request):
+    """API списка датчиков"""
+    return JsonResponse({'success': True, 'sensors': [sensor_summary(sensor) for sensor in Sensor.objects.all()]})
+
+
+def sensor_series(request, code):
+    """API показаний датчика за интервал (?start, end — секунды эпохи; width — точек)"""
+    sensor = get_object_or_404(Sensor, code=code)
+    try:
+        end = float(request.GET.get('end') or (sensor.last_reading_at.timestamp() if sensor.last_reading_at else time.time()))
+        start = float(request.GET.get('start') or end - 7 * DAY_SECONDS)
+        width = int(request.GET.get('width') or DEFAULT_WIDTH)
+        return JsonResponse({'success': True, 'sensor': sensor_summary(sensor), **read_series(sensor, start, end, width)})
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+
+
+async def sensor_stream(request):
+    """Поток новых показаний (Server-Sent Events); ?sensors=код,код&since=секунды эпохи"""
+    codes = [code for code in request.GET.get('sensors', '').split(',') if code]
+    if not codes:
+        codes = await sync_to_async(list)(Sensor.objects.values_list('code', flat=True))
+    since = request.GET.get('since')
+    try:
+        since = float(since) if since else None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': f'Неверное значение since: {since}'}, status=400)
+    if since is not None and not math.isfinite(since):
+        return JsonResponse({'success': False, 'error': f'Неверное значение since: {since}'}, status=400)
+    response = StreamingHttpResponse(
+        stream_events(codes, since),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@staff_member_required
+def profiles(request):
+    """Снятые профили запросов (кольцевой буфер core.profiling)"""
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Профили запросов',
+        'profiles': list_profiles(),
+    }
+    return render(request, 'core/profiles.html', context)
+
+
+@staff_member_required
+def profile_download(request, profile_id):
+    """Выгрузка профиля: .prof (pstats) или .folded (свернутые стеки)"""
+    path = profile_file(profile_id)
+    if path is None:
+        raise Http404('Профиль не найден')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
+
+@staff_member_required
+def slow_queries(request):
+    """Топ медленных SQL-запросов (журнал core.slowlog)"""
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Медленные SQL-запросы',
+        'queries': slow_query_report(),
+        'threshold': getattr(settings, 'SLOW_QUERY_MS', None),
+    }
+    return render(request, 'core/slow_queries.html', context)
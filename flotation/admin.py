@@ -15,8 +15,17 @@ class FlotationTestAdmin(admin.ModelAdmin):
     search_fields = ['number', 'reagent_regime']
     ordering = ['-number']
 
+    def get_queryset(self, request):
+        # Извлечение, эффективность и выход считаются по продуктам опыта
+        return super().get_queryset(request).prefetch_related('products')
+
+
 @admin.register(FlotationProduct)
 class FlotationProductAdmin(admin.ModelAdmin):
     list_display = ['test', 'name', 'mass', 'grade', 'au_content']
     list_filter = ['name']
-    search_fields = ['test__number', 'name']
\ No newline at end of file
+    search_fields = ['test__number', 'name']
+
+    def get_queryset(self, request):
+        # Название опыта в списке включает извлечение по его продуктам
+        return super().get_queryset(request).select_related('test').prefetch_related('test__products')
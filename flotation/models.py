@@ -106,19 +106,23 @@ class FlotationTest(models.Model):
     # Категория теста
     configuration = models.CharField('Конфигурация', max_length=50, blank=True)
     
+    # Показатели считаются по self.products.all(): после prefetch_related('products')
+    # — без запросов к БД, иначе — одним запросом на показатель
+    
     @property
     def extraction(self):
         """Рассчитанное извлечение"""
-        useful_products = self.products.exclude(product_type='tails')
-        total_au = self.products.aggregate(total=models.Sum('au_content'))['total'] or 0
-        useful_au = useful_products.aggregate(total=models.Sum('au_content'))['total'] or 0
+        products = self.products.all()
+        total_au = sum(product.au_content for product in products)
+        useful_au = sum(product.au_content for product in products if product.product_type != 'tails')
         return (useful_au / total_au * 100) if total_au > 0 else 0
     
     @property 
     def concentrate_yield(self):
         """Рассчитанный выход концентрата"""
-        concentrate = self.products.filter(product_type='final_concentrate').first()
-        total_mass = self.products.aggregate(total=models.Sum('mass'))['total'] or 0
+        products = sorted(self.products.all(), key=lambda product: product.pk)
+        concentrate = next((product for product in products if product.product_type == 'final_concentrate'), None)
+        total_mass = sum(product.mass for product in products)
         return (concentrate.mass / total_mass * 100) if concentrate and total_mass > 0 else 0
     
     @property
@@ -3,6 +3,11 @@ from .models import Reagent, FlotationTest, FlotationProduct
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.db import transaction
+from asgiref.sync import sync_to_async
+from core.concurrency import gather_queries
+from core.db import retry_on_lock
+from core.instrumentation import timed
+from core.metrics import track_calculation
 import json
 
 
@@ -131,27 +136,37 @@ def test_detail(request, test_id):
         })
 
 
-def analytics(request):
-    """Расширенная аналитика флотации"""
-    from django.db.models import Avg, Max, Min, Count
+ANALYTICS_BREADCRUMBS = [
+    {'title': 'Главная', 'url': 'core:home'},
+    {'title': 'Флотация', 'url': 'flotation:dashboard'},
+    {'title': 'Аналитика', 'url': None}
+]
+
+
+def _analytics_trend():
+    """Последние 20 тестов для детального тренда"""
+    recent_tests = list(FlotationTest.objects.prefetch_related('products').order_by('-number')[:20])
+    recent_tests.reverse()
+    return {
+        'recent_tests': recent_tests,
+        'chart': {
+            'labels': [f"Тест {test.number}" for test in recent_tests],
+            'extraction_data': [test.extraction for test in recent_tests],
+            'efficiency_data': [test.efficiency for test in recent_tests],
+            'yield_data': [test.concentrate_yield for test in recent_tests]
+        },
+    }
+
+
+def _analytics_summary():
+    """Статистика по всем тестам; None, если тестов нет"""
     from collections import defaultdict
-    import json
     
     # Получаем все тесты с продуктами
-    all_tests = FlotationTest.objects.prefetch_related('products').all()
+    all_tests = list(FlotationTest.objects.prefetch_related('products').all())
     
     if not all_tests:
-        # Если нет данных, возвращаем пустой контекст
-        context = {
-            'no_data': True,
-            'page_title': 'Аналитика флотации',
-            'breadcrumbs': [
-                {'title': 'Главная', 'url': 'core:home'},
-                {'title': 'Флотация', 'url': 'flotation:dashboard'},
-                {'title': 'Аналитика', 'url': None}
-            ]
-        }
-        return render(request, 'flotation/analytics.html', context)
+        return None
     
     # === 1. СТАТИСТИКА ПО КОНФИГУРАЦИЯМ ===
     config_stats = {}
@@ -221,18 +236,7 @@ def analytics(request):
         'poor': {'count': len(poor_tests), 'percentage': len(poor_tests) / len(all_tests) * 100}
     }
     
-    # === 3. ТРЕНДЫ И ВРЕМЕННОЙ АНАЛИЗ ===
-    # Последние 20 тестов для детального тренда
-    recent_tests = list(FlotationTest.objects.prefetch_related('products').order_by('-number')[:20])
-    recent_tests.reverse()
-    
-    # Данные для графиков
-    trend_chart_data = {
-        'labels': [f"Тест {test.number}" for test in recent_tests],
-        'extraction_data': [test.extraction for test in recent_tests],
-        'efficiency_data': [test.efficiency for test in recent_tests],
-        'yield_data': [test.concentrate_yield for test in recent_tests]
-    }
+    # === 3. ТРЕНДЫ — см. _analytics_trend ===
     
     # === 4. СРАВНЕНИЕ МИКРОФЛОТАЦИИ И СТАНДАРТНОЙ ===
     process_comparison = {}
@@ -313,8 +317,7 @@ def analytics(request):
         'colors': ['#10B981', '#3B82F6', '#F59E0B', '#EF4444']
     }
     
-    # === КОНТЕКСТ ===
-    context = {
+    return {
         # Основные статистики
         'total_tests': total_tests,
         'avg_extraction': avg_extraction,
@@ -331,25 +334,33 @@ def analytics(request):
         'reagent_effectiveness': reagent_effectiveness,
         
         # Данные для графиков (JSON)
-        'trend_chart_data': json.dumps(trend_chart_data),
         'config_pie_data': json.dumps(config_pie_data),
         'extraction_histogram_data': json.dumps(extraction_histogram),
         
         # Списки тестов
-        'recent_tests': recent_tests[:10],  # Только 10 последних для отображения
         'excellent_tests': excellent_tests[:5],  # Топ 5 отличных тестов
         'poor_tests': poor_tests[:3] if poor_tests else [],  # Худшие тесты для анализа
-        
-        # Метаданные
-        'page_title': 'Аналитика флотации',
-        'breadcrumbs': [
-            {'title': 'Главная', 'url': 'core:home'},
-            {'title': 'Флотация', 'url': 'flotation:dashboard'},
-            {'title': 'Аналитика', 'url': None}
-        ]
     }
+
+
+async def analytics(request):
+    """Расширенная аналитика флотации"""
+    # Сводка по всем тестам и тренд последних тестов считаются параллельно
+    data = await gather_queries(summary=_analytics_summary, trend=_analytics_trend)
     
-    return render(request, 'flotation/analytics.html', context)
+    if data['summary'] is None:
+        # Если нет данных, возвращаем пустой контекст
+        context = {'no_data': True}
+    else:
+        context = data['summary']
+        context['trend_chart_data'] = json.dumps(data['trend']['chart'])
+        context['recent_tests'] = data['trend']['recent_tests'][:10]  # Только 10 последних для отображения
+    
+    # Метаданные
+    context['page_title'] = 'Аналитика флотации'
+    context['breadcrumbs'] = ANALYTICS_BREADCRUMBS
+    # Шаблон обращается к свойствам моделей (запросы), поэтому рендер синхронный
+    return await sync_to_async(render)(request, 'flotation/analytics.html', context)
 
 def reagents(request):
     """Управление реагентами"""
@@ -425,6 +436,8 @@ def calculator(request):
     return render(request, 'flotation/calculator.html', context)
 
 
+@timed('calc')
+@track_calculation
 def calculate_flotation_results(data):
     """Расчет показателей флотации"""
     
@@ -530,6 +543,7 @@ def validate_results(data, results):
     return validations
 
 
+@retry_on_lock
 @transaction.atomic
 def save_flotation_test(data, results):
     """Сохранение теста в базу данных"""
@@ -578,47 +592,31 @@ def save_flotation_test(data, results):
     return test
 
 
-def dashboard(request):
-    """Дашборд флотации с графиками"""
-    # Статистика тестов
-    tests_stats = {
+def _dashboard_counts():
+    """Количество тестов и реагентов"""
+    return {
         'total': FlotationTest.objects.count(),
         'microflotation': FlotationTest.objects.filter(is_microflotation=True).count(),
         'standard': FlotationTest.objects.filter(is_microflotation=False).count(),
+        'reagents': Reagent.objects.count(),
     }
-    
-    # Получаем все тесты для расчета статистики
-    all_tests = FlotationTest.objects.prefetch_related('products').all()
-    
-    # Рассчитываем статистику извлечения
+
+
+def _dashboard_extraction():
+    """Среднее и лучшее извлечение, распределение по конфигурациям"""
     extraction_values = []
     best_test = None
     best_extraction = 0
-    
-    for test in all_tests:
+    config_stats = {}
+
+    for test in FlotationTest.objects.prefetch_related('products').all():
         extraction = test.extraction
         if extraction:
             extraction_values.append(extraction)
             if extraction > best_extraction:
                 best_extraction = extraction
                 best_test = test
-    
-    avg_extraction = sum(extraction_values) / len(extraction_values) if extraction_values else 0
-    
-    # ДАННЫЕ ДЛЯ ГРАФИКА ТРЕНДА ИЗВЛЕЧЕНИЯ
-    recent_tests = FlotationTest.objects.prefetch_related('products').order_by('-number')[:20]
-    recent_tests_list = list(recent_tests)
-    recent_tests_list.reverse()  # Переворачиваем для правильного порядка
-    
-    trend_data = {
-        'labels': [f"Тест {test.number}" for test in recent_tests_list],
-        'data': [test.extraction for test in recent_tests_list],
-        'test_numbers': [test.number for test in recent_tests_list]
-    }
-    
-    # ДАННЫЕ ДЛЯ КРУГОВОЙ ДИАГРАММЫ КОНФИГУРАЦИЙ
-    config_stats = {}
-    for test in all_tests:
+
         # Определяем тип конфигурации
         if test.is_microflotation:
             config_type = 'Микрофлотация'
@@ -626,15 +624,57 @@ def dashboard(request):
             config_type = test.configuration
         else:
             config_type = 'Базовая'
-        
-        if config_type not in config_stats:
-            config_stats[config_type] = 0
-        config_stats[config_type] += 1
-    
+        config_stats[config_type] = config_stats.get(config_type, 0) + 1
+
+    avg_extraction = sum(extraction_values) / len(extraction_values) if extraction_values else 0
+    return {
+        'avg_extraction': avg_extraction,
+        'best_extraction': best_extraction,
+        'best_test': best_test,
+        'config_stats': config_stats,
+    }
+
+
+def _dashboard_trend():
+    """Извлечение по последним 20 тестам (5 последних — для таблицы)"""
+    recent_tests = list(FlotationTest.objects.prefetch_related('products').order_by('-number')[:20])
+    recent_tests.reverse()  # Переворачиваем для правильного порядка
+    return {
+        'labels': [f"Тест {test.number}" for test in recent_tests],
+        'data': [test.extraction for test in recent_tests],
+        'test_numbers': [test.number for test in recent_tests],
+        'recent': recent_tests[:-6:-1],
+    }
+
+
+def _dashboard_top_reagents():
+    return list(Reagent.objects.filter(max_extraction__isnull=False).order_by('-max_extraction')[:5])
+
+
+async def dashboard(request):
+    """Дашборд флотации с графиками"""
+    # Независимые запросы выполняются параллельно
+    data = await gather_queries(
+        counts=_dashboard_counts,
+        extraction=_dashboard_extraction,
+        trend=_dashboard_trend,
+        top_reagents=_dashboard_top_reagents,
+    )
+    counts = data['counts']
+    extraction = data['extraction']
+    trend = data['trend']
+
+    # ДАННЫЕ ДЛЯ ГРАФИКА ТРЕНДА ИЗВЛЕЧЕНИЯ
+    trend_data = {
+        'labels': trend['labels'],
+        'data': trend['data'],
+        'test_numbers': trend['test_numbers'],
+    }
+
     # Подготавливаем данные для Chart.js
     pie_data = {
-        'labels': list(config_stats.keys()),
-        'data': list(config_stats.values()),
+        'labels': list(extraction['config_stats'].keys()),
+        'data': list(extraction['config_stats'].values()),
         'colors': [
             '#3B82F6',  # Синий для микрофлотации
             '#10B981',  # Зеленый для конфигураций
@@ -644,41 +684,22 @@ def dashboard(request):
             '#06B6D4'   # Голубой
         ]
     }
-    
-    # Последние тесты (5 штук)
-    recent_tests_display = FlotationTest.objects.prefetch_related('products').order_by('-number')[:5]
-    
-    # Топ реагенты
-    top_reagents = []
-    try:
-        top_reagents = Reagent.objects.filter(
-            max_extraction__isnull=False
-        ).order_by('-max_extraction')[:5]
-    except:
-        pass
-    
-    # Общая статистика реагентов
-    reagents_count = 0
-    try:
-        reagents_count = Reagent.objects.count()
-    except:
-        pass
-    
+
     context = {
         # Основная статистика
-        'total_tests': tests_stats['total'],
-        'avg_extraction': avg_extraction,
-        'best_extraction': best_extraction,
-        'total_reagents': reagents_count,
+        'total_tests': counts['total'],
+        'avg_extraction': extraction['avg_extraction'],
+        'best_extraction': extraction['best_extraction'],
+        'total_reagents': counts['reagents'],
         
         # Детальные данные
-        'recent_tests': recent_tests_display,
-        'top_reagents': top_reagents,
-        'best_test': best_test,
+        'recent_tests': trend['recent'],
+        'top_reagents': data['top_reagents'],
+        'best_test': extraction['best_test'],
         
         # Статистика по типам
-        'microflotation_count': tests_stats['microflotation'],
-        'standard_count': tests_stats['standard'],
+        'microflotation_count': counts['microflotation'],
+        'standard_count': counts['standard'],
         
         # ДАННЫЕ ДЛЯ ГРАФИКОВ
         'trend_chart_data': json.dumps(trend_data),
@@ -692,4 +713,5 @@ def dashboard(request):
             {'title': 'Дашборд', 'url': None}
         ]
     }
-    return render(request, 'flotation/dashboard.html', context)
\ No newline at end of file
+    # Шаблон обращается к свойствам моделей (запросы), поэтому рендер синхронный
+    return await sync_to_async(render)(request, 'flotation/dashboard.html', context)
\ No newline at end of file
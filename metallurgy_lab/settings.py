@@ -23,11 +23,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.instrumentation.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -36,7 +39,8 @@ ROOT_URLCONF = 'metallurgy_lab.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с учетом времени рендера (core.instrumentation)
+        'BACKEND': 'core.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -53,10 +57,20 @@ TEMPLATES = [
 WSGI_APPLICATION = 'metallurgy_lab.wsgi.application'
 
 
+# Профиль SQLite (core.db.PRAGMA_PROFILES): production — WAL, PRAGMA и постоянные
+# соединения; default — настройки SQLite по умолчанию (разработка и тесты).
+# На сервере задается переменной окружения DB_PROFILE=production
+DB_PROFILE = os.environ.get('DB_PROFILE', 'default')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение переиспользуется между запросами и проверяется перед использованием
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)) if DB_PROFILE == 'production' else 0,
+        'CONN_HEALTH_CHECKS': True,
+        # BEGIN IMMEDIATE: запись ждет блокировку по busy_timeout, а не падает при ее повышении
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'} if DB_PROFILE == 'production' else {},
     }
 }
 
@@ -91,4 +105,52 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Токен записи показаний датчиков (заголовок X-Sensor-Token); пустой — запись закрыта
+SENSOR_INGEST_TOKEN = os.environ.get('SENSOR_INGEST_TOKEN', '')
+
+# Отчеты строятся в фоновом пуле потоков; False — сразу в запросе (тесты, отладка)
+REPORTS_ASYNC = True
+
+# Асинхронные представления: потоки для параллельных запросов дашбордов и для расчетов
+ASYNC_DB_WORKERS = 4
+ASYNC_CPU_WORKERS = 2
+
+# Инструментирование запросов (core.instrumentation): заголовок Server-Timing и
+# JSON-строки в логгер core.timing. Выключено — middleware не подключается
+TIMING_ENABLED = os.environ.get('TIMING_ENABLED', '') == '1'
+TIMING_SAMPLE_RATE = float(os.environ.get('TIMING_SAMPLE_RATE', 1.0))
+# Столько одинаковых SQL-запросов за запрос — признак N+1
+TIMING_DUPLICATE_THRESHOLD = 5
+
+# Профилирование запросов (core.profiling): сотрудники — по ?_profile=1,
+# остальные запросы — случайно с этой долей (0 — выключено)
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILE_DIR = BASE_DIR / 'var' / 'profiles'
+PROFILE_KEEP = 50
+PROFILE_SAMPLE_INTERVAL = 0.005  # с, шаг статистического сэмплера
+
+# Метрики Prometheus (core.metrics) по адресу /metrics; если токен задан, сборщик
+# передает его в заголовке Authorization: Bearer <токен>
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Журнал медленных SQL-запросов (core.slowlog): запросы дольше порога (мс) пишутся
+# с планом EXPLAIN QUERY PLAN; полный проход по этим таблицам отмечается в отчете
+# и в логе core.slow_queries с уровнем WARNING. Включается переменной окружения
+# SLOW_QUERY_MS (например, 100); без нее журнал выключен
+SLOW_QUERY_MS = float(os.environ['SLOW_QUERY_MS']) if os.environ.get('SLOW_QUERY_MS') else None
+SLOW_QUERY_LOG = BASE_DIR / 'var' / 'slow_queries.jsonl'
+SLOW_QUERY_SCAN_TABLES = ('flotation_flotationproduct', 'molybdenum_leachingproduct')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'core.slow_queries': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
     path('', include('core.urls')),
     path('flotation/', include('flotation.urls')),
     path('molybdenum/', include('molybdenum.urls')),
@@ -48,6 +48,10 @@ class LeachingTestAdmin(admin.ModelAdmin):
     
     readonly_fields = ['date_conducted']
 
+    def get_queryset(self, request):
+        # Извлечение Mo в раствор берется из продуктов опыта
+        return super().get_queryset(request).prefetch_related('products')
+
 
 @admin.register(LeachingProduct)
 class LeachingProductAdmin(admin.ModelAdmin):
@@ -0,0 +1,323 @@
+"""
+Кинетика окислительного выщелачивания молибденита (модель сжимающегося ядра)
+
+Степень превращения X частицы выражается через безразмерный радиус
+непрореагировавшего ядра ξ = (1 - X)^(1/3). Для смешанного режима
+(химическая реакция + диффузия через слой продуктов):
+
+    dξ/dt = -1 / (τ_r + 6·τ_d·ξ·(1 - ξ))
+
+где τ_r = 1/k_r и τ_d = 1/k_d — времена полного превращения в
+кинетическом и диффузионном режимах. Константы скорости:
+
+    k = A · exp(-Ea / RT) · C^n · f_O2^(наличие кислорода)
+
+Уравнения интегрируются методом Рунге-Кутты 4-го порядка сразу для всей
+сетки параметров (температура × концентрация кислоты × ...): цикл идет
+только по шагам времени, все точки сетки считаются массивами NumPy.
+"""
+
+import math
+
+import numpy as np
+
+
+R_GAS = 8.314  # Дж/(моль·К)
+
+CONTROL_MODES = ('reaction', 'diffusion', 'mixed')
+
+# Стехиометрия: MoS2 + 6HNO3 → H2MoO4 + 2H2SO4 + 6NO
+ATOMIC_MASS_MO = 95.95  # г/моль
+MOLAR_MASS_HNO3 = 63.01  # г/моль
+HNO3_PER_MO = 6
+
+# Для чисто диффузионного режима τ_r не может быть нулевым
+# (особенность при ξ = 1), поэтому оставляем малую кинетическую составляющую
+DIFFUSION_ONLY_TAU_RATIO = 1e-3
+
+# Параметры по умолчанию подобраны по опытам №1-6 (95°C, 4 ч).
+# Энергии активации — литературные оценки: все опыты проведены при одной
+# температуре, поэтому Ea по ним не определяется.
+DEFAULT_KINETIC_PARAMS = {
+    'reaction': {
+        'ln_a': 11.62,          # ln(A), A в 1/ч
+        'ea': 60000.0,          # Дж/моль
+        'acid_order': 1.0,      # порядок по кислоте
+        'ln_oxygen': 0.693,     # ln(f_O2), ускорение при продувке O2
+    },
+    'diffusion': {
+        'ln_a': 1.90,
+        'ea': 15000.0,
+        'acid_order': 0.0,
+        'ln_oxygen': 0.0,
+    },
+    # Вклад H2SO4 в эффективную концентрацию окислителя (г/л HNO3 на г/л H2SO4)
+    'h2so4_weight': 0.25,
+}
+
+
+def effective_acid_concentration(hno3, h2so4, params=None):
+    """
+    Эффективная концентрация кислоты (г/л в пересчете на HNO3)
+
+    Args:
+        hno3: концентрация HNO3 (г/л), число или массив
+        h2so4: концентрация H2SO4 (г/л), число или массив
+
+    Returns:
+        ndarray: эффективная концентрация
+    """
+    params = params or DEFAULT_KINETIC_PARAMS
+    hno3 = np.nan_to_num(np.asarray(hno3, dtype=float))
+    h2so4 = np.nan_to_num(np.asarray(h2so4, dtype=float))
+    return hno3 + params['h2so4_weight'] * h2so4
+
+
+def rate_constants(temperature, acid_concentration, has_oxygen, params=None):
+    """
+    Константы скорости k_r и k_d (1/ч) по уравнению Аррениуса
+
+    Все аргументы транслируются (broadcast) по правилам NumPy.
+
+    Returns:
+        tuple: (k_reaction, k_diffusion)
+    """
+    params = params or DEFAULT_KINETIC_PARAMS
+    temp_k = np.asarray(temperature, dtype=float) + 273.15
+    conc = np.maximum(np.asarray(acid_concentration, dtype=float), 1e-9)
+    oxygen = np.asarray(has_oxygen, dtype=float)
+
+    constants = []
+    for regime in ('reaction', 'diffusion'):
+        p = params[regime]
+        ln_k = (
+            p['ln_a']
+            - p['ea'] / (R_GAS * temp_k)
+            + p['acid_order'] * np.log(conc)
+            + p['ln_oxygen'] * oxygen
+        )
+        constants.append(np.exp(ln_k))
+
+    return constants[0], constants[1]
+
+
+def _core_rate(xi, tau_r, tau_d):
+    """Скорость изменения радиуса ядра dξ/dt"""
+    rate = -1.0 / (tau_r + 6.0 * tau_d * xi * (1.0 - xi))
+    return np.where(xi > 0, rate, 0.0)
+
+
+def simulate_extraction(temperature, acid_concentration, time_points, has_oxygen=False,
+                        control='mixed', params=None, mo_mass=None, solution_volume=None,
+                        internal_steps=400):
+    """
+    Интегрирование кинетики выщелачивания по сетке параметров
+
+    Args:
+        temperature: температура (°C), число или массив
+        acid_concentration: эффективная концентрация кислоты (г/л), число или массив
+        time_points (list): моменты времени (ч), по возрастанию
+        has_oxygen: продувка кислородом (bool или массив)
+        control (str): режим — 'reaction', 'diffusion' или 'mixed'
+        params (dict): кинетические параметры (по умолчанию DEFAULT_KINETIC_PARAMS)
+        mo_mass: масса Mo в навеске (г) — для учета расхода кислоты
+        solution_volume: объем раствора (мл) — для учета расхода кислоты
+        internal_steps (int): число внутренних шагов интегрирования
+
+    Returns:
+        ndarray: степень извлечения Mo (%) формы broadcast(параметры) + (len(time_points),)
+    """
+    if control not in CONTROL_MODES:
+        raise ValueError(f'Неизвестный режим: {control}')
+
+    params = params or DEFAULT_KINETIC_PARAMS
+    times = np.asarray(time_points, dtype=float)
+    if times.ndim != 1 or times.size == 0:
+        raise ValueError('Нужен одномерный список моментов времени')
+    if np.any(np.diff(times) < 0) or times[0] < 0:
+        raise ValueError('Моменты времени должны быть неотрицательными и возрастать')
+
+    temperature, conc0, oxygen = np.broadcast_arrays(
+        np.asarray(temperature, dtype=float),
+        np.asarray(acid_concentration, dtype=float),
+        np.asarray(has_oxygen, dtype=float),
+    )
+    shape = temperature.shape
+
+    # Расход кислоты на окисление: ΔC (г/л) на единицу степени превращения
+    if mo_mass and solution_volume:
+        acid_per_x = (
+            float(mo_mass) / ATOMIC_MASS_MO * HNO3_PER_MO * MOLAR_MASS_HNO3
+            / (float(solution_volume) / 1000)
+        )
+    else:
+        acid_per_x = 0.0
+
+    def taus(conc):
+        k_r, k_d = rate_constants(temperature, conc, oxygen, params)
+        tau_r, tau_d = 1.0 / k_r, 1.0 / k_d
+        if control == 'reaction':
+            return tau_r, np.zeros_like(tau_d)
+        if control == 'diffusion':
+            return DIFFUSION_ONLY_TAU_RATIO * tau_d, tau_d
+        return tau_r, tau_d
+
+    def derivatives(xi, conc):
+        tau_r, tau_d = taus(conc)
+        d_xi = _core_rate(xi, tau_r, tau_d)
+        # dX/dt = -3ξ²·dξ/dt
+        d_conc = acid_per_x * 3.0 * xi ** 2 * d_xi
+        return d_xi, d_conc
+
+    # Внутренняя сетка сгущается к t = 0, где в диффузионном режиме
+    # скорость максимальна (X ~ √t)
+    t_max = times[-1]
+    if t_max > 0:
+        grid = np.concatenate(([0.0], np.geomspace(t_max * 1e-6, t_max, internal_steps)))
+    else:
+        grid = np.zeros(1)
+
+    xi = np.ones(shape)
+    conc = conc0.copy()
+    history = np.empty(shape + (grid.size,))
+    history[..., 0] = xi
+
+    for step in range(1, grid.size):
+        h = grid[step] - grid[step - 1]
+        k1x, k1c = derivatives(xi, conc)
+        k2x, k2c = derivatives(np.clip(xi + 0.5 * h * k1x, 0, 1), conc + 0.5 * h * k1c)
+        k3x, k3c = derivatives(np.clip(xi + 0.5 * h * k2x, 0, 1), conc + 0.5 * h * k2c)
+        k4x, k4c = derivatives(np.clip(xi + h * k3x, 0, 1), conc + h * k3c)
+        xi = np.clip(xi + h / 6.0 * (k1x + 2 * k2x + 2 * k3x + k4x), 0, 1)
+        conc = np.maximum(conc + h / 6.0 * (k1c + 2 * k2c + 2 * k3c + k4c), 0)
+        history[..., step] = xi
+
+    # Линейная интерполяция на запрошенные моменты: сетка общая для всех точек,
+    # поэтому индексы и веса считаются один раз
+    idx = np.clip(np.searchsorted(grid, times, side='right') - 1, 0, grid.size - 1)
+    nxt = np.minimum(idx + 1, grid.size - 1)
+    span = grid[nxt] - grid[idx]
+    weight = np.divide(times - grid[idx], span, out=np.zeros_like(times), where=span > 0)
+    xi_t = history[..., idx] * (1 - weight) + history[..., nxt] * weight
+
+    return (1.0 - xi_t ** 3) * 100
+
+
+def integrated_rate(extraction, control='reaction'):
+    """
+    Интегральная форма g(X) = k·t для чистых режимов
+
+    Args:
+        extraction: степень извлечения (%), число или массив
+        control (str): 'reaction' или 'diffusion'
+    """
+    x = np.clip(np.asarray(extraction, dtype=float) / 100, 1e-6, 0.999)
+    if control == 'reaction':
+        return 1 - (1 - x) ** (1 / 3)
+    if control == 'diffusion':
+        return 1 - 3 * (1 - x) ** (2 / 3) + 2 * (1 - x)
+    raise ValueError(f'Подбор параметров возможен только для режимов reaction/diffusion: {control}')
+
+
+def fit_kinetic_parameters(tests, control='reaction', base_params=None):
+    """
+    Подбор кинетических параметров по сохраненным опытам выщелачивания
+
+    Интегральная форма модели линеаризуется:
+        ln(g(X)/t) = ln A - Ea/(RT) + n·ln C + ln(f_O2)·O2
+    и решается методом наименьших квадратов. Параметры, по которым в данных
+    нет разброса (например, все опыты при одной температуре), не подбираются
+    и берутся из base_params. Для смешанного режима подбираются оба чистых
+    режима, а СКО считается по смешанной модели.
+
+    Args:
+        tests: итерируемый набор LeachingTest
+        control (str): 'reaction', 'diffusion' или 'mixed'
+        base_params (dict): исходные параметры
+
+    Returns:
+        dict: {'params': ..., 'fitted': [...], 'n_tests': int, 'rmse': float|None}
+            (для 'mixed' имена в fitted — с префиксом режима)
+    """
+    if control == 'mixed':
+        tests = list(tests)
+        reaction = fit_kinetic_parameters(tests, 'reaction', base_params)
+        result = fit_kinetic_parameters(tests, 'diffusion', reaction['params'])
+        result['fitted'] = [f'{regime}.{name}' for regime, fit in (('reaction', reaction), ('diffusion', result))
+                            for name in fit['fitted']]
+        if result['rmse'] is not None:
+            result['rmse'] = _fit_rmse(_fit_rows(tests, result['params']), 'mixed', result['params'])
+        return result
+
+    base_params = base_params or DEFAULT_KINETIC_PARAMS
+    params = {
+        'reaction': dict(base_params['reaction']),
+        'diffusion': dict(base_params['diffusion']),
+        'h2so4_weight': base_params['h2so4_weight'],
+    }
+
+    rows = _fit_rows(tests, params)
+    result = {'params': params, 'fitted': [], 'n_tests': rows[-1].size if rows else 0, 'rmse': None}
+    if not rows or rows[-1].size == 0:
+        return result
+    temperature, conc, oxygen, duration, extraction = rows
+
+    y = np.log(integrated_rate(extraction, control) / duration)
+    regime = params[control]
+
+    candidates = [
+        ('ea', -1.0 / (R_GAS * (temperature + 273.15))),
+        ('acid_order', np.log(conc)),
+        ('ln_oxygen', oxygen),
+    ]
+    columns = [np.ones_like(y)]
+    names = ['ln_a']
+    for name, regressor in candidates:
+        if np.ptp(regressor) > 1e-12 and len(names) < y.size:
+            columns.append(regressor)
+            names.append(name)
+        else:
+            # Фиксированный параметр переносим в левую часть
+            y = y - regime[name] * regressor
+
+    coefficients, *_ = np.linalg.lstsq(np.column_stack(columns), y, rcond=None)
+    for name, value in zip(names, coefficients):
+        regime[name] = float(value)
+
+    result['fitted'] = names
+    result['n_tests'] = int(extraction.size)
+    result['rmse'] = _fit_rmse(rows, control, params)
+    return result
+
+
+def _fit_rows(tests, params):
+    """Условия и извлечение опытов с результатом: (температура, C, O2, длительность, X) или None"""
+    rows = []
+    for test in tests:
+        extraction = test.mo_extraction_to_solution
+        if not extraction or not test.duration:
+            continue
+        rows.append((
+            test.temperature,
+            test.hno3_concentration or 0,
+            test.h2so4_concentration or 0,
+            test.has_oxygen,
+            test.duration,
+            extraction,
+        ))
+    if not rows:
+        return None
+
+    temperature, hno3, h2so4, oxygen, duration, extraction = (np.array(col, dtype=float) for col in zip(*rows))
+    conc = effective_acid_concentration(hno3, h2so4, params)
+    valid = conc > 0
+    return tuple(a[valid] for a in (temperature, conc, oxygen, duration, extraction))
+
+
+def _fit_rmse(rows, control, params):
+    """СКО модели по опытам: одна интеграция для всех опытов на общей сетке длительностей"""
+    temperature, conc, oxygen, duration, extraction = rows
+    durations = np.unique(duration)
+    curves = simulate_extraction(temperature, conc, durations, oxygen, control=control, params=params)
+    predicted = curves[np.arange(duration.size), np.searchsorted(durations, duration)]
+    return float(math.sqrt(np.mean((predicted - extraction) ** 2)))
@@ -98,10 +98,20 @@ class LeachingTest(models.Model):
             return f"1:{ratio:.0f}"
         return "—"
     
+    def product(self, product_type):
+        """
+        Продукт опыта заданного типа или None
+        
+        Ищется среди self.products.all(): после prefetch_related('products')
+        — без запросов к БД.
+        """
+        products = sorted(self.products.all(), key=lambda product: product.pk)
+        return next((product for product in products if product.product_type == product_type), None)
+    
     @property
     def mo_extraction_to_solution(self):
         """Извлечение Mo в раствор (%)"""
-        solution = self.products.filter(product_type='solution').first()
+        solution = self.product('solution')
         if solution:
             return solution.mo_extraction
         return 0
@@ -109,7 +119,7 @@ class LeachingTest(models.Model):
     @property
     def mo_extraction_to_cake(self):
         """Извлечение Mo в кек (%)"""
-        cake = self.products.filter(product_type='cake').first()
+        cake = self.product('cake')
         if cake:
             return cake.mo_extraction
         return 0
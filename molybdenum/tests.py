@@ -1,5 +1,13 @@
+import json
+from unittest import mock
+
+import numpy as np
 from django.test import TestCase
-from .utils import calculate_leaching_balance, calculate_sorption
+from django.urls import reverse
+from . import views
+from .models import LeachingTest, LeachingProduct
+from .utils import calculate_leaching_balance, calculate_sorption, LEACHING_GRAPH
+from .kinetics import simulate_extraction, rate_constants, fit_kinetic_parameters, DEFAULT_KINETIC_PARAMS
 
 
 class LeachingCalculationsTest(TestCase):
@@ -63,4 +71,133 @@ class SorptionCalculationsTest(TestCase):
         self.assertGreater(result['sorption_capacity'], 0)
         
         # Проверяем количество Mo на анионите
-        self.assertGreater(result['mo_on_anionite'], 0)
\ No newline at end of file
+        self.assertGreater(result['mo_on_anionite'], 0)
+
+class LeachingKineticsTest(TestCase):
+    """Тесты кинетической модели выщелачивания"""
+    
+    def test_mixed_control_matches_analytical_solution(self):
+        """Смешанный режим совпадает с аналитическим t = τ_r(1-ξ) + τ_d(1-3ξ²+2ξ³)"""
+        times = np.linspace(0, 10, 11)
+        extraction = simulate_extraction(95, 50, times, has_oxygen=True)
+        
+        k_r, k_d = rate_constants(95, 50, True)
+        xi = np.linspace(1, 0, 100001)
+        t_exact = (1 - xi) / k_r + (1 - 3 * xi ** 2 + 2 * xi ** 3) / k_d
+        expected = (1 - np.interp(times, t_exact, xi) ** 3) * 100
+        
+        np.testing.assert_allclose(extraction, expected, atol=0.01)
+    
+    def test_grid_is_vectorized(self):
+        """Сетка температура × концентрация считается одним вызовом"""
+        temperatures = np.array([80, 95, 110])[:, None]
+        concentrations = np.array([20, 50])[None, :]
+        curves = simulate_extraction(temperatures, concentrations, [0, 2, 4])
+        
+        self.assertEqual(curves.shape, (3, 2, 3))
+        # Извлечение растет с температурой и концентрацией
+        self.assertTrue(np.all(np.diff(curves[:, :, -1], axis=0) > 0))
+        self.assertTrue(np.all(np.diff(curves[:, :, -1], axis=1) > 0))
+    
+    def create_tests(self, rows=((1, False, 19.2), (2, False, 25.0), (3, True, 53.2))):
+        for number, has_oxygen, mo_extraction in rows:
+            test = LeachingTest.objects.create(
+                number=number, concentrate_mass=50, initial_mo=20.3, initial_cu=1.99,
+                initial_fe=2.33, initial_si=2.47, acid_type='hno3', hno3_concentration=50 + 10 * number,
+                solution_volume=300, temperature=95, duration=4, stirring_speed=300,
+                has_oxygen=has_oxygen,
+            )
+            LeachingProduct.objects.create(
+                test=test, product_type='solution', mass_or_volume=300, mo_content=1, cu_content=0,
+                fe_content=0, si_content=0, mo_grams=1, cu_grams=0, fe_grams=0, si_grams=0,
+                mo_extraction=mo_extraction, cu_extraction=0, fe_extraction=0, si_extraction=0,
+            )
+
+    def test_fit_on_stored_tests(self):
+        """Подбор параметров по опытам: без кислорода / с кислородом"""
+        self.create_tests()
+        fit = fit_kinetic_parameters(LeachingTest.objects.prefetch_related('products'))
+        
+        # Температура одинакова — Ea не подбирается
+        self.assertEqual(fit['fitted'], ['ln_a', 'acid_order', 'ln_oxygen'])
+        self.assertEqual(fit['n_tests'], 3)
+        self.assertLess(fit['rmse'], 0.5)
+        self.assertGreater(fit['params']['reaction']['ln_oxygen'], 0)
+
+    def test_fit_mixed_control(self):
+        """Для смешанного режима подбираются оба чистых режима"""
+        self.create_tests()
+        tests = LeachingTest.objects.prefetch_related('products')
+        fit = fit_kinetic_parameters(tests, control='mixed')
+        reaction = fit_kinetic_parameters(tests, control='reaction')
+        diffusion = fit_kinetic_parameters(tests, control='diffusion', base_params=reaction['params'])
+
+        self.assertEqual(fit['fitted'], [f'{regime}.{name}' for regime in ('reaction', 'diffusion')
+                                         for name in ('ln_a', 'acid_order', 'ln_oxygen')])
+        self.assertEqual(fit['params'], diffusion['params'])
+        self.assertNotEqual(fit['params']['diffusion']['ln_a'], DEFAULT_KINETIC_PARAMS['diffusion']['ln_a'])
+        self.assertIsNotNone(fit['rmse'])
+
+    def test_api_fit_follows_control_and_data(self):
+        """API подбирает параметры для запрошенного режима и пересчитывает их только при смене данных"""
+        views._fits.clear()
+        self.addCleanup(views._fits.clear)
+        self.create_tests()
+
+        def post(control):
+            response = self.client.post(reverse('molybdenum:leaching_kinetics'), data=json.dumps({
+                'control': control, 'hno3_concentration': 60, 'points': 5,
+            }), content_type='application/json')
+            return response.json()['results']
+
+        with mock.patch.object(views, 'fit_kinetic_parameters', wraps=fit_kinetic_parameters) as fit:
+            diffusion = post('diffusion')
+            post('diffusion')
+            self.assertEqual(fit.call_count, 1)
+            self.assertEqual(fit.call_args.kwargs['control'], 'diffusion')
+            self.assertNotEqual(diffusion['params']['diffusion']['ln_a'],
+                                DEFAULT_KINETIC_PARAMS['diffusion']['ln_a'])
+
+            post('mixed')
+            self.assertEqual(fit.call_count, 2)
+            self.assertEqual(fit.call_args.kwargs['control'], 'mixed')
+
+            self.create_tests([(4, True, 60.0)])
+            post('mixed')
+            self.assertEqual(fit.call_count, 3)
+
+
+class LeachingLiveRecalculationTest(TestCase):
+    """Тесты живого пересчета баланса выщелачивания"""
+
+    DATA = {
+        'concentrate_mass': 50, 'initial_mo': 25.01, 'initial_cu': 0.91, 'initial_fe': 3.5, 'initial_si': 3.2,
+        'cake_mass': 43.5, 'cake_mo': 7.88, 'cake_cu': 0.37, 'cake_fe': 1.42, 'cake_si': 3.36,
+        'solution_volume': 250, 'solution_mo': 36.3, 'solution_cu': 1.18, 'solution_fe': 4.53, 'solution_si': 0.54,
+        'temperature': 80, 'duration': 2,
+    }
+
+    def setUp(self):
+        LEACHING_GRAPH.sessions.clear()
+
+    def post(self, **changes):
+        return self.client.post(
+            '/molybdenum/leaching-live/', data=json.dumps({**self.DATA, **changes}), content_type='application/json'
+        ).json()
+
+    def test_changed_outputs_only(self):
+        """Изменение концентрации Cu в растворе не затрагивает кек и выход кека"""
+        first = self.post(reset=True)
+        self.assertTrue(first['full'])
+        result = first['changed']
+
+        second = self.post(solution_cu=1.5)
+        self.assertFalse(second['full'])
+        self.assertEqual(set(second['changed']), {'solution', 'extractions', 'balance_check', 'avg_balance', 'validations'})
+        self.assertNotIn('cake_elements', second['recomputed'])
+        result.update(second['changed'])
+
+        expected = json.loads(json.dumps(calculate_leaching_balance({**self.DATA, 'solution_cu': 1.5})))
+        self.assertEqual(result, expected)
+
+        self.assertFalse(self.post(concentrate_mass=0)['success'])
@@ -10,6 +10,8 @@ urlpatterns = [
     # Калькуляторы
     path('leaching-calculator/', views.leaching_calculator, name='leaching_calculator'),
     path('sorption-calculator/', views.sorption_calculator, name='sorption_calculator'),
+    path('leaching-kinetics/', views.leaching_kinetics, name='leaching_kinetics'),
+    path('leaching-live/', views.leaching_live, name='leaching_live'),
     
     # Списки тестов
     path('leaching-tests/', views.leaching_tests, name='leaching_tests'),
@@ -2,7 +2,31 @@
 Утилиты для расчетов процессов переработки молибденита
 """
 
+from core.graph import Graph
+from core.instrumentation import timed
+from core.metrics import track_calculation
 
+
+ELEMENTS = ['mo', 'cu', 'fe', 'si']
+
+# Входные параметры баланса выщелачивания
+LEACHING_INPUTS = (
+    'concentrate_mass', 'cake_mass', 'solution_volume',
+    *(f'initial_{element}' for element in ELEMENTS),
+    *(f'cake_{element}' for element in ELEMENTS),
+    *(f'solution_{element}' for element in ELEMENTS),
+)
+
+LEACHING_GRAPH = Graph(LEACHING_INPUTS)
+
+
+def parse_leaching_inputs(data):
+    """Входные данные баланса выщелачивания в числовом виде"""
+    return {key: float(data[key]) for key in LEACHING_INPUTS}
+
+
+@timed('calc')
+@track_calculation
 def calculate_leaching_balance(data):
     """
     Расчет материального баланса выщелачивания молибденитового концентрата
@@ -18,49 +42,60 @@ def calculate_leaching_balance(data):
     
     Returns:
         dict: Результаты расчета с материальным балансом
-    """
-    
-    # === ИСХОДНОЕ КОЛИЧЕСТВО ЭЛЕМЕНТОВ (г) ===
-    concentrate_mass = float(data['concentrate_mass'])
     
-    initial_elements = {
-        'mo': concentrate_mass * float(data['initial_mo']) / 100,
-        'cu': concentrate_mass * float(data['initial_cu']) / 100,
-        'fe': concentrate_mass * float(data['initial_fe']) / 100,
-        'si': concentrate_mass * float(data['initial_si']) / 100,
+    Расчет выполняется по графу LEACHING_GRAPH; тот же граф используется
+    для инкрементального пересчета в живом калькуляторе.
+    """
+    return LEACHING_GRAPH.evaluate(parse_leaching_inputs(data))
+
+
+# === ГРАФ БАЛАНСА ВЫЩЕЛАЧИВАНИЯ ===
+
+@LEACHING_GRAPH.output('initial')
+def initial_elements(concentrate_mass, initial_mo, initial_cu, initial_fe, initial_si):
+    """Исходное количество элементов (г)"""
+    return {
+        'mo': concentrate_mass * initial_mo / 100,
+        'cu': concentrate_mass * initial_cu / 100,
+        'fe': concentrate_mass * initial_fe / 100,
+        'si': concentrate_mass * initial_si / 100,
     }
-    
-    # === КЕК: КОЛИЧЕСТВО ЭЛЕМЕНТОВ (г) ===
-    cake_mass = float(data['cake_mass'])
-    
-    cake_elements = {
-        'mo': cake_mass * float(data['cake_mo']) / 100,
-        'cu': cake_mass * float(data['cake_cu']) / 100,
-        'fe': cake_mass * float(data['cake_fe']) / 100,
-        'si': cake_mass * float(data['cake_si']) / 100,
+
+
+@LEACHING_GRAPH.output('cake')
+def cake_elements(cake_mass, cake_mo, cake_cu, cake_fe, cake_si):
+    """Кек: количество элементов (г)"""
+    return {
+        'mo': cake_mass * cake_mo / 100,
+        'cu': cake_mass * cake_cu / 100,
+        'fe': cake_mass * cake_fe / 100,
+        'si': cake_mass * cake_si / 100,
     }
-    
-    # === РАСТВОР: КОЛИЧЕСТВО ЭЛЕМЕНТОВ (г) ===
-    # Формула: концентрация (г/л) × объем (мл) / 1000
-    solution_volume = float(data['solution_volume'])
-    
-    solution_elements = {
-        'mo': float(data['solution_mo']) * solution_volume / 1000,
-        'cu': float(data['solution_cu']) * solution_volume / 1000,
-        'fe': float(data['solution_fe']) * solution_volume / 1000,
-        'si': float(data['solution_si']) * solution_volume / 1000,
+
+
+@LEACHING_GRAPH.output('solution')
+def solution_elements(solution_volume, solution_mo, solution_cu, solution_fe, solution_si):
+    """Раствор: количество элементов (г); концентрация (г/л) × объем (мл) / 1000"""
+    return {
+        'mo': solution_mo * solution_volume / 1000,
+        'cu': solution_cu * solution_volume / 1000,
+        'fe': solution_fe * solution_volume / 1000,
+        'si': solution_si * solution_volume / 1000,
     }
-    
-    # === ИЗВЛЕЧЕНИЯ (%) ===
+
+
+@LEACHING_GRAPH.output('extractions')
+def extractions(initial, cake, solution):
+    """Извлечения в кек и в раствор (%)"""
     extractions = {}
     
-    for element in ['mo', 'cu', 'fe', 'si']:
-        if initial_elements[element] > 0:
+    for element in ELEMENTS:
+        if initial[element] > 0:
             # Извлечение в кек
-            cake_extraction = (cake_elements[element] / initial_elements[element]) * 100
+            cake_extraction = (cake[element] / initial[element]) * 100
             
             # Извлечение в раствор
-            solution_extraction = (solution_elements[element] / initial_elements[element]) * 100
+            solution_extraction = (solution[element] / initial[element]) * 100
             
             extractions[f'{element}_to_cake'] = cake_extraction
             extractions[f'{element}_to_solution'] = solution_extraction
@@ -68,25 +103,39 @@ def calculate_leaching_balance(data):
             extractions[f'{element}_to_cake'] = 0
             extractions[f'{element}_to_solution'] = 0
     
-    # === ВЫХОД КЕКА (%) ===
-    cake_yield = (cake_mass / concentrate_mass) * 100
-    
-    # === ПРОВЕРКА БАЛАНСА ===
-    # Сумма элементов в продуктах / Исходное × 100
+    return extractions
+
+
+@LEACHING_GRAPH.output('cake_yield')
+def cake_yield(cake_mass, concentrate_mass):
+    """Выход кека (%)"""
+    return (cake_mass / concentrate_mass) * 100
+
+
+@LEACHING_GRAPH.output('balance_check')
+def balance_check(initial, cake, solution):
+    """Проверка баланса: сумма элементов в продуктах / исходное × 100"""
     balance_check = {}
     
-    for element in ['mo', 'cu', 'fe', 'si']:
-        if initial_elements[element] > 0:
-            total_in_products = cake_elements[element] + solution_elements[element]
-            balance = (total_in_products / initial_elements[element]) * 100
-            balance_check[element] = balance
+    for element in ELEMENTS:
+        if initial[element] > 0:
+            total_in_products = cake[element] + solution[element]
+            balance_check[element] = (total_in_products / initial[element]) * 100
         else:
             balance_check[element] = 0
     
-    # Средний баланс
-    avg_balance = sum(balance_check.values()) / len(balance_check)
-    
-    # === ВАЛИДАЦИИ ===
+    return balance_check
+
+
+@LEACHING_GRAPH.output('avg_balance')
+def avg_balance(balance_check):
+    """Средний баланс"""
+    return sum(balance_check.values()) / len(balance_check)
+
+
+@LEACHING_GRAPH.output('validations')
+def validations(avg_balance, extractions):
+    """Проверки баланса и извлечения Mo"""
     validations = []
     
     # Проверка баланса
@@ -124,24 +173,15 @@ def calculate_leaching_balance(data):
             'message': f'Низкое извлечение Mo в раствор: {mo_to_solution:.1f}%'
         })
     
-    # === ФОРМИРУЕМ РЕЗУЛЬТАТ ===
-    return {
-        'initial': initial_elements,
-        'cake': cake_elements,
-        'solution': solution_elements,
-        'extractions': extractions,
-        'cake_yield': cake_yield,
-        'balance_check': balance_check,
-        'avg_balance': avg_balance,
-        'validations': validations,
-        
-        # Дополнительная информация
-        'concentrate_mass': concentrate_mass,
-        'cake_mass': cake_mass,
-        'solution_volume': solution_volume,
-    }
+    return validations
+
+
+# Дополнительная информация
+LEACHING_GRAPH.expose('concentrate_mass', 'cake_mass', 'solution_volume')
 
 
+@timed('calc')
+@track_calculation
 def calculate_sorption(data):
     """
     Расчет сорбции молибдена на анионите
@@ -295,6 +335,8 @@ def calculate_sorption(data):
     }
 
 
+@timed('calc')
+@track_calculation
 def calculate_kinetic_series(base_data, time_points):
     """
     Расчет кинетической серии сорбции для построения графиков
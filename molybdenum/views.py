@@ -4,103 +4,139 @@ from django.views.decorators.csrf import csrf_exempt
 from django.db import transaction
 from django.db.models import Avg, Max, Min, Count
 import json
+import threading
+
+import numpy as np
+from asgiref.sync import sync_to_async
 
 from .models import LeachingTest, LeachingProduct, SorptionTest
 from .utils import (
+    LEACHING_GRAPH,
     calculate_leaching_balance,
     calculate_sorption,
+    parse_leaching_inputs,
     validate_leaching_data,
     validate_sorption_data,
     calculate_kinetic_series
 )
+from core.concurrency import gather_queries, run_calculation
+from core.db import retry_on_lock
+from core.graph import live_update
+from core.metrics import record_cache
+from core.stats import data_versions
+from .kinetics import (
+    effective_acid_concentration,
+    fit_kinetic_parameters,
+    simulate_extraction,
+    CONTROL_MODES,
+)
 
 
-def dashboard(request):
-    """Главная страница модуля переработки молибденита"""
-    
-    # Статистика по выщелачиванию
-    leaching_tests = LeachingTest.objects.all()
-    total_leaching = leaching_tests.count()
-    
-    # Рассчитываем среднее извлечение Mo
+def _dashboard_leaching():
+    """Извлечение Mo по опытам выщелачивания и сравнение с/без кислорода"""
     leaching_extractions = []
     best_leaching = None
     best_leaching_extraction = 0
+    oxygen = {True: [], False: []}
     
-    for test in leaching_tests:
+    for test in LeachingTest.objects.prefetch_related('products'):
         extraction = test.mo_extraction_to_solution
         leaching_extractions.append(extraction)
+        oxygen[test.has_oxygen].append(extraction)
         if extraction > best_leaching_extraction:
             best_leaching_extraction = extraction
             best_leaching = test
     
-    avg_leaching_extraction = sum(leaching_extractions) / len(leaching_extractions) if leaching_extractions else 0
+    def _group(values):
+        return {
+            'count': len(values),
+            'avg_extraction': sum(values) / len(values) if values else 0
+        }
     
-    # Статистика по сорбции
+    return {
+        'total': len(leaching_extractions),
+        'avg_extraction': sum(leaching_extractions) / len(leaching_extractions) if leaching_extractions else 0,
+        'best_test': best_leaching,
+        'best_extraction': best_leaching_extraction,
+        'oxygen_comparison': {
+            'with_oxygen': _group(oxygen[True]),
+            'without_oxygen': _group(oxygen[False]),
+        },
+    }
+
+
+def _dashboard_sorption():
+    """Агрегаты и лучший опыт сорбции"""
     sorption_tests = SorptionTest.objects.all()
-    total_sorption = sorption_tests.count()
-    
-    sorption_stats = sorption_tests.aggregate(
+    stats = sorption_tests.aggregate(
+        total=Count('id'),
         avg_extraction=Avg('mo_extraction'),
         max_extraction=Max('mo_extraction'),
         avg_capacity=Avg('sorption_capacity')
     )
-    
-    best_sorption = sorption_tests.order_by('-mo_extraction').first()
-    
-    # Последние тесты
-    recent_leaching = leaching_tests.order_by('-date_conducted')[:5]
-    recent_sorption = sorption_tests.order_by('-date_conducted')[:5]
-    
-    # Сравнение с/без кислорода
-    with_oxygen = leaching_tests.filter(has_oxygen=True)
-    without_oxygen = leaching_tests.filter(has_oxygen=False)
-    
-    oxygen_comparison = {
-        'with_oxygen': {
-            'count': with_oxygen.count(),
-            'avg_extraction': sum([t.mo_extraction_to_solution for t in with_oxygen]) / with_oxygen.count() if with_oxygen.count() > 0 else 0
-        },
-        'without_oxygen': {
-            'count': without_oxygen.count(),
-            'avg_extraction': sum([t.mo_extraction_to_solution for t in without_oxygen]) / without_oxygen.count() if without_oxygen.count() > 0 else 0
-        }
+    stats['best_test'] = sorption_tests.order_by('-mo_extraction').first()
+    return stats
+
+
+def _dashboard_recent():
+    """Последние опыты выщелачивания и сорбции"""
+    return {
+        'leaching': list(LeachingTest.objects.prefetch_related('products').order_by('-date_conducted')[:5]),
+        'sorption': list(SorptionTest.objects.order_by('-date_conducted')[:5]),
     }
-    
-    # Данные для графика тренда (последние 10 тестов выщелачивания)
-    trend_tests = list(leaching_tests.order_by('number')[:10])
-    trend_chart_data = {
+
+
+def _dashboard_trend():
+    """Данные для графика тренда (последние 10 тестов выщелачивания)"""
+    trend_tests = list(LeachingTest.objects.prefetch_related('products').order_by('number')[:10])
+    solutions = [t.product('solution') for t in trend_tests]
+    return {
         'labels': [f"Опыт {t.number}" for t in trend_tests],
         'mo_data': [t.mo_extraction_to_solution for t in trend_tests],
-        'cu_data': [t.products.filter(product_type='solution').first().cu_extraction if t.products.filter(product_type='solution').exists() else 0 for t in trend_tests],
-        'fe_data': [t.products.filter(product_type='solution').first().fe_extraction if t.products.filter(product_type='solution').exists() else 0 for t in trend_tests],
+        'cu_data': [solution.cu_extraction if solution else 0 for solution in solutions],
+        'fe_data': [solution.fe_extraction if solution else 0 for solution in solutions],
     }
+
+
+async def dashboard(request):
+    """Главная страница модуля переработки молибденита"""
+    
+    # Независимые запросы выполняются параллельно
+    data = await gather_queries(
+        leaching=_dashboard_leaching,
+        sorption=_dashboard_sorption,
+        recent=_dashboard_recent,
+        trend=_dashboard_trend,
+    )
+    leaching = data['leaching']
+    sorption_stats = data['sorption']
     
     context = {
         # Общая статистика
-        'total_leaching_tests': total_leaching,
-        'total_sorption_tests': total_sorption,
-        'avg_leaching_extraction': avg_leaching_extraction,
+        'total_leaching_tests': leaching['total'],
+        'total_sorption_tests': sorption_stats['total'],
+        'avg_leaching_extraction': leaching['avg_extraction'],
         'avg_sorption_extraction': sorption_stats['avg_extraction'] or 0,
         
         # Лучшие результаты
-        'best_leaching_test': best_leaching,
-        'best_leaching_extraction': best_leaching_extraction,
-        'best_sorption_test': best_sorption,
+        'best_leaching_test': leaching['best_test'],
+        'best_leaching_extraction': leaching['best_extraction'],
+        'best_sorption_test': sorption_stats['best_test'],
         'best_sorption_extraction': sorption_stats['max_extraction'] or 0,
         
         # Последние тесты
-        'recent_leaching_tests': recent_leaching,
-        'recent_sorption_tests': recent_sorption,
+        'recent_leaching_tests': data['recent']['leaching'],
+        'recent_sorption_tests': data['recent']['sorption'],
         
         # Сравнения
-        'oxygen_comparison': oxygen_comparison,
+        'oxygen_comparison': leaching['oxygen_comparison'],
         
         # Графики
-        'trend_chart_data': json.dumps(trend_chart_data),
+        'trend_chart_data': json.dumps(data['trend']),
     }
     
-    return render(request, 'molybdenum/dashboard.html', context)
+    # Шаблон обращается к свойствам моделей (запросы), поэтому рендер синхронный
+    return await sync_to_async(render)(request, 'molybdenum/dashboard.html', context)
 
 
 def leaching_calculator(request):
@@ -146,6 +182,136 @@ def leaching_calculator(request):
     return render(request, 'molybdenum/leaching_calculator.html', context)
 
 
+def leaching_live(request):
+    """API: живой пересчет баланса выщелачивания (только изменившиеся разделы)"""
+    
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
+    
+    try:
+        data = json.loads(request.body)
+        
+        is_valid, errors = validate_leaching_data(data)
+        if not is_valid:
+            return JsonResponse({
+                'success': False,
+                'errors': errors
+            })
+        
+        return JsonResponse(live_update(
+            request, LEACHING_GRAPH, parse_leaching_inputs(data), reset=data.get('reset', False)
+        ))
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+
+
+# Подбор параметров по опытам: {режим: (версия данных, результат)}
+_fits = {}
+_fits_lock = threading.Lock()
+
+
+def _leaching_data_version():
+    """Версия опытов выщелачивания: счетчик сводки (меняется и с продуктами) и число/время изменения опытов"""
+    stamp = LeachingTest.objects.aggregate(count=Count('pk'), last=Max('pk'), updated=Max('updated_at'))
+    return data_versions().get('leaching'), *stamp.values()
+
+
+def _stored_fit(control):
+    """Параметры кинетики, подобранные по сохраненным опытам для режима control; пересчет — при смене данных"""
+    version = _leaching_data_version()
+    cached = _fits.get(control)
+    record_cache('leaching_fit', cached is not None and cached[0] == version)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    fit = fit_kinetic_parameters(LeachingTest.objects.prefetch_related('products'), control=control)
+    with _fits_lock:
+        _fits[control] = (version, fit)
+    return fit
+
+
+def _leaching_kinetics_results(data, control):
+    """Расчет кривых кинетики по сетке температура × концентрация кислоты"""
+    # Параметры подбираются по сохраненным опытам для того же режима
+    fit = _stored_fit(control)
+    params = fit['params']
+    
+    # Сетка: температура × концентрация кислоты
+    temperatures = data.get('temperatures') or [data.get('temperature', 95)]
+    temperatures = np.array([float(t) for t in temperatures])
+    
+    if data.get('acid_concentrations'):
+        concentrations = np.array([float(c) for c in data['acid_concentrations']])
+    else:
+        concentrations = np.atleast_1d(effective_acid_concentration(
+            data.get('hno3_concentration') or 0,
+            data.get('h2so4_concentration') or 0,
+            params
+        ))
+    
+    duration = float(data.get('duration') or 4)
+    points = min(int(data.get('points', 50)), 500)
+    max_time = max(duration * float(data.get('time_factor', 2)), duration)
+    time_points = np.linspace(0, max_time, points)
+    
+    curves = simulate_extraction(
+        temperatures[:, None],
+        concentrations[None, :],
+        time_points,
+        has_oxygen=bool(data.get('has_oxygen', False)),
+        control=control,
+        params=params,
+        mo_mass=data.get('mo_mass'),
+        solution_volume=data.get('solution_volume'),
+    )
+    
+    return {
+        'time': time_points.round(3).tolist(),
+        'temperatures': temperatures.tolist(),
+        'acid_concentrations': concentrations.round(2).tolist(),
+        'extraction': curves.round(2).tolist(),
+        'control': control,
+        'params': params,
+        'fit': {
+            'fitted': fit['fitted'],
+            'n_tests': fit['n_tests'],
+            'rmse': fit['rmse'],
+        },
+    }
+
+
+async def leaching_kinetics(request):
+    """API: кинетика выщелачивания (извлечение Mo во времени)"""
+    
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Неверный метод запроса'})
+    
+    try:
+        data = json.loads(request.body)
+        
+        control = data.get('control', 'mixed')
+        if control not in CONTROL_MODES:
+            return JsonResponse({'success': False, 'error': f'Неизвестный режим: {control}'})
+        
+        # Подбор параметров и расчет сетки — вне цикла событий
+        results = await run_calculation(_leaching_kinetics_results, data, control)
+        
+        return JsonResponse({
+            'success': True,
+            'results': results
+        })
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+
+
 def sorption_calculator(request):
     """Калькулятор сорбции молибдена"""
     
@@ -399,11 +565,9 @@ def sorption_test_detail(request, test_id):
         })
 
 
-def analytics(request):
-    """Комплексная аналитика процессов"""
-    
-    # === ДАННЫЕ ВЫЩЕЛАЧИВАНИЯ ===
-    leaching_tests = LeachingTest.objects.prefetch_related('products').all()
+def _analytics_leaching():
+    """Сравнение опытов выщелачивания по кислоте и кислороду"""
+    leaching_tests = list(LeachingTest.objects.prefetch_related('products'))
     
     # Сравнение 6 опытов
     comparison_data = {
@@ -416,7 +580,7 @@ def analytics(request):
     # Группировка по типу кислоты
     acid_type_stats = {}
     for acid_code, acid_name in LeachingTest._meta.get_field('acid_type').choices:
-        tests = leaching_tests.filter(acid_type=acid_code)
+        tests = [t for t in leaching_tests if t.acid_type == acid_code]
         if tests:
             extractions = [t.mo_extraction_to_solution for t in tests]
             acid_type_stats[acid_name] = {
@@ -440,7 +604,16 @@ def analytics(request):
         }
     }
     
-    # === ДАННЫЕ СОРБЦИИ ===
+    return {
+        'comparison_chart_data': json.dumps(comparison_data),
+        'acid_type_stats': acid_type_stats,
+        'oxygen_effect': oxygen_effect,
+        'total_leaching_tests': len(leaching_tests),
+    }
+
+
+def _analytics_sorption():
+    """Кинетика сорбции по температурам и сравнение анионитов"""
     sorption_tests = SorptionTest.objects.all()
     
     # Кинетические кривые (группировка по температуре)
@@ -465,26 +638,26 @@ def analytics(request):
                 'max_extraction': tests.aggregate(Max('mo_extraction'))['mo_extraction__max'],
             }
     
-    context = {
-        # Выщелачивание
-        'comparison_chart_data': json.dumps(comparison_data),
-        'acid_type_stats': acid_type_stats,
-        'oxygen_effect': oxygen_effect,
-        
-        # Сорбция
+    return {
         'kinetics_data': json.dumps(kinetics_data),
         'anionite_stats': anionite_stats,
-        
-        # Общее
-        'total_leaching_tests': leaching_tests.count(),
         'total_sorption_tests': sorption_tests.count(),
     }
+
+
+async def analytics(request):
+    """Комплексная аналитика процессов"""
+    
+    # Выщелачивание и сорбция не зависят друг от друга
+    data = await gather_queries(leaching=_analytics_leaching, sorption=_analytics_sorption)
+    context = {**data['leaching'], **data['sorption']}
     
-    return render(request, 'molybdenum/analytics.html', context)
+    return await sync_to_async(render)(request, 'molybdenum/analytics.html', context)
 
 
 # === HELPER FUNCTIONS ===
 
+@retry_on_lock
 @transaction.atomic
 def save_leaching_test(data, results):
     """Сохранение теста выщелачивания в БД"""
@@ -555,6 +728,7 @@ def save_leaching_test(data, results):
     return test
 
 
+@retry_on_lock
 @transaction.atomic
 def save_sorption_test(data, results):
     """Сохранение теста сорбции в БД"""
@@ -31,8 +31,205 @@ document.addEventListener('DOMContentLoaded', function() {
             showError('Ошибка сети при выполнении расчета');
         }
     });
+    
+    // Живой пересчет: после показа результатов изменения формы
+    // отправляются с задержкой, сервер возвращает только изменившиеся разделы
+    form.addEventListener('input', function() {
+        if (document.getElementById('resultsContainer').classList.contains('hidden')) {
+            return;
+        }
+        clearTimeout(liveTimer);
+        liveTimer = setTimeout(liveRecalculate, LIVE_DELAY);
+    });
+    
+    const sweepForm = document.getElementById('sweepForm');
+    if (sweepForm) {
+        sweepForm.addEventListener('submit', async function(e) {
+            e.preventDefault();
+            await buildHeatmap();
+        });
+    }
 });
 
+// === ЖИВОЙ ПЕРЕСЧЕТ ===
+
+const LIVE_DELAY = 300;  // мс после последнего изменения
+let liveTimer = null;
+let liveResult = null;   // результат, собранный из ответов /antimony/live/
+
+async function liveRecalculate() {
+    const data = Object.fromEntries(new FormData(document.getElementById('calculatorForm')).entries());
+    data.reset = liveResult === null;
+    
+    try {
+        const response = await fetch('/antimony/live/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCSRFToken()
+            },
+            body: JSON.stringify(data)
+        });
+        const result = await response.json();
+        
+        if (!result.success) {
+            return;  // Неполный ввод: ждем следующего изменения
+        }
+        if (result.full || liveResult === null) {
+            liveResult = {success: true, ...result.changed};
+        } else {
+            Object.assign(liveResult, result.changed);
+        }
+        if (Object.keys(result.changed).length > 0) {
+            displayResults(liveResult);
+        }
+    } catch (error) {
+        console.error('Error:', error);
+    }
+}
+
+// === КАРТА ПАРАМЕТРОВ ===
+
+async function buildHeatmap() {
+    const base = Object.fromEntries(new FormData(document.getElementById('calculatorForm')).entries());
+    const sweep = Object.fromEntries(new FormData(document.getElementById('sweepForm')).entries());
+    
+    if (sweep.x_axis === sweep.y_axis) {
+        alert('Выберите разные параметры для осей X и Y');
+        return;
+    }
+    
+    // Базовые значения из формы калькулятора, оси — диапазоны
+    const grid = {};
+    Object.entries(base).forEach(([key, value]) => {
+        if (key !== 'csrfmiddlewaretoken' && key !== 'mode') {
+            grid[key] = key === 'reducer_type' ? value : parseFloat(value);
+        }
+    });
+    grid[sweep.x_axis] = {min: sweep.x_min, max: sweep.x_max, steps: sweep.x_steps};
+    grid[sweep.y_axis] = {min: sweep.y_min, max: sweep.y_max, steps: sweep.y_steps};
+    
+    try {
+        const response = await fetch('/antimony/sweep/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCSRFToken()
+            },
+            body: JSON.stringify({grid: grid, columns: [sweep.metric], mode: base.mode})
+        });
+        const result = await response.json();
+        
+        if (result.success) {
+            drawHeatmap(result, sweep.x_axis, sweep.y_axis, sweep.metric);
+        } else {
+            alert('Ошибка расчета карты: ' + result.error);
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Ошибка сети при расчете карты');
+    }
+}
+
+function heatmapColor(t) {
+    // Градиент синий → фиолетовый → желтый
+    const stops = [[37, 99, 235], [124, 58, 237], [245, 158, 11]];
+    const scaled = Math.min(Math.max(t, 0), 1) * (stops.length - 1);
+    const i = Math.min(Math.floor(scaled), stops.length - 2);
+    const f = scaled - i;
+    const c = stops[i].map((v, k) => Math.round(v + (stops[i + 1][k] - v) * f));
+    return `rgb(${c[0]}, ${c[1]}, ${c[2]})`;
+}
+
+function drawHeatmap(result, xAxis, yAxis, metric) {
+    document.getElementById('heatmapContainer').classList.remove('hidden');
+    
+    const axisNames = Object.keys(result.axes);
+    const xValues = result.axes[xAxis] || [];
+    const yValues = result.axes[yAxis] || [];
+    const values = result.columns[metric];
+    if (!xValues.length || !yValues.length) {
+        alert('Для карты нужно не меньше двух значений по каждой оси');
+        return;
+    }
+    
+    // Индекс в плоском массиве (порядок осей — как в ответе сервера)
+    const xi = axisNames.indexOf(xAxis);
+    const yi = axisNames.indexOf(yAxis);
+    const strides = result.shape.map((_, i) => result.shape.slice(i + 1).reduce((a, b) => a * b, 1));
+    const valueAt = (ix, iy) => values[ix * strides[xi] + iy * strides[yi]];
+    
+    const finite = values.filter(v => v !== null && isFinite(v));
+    const vMin = Math.min(...finite);
+    const vMax = Math.max(...finite);
+    const span = vMax - vMin || 1;
+    
+    const canvas = document.getElementById('heatmapCanvas');
+    const ctx = canvas.getContext('2d');
+    canvas.width = canvas.clientWidth;
+    const pad = {left: 70, right: 90, top: 10, bottom: 40};
+    const w = (canvas.width - pad.left - pad.right) / xValues.length;
+    const h = (canvas.height - pad.top - pad.bottom) / yValues.length;
+    
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    for (let ix = 0; ix < xValues.length; ix++) {
+        for (let iy = 0; iy < yValues.length; iy++) {
+            const v = valueAt(ix, iy);
+            ctx.fillStyle = (v === null || !isFinite(v)) ? '#334155' : heatmapColor((v - vMin) / span);
+            ctx.fillRect(pad.left + ix * w, pad.top + (yValues.length - 1 - iy) * h, Math.ceil(w), Math.ceil(h));
+        }
+    }
+    
+    // Подписи осей
+    ctx.fillStyle = '#94A3B8';
+    ctx.font = '11px sans-serif';
+    ctx.textAlign = 'center';
+    const xTicks = Math.min(xValues.length, 8);
+    for (let k = 0; k < xTicks; k++) {
+        const ix = Math.round(k * (xValues.length - 1) / Math.max(xTicks - 1, 1));
+        ctx.fillText(formatNumber(xValues[ix], 1), pad.left + (ix + 0.5) * w, canvas.height - pad.bottom + 16);
+    }
+    ctx.textAlign = 'right';
+    const yTicks = Math.min(yValues.length, 8);
+    for (let k = 0; k < yTicks; k++) {
+        const iy = Math.round(k * (yValues.length - 1) / Math.max(yTicks - 1, 1));
+        ctx.fillText(formatNumber(yValues[iy], 1), pad.left - 8, pad.top + (yValues.length - 0.5 - iy) * h + 4);
+    }
+    
+    // Шкала значений
+    const barX = canvas.width - pad.right + 20;
+    const barH = canvas.height - pad.top - pad.bottom;
+    for (let p = 0; p < barH; p++) {
+        ctx.fillStyle = heatmapColor(1 - p / barH);
+        ctx.fillRect(barX, pad.top + p, 14, 1);
+    }
+    ctx.fillStyle = '#E2E8F0';
+    ctx.textAlign = 'left';
+    ctx.fillText(formatNumber(vMax, 2), barX + 18, pad.top + 10);
+    ctx.fillText(formatNumber(vMin, 2), barX + 18, pad.top + barH);
+    
+    // Подсказка при наведении
+    const tooltip = document.getElementById('heatmapTooltip');
+    canvas.onmousemove = function(e) {
+        const rect = canvas.getBoundingClientRect();
+        const ix = Math.floor((e.clientX - rect.left - pad.left) / w);
+        const iy = yValues.length - 1 - Math.floor((e.clientY - rect.top - pad.top) / h);
+        if (ix < 0 || iy < 0 || ix >= xValues.length || iy >= yValues.length) {
+            tooltip.classList.add('hidden');
+            return;
+        }
+        tooltip.innerHTML = `${xAxis}: ${formatNumber(xValues[ix], 2)}<br>${yAxis}: ${formatNumber(yValues[iy], 2)}<br>` +
+            `<b>${result.labels[metric]}: ${formatNumber(valueAt(ix, iy), 2)}</b>`;
+        tooltip.style.left = (e.clientX - rect.left + 12) + 'px';
+        tooltip.style.top = (e.clientY - rect.top + 12) + 'px';
+        tooltip.classList.remove('hidden');
+    };
+    canvas.onmouseleave = () => tooltip.classList.add('hidden');
+    
+    document.getElementById('heatmapInfo').textContent =
+        `${result.labels[metric]}: ${result.size} сценариев, диапазон ${formatNumber(vMin, 2)} – ${formatNumber(vMax, 2)}`;
+}
+
 function displayResults(data) {
     const resultsContainer = document.getElementById('resultsContainer');
     const noResults = document.getElementById('noResults');
@@ -250,6 +447,10 @@ function displayResults(data) {
             </div>
         </div>
         
+        ${generateHeatBalanceHTML(data.heat_balance)}
+        
+        ${generateEquilibriumHTML(data.equilibrium)}
+        
         <!-- Рекомендации -->
         ${generateRecommendationsHTML(data.recommendations)}
         
@@ -289,6 +490,80 @@ function displayResults(data) {
     }, 100);
 }
 
+function generateHeatBalanceHTML(heat) {
+    const rows = [
+        ['Теплота реакций и испарения влаги', heat.reaction_heat],
+        ['Физическое тепло металла', heat.metal_heat],
+        ['Физическое тепло шлака', heat.slag_heat],
+        ['Физическое тепло газов и остатка восстановителя', heat.gas_heat],
+        ['Потери тепла печью', heat.heat_losses],
+    ].map(([label, value]) => `
+        <div class="flex justify-between">
+            <span class="text-gray-400">${label}:</span>
+            <span class="text-white font-medium">${value} кДж</span>
+        </div>
+    `).join('');
+    
+    return `
+        <div class="space-y-4">
+            <h3 class="text-lg font-semibold text-yellow-400 border-b border-yellow-400/30 pb-2">
+                🔥 Тепловой баланс
+            </h3>
+            <div class="bg-white/5 rounded-xl p-4 space-y-2 text-sm">
+                ${rows}
+                <div class="border-t border-white/10 pt-2 flex justify-between font-semibold">
+                    <span class="text-gray-300">Всего:</span>
+                    <span class="text-orange-400">${heat.total_heat} кДж</span>
+                </div>
+                <div class="flex justify-between font-semibold">
+                    <span class="text-gray-300">Удельный расход:</span>
+                    <span class="text-purple-400">${heat.specific_energy} кВт·ч/т черновой Sb</span>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+function generateEquilibriumHTML(equilibrium) {
+    if (!equilibrium) {
+        return '';
+    }
+    
+    const rows = Object.entries(equilibrium.distribution).map(([element, shares]) => `
+        <tr class="border-t border-white/10">
+            <td class="py-1 text-gray-300">${element}</td>
+            <td class="py-1 text-right text-green-400">${shares.metal}%</td>
+            <td class="py-1 text-right text-yellow-400">${shares.slag}%</td>
+            <td class="py-1 text-right text-red-400">${shares.gas}%</td>
+        </tr>
+    `).join('');
+    
+    return `
+        <div class="space-y-4">
+            <h3 class="text-lg font-semibold text-yellow-400 border-b border-yellow-400/30 pb-2">
+                🔬 Равновесное распределение элементов
+            </h3>
+            <div class="bg-white/5 rounded-xl p-4 text-sm">
+                <table class="w-full">
+                    <thead>
+                        <tr class="text-gray-400">
+                            <th class="text-left font-medium">Элемент</th>
+                            <th class="text-right font-medium">Металл</th>
+                            <th class="text-right font-medium">Шлак</th>
+                            <th class="text-right font-medium">Газ</th>
+                        </tr>
+                    </thead>
+                    <tbody>${rows}</tbody>
+                </table>
+                <div class="mt-3 text-xs text-gray-400">
+                    CO / (CO + CO₂): <span class="text-white">${equilibrium.co_fraction}%</span>,
+                    оксидный расплав: <span class="text-white">${equilibrium.oxide_slag_mass} г</span>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
 function generateRecommendationsHTML(recommendations) {
     if (!recommendations || recommendations.length === 0) {
         return '';